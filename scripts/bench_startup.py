@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Startup benchmark: import time and WePublicDefender construction time.
+
+Short-lived CLI runs (guidance mode, wpd-verify-citation) construct one
+WePublicDefender and exit, so construction must stay cheap. This measures
+the first (cold) construction and the median of repeated (warm)
+constructions and exits non-zero if either exceeds its budget.
+
+Usage:
+  python scripts/bench_startup.py
+  python scripts/bench_startup.py --runs 50 --cold-budget-ms 100 --warm-budget-ms 10
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Measure WePublicDefender import and construction time")
+    ap.add_argument("--runs", type=int, default=20, help="Warm constructions to time (default 20)")
+    ap.add_argument("--cold-budget-ms", type=float, default=100.0, help="Budget for the first construction (default 100ms)")
+    ap.add_argument("--warm-budget-ms", type=float, default=10.0, help="Budget for the median warm construction (default 10ms)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    from wepublic_defender.core import WePublicDefender
+    import_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    WePublicDefender()
+    cold_ms = (time.perf_counter() - t0) * 1000
+
+    warm = []
+    for _ in range(max(1, args.runs)):
+        t0 = time.perf_counter()
+        WePublicDefender()
+        warm.append((time.perf_counter() - t0) * 1000)
+    warm_ms = statistics.median(warm)
+
+    print(f"import:            {import_ms:8.1f} ms")
+    print(f"construct (cold):  {cold_ms:8.2f} ms  (budget {args.cold_budget_ms:.0f} ms)")
+    print(f"construct (warm):  {warm_ms:8.2f} ms  median of {len(warm)} (budget {args.warm_budget_ms:.0f} ms)")
+
+    over = cold_ms > args.cold_budget_ms or warm_ms > args.warm_budget_ms
+    if over:
+        print("[fail] construction exceeded its budget")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -67,6 +67,9 @@ setup(
             "flake8>=6.0.0",
             "mypy>=1.0.0",
         ],
+        "fast": [
+            "orjson>=3.9.0",
+        ],
     },
     classifiers=[
         "Development Status :: 3 - Alpha",
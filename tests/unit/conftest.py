@@ -13,6 +13,15 @@ from datetime import date
 from wepublic_defender.models.token_tracker import TokenUsage
 
 
+@pytest.fixture(autouse=True)
+def isolated_state_dirs(tmp_path, monkeypatch):
+    """Keep the LLM response cache and rate-limit state out of the working tree, isolated per test."""
+    cache_dir = tmp_path / "llm_cache"
+    monkeypatch.setenv("WPD_LLM_CACHE_DIR", str(cache_dir))
+    monkeypatch.setenv("WPD_RATE_LIMIT_DIR", str(tmp_path / "locks"))
+    return cache_dir
+
+
 @pytest.fixture
 def sample_llm_config():
     """Sample LLM configuration for testing with priority tier pricing."""
@@ -0,0 +1,178 @@
+"""
+Unit tests for batch.py
+
+Tests batch request building, polling backoff, result mapping and the
+submit/collect round trip through WePublicDefender.
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from wepublic_defender.batch import (
+    BatchNotSupportedError,
+    build_batch_request,
+    fetch_batch_results,
+    load_job,
+    submit_batch,
+    wait_for_batch,
+)
+from wepublic_defender.core import WePublicDefender
+from wepublic_defender.models.legal_responses import DocumentReviewResult
+
+
+MESSAGES = [{"role": "system", "content": "Review."}, {"role": "user", "content": "Brief."}]
+REVIEW = {"critical_issues": [], "major_issues": ["Thin facts"], "minor_issues": [], "ready_to_file": False, "iteration": 1, "confidence": 80}
+
+
+class FakeBatchClient:
+    """Records uploads and answers each submitted request with `reply(custom_id, body)`."""
+
+    def __init__(self, reply=None, statuses=("completed",)):
+        self.reply = reply or (lambda cid, body: {"status_code": 200, "body": _body(json.dumps(REVIEW))})
+        self.statuses = list(statuses)
+        self.uploaded = []
+        self.files = MagicMock()
+        self.files.create.side_effect = self._upload
+        self.files.content.side_effect = self._content
+        self.batches = MagicMock()
+        self.batches.create.return_value = SimpleNamespace(id="batch_abc", status="validating")
+        self.batches.retrieve.side_effect = self._retrieve
+
+    def _upload(self, file, purpose):
+        assert purpose == "batch"
+        self.uploaded = [json.loads(line) for line in file.read().decode("utf-8").splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def _retrieve(self, batch_id):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        counts = SimpleNamespace(total=len(self.uploaded), completed=len(self.uploaded), failed=0)
+        return SimpleNamespace(status=status, output_file_id="file-out", error_file_id=None, request_counts=counts)
+
+    def _content(self, file_id):
+        lines = [
+            json.dumps({"custom_id": line["custom_id"], "response": self.reply(line["custom_id"], line["body"]), "error": None})
+            for line in self.uploaded
+        ]
+        return SimpleNamespace(text="\n".join(lines))
+
+
+def _body(text, inp=1000, out=200, cached=0):
+    return {
+        "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": inp, "output_tokens": out, "input_tokens_details": {"cached_tokens": cached}},
+    }
+
+
+@pytest.fixture
+def case_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class TestBuildRequest:
+    """Test JSONL line construction."""
+
+    def test_structured_request_uses_json_schema(self):
+        line, ctx = build_batch_request("0-self_review-gpt-5", "gpt-5", MESSAGES, effort="low", pydantic_model=DocumentReviewResult)
+        assert line["url"] == "/v1/responses"
+        assert line["body"]["model"] and line["body"]["input"] == MESSAGES
+        assert line["body"]["text"]["format"]["type"] == "json_schema"
+        assert "text_format" not in line["body"]
+        assert ctx["service_tier"] == "batch" and ctx["structured"] is False
+        json.dumps(line)  # must be serializable
+
+    def test_xai_models_are_not_batchable(self):
+        with pytest.raises(BatchNotSupportedError):
+            build_batch_request("x", "grok-4", MESSAGES)
+
+
+class TestLifecycle:
+    """Test manifest persistence, polling and result mapping."""
+
+    def _submit(self, client):
+        line, ctx = build_batch_request("r1", "gpt-5", MESSAGES)
+        return submit_batch([(line, {"model": "gpt-5", "ctx": ctx})], label="t", client=client)
+
+    def test_submit_persists_manifest_and_input(self, case_dir):
+        client = FakeBatchClient()
+        job = self._submit(client)
+        assert (case_dir / ".wepublic_defender" / "batches" / "batch_abc.json").exists()
+        assert (case_dir / ".wepublic_defender" / "batches" / "batch_abc.input.jsonl").exists()
+        assert load_job("batch_abc").requests["r1"]["model"] == "gpt-5"
+        assert client.batches.create.call_args.kwargs["completion_window"] == "24h"
+        assert job.status == "validating"
+
+    def test_wait_backs_off_until_done(self, case_dir):
+        client = FakeBatchClient(statuses=["validating", "in_progress", "in_progress", "completed"])
+        job = self._submit(client)
+        sleeps = []
+        cfg = {"batchConfig": {"poll_base_delay": 1.0, "poll_max_delay": 3.0, "max_wait_seconds": 100}}
+        job = wait_for_batch(job, client=client, root_cfg=cfg, sleep=sleeps.append)
+        assert job.status == "completed"
+        assert sleeps == [1.0, 2.0, 3.0]
+
+    def test_wait_gives_up_at_max_wait(self, case_dir):
+        client = FakeBatchClient(statuses=["in_progress"])
+        job = self._submit(client)
+        cfg = {"batchConfig": {"poll_base_delay": 4.0, "poll_max_delay": 4.0, "max_wait_seconds": 6}}
+        sleeps = []
+        job = wait_for_batch(job, client=client, root_cfg=cfg, sleep=sleeps.append)
+        assert job.status == "in_progress"
+        assert sum(sleeps) == 6
+
+    def test_failed_lines_map_to_errors(self, case_dir):
+        client = FakeBatchClient(reply=lambda cid, body: {"status_code": 400, "body": {"error": {"message": "bad schema"}}})
+        job = wait_for_batch(self._submit(client), client=client, max_wait=0)
+        results = fetch_batch_results(job, client)
+        assert "bad schema" in results["r1"]["error"]
+
+
+class TestCoreBatch:
+    """Test WePublicDefender.submit_agent_batch / collect_agent_batch."""
+
+    @pytest.fixture
+    def wpd(self):
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                return WePublicDefender()
+
+    @pytest.mark.asyncio
+    async def test_round_trip_matches_agent_output(self, wpd, case_dir):
+        client = FakeBatchClient()
+        with patch("wepublic_defender.batch._client", return_value=client):
+            job = wpd.submit_agent_batch([{"agent_type": "self_review", "document": "Brief."}], label="sr")
+            # self_review runs gpt-5 + grok-4; grok has no batch endpoint
+            assert [r["model"] for r in job.requests.values()] == ["gpt-5"]
+            assert job.skipped == [{"key": "self_review", "agent": "self_review", "model": "grok-4", "reason": "no batch endpoint"}]
+
+            collected = await wpd.collect_agent_batch(job.id)
+
+        assert collected["status"] == "completed"
+        result = collected["results"]["self_review"]
+        assert result["model"] == "gpt-5"
+        assert result["structured"]["major_issues"] == ["Thin facts"]
+        assert result["usage"]["service_tier"] == "batch"
+        assert result["batch_id"] == "batch_abc"
+
+        event = wpd.token_tracker._history[-1]
+        assert event.service_tier == "batch"
+        full = event.model_copy(update={"service_tier": "auto"})
+        assert wpd.token_tracker.cost_for_usage(event)[3] == pytest.approx(wpd.token_tracker.cost_for_usage(full)[3] / 2)
+        assert load_job(job.id).collected_at is not None
+
+    @pytest.mark.asyncio
+    async def test_collect_before_completion_returns_status(self, wpd, case_dir):
+        client = FakeBatchClient(statuses=["in_progress"])
+        with patch("wepublic_defender.batch._client", return_value=client):
+            job = wpd.submit_agent_batch([{"agent_type": "self_review", "document": "Brief.", "override_model": "gpt-5"}])
+            collected = await wpd.collect_agent_batch(job.id)
+        assert collected["status"] == "in_progress"
+        assert collected["results"] == {}
+        assert wpd.token_tracker.usage("gpt-5").output == 0
+
+    def test_nothing_batchable_raises(self, wpd, case_dir):
+        with pytest.raises(ValueError):
+            wpd.submit_agent_batch([{"agent_type": "self_review", "document": "Brief.", "override_model": "grok-4"}])
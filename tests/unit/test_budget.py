@@ -0,0 +1,200 @@
+"""
+Unit tests for budget.py
+
+Tests the tier/effort/model ladder, skipping optional models, refusing calls
+that cannot fit, output projection from history and the budget path through
+WePublicDefender.call_agent.
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.budget import BudgetExceededError, BudgetScheduler, OutputHistory, effort_ladder
+from wepublic_defender.core import WePublicDefender
+from wepublic_defender.models.token_tracker import TokenTracker, TokenUsage
+
+
+MESSAGES = [
+    {"role": "system", "content": "You are a careful legal reviewer. " * 100},
+    {"role": "user", "content": "The defendant moves to dismiss. " * 1200},
+]
+
+
+def _scheduler(budget, tracker=None, **cfg):
+    settings = {"budgetConfig": {"reserve_fraction": 0.0, **cfg}}
+    return BudgetScheduler(budget, tracker, settings, history=OutputHistory(tracker, csv_path="missing.csv"))
+
+
+def _full_cost(model, tier="auto", effort="high"):
+    """Projected cost of the unmodified option under a roomy budget."""
+    return _scheduler(100.0).plan("self_review", [model], MESSAGES, effort=effort, service_tier=tier).calls[0].projected_cost
+
+
+class TestPlanning:
+    """Test option selection against the remaining budget."""
+
+    def test_roomy_budget_keeps_configuration(self):
+        plan = _scheduler(10.0).plan("self_review", ["gpt-5", "grok-4"], MESSAGES, effort="high", service_tier="priority")
+        assert [(c.model, c.effort, c.service_tier) for c in plan.calls] == [
+            ("gpt-5", "high", "priority"),
+            ("grok-4", None, "priority"),
+        ]
+        assert plan.skipped == [] and all(c.changes == [] for c in plan.calls)
+
+    def test_tier_is_dropped_before_effort_and_model(self):
+        budget = _full_cost("gpt-5", "auto") * 1.01
+        call = _scheduler(budget).plan("self_review", ["gpt-5"], MESSAGES, effort="high", service_tier="priority").calls[0]
+        assert (call.model, call.effort, call.service_tier) == ("gpt-5", "high", "auto")
+        assert call.changes == ["tier priority->auto"]
+
+    def test_model_downgrade_when_cheaper_options_do_not_fit(self):
+        budget = _full_cost("gpt-5-mini", "auto") * 1.01
+        call = _scheduler(budget, flex_models=[]).plan("self_review", ["gpt-5"], MESSAGES, effort="high").calls[0]
+        assert call.model == "gpt-5-mini" and call.downgraded_from == "gpt-5"
+        assert call.projected_cost <= budget
+
+    def test_second_model_skipped_and_primary_required(self):
+        budget = _full_cost("gpt-5") * 1.01
+        plan = _scheduler(budget, downgrades={}, flex_models=[], min_effort="high").plan(
+            "self_review", ["gpt-5", "grok-4"], MESSAGES, effort="high"
+        )
+        assert [c.model for c in plan.calls] == ["gpt-5"]
+        assert plan.skipped[0]["model"] == "grok-4"
+
+        with pytest.raises(BudgetExceededError):
+            _scheduler(0.0001).plan("self_review", ["gpt-5"], MESSAGES, effort="high")
+
+    def test_reservation_is_replaced_by_actual_cost(self):
+        scheduler = _scheduler(1.0)
+        plan = scheduler.plan("self_review", ["gpt-5"], MESSAGES, effort="high")
+        assert scheduler.remaining() == pytest.approx(1.0 - plan.projected_cost)
+        actual = scheduler.record(plan, [{"model": "gpt-5", "usage": {"input": 1000, "output": 100, "cached": 0}}])
+        assert actual == pytest.approx((1000 * 1.25 + 100 * 10) / 1_000_000)
+        assert scheduler.remaining() == pytest.approx(1.0 - actual)
+        assert "actual $0.0022" in scheduler.report()
+
+    def test_pending_calls_stay_reserved_until_settled(self):
+        scheduler = _scheduler(1.0, downgrades={}, flex_models=[])
+        plan = scheduler.plan("self_review", ["gpt-5", "grok-4"], MESSAGES, effort="high")
+        grok = plan.call("grok-4")
+        scheduler.record(plan, [{"model": "gpt-5", "usage": {"input": 1000, "output": 100}}], pending=["grok-4"])
+        assert scheduler.remaining() == pytest.approx(1.0 - scheduler.spent() - grok.projected_cost)
+
+        late = scheduler.settle(plan, "grok-4", {"model": "grok-4", "usage": {"input": 1000, "output": 100}})
+        assert late > 0
+        assert scheduler.remaining() == pytest.approx(1.0 - scheduler.spent())
+        assert plan.actual_cost == pytest.approx(scheduler.spent())
+
+    def test_cancelled_call_pays_its_input_share(self):
+        scheduler = _scheduler(1.0)
+        plan = scheduler.plan("self_review", ["gpt-5"], MESSAGES, effort="high")
+        charged = scheduler.cancel(plan)
+        assert 0 < charged < plan.projected_cost
+        assert charged == pytest.approx(scheduler.input_share(plan.calls[0]))
+        assert scheduler.remaining() == pytest.approx(1.0 - charged)
+
+    def test_extra_billed_calls_are_charged_and_may_use_the_reserve(self):
+        scheduler = _scheduler(1.0, reserve_fraction=0.5)
+        usage = {"input": 1000, "output": 100, "cached": 0}
+        one = scheduler.cost_of({"model": "gpt-5", "usage": usage})
+        retried = {"model": "gpt-5", "usage": dict(usage, extra_billed=[dict(usage, model="gpt-5")])}
+        assert scheduler.cost_of(retried) == pytest.approx(2 * one)
+
+        assert scheduler.remaining() == pytest.approx(0.5)
+        assert scheduler.affords(0.8) and not scheduler.affords(1.2)
+
+    def test_effort_ladder_stops_at_min_effort(self):
+        assert effort_ladder("medium", "minimal") == ["medium", "low", "minimal"]
+        assert effort_ladder(None, "low") == [None]
+
+
+class TestOutputHistory:
+    """Test output projection from observed calls."""
+
+    def test_percentile_of_tracked_outputs_drives_projection(self):
+        tracker = TokenTracker()
+        for out in (100, 200, 300, 400):
+            tracker.add_usage(TokenUsage(model="gpt-5", input=10, output=out, notes="agent:self_review"))
+        tracker.add_usage(TokenUsage(model="gpt-5", input=10, output=9000, notes="agent:drafter"))
+        scheduler = _scheduler(10.0, tracker, output_percentile=100)
+        call = scheduler.plan("self_review", ["gpt-5"], MESSAGES, effort="high").calls[0]
+        assert call.output_tokens == 400
+
+    def test_rewrite_agents_project_document_sized_output(self):
+        call = _scheduler(10.0).plan("drafter", ["gpt-5"], MESSAGES, effort="high").calls[0]
+        assert call.output_tokens >= call.input_tokens
+
+
+class TestCallAgentBudget:
+    """Test budget planning inside call_agent."""
+
+    @pytest.fixture
+    def wpd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        wpd.cache_mode = "off"
+        return wpd
+
+    @staticmethod
+    async def _fake_complete(**kwargs):
+        text = json.dumps({"critical_issues": [], "major_issues": [], "minor_issues": [], "ready_to_file": True, "iteration": 1, "confidence": 90})
+        return {"text": text, "usage": {"input": 2000, "output": 300, "cached": 0, "duration": 0.01}, "meta": {}}
+
+    @pytest.mark.asyncio
+    async def test_budget_applies_plan_and_reports_actual(self, wpd):
+        document = "The defendant moves to dismiss. " * 400
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._fake_complete) as calls:
+            wpd.set_budget(10.0)
+            first = await wpd.call_agent("self_review", document, mode="external-llm", override_service_tier="priority")
+            assert first["budget"]["changes"] == []
+
+            # Leave room for one flex-tier call and nothing else
+            wpd.set_budget(wpd.estimate_agent_call("self_review", document)[0].estimated_cost * 0.6)
+            second = await wpd.call_agent("self_review", document, mode="external-llm", override_service_tier="priority")
+
+        assert [c.kwargs["service_tier"] for c in calls.call_args_list][-1] == "flex"
+        assert second["budget"]["skipped"][0]["model"] == "grok-4"
+        assert second["budget"]["actual"] > 0 and wpd.budget.spent() == second["budget"]["actual"]
+
+    @pytest.mark.asyncio
+    async def test_call_that_cannot_fit_is_never_sent(self, wpd):
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._fake_complete) as calls:
+            with pytest.raises(BudgetExceededError):
+                await wpd.call_agent("self_review", "Short brief.", mode="external-llm", budget=0.000001)
+        assert calls.call_count == 0
+
+    @pytest.mark.asyncio
+    async def test_paid_json_retry_runs_at_the_planned_tier_and_is_charged(self, wpd):
+        replies = ["Sorry, I cannot produce JSON today."]
+
+        async def complete(**kwargs):
+            if replies:
+                return {"text": replies.pop(), "usage": {"input": 2000, "output": 300, "cached": 0, "duration": 0.01}, "meta": {}}
+            return await self._fake_complete(**kwargs)
+
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=complete) as calls:
+            wpd.set_budget(10.0)
+            result = await wpd.call_agent("self_review", "Short brief.", mode="external-llm", override_model="gpt-5", override_service_tier="flex")
+
+        assert [c.kwargs["service_tier"] for c in calls.call_args_list] == ["flex", "flex"]
+        assert result["structured"]["ready_to_file"] is True
+        one = wpd.budget.cost_of({"model": "gpt-5", "usage": {"input": 2000, "output": 300}})
+        assert wpd.budget.spent() == pytest.approx(2 * one)
+        assert wpd.budget.spent() == pytest.approx(sum(c[3] for c in wpd.token_tracker.cost_all().values()))
+
+    @pytest.mark.asyncio
+    async def test_json_retry_is_skipped_when_it_does_not_fit(self, wpd):
+        async def complete(**kwargs):
+            return {"text": "not json", "usage": {"input": 2000, "output": 300, "cached": 0, "duration": 0.01}, "meta": {}}
+
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=complete) as calls:
+            wpd.set_budget(10.0)
+            with patch.object(BudgetScheduler, "affords", return_value=False):
+                result = await wpd.call_agent("self_review", "Short brief.", mode="external-llm", override_model="gpt-5")
+
+        assert calls.call_count == 1
+        assert "structured" not in result
@@ -0,0 +1,128 @@
+"""
+Unit tests for chunking.py
+
+Tests heading-aware splitting, token-bounded packing with overlap, result
+merging and the chunked path through WePublicDefender.call_agent.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.chunking import build_chunks, merge_review_results, split_sections
+from wepublic_defender.core import WePublicDefender
+
+
+def _count(text):
+    return len(text) // 4
+
+
+def _doc(*sections, words=60):
+    return "# COMPLAINT\n\n" + "".join(f"## {name}\n\n" + f"{name.lower()} text " * words + "\n\n" for name in sections)
+
+
+class TestSplitting:
+    """Test section splitting and chunk packing."""
+
+    def test_headings_inside_code_fences_are_ignored(self):
+        doc = "## A\n```\n## not a heading\n```\n## B\nb\n"
+        assert [s.title for s in split_sections(doc)] == ["A", "B"]
+
+    def test_chunks_respect_token_budget(self):
+        chunks = build_chunks(_doc("FACTS", "CLAIMS", "RELIEF", "PRAYER"), _count, max_tokens=250)
+        assert len(chunks) > 1
+        assert all(c.tokens <= 250 for c in chunks)
+        assert [s for c in chunks for s in c.sections] == ["(preamble)", "FACTS", "CLAIMS", "RELIEF", "PRAYER"]
+
+    def test_oversized_section_splits_on_paragraphs(self):
+        body = "\n\n".join(f"Paragraph {i}. " + "word " * 40 for i in range(10))
+        chunks = build_chunks(f"## EXHIBIT A\n\n{body}\n", _count, max_tokens=120)
+        assert len(chunks) > 2
+        assert all(c.sections == ["EXHIBIT A"] for c in chunks)
+        assert all(_count(c.body) <= 120 for c in chunks)
+        assert "".join(c.body for c in chunks).count("Paragraph") == 10
+
+    def test_overlap_carries_previous_tail(self):
+        chunks = build_chunks(_doc("FACTS", "CLAIMS"), _count, max_tokens=200, overlap_tokens=60)
+        assert chunks[0].overlap == ""
+        assert chunks[1].overlap and chunks[0].body.rstrip().endswith(chunks[1].overlap.rstrip()[-20:])
+        assert "CONTEXT FROM PREVIOUS EXCERPT" in chunks[1].prompt(len(chunks))
+
+
+class TestMerge:
+    """Test merged review outcomes."""
+
+    def test_ready_requires_every_chunk_and_merged_totals(self):
+        chunks = build_chunks(_doc("A", "B", "C"), _count, max_tokens=100)
+        reviews = [
+            (c, {"major_issues": [f"Issue {c.index}"], "ready_to_file": True, "iteration": 1, "confidence": 80})
+            for c in chunks
+        ]
+        merged = merge_review_results(reviews)
+        # Each chunk alone is fine, but together there are more than two major issues
+        assert len(merged["major_issues"]) > 2
+        assert merged["ready_to_file"] is False
+
+
+class TestChunkedCallAgent:
+    """Test the chunked map-reduce path in call_agent."""
+
+    @pytest.fixture
+    def wpd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        wpd.cache_mode = "off"
+        wpd.review_settings["chunkingConfig"] = {
+            "enabled": True,
+            "min_document_tokens": 100,
+            "max_chunk_tokens": 250,
+            "overlap_tokens": 20,
+            "max_concurrency": 2,
+        }
+        return wpd
+
+    @pytest.mark.asyncio
+    async def test_review_is_mapped_and_merged(self, wpd):
+        active = {"now": 0, "peak": 0}
+
+        async def fake_complete(**kwargs):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            excerpt = kwargs["messages"][-1]["content"]
+            major = ["Damages are not pleaded."] if "CLAIMS" in excerpt.split("\n")[0] else []
+            review = {"critical_issues": [], "major_issues": major, "minor_issues": ["Typo."], "ready_to_file": True, "iteration": 1, "confidence": 85}
+            return {"text": json.dumps(review), "usage": {"input": 100, "output": 20, "cached": 0, "duration": 0.01}, "meta": {}}
+
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=fake_complete) as calls:
+            result = await wpd.call_agent(
+                "self_review", _doc("FACTS", "CLAIMS", "RELIEF", "PRAYER"), mode="external-llm", override_model="gpt-5"
+            )
+
+        info = result["chunked"]
+        assert info["chunks"] == calls.call_count > 1
+        assert active["peak"] <= 2
+        assert [t["index"] for t in info["timings"]] == list(range(info["chunks"]))
+        assert all(t["duration"] > 0 for t in info["timings"])
+        assert result["structured"]["major_issues"] == ["[CLAIMS] Damages are not pleaded."]
+        assert len(result["structured"]["minor_issues"]) == 1  # deduped across chunks
+        assert result["usage"]["input"] == 100 * info["chunks"]
+        assert wpd.token_tracker.usage("gpt-5").input == 100 * info["chunks"]
+
+    @pytest.mark.asyncio
+    async def test_short_documents_and_opt_out_are_sent_whole(self, wpd):
+        async def fake_complete(**kwargs):
+            return {"text": json.dumps({"ready_to_file": True, "iteration": 1, "confidence": 90}), "usage": {}, "meta": {}}
+
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=fake_complete) as calls:
+            short = await wpd.call_agent("self_review", "## A\nshort", mode="external-llm", override_model="gpt-5")
+            opted_out = await wpd.call_agent(
+                "self_review", _doc("FACTS", "CLAIMS"), mode="external-llm", override_model="gpt-5", chunked=False
+            )
+        assert calls.call_count == 2
+        assert "chunked" not in short and "chunked" not in opted_out
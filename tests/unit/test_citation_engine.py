@@ -0,0 +1,141 @@
+"""
+Unit tests for citation_engine.py
+
+Tests citation extraction (case names, pin cites, propositions, sections),
+normalization, the per-citation cache key and the per-citation path through
+WePublicDefender.call_agent.
+"""
+
+import asyncio
+import json
+import re
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.citation_engine import extract_citations, normalize_citation
+from wepublic_defender.core import WePublicDefender
+
+
+BRIEF = """# MOTION TO DISMISS
+
+## I. PLEADING STANDARD
+
+A complaint must state a plausible claim. See Bell Atl. Corp. v. Twombly, 550 U.S. 544, 570 (2007).
+Threadbare recitals do not suffice. Ashcroft v. Iqbal, 556 U.S. 662, 678 (2009).
+
+## II. QUALIFIED IMMUNITY
+
+Officials are immune unless the right was clearly established. Pearson v. Callahan, 555 U.S. 223 (2009).
+Plausibility governs here too. Twombly, 550 U.S. 544, 556. Rule 8 applies, see 12 Fed. R. Civ. P. 8, and 42 U.S.C. § 1983.
+"""
+
+
+def _verification(citation, case_name="Case v. Case", good=True):
+    return {
+        "case_name": case_name,
+        "citation": citation,
+        "still_good_law": good,
+        "verified_date": "2025-01-01",
+        "confidence": 90,
+        "supports_position": True,
+    }
+
+
+class TestExtraction:
+    """Test local citation extraction."""
+
+    def test_distinct_citations_in_document_order(self):
+        cites = extract_citations(BRIEF)
+        assert [c.citation for c in cites] == ["550 U.S. 544", "556 U.S. 662", "555 U.S. 223"]
+        assert [c.case_name for c in cites] == ["Bell Atl. Corp. v. Twombly", "Ashcroft v. Iqbal", "Pearson v. Callahan"]
+
+    def test_repeat_citation_merges_pins_sections_and_propositions(self):
+        twombly = extract_citations(BRIEF)[0]
+        assert twombly.pin_cites == ["570", "556"]
+        assert twombly.sections == ["I. PLEADING STANDARD", "II. QUALIFIED IMMUNITY"]
+        assert twombly.propositions[0] == "A complaint must state a plausible claim."
+        assert len(twombly.propositions) == 2
+
+    def test_rules_and_statutes_are_not_reporters(self):
+        assert all("Fed. R." not in c.citation for c in extract_citations(BRIEF))
+        assert extract_citations("See 42 U.S.C. § 1983 and Fed. R. Civ. P. 12(b)(6).") == []
+
+    def test_normalization_ignores_spacing_and_pins(self):
+        assert normalize_citation("123 F. 3d 456, 460") == normalize_citation("123 F.3d 456")
+        assert extract_citations("Smith v. Jones, 1 F. 3d 2. Later: Smith v. Jones, 1 F.3d 2, 5.")[0].pin_cites == ["5"]
+
+    def test_max_citations_caps_distinct_citations(self):
+        assert len(extract_citations(BRIEF, max_citations=2)) == 2
+
+
+class TestPerCitationCallAgent:
+    """Test the per-citation path for citation_verify."""
+
+    @pytest.fixture
+    def wpd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        wpd.cache_mode = "off"
+        wpd.review_settings["perCitationConfig"] = {"enabled": True, "max_concurrency": 2}
+        return wpd
+
+    @staticmethod
+    def _fake(active=None):
+        async def fake_complete(**kwargs):
+            if active is not None:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            if active is not None:
+                active["now"] -= 1
+            prompt = kwargs["messages"][-1]["content"]
+            match = re.search(r"CITATION TO VERIFY: (.+)", prompt)
+            items = [_verification(match.group(1) if match else "1 F.4th 1", good="555 U.S." not in prompt)]
+            return {"text": json.dumps(items), "usage": {"input": 50, "output": 10, "cached": 0, "duration": 0.01}, "meta": {}}
+
+        return fake_complete
+
+    @pytest.mark.asyncio
+    async def test_each_citation_verified_concurrently_in_document_order(self, wpd):
+        active = {"now": 0, "peak": 0}
+        seen = []
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._fake(active)) as calls:
+            result = await wpd.call_agent(
+                "citation_verify", BRIEF, mode="external-llm", override_model="gpt-5",
+                on_delta=lambda agent, model, line: seen.append(line),
+            )
+
+        assert calls.call_count == 3
+        assert 1 < active["peak"] <= 2
+        assert [r["citation"] for r in result["structured"]] == ["550 U.S. 544", "556 U.S. 662", "555 U.S. 223"]
+        assert result["structured"][2]["applies_to_sections"] == ["II. QUALIFIED IMMUNITY"]
+        assert result["per_citation"]["verified"] == 3 and result["per_citation"]["failed"] == []
+        assert result["usage"]["input"] == 150
+        assert len(seen) == 3 and any("555 U.S. 223: PROBLEM" in line for line in seen)
+        assert result["claude_prompt"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_citations_hit_cache_when_context_changes(self, wpd):
+        wpd.cache_mode = "use"
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._fake()) as calls:
+            await wpd.call_agent("citation_verify", BRIEF, mode="external-llm", override_model="gpt-5")
+            edited = BRIEF.replace("Threadbare recitals do not suffice.", "Labels and conclusions are not enough.")
+            result = await wpd.call_agent("citation_verify", edited, mode="external-llm", override_model="gpt-5")
+
+        # Only Iqbal's proposition changed, so only Iqbal is re-verified
+        assert calls.call_count == 4
+        assert result["per_citation"]["cached"] == 2
+        assert [t["cache_hit"] for t in result["per_citation"]["timings"]] == [True, False, True]
+
+    @pytest.mark.asyncio
+    async def test_no_reporter_citations_or_opt_out_sends_whole_document(self, wpd):
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._fake()) as calls:
+            statutes = await wpd.call_agent("citation_verify", "See 42 U.S.C. § 1983.", mode="external-llm", override_model="gpt-5")
+            opted_out = await wpd.call_agent(
+                "citation_verify", BRIEF, mode="external-llm", override_model="gpt-5", per_citation=False
+            )
+        assert calls.call_count == 2
+        assert "per_citation" not in statutes and "per_citation" not in opted_out
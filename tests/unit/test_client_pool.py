@@ -0,0 +1,144 @@
+"""
+Unit tests for client_pool.py
+
+Tests client reuse, keying, pool limit resolution and shutdown.
+"""
+
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from wepublic_defender.client_pool import ClientPool, resolve_pool_limits
+
+
+OPENAI_PROVIDER = {
+    "name": "OpenAI",
+    "base_url": "https://api.openai.com/v1",
+    "api_key_env_var": "OPENAI_API_KEY",
+}
+
+
+class TestResolvePoolLimits:
+    """Test pool limit merging."""
+
+    def test_defaults(self):
+        limits = resolve_pool_limits({})
+        assert limits["max_connections"] == 20
+        assert limits["max_keepalive_connections"] == 10
+
+    def test_provider_overrides_root(self):
+        limits = resolve_pool_limits(
+            {"connection_pool": {"max_connections": 4}},
+            {"connectionPool": {"max_connections": 40, "max_keepalive_connections": 8}},
+        )
+        assert limits["max_connections"] == 4
+        assert limits["max_keepalive_connections"] == 8
+
+
+class TestClientPool:
+    """Test OpenAI/xAI client reuse."""
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"})
+    @patch("wepublic_defender.client_pool.OpenAI")
+    def test_openai_client_reused(self, mock_openai):
+        pool = ClientPool()
+        first = pool.openai_client("openai", OPENAI_PROVIDER)
+        second = pool.openai_client("openai", OPENAI_PROVIDER)
+
+        assert first is second
+        assert mock_openai.call_count == 1
+        assert pool.size() == 1
+
+    @patch("wepublic_defender.client_pool.OpenAI")
+    def test_api_key_change_creates_new_client(self, mock_openai):
+        mock_openai.side_effect = lambda **kw: MagicMock()
+        pool = ClientPool()
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"}):
+            first = pool.openai_client("openai", OPENAI_PROVIDER)
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "key-b"}):
+            second = pool.openai_client("openai", OPENAI_PROVIDER)
+
+        assert first is not second
+        assert pool.size() == 2
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_missing_key_returns_none(self):
+        pool = ClientPool()
+        assert pool.openai_client("openai", OPENAI_PROVIDER) is None
+        assert pool.size() == 0
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_xai_missing_key_raises(self):
+        pool = ClientPool()
+        with pytest.raises(RuntimeError):
+            pool.xai_client("xai", {"api_key_env_var": "XAI_API_KEY"})
+
+    @patch.dict("os.environ", {"XAI_API_KEY": "key-x"})
+    @patch("wepublic_defender.client_pool.XAIClient")
+    def test_xai_client_dials_the_configured_host(self, mock_xai):
+        mock_xai.side_effect = lambda **kw: MagicMock()
+        pool = ClientPool()
+        default = pool.xai_client("xai", {"api_key_env_var": "XAI_API_KEY"})
+        proxied = pool.xai_client("xai", {"api_key_env_var": "XAI_API_KEY", "base_url": "https://grok.example.com/v1"})
+
+        assert default is not proxied
+        assert "api_host" not in mock_xai.call_args_list[0].kwargs
+        assert mock_xai.call_args_list[1].kwargs["api_host"] == "grok.example.com"
+        # Same host, spelled differently: one client
+        assert pool.xai_client("xai", {"api_key_env_var": "XAI_API_KEY", "base_url": "https://grok.example.com"}) is proxied
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"})
+    @patch("wepublic_defender.client_pool.OpenAI")
+    def test_concurrent_borrow_creates_single_client(self, mock_openai):
+        pool = ClientPool()
+        results = []
+
+        def _borrow():
+            results.append(pool.openai_client("openai", OPENAI_PROVIDER))
+
+        threads = [threading.Thread(target=_borrow) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert mock_openai.call_count == 1
+        assert all(r is results[0] for r in results)
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"})
+    @patch("wepublic_defender.client_pool.OpenAI")
+    def test_close_all_closes_and_clears(self, mock_openai):
+        pool = ClientPool()
+        client = pool.openai_client("openai", OPENAI_PROVIDER)
+
+        pool.close_all()
+
+        client.close.assert_called_once()
+        assert pool.size() == 0
+
+    @pytest.mark.asyncio
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"})
+    @patch("wepublic_defender.client_pool.AsyncOpenAI")
+    async def test_async_openai_client_reused_per_loop(self, mock_async_openai):
+        pool = ClientPool()
+        first = pool.async_openai_client("openai", OPENAI_PROVIDER)
+        second = pool.async_openai_client("openai", OPENAI_PROVIDER)
+
+        assert first is second
+        assert mock_async_openai.call_count == 1
+
+    @pytest.mark.asyncio
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "key-a"})
+    @patch("wepublic_defender.client_pool.AsyncOpenAI")
+    async def test_aclose_async_clients_awaits_close(self, mock_async_openai):
+        client = MagicMock()
+        client.close = AsyncMock()
+        mock_async_openai.return_value = client
+        pool = ClientPool()
+        pool.async_openai_client("openai", OPENAI_PROVIDER)
+
+        await pool.aclose_async_clients()
+
+        client.close.assert_awaited_once()
+        assert pool.size() == 0
@@ -0,0 +1,169 @@
+"""
+Unit tests for completion.py
+
+Tests policy parsing, early return under each policy and straggler
+handling (including budget reservations) in multi-model call_agent.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.completion import (
+    parse_completion_policy,
+    resolve_completion_config,
+    run_with_policy,
+)
+from wepublic_defender.core import WePublicDefender
+
+
+async def _reply(name, delay, error=None):
+    await asyncio.sleep(delay)
+    if error == "raise":
+        raise RuntimeError(f"{name} exploded")
+    return {"model": name, "error": error} if error else {"model": name, "text": name}
+
+
+def _ok(result):
+    return not result.get("error")
+
+
+class TestParse:
+    """Test policy strings and config resolution."""
+
+    @pytest.mark.parametrize("spec", ["quorum", "quorum:0", "quorum:1.5", "deadline:abc", "all:2", "fastest"])
+    def test_rejects_bad_specs(self, spec):
+        with pytest.raises(ValueError):
+            parse_completion_policy(spec)
+
+    def test_invalid_straggler_mode_falls_back(self):
+        cfg = resolve_completion_config({"completionConfig": {"stragglers": "ignore"}})
+        assert cfg["stragglers"] == "detach"
+
+
+class TestRunWithPolicy:
+    """Test when run_with_policy stops waiting."""
+
+    @pytest.mark.asyncio
+    async def test_all_waits_for_everyone(self):
+        calls = [("a", _reply("a", 0.01)), ("b", _reply("b", 0.05))]
+        done, cut = await run_with_policy(calls, parse_completion_policy("all"), _ok)
+        assert [n for n, _ in done] == ["a", "b"] and cut == []
+
+    @pytest.mark.asyncio
+    async def test_first_success_skips_failures(self):
+        calls = [("bad", _reply("bad", 0.0, error="raise")), ("good", _reply("good", 0.02)), ("slow", _reply("slow", 5))]
+        done, cut = await run_with_policy(calls, parse_completion_policy("first_success"), _ok)
+        assert [n for n, _ in done] == ["bad", "good"]
+        assert "exploded" in dict(done)["bad"]["error"]
+        assert [n for n, _ in cut] == ["slow"]
+        cut[0][1].cancel()
+
+    @pytest.mark.asyncio
+    async def test_quorum_larger_than_models_waits_for_all(self):
+        calls = [("a", _reply("a", 0.01)), ("b", _reply("b", 0.02))]
+        done, cut = await run_with_policy(calls, parse_completion_policy("quorum:5"), _ok)
+        assert len(done) == 2 and cut == []
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_what_finished(self):
+        calls = [("fast", _reply("fast", 0.01)), ("slow", _reply("slow", 5))]
+        done, cut = await run_with_policy(calls, parse_completion_policy("deadline:0.1"), _ok)
+        assert [n for n, _ in done] == ["fast"] and [n for n, _ in cut] == ["slow"]
+        cut[0][1].cancel()
+
+    @pytest.mark.asyncio
+    async def test_deadline_with_nothing_finished_waits_for_first(self):
+        calls = [("a", _reply("a", 0.1)), ("b", _reply("b", 5))]
+        done, cut = await run_with_policy(calls, parse_completion_policy("deadline:0.01"), _ok)
+        assert [n for n, _ in done] == ["a"]
+        cut[0][1].cancel()
+
+
+class TestCallAgentCompletion:
+    """Test the multi-model branch of call_agent under completion policies."""
+
+    DELAYS = {"grok-4": 0.01, "gpt-5": 0.05, "gpt-5-mini": 5}
+
+    @pytest.fixture
+    def wpd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+
+        async def fake_run(agent_type, model, **kwargs):
+            return await _reply(model, self.DELAYS[model])
+
+        wpd._run_single_model = fake_run
+        wpd.review_settings["reviewAgentConfig"]["strategy_agent"]["models"] = ["grok-4", "gpt-5", "gpt-5-mini"]
+        wpd.review_settings["reviewAgentConfig"]["self_review_agent"]["models"] = ["gpt-5", "grok-4"]
+        return wpd
+
+    @pytest.mark.asyncio
+    async def test_default_runs_all_in_config_order(self, wpd):
+        result = await wpd.call_agent("self_review", "Doc", mode="external-llm")
+        assert result["model"] == "gpt-5"
+        assert [r["model"] for r in result["alternate_results"]] == ["grok-4"]
+        assert result["completion"]["policy"] == "all" and result["completion"]["cut"] == []
+
+    @pytest.mark.asyncio
+    async def test_quorum_detaches_and_saves_straggler(self, wpd, tmp_path):
+        self.DELAYS["gpt-5-mini"] = 0.2
+        try:
+            result = await wpd.call_agent("strategy", "Doc", mode="external-llm", completion_policy="quorum:2")
+        finally:
+            self.DELAYS["gpt-5-mini"] = 5
+        assert result["model"] == "grok-4"
+        assert result["completion"]["completed"] == ["grok-4", "gpt-5"]
+        assert result["completion"]["cut"] == ["gpt-5-mini"]
+
+        late = await wpd.wait_for_stragglers(timeout=2)
+        assert [(l["agent"], l["model"]) for l in late] == [("strategy", "gpt-5-mini")]
+        saved = json.loads(open(late[0]["saved_to"], encoding="utf-8").read())
+        assert saved["result"]["text"] == "gpt-5-mini"
+        assert late[0]["saved_to"].endswith("_strategy_gpt-5-mini.late.json")
+
+    @pytest.mark.asyncio
+    async def test_detached_straggler_keeps_its_budget_reservation(self, wpd):
+        self.DELAYS["gpt-5-mini"] = 0.2
+        wpd.set_budget(10.0)
+        try:
+            result = await wpd.call_agent("strategy", "Doc", mode="external-llm", completion_policy="quorum:2")
+            assert result["budget"]["pending"] == ["gpt-5-mini"]
+            mini = wpd.budget.plans[-1].call("gpt-5-mini")
+            assert wpd.budget.remaining() == pytest.approx(wpd.budget.spendable() - mini.projected_cost)
+
+            await wpd.wait_for_stragglers(timeout=2)
+        finally:
+            self.DELAYS["gpt-5-mini"] = 5
+        assert wpd.budget.remaining() == pytest.approx(wpd.budget.spendable())
+
+    @pytest.mark.asyncio
+    async def test_cancel_mode_cancels_stragglers(self, wpd):
+        wpd.review_settings["completionConfig"] = {"policy": "first_success", "stragglers": "cancel"}
+        result = await wpd.call_agent("strategy", "Doc", mode="external-llm")
+        assert result["model"] == "grok-4"
+        assert result["completion"]["cut"] == ["gpt-5", "gpt-5-mini"]
+        assert wpd._stragglers == []
+        assert await wpd.wait_for_stragglers() == []
+
+    @pytest.mark.asyncio
+    async def test_cancelled_stragglers_are_charged_their_input(self, wpd):
+        wpd.review_settings["completionConfig"] = {"policy": "first_success", "stragglers": "cancel"}
+        wpd.set_budget(10.0)
+        await wpd.call_agent("strategy", "Doc", mode="external-llm")
+        plan = wpd.budget.plans[-1]
+        expected = sum(wpd.budget.input_share(plan.call(m)) for m in ("gpt-5", "gpt-5-mini"))
+        assert expected > 0
+        assert wpd.budget.spent() == pytest.approx(expected)
+
+    @pytest.mark.asyncio
+    async def test_agent_setting_selects_policy(self, wpd):
+        wpd.review_settings["reviewAgentConfig"]["self_review_agent"]["completion_policy"] = "first_success"
+        wpd.review_settings["completionConfig"] = {"stragglers": "cancel"}
+        result = await wpd.call_agent("self_review", "Doc", mode="external-llm")
+        assert result["model"] == "grok-4"
+        assert result["alternate_results"] == []
@@ -13,6 +13,8 @@ from wepublic_defender.config import (
     get_model_config,
     get_provider_config,
     get_agent_config,
+    get_resolved_llm_config,
+    invalidate_llm_config_cache,
 )
 
 
@@ -251,6 +253,56 @@ class TestUpdateAgentPreference:
             update_agent_preference("fake_agent", models=["gpt-5"])
 
 
+class TestResolvedLLMConfig:
+    """Test memoized provider config resolution."""
+
+    @pytest.fixture
+    def case_dir(self, tmp_path, monkeypatch):
+        """Point per-case settings at tmp_path and start from an empty cache."""
+        monkeypatch.setattr("wepublic_defender.config._case_settings_dir", lambda: tmp_path)
+        monkeypatch.setenv("WPD_CONFIG_CHECK_INTERVAL", "0")
+        invalidate_llm_config_cache()
+        yield tmp_path
+        invalidate_llm_config_cache()
+
+    def test_profiles_precomputed(self, case_dir):
+        """Verify per-model profiles expose provider, api_type and pricing."""
+        resolved = get_resolved_llm_config()
+        gpt5 = resolved.profile("gpt-5")
+
+        assert gpt5.provider_name == "openai"
+        assert gpt5.api_type == "openai_responses"
+        assert gpt5.supports_reasoning is True
+        assert gpt5.pricing["input_token_ppm"] == 1.25
+        assert gpt5.timeouts["with_web_search"] == 300.0
+        assert resolved.profile("nonexistent-model") is None
+
+    def test_memoized_until_file_changes(self, case_dir):
+        """Verify the same object is returned until the case override changes."""
+        first = get_resolved_llm_config()
+        assert get_resolved_llm_config() is first
+
+        override = case_dir / "llm_providers.json"
+        override.write_text(json.dumps(
+            {"modelConfigurations": {"gpt-5": {"input_token_ppm": 9.99}}}
+        ))
+
+        reloaded = get_resolved_llm_config()
+        assert reloaded is not first
+        assert reloaded.profile("gpt-5").pricing["input_token_ppm"] == 9.99
+
+    def test_check_interval_skips_disk(self, case_dir, monkeypatch):
+        """Verify lookups inside the check interval do not stat the files."""
+        monkeypatch.setenv("WPD_CONFIG_CHECK_INTERVAL", "3600")
+        first = get_resolved_llm_config()
+
+        (case_dir / "llm_providers.json").write_text(json.dumps(
+            {"modelConfigurations": {"gpt-5": {"input_token_ppm": 9.99}}}
+        ))
+
+        assert get_resolved_llm_config() is first
+
+
 class TestConfigDataIntegrity:
     """Test configuration data integrity and consistency."""
 
@@ -36,13 +36,45 @@ class TestWePublicDefenderInit:
         assert len(wpd.token_tracker.cfg) > 0
 
     @patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key', 'XAI_API_KEY': 'test-key'})
-    @patch('wepublic_defender.core.OpenAI')
-    def test_clients_created(self, mock_openai):
-        """Test OpenAI and Grok clients are created."""
-        WePublicDefender()
+    @patch('wepublic_defender.client_pool.OpenAI')
+    def test_clients_created_lazily_from_pool(self, mock_openai):
+        """Test clients are borrowed from the shared pool on first use, not at construction."""
+        from wepublic_defender.client_pool import get_client_pool
+
+        get_client_pool().close_all()
+        wpd = WePublicDefender()
+        assert mock_openai.call_count == 0
 
-        # Should have attempted to create clients
-        assert mock_openai.call_count >= 1  # Called for both openai and grok
+        assert wpd.openai_client is WePublicDefender().openai_client
+        assert wpd.grok_client is not None
+        assert mock_openai.call_count == 2  # one per provider, shared by both instances
+        get_client_pool().close_all()
+
+    @patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key', 'XAI_API_KEY': 'test-key'})
+    @patch('wepublic_defender.client_pool.OpenAI')
+    def test_construction_is_lazy(self, mock_openai):
+        """Test warm construction reads no files and defers clients and prompts (timing: scripts/bench_startup.py)."""
+        from wepublic_defender import config as config_pkg
+        from wepublic_defender.client_pool import get_client_pool
+
+        get_client_pool().close_all()
+        assert WePublicDefender().llm_config  # warm the memoized loaders
+        with patch.object(config_pkg, "load_llm_providers", wraps=config_pkg.load_llm_providers) as providers, \
+                patch.object(config_pkg, "load_review_settings", wraps=config_pkg.load_review_settings) as settings, \
+                patch("wepublic_defender.core.get_prompt_cache") as prompts:
+            wpd = WePublicDefender()
+            assert wpd.llm_config["modelConfigurations"]
+            assert providers.call_count == 0
+            assert settings.call_count == 0
+            assert prompts.call_count == 0
+        assert mock_openai.call_count == 0
+        assert wpd.openai_client is not None
+        assert mock_openai.call_count == 1
+        get_client_pool().close_all()
+
+        # Each instance owns its settings even though loading is memoized
+        wpd.review_settings["workflowConfig"]["service_tier"] = "flex"
+        assert WePublicDefender().review_settings["workflowConfig"].get("service_tier") != "flex"
 
     @patch.dict('os.environ', {}, clear=True)
     @patch('wepublic_defender.core.OpenAI')
@@ -73,7 +105,7 @@ class TestCallAgent:
         "final_review",
     ])
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_valid_agent_types(self, mock_chat, wpd, agent_type):
         """Test all valid agent types work."""
         # Return valid JSON matching expected schemas
@@ -104,6 +136,38 @@ class TestCallAgent:
         # Some agents have multiple models configured, so may be called multiple times
         assert mock_chat.call_count >= 1
 
+    @pytest.mark.parametrize("budget", [None, 100.0])
+    @pytest.mark.asyncio
+    async def test_request_is_token_counted_once(self, wpd, budget):
+        """Test the pre-flight estimate is shared by the budget plan, call_agent and the transport."""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock, MagicMock
+        from wepublic_defender.token_estimator import TokenEstimator
+
+        usage = SimpleNamespace(input_tokens=12, output_tokens=7, input_tokens_details=None)
+        client = MagicMock()
+        text = '{"ready_to_file": true, "iteration": 1, "confidence": 95}'
+        parsed = SimpleNamespace(model_dump_json=lambda indent=None: text)
+        response = SimpleNamespace(output_text=text, output_parsed=parsed, usage=usage)
+        client.with_options.return_value.responses.create = AsyncMock(return_value=response)
+        client.with_options.return_value.responses.parse = AsyncMock(return_value=response)
+        counts = []
+        real_count = TokenEstimator.count_request
+
+        def count_request(self, *args, **kwargs):
+            counts.append(args[0])
+            return real_count(self, *args, **kwargs)
+
+        with patch('wepublic_defender.llm_client.get_client_pool') as pool, patch.object(TokenEstimator, "count_request", count_request):
+            pool.return_value.async_openai_client.return_value = client
+            result = await wpd.call_agent(
+                "self_review", "Test document content", mode="external-llm",
+                override_model="gpt-5", cache_mode="off", budget=budget,
+            )
+
+        assert "error" not in result
+        assert counts == ["gpt-5"]
+
     @pytest.mark.asyncio
     async def test_invalid_agent_type_raises(self, wpd):
         """Test invalid agent type raises ValueError or FileNotFoundError."""
@@ -111,7 +175,7 @@ class TestCallAgent:
             await wpd.call_agent("nonexistent_agent", "Test document", mode="guidance")
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_override_model_parameter(self, mock_chat, wpd):
         """Test override_model parameter changes which model is used."""
         mock_chat.return_value = {
@@ -121,12 +185,12 @@ class TestCallAgent:
 
         await wpd.call_agent("self_review", "Test", mode="external-llm", override_model="grok-4")
 
-        # Verify chat_complete was called with grok-4
+        # Verify async_chat_complete was called with grok-4
         call_kwargs = mock_chat.call_args.kwargs
         assert call_kwargs["model_key"] == "grok-4"
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_override_service_tier_parameter(self, mock_chat, wpd):
         """Test override_service_tier parameter."""
         mock_chat.return_value = {
@@ -140,7 +204,7 @@ class TestCallAgent:
         assert call_kwargs["service_tier"] == "priority"
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_override_effort_parameter(self, mock_chat, wpd):
         """Test override_effort parameter."""
         mock_chat.return_value = {
@@ -154,7 +218,7 @@ class TestCallAgent:
         assert call_kwargs["effort"] == "high"
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_token_tracking(self, mock_chat, wpd):
         """Test that token usage is tracked."""
         mock_chat.return_value = {
@@ -174,7 +238,7 @@ class TestCallAgent:
         assert len(wpd.token_tracker._history) > 0
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_markdown_instructions_in_prompt(self, mock_chat, wpd):
         """Test that markdown format instructions are included in prompt."""
         mock_chat.return_value = {
@@ -192,7 +256,7 @@ class TestCallAgent:
         assert "RETURN FORMAT: Markdown" in system_message or "markdown" in system_message.lower()
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_jurisdiction_context_added(self, mock_chat, wpd):
         """Test that jurisdiction context is added to prompt when provided."""
         mock_chat.return_value = {
@@ -216,7 +280,7 @@ class TestCallAgent:
         assert "South Carolina" in system_message or "JURISDICTION" in system_message
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_error_handling(self, mock_chat, wpd):
         """Test error handling when LLM call fails."""
         mock_chat.side_effect = Exception("API Error")
@@ -228,7 +292,7 @@ class TestCallAgent:
         assert "API Error" in result["error"]
 
     @pytest.mark.asyncio
-    @patch('wepublic_defender.core.chat_complete')
+    @patch('wepublic_defender.core.async_chat_complete')
     async def test_web_search_parameter(self, mock_chat, wpd):
         """Test web_search parameter is passed through."""
         mock_chat.return_value = {
@@ -242,6 +306,41 @@ class TestCallAgent:
         assert result["web_search"] is True
 
 
+    @pytest.mark.asyncio
+    @patch('wepublic_defender.core.async_chat_complete')
+    async def test_response_cache_hit_skips_call(self, mock_chat, wpd):
+        """Test a repeated call is served from the response cache and not billed."""
+        mock_chat.return_value = {
+            "text": '{"ready_to_file": true, "iteration": 1, "confidence": 95}',
+            "usage": {"input": 1000, "output": 500, "cached": 0}
+        }
+
+        first = await wpd.call_agent("self_review", "Same draft", mode="external-llm", override_model="gpt-5")
+        second = await wpd.call_agent("self_review", "Same draft", mode="external-llm", override_model="gpt-5")
+
+        assert mock_chat.call_count == 1
+        assert second["text"] == first["text"]
+        assert second["usage"]["cache_hit"] is True
+        assert len(wpd.token_tracker._history) == 1
+        assert wpd.token_tracker.cache_hit_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    @patch('wepublic_defender.core.async_chat_complete')
+    async def test_response_cache_refresh_and_off(self, mock_chat, wpd):
+        """Test refresh skips lookup and off bypasses the cache entirely."""
+        mock_chat.return_value = {
+            "text": '{"ready_to_file": true, "iteration": 1, "confidence": 95}',
+            "usage": {"input": 10, "output": 5, "cached": 0}
+        }
+
+        await wpd.call_agent("self_review", "Draft", mode="external-llm", override_model="gpt-5")
+        await wpd.call_agent("self_review", "Draft", mode="external-llm", override_model="gpt-5", cache_mode="refresh")
+        wpd.cache_mode = "off"
+        await wpd.call_agent("self_review", "Draft", mode="external-llm", override_model="gpt-5")
+
+        assert mock_chat.call_count == 3
+
+
 class TestConvertToWord:
     """Test convert_to_word wrapper method."""
 
@@ -303,6 +402,19 @@ class TestCostReporting:
         assert isinstance(report, str)
         assert len(report) > 0
 
+    @pytest.mark.asyncio
+    async def test_usage_csv_cost_matches_token_tracker(self, wpd):
+        """Test cached input is billed once, at the cached rate, and priority pricing applies."""
+        logged = []
+        usage = {"input": 1_000_000, "output": 0, "cached": 1_000_000, "service_tier": "priority"}
+        with patch('wepublic_defender.core.async_chat_complete', return_value={"text": '{"ready_to_file": true, "iteration": 1, "confidence": 95}', "usage": usage}):
+            with patch('wepublic_defender.usage_logger.log_agent_call', side_effect=lambda **kw: logged.append(kw)):
+                await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5", cache_mode="off")
+
+        cfg = wpd.token_tracker.cfg["gpt-5"]
+        cached_ppm = cfg["priority_tier"]["input_token_cached_ppm"] if "priority_tier" in cfg else cfg["input_token_cached_ppm"] * cfg.get("priority_multiplier", 2.0)
+        assert logged[0]["cost"] == pytest.approx(cached_ppm)
+
     def test_reset_costs(self, wpd):
         """Test reset_costs clears tracker."""
         wpd.token_tracker.add("gpt-5", inp=1000, out=500)
@@ -352,3 +464,80 @@ class TestBuildJurisdictionContext:
 
         assert "S.C. Supreme Court" in result
         assert "Fourth Circuit" in result
+
+
+class TestStreaming:
+    """Test streamed agent calls."""
+
+    @pytest.fixture
+    def wpd(self):
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                return WePublicDefender()
+
+    @pytest.mark.asyncio
+    async def test_stream_writes_partial_output_and_forwards_deltas(self, wpd, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        partial_files = []
+        text = '{"ready_to_file": true, "iteration": 1, "confidence": 95}'
+
+        async def fake_complete(**kwargs):
+            assert kwargs["stream"] is True
+            kwargs["on_delta"](text[:10])
+            partial_files.extend((tmp_path / ".wepublic_defender" / "reviews").glob("*.partial.md"))
+            kwargs["on_delta"](text[10:])
+            return {"text": text, "usage": {"input": 10, "output": 5, "cached": 0, "streamed": True, "ttft": 0.1}}
+
+        seen = []
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete):
+            result = await wpd.call_agent(
+                "self_review", "Doc", mode="external-llm", override_model="gpt-5",
+                stream=True, on_delta=lambda agent, model, d: seen.append((agent, model, d)),
+            )
+
+        assert "".join(d for _, _, d in seen) == text
+        assert seen[0][:2] == ("self_review", "gpt-5")
+        assert len(partial_files) == 1
+        assert not partial_files[0].exists()  # removed once the full result is in
+        assert result["usage"]["ttft"] == 0.1
+
+    @pytest.mark.asyncio
+    async def test_stream_progress_reports_ttft_for_every_request(self, wpd, tmp_path, monkeypatch):
+        import io
+        from wepublic_defender.streaming import StreamProgress
+
+        monkeypatch.chdir(tmp_path)
+        clock = {"now": 1000.0}
+        monkeypatch.setattr("wepublic_defender.streaming.time.time", lambda: clock["now"])
+
+        async def fake_complete(**kwargs):
+            clock["now"] += 3.0
+            kwargs["on_delta"]('{"ready_to_file": true, "iteration": 1, "confidence": 95}')
+            return {"text": '{"ready_to_file": true, "iteration": 1, "confidence": 95}', "usage": {"input": 10, "output": 5, "cached": 0}}
+
+        out = io.StringIO()
+        progress = StreamProgress(out=out)
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete):
+            for document in ("Doc v1", "Doc v2"):
+                await wpd.call_agent(
+                    "self_review", document, mode="external-llm", override_model="gpt-5",
+                    stream=True, on_delta=progress, cache_mode="off",
+                )
+                clock["now"] += 60.0
+
+        assert out.getvalue().count("first token after 3.0s") == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_failure_keeps_partial_output(self, wpd, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+
+        async def fake_complete(**kwargs):
+            kwargs["on_delta"]("half a review")
+            raise TimeoutError("stalled")
+
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete):
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5", stream=True)
+
+        assert "error" in result
+        from pathlib import Path
+        assert Path(result["partial_output"]).read_text(encoding="utf-8") == "half a review"
@@ -0,0 +1,137 @@
+"""
+Unit tests for document_batch.py
+
+Tests document discovery (glob and manifest), the document concurrency
+cap and error isolation, and multi-document runs of wpd-review-pipeline
+sharing one WePublicDefender (including waiting for detached stragglers).
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.cli import review_pipeline
+from wepublic_defender.document_batch import (
+    DocumentReport,
+    DocumentSpec,
+    expand_files,
+    load_document_manifest,
+    run_documents,
+)
+from wepublic_defender.rate_limiter import scopes_for
+from wepublic_defender.side_effects import get_side_effect_writer
+
+
+DRAFT = "# MOTION\n\n## ARGUMENT\n\nThe complaint fails to state a claim.\n"
+
+
+class TestDiscovery:
+    """Test --files and --manifest inputs."""
+
+    def test_glob_skips_drafter_revisions(self, tmp_path):
+        for name in ("motion.md", "reply.md", "motion.rev1.md"):
+            (tmp_path / name).write_text(DRAFT, encoding="utf-8")
+        specs = expand_files(str(tmp_path / "*.md"))
+        assert [Path(s.file).name for s in specs] == ["motion.md", "reply.md"]
+
+    def test_manifest_resolves_paths_and_keeps_settings(self, tmp_path):
+        manifest = tmp_path / "docs.json"
+        manifest.write_text(json.dumps({"documents": ["a.md", {"file": "b.md", "max_iters": 3, "ignored": 1}]}), encoding="utf-8")
+        specs = load_document_manifest(manifest)
+        assert [s.file for s in specs] == [str(tmp_path / "a.md"), str(tmp_path / "b.md")]
+        assert specs[1].settings == {"max_iters": 3}
+        manifest.write_text(json.dumps({"documents": [{"max_iters": 3}]}), encoding="utf-8")
+        with pytest.raises(ValueError, match="file"):
+            load_document_manifest(manifest)
+
+
+class TestRunDocuments:
+    """Test the document runner."""
+
+    @pytest.mark.asyncio
+    async def test_cap_and_failures_are_isolated(self):
+        active = {"now": 0, "peak": 0}
+
+        async def review(spec):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            if spec.file == "bad.md":
+                raise RuntimeError("provider down")
+            return DocumentReport(file=spec.file, status="complete", cost=0.1)
+
+        specs = [DocumentSpec(file=name) for name in ("a.md", "bad.md", "b.md", "c.md")]
+        reports = await run_documents(specs, review, max_documents=2)
+        assert active["peak"] == 2
+        assert [r.status for r in reports] == ["complete", "error", "complete", "complete"]
+        assert "provider down" in reports[1].error
+
+
+class TestPipelineDocuments:
+    """Test review_pipeline.main with --files."""
+
+    @pytest.mark.asyncio
+    async def test_documents_share_one_defender_and_get_a_summary(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        for name in ("motion.md", "reply.md"):
+            (tmp_path / name).write_text(DRAFT.replace("MOTION", name), encoding="utf-8")
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["wpd-review-pipeline", "--files", "*.md", "--max-docs", "2", "--max-concurrent", "3", "--provider-limit", "xai=1"],
+        )
+        defenders = set()
+        limits = []
+
+        async def call_agent(self, agent, text, **kwargs):
+            defenders.add(id(self))
+            limits.append(scopes_for("xai", {}, "grok-4", {}))
+            structured = {"critical_issues": [], "major_issues": [], "minor_issues": [], "weaknesses_found": []}
+            return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": structured}
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", call_agent):
+                assert await review_pipeline.main() == 0
+        await get_side_effect_writer().flush()
+
+        assert len(defenders) == 1
+        assert limits[0] == [("global", {"max_concurrent": 3}), ("provider:xai", {"max_concurrent": 1})]
+        assert scopes_for("xai", {}, "grok-4", {}) == []
+
+        summary_file = next((tmp_path / ".wepublic_defender" / "reviews").glob("documents_*_SUMMARY.json"))
+        saved = json.loads(summary_file.read_text(encoding="utf-8"))
+        assert saved["summary"]["documents"] == 2 and saved["summary"]["ready"] == 2
+        assert {Path(d["file"]).name for d in saved["documents"]} == {"motion.md", "reply.md"}
+        assert all(d["calls"] == 4 and d["run_id"] for d in saved["documents"])
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("target", [["--files", "*.md"], ["--file", "motion.md"]])
+    async def test_detached_stragglers_finish_before_the_summary(self, tmp_path, monkeypatch, capsys, target):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "motion.md").write_text(DRAFT, encoding="utf-8")
+        monkeypatch.setattr(sys, "argv", ["wpd-review-pipeline", *target, "--max-iters", "1"])
+        waited = []
+
+        async def call_agent(self, agent, text, **kwargs):
+            structured = {"critical_issues": [], "major_issues": [], "minor_issues": [], "weaknesses_found": []}
+            return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": structured}
+
+        async def wait_for_stragglers(self, timeout=None):
+            waited.append(id(self))
+            return [{"agent": "self_review", "model": "grok-4", "result": {"text": "late"}, "saved_to": "late.json"}]
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", call_agent):
+                with patch.object(review_pipeline.WePublicDefender, "wait_for_stragglers", wait_for_stragglers):
+                    assert await review_pipeline.main() == 0
+        await get_side_effect_writer().flush()
+
+        out = capsys.readouterr().out
+        assert len(waited) == 1
+        assert "[late] self_review/grok-4 finished | saved_to=late.json" in out
+        assert out.index("[late]") < out.rindex("=== Usage Summary ===")
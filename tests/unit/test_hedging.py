@@ -0,0 +1,191 @@
+"""
+Unit tests for hedging.py
+
+Tests latency thresholds, the hedged race and hedge accounting in WePublicDefender.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.core import WePublicDefender
+from wepublic_defender.hedging import LatencyHistory, percentile, resolve_hedge_config, run_hedged
+from wepublic_defender.models.token_tracker import TokenTracker
+from wepublic_defender.speculative import typical_duration
+
+
+VALID = '{"ready_to_file": true, "iteration": 1, "confidence": 95}'
+
+
+def _result(text, model="gpt-5"):
+    return {"text": text, "usage": {"input": 100, "output": 50, "cached": 0, "model": model}}
+
+
+class TestLatencyHistory:
+    """Test percentile thresholds from tracker and CSV history."""
+
+    def test_percentile_interpolates(self):
+        assert percentile([1, 2, 3, 4], 100) == 4.0
+        assert percentile([5.0], 95) == 5.0
+
+    def test_threshold_requires_min_samples(self, tmp_path):
+        tracker = TokenTracker()
+        history = LatencyHistory(tracker, csv_path=tmp_path / "missing.csv")
+        cfg = {"percentile": 90, "min_samples": 3, "min_delay_seconds": 0}
+        tracker.add("gpt-5", 10, 10, duration=10.0)
+        assert history.threshold("gpt-5", cfg) is None
+        tracker.add("gpt-5", 10, 10, duration=20.0)
+        tracker.add("gpt-5", 10, 10, duration=30.0)
+        assert history.threshold("gpt-5", cfg) == pytest.approx(28.0)
+
+    def test_threshold_uses_csv_and_floor(self, tmp_path):
+        csv_path = tmp_path / "usage_log.csv"
+        csv_path.write_text(
+            "timestamp,agent,model,file,input_tokens,output_tokens,cached_tokens,cost,duration,status,error\n"
+            "t,a,grok-4,f,1,1,0,0.1,4.00,success,\n"
+            "t,a,grok-4,f,1,1,0,0.1,6.00,success,\n"
+            "t,a,grok-4,f,1,1,0,0.0,0.01,cache_hit,\n",
+            encoding="utf-8",
+        )
+        history = LatencyHistory(TokenTracker(), csv_path=csv_path)
+        assert history.samples("grok-4") == [4.0, 6.0]
+        cfg = {"percentile": 50, "min_samples": 2, "min_delay_seconds": 30}
+        assert history.threshold("grok-4", cfg) == 30.0
+
+    def test_agent_flag_overrides_enabled(self):
+        settings = {"hedgingConfig": {"enabled": False}}
+        assert resolve_hedge_config(settings, {"hedge": True})["enabled"] is True
+
+
+class TestRunHedged:
+    """Test the primary/backup race."""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_never_hedges(self):
+        async def primary():
+            return _result(VALID)
+
+        async def backup():
+            raise AssertionError("backup should not run")
+
+        result, outcome = await run_hedged(primary, backup, 1.0, lambda r: True)
+        assert result["text"] == VALID
+        assert outcome["fired"] is False
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_and_is_cancelled(self):
+        cancelled = asyncio.Event()
+
+        async def primary():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return _result(VALID)
+
+        async def backup():
+            return _result(VALID, model="gpt-5-mini")
+
+        result, outcome = await run_hedged(primary, backup, 0.01, lambda r: True)
+        assert outcome == {"fired": True, "winner": "backup", "threshold": 0.01, "completed": [("backup", result)]}
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_invalid_backup_waits_for_primary(self):
+        async def primary():
+            await asyncio.sleep(0.05)
+            return _result(VALID)
+
+        async def backup():
+            return _result("not json")
+
+        result, outcome = await run_hedged(primary, backup, 0.01, lambda r: r["text"] == VALID)
+        assert outcome["winner"] == "primary"
+        assert [role for role, _ in outcome["completed"]] == ["backup", "primary"]
+
+
+class TestCoreHedging:
+    """Test hedging inside WePublicDefender._run_single_model."""
+
+    @pytest.fixture
+    def wpd(self):
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        wpd.cache_mode = "off"
+        wpd.review_settings["hedgingConfig"] = {
+            "enabled": True,
+            "percentile": 50,
+            "min_samples": 1,
+            "min_delay_seconds": 0,
+            "backups": {"gpt-5": {"model": "gpt-5-mini"}},
+        }
+        wpd.token_tracker.add("gpt-5", 10, 10, duration=0.01)
+        return wpd
+
+    @pytest.mark.asyncio
+    async def test_backup_win_is_tracked_as_hedge(self, wpd):
+        async def fake_complete(**kwargs):
+            if kwargs["model_key"] == "gpt-5":
+                await asyncio.sleep(5)
+            return _result(VALID, model=kwargs["model_key"])
+
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete):
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5")
+
+        assert result["usage"]["hedge"]["winner"] == "backup"
+        assert result["usage"]["hedge"]["billed_model"] == "gpt-5-mini"
+        stats = wpd.token_tracker.hedge_stats()
+        assert stats["fired"] == 1 and stats["backup_wins"] == 1
+        assert stats["hedge_cost"] > 0
+        assert wpd.token_tracker.usage("gpt-5-mini").output == 50
+
+    @pytest.mark.asyncio
+    async def test_hedging_disabled_without_backup(self, wpd):
+        wpd.review_settings["hedgingConfig"]["backups"] = {}
+
+        async def fake_complete(**kwargs):
+            return _result(VALID)
+
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete) as mock_chat:
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5")
+
+        assert "hedge" not in result["usage"]
+        assert mock_chat.call_count == 1
+        assert wpd.token_tracker.hedge_stats()["fired"] == 0
+
+    @pytest.mark.asyncio
+    async def test_losing_hedge_call_is_charged_to_the_budget(self, wpd):
+        async def fake_complete(**kwargs):
+            if kwargs["model_key"] == "gpt-5":
+                await asyncio.sleep(0.05)
+                return _result(VALID)
+            return _result("not json", model=kwargs["model_key"])
+
+        wpd.set_budget(10.0)
+        with patch('wepublic_defender.core.async_chat_complete', side_effect=fake_complete):
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5")
+
+        assert result["usage"]["hedge"]["winner"] == "primary"
+        assert [e["model"] for e in result["usage"]["extra_billed"]] == ["gpt-5-mini"]
+        loser = wpd.budget.cost_of({"model": "gpt-5-mini", "usage": result["usage"]["extra_billed"][0]})
+        assert loser > 0
+        assert wpd.budget.spent() == pytest.approx(wpd.budget.cost_of({"model": "gpt-5", "usage": {k: v for k, v in result["usage"].items() if k != "extra_billed"}}) + loser)
+
+
+class TestAgentLatency:
+    """Test per-agent durations for speculative savings."""
+
+    def test_agent_samples_combine_tracker_and_cached_csv(self, tmp_path):
+        csv_path = tmp_path / "usage_log.csv"
+        csv_path.write_text("agent,model,duration,status\nfinal_review,gpt-5,40,success\nself_review,gpt-5,9,success\n", encoding="utf-8")
+        tracker = TokenTracker()
+        tracker.add("gpt-5", 10, 10, notes="agent:final_review", duration=20)
+        history = LatencyHistory(tracker, csv_path=csv_path)
+
+        assert history.agent_samples("final_review") == [20.0, 40.0]
+        assert typical_duration("final_review", history) == 30.0
+        with patch("wepublic_defender.hedging.open", side_effect=AssertionError("re-read")):
+            assert history.agent_samples("self_review") == [9.0]  # unchanged mtime: no re-read
@@ -0,0 +1,126 @@
+"""
+Unit tests for incremental.py
+
+Tests section diffing, finding attribution and carry-forward, citation
+reuse, and incremental re-review between wpd-review-pipeline iterations.
+"""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.cli import review_pipeline
+from wepublic_defender.incremental import (
+    attribute_finding,
+    finish_incremental,
+    plan_incremental,
+    prepare_incremental,
+    split_previous_findings,
+)
+from wepublic_defender.side_effects import get_side_effect_writer
+
+
+DRAFT = (
+    "# MOTION TO DISMISS\n\n"
+    "## FACTS\n\nOfficer Doe stopped Plaintiff on March 3 without cause.\n" + "Plaintiff was detained for forty minutes.\n" * 20 + "\n"
+    "## QUALIFIED IMMUNITY\n\nThe right was clearly established. See Pearson v. Callahan, 555 U.S. 223 (2009).\n"
+    + "No reasonable officer could have believed the stop lawful.\n" * 20 + "\n"
+    "## CONCLUSION\n\nThe motion should be denied.\n"
+)
+REVISED = DRAFT.replace("The motion should be denied.", "The motion should be denied in its entirety.")
+
+
+def _review(**fields):
+    structured = {"critical_issues": [], "major_issues": [], "minor_issues": [], "ready_to_file": False, "iteration": 1, "confidence": 70}
+    structured.update(fields)
+    return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": structured}
+
+
+class TestPlan:
+    """Test section diffing."""
+
+    def test_changed_unchanged_and_removed_sections(self):
+        plan = plan_incremental(DRAFT, REVISED.replace("## FACTS", "## BACKGROUND"), {"max_changed_fraction": 1.0})
+        assert plan.changed == ["BACKGROUND", "CONCLUSION"]
+        assert plan.unchanged == ["(preamble)", "QUALIFIED IMMUNITY"]
+        assert plan.removed == ["FACTS"]
+
+    def test_whitespace_is_not_a_change_and_large_rewrites_fall_back(self):
+        plan = plan_incremental(DRAFT, DRAFT.replace("without cause.\n", "without cause.   \n\n\n"))
+        assert plan.changed == [] and plan.changed_fraction == 0
+        assert plan_incremental(DRAFT, DRAFT.upper(), {"max_changed_fraction": 0.6}) is None
+        assert plan_incremental("no headings", "no headings at all") is None
+
+
+class TestCarryForward:
+    """Test finding attribution and merging."""
+
+    def test_findings_on_unchanged_sections_are_carried_with_attribution(self):
+        plan = plan_incremental(DRAFT, REVISED)
+        facts, conclusion = "FACTS", "CONCLUSION"
+        previous = _review(
+            major_issues=[f"[{facts}] No time of day for the stop", "The CONCLUSION asks for the wrong relief"],
+            minor_issues=["Overall tone is informal"],
+        )
+        carried, open_findings = split_previous_findings(previous["structured"], plan)
+        assert carried["major_issues"] == [f"[{facts}] No time of day for the stop"]
+        assert open_findings == ["Overall tone is informal"]
+        assert attribute_finding("The CONCLUSION asks for the wrong relief", plan.titles) == [conclusion]
+
+        document, carried = prepare_incremental("self_review", previous, plan)
+        assert "in its entirety" in document and "Overall tone is informal" in document
+        assert "Pearson v. Callahan" not in document.split("--- END DIGEST ---")[1]
+
+        fresh = _review(minor_issues=[f"[{conclusion}] Cite the rule"], ready_to_file=True, confidence=85)
+        result = finish_incremental("self_review", previous, fresh, plan, carried, document, max_major=2)
+        assert result["structured"]["major_issues"] == [f"[{facts}] No time of day for the stop"]
+        assert result["structured"]["minor_issues"] == [f"[{conclusion}] Cite the rule"]
+        assert result["structured"]["ready_to_file"] is True
+        strict = finish_incremental("self_review", previous, fresh, plan, carried, document, max_major=0)
+        assert strict["structured"]["ready_to_file"] is False  # the carried major issue counts against --max-major
+        assert result["incremental"]["carried"] == 1
+        assert result["incremental"]["tokens_sent"] < result["incremental"]["tokens_full"]
+
+    def test_citation_verify_skips_when_changed_sections_cite_nothing(self):
+        plan = plan_incremental(DRAFT, REVISED)
+        previous = {"text": "[]", "usage": {"total_tokens": 900}, "structured": [{"citation": "555 U.S. 223", "still_good_law": True}]}
+        document, carried = prepare_incremental("citation_verify", previous, plan)
+        assert document is None
+        result = finish_incremental("citation_verify", previous, None, plan, carried, document, max_major=2)
+        assert result["structured"] == previous["structured"]
+        assert result["usage"] == {} and result["incremental"]["called"] is False
+
+
+class TestPipelineIncremental:
+    """Test the second iteration of review_pipeline.main sees only the revision."""
+
+    @pytest.mark.asyncio
+    async def test_second_iteration_reviews_only_changed_sections(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "brief.md").write_text(DRAFT, encoding="utf-8")
+        monkeypatch.setattr(sys, "argv", ["wpd-review-pipeline", "--file", "brief.md", "--max-parallel", "1"])
+        sent = []
+
+        async def call_agent(self, agent, text, **kwargs):
+            sent.append((agent, text))
+            if agent == "drafter":
+                return {"text": REVISED, "model": "gpt-5", "usage": {}}
+            if agent == "citation_verify":
+                return {"text": "[]", "model": "gpt-5", "usage": {}, "structured": [{"citation": "555 U.S. 223"}]}
+            if agent == "opposing_counsel":
+                return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": {"weaknesses_found": []}}
+            return _review(critical_issues=["[FACTS] Stop date unsupported"])
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", call_agent):
+                assert await review_pipeline.main() == 0
+        await get_side_effect_writer().flush()
+
+        second = [(agent, text) for agent, text in sent[sent.index(next(s for s in sent if s[0] == "drafter")) + 1:]]
+        agents = [agent for agent, _ in second if agent != "drafter"]
+        # No citation in the changed CONCLUSION, so citation_verify is not called again
+        assert agents == ["self_review", "opposing_counsel", "final_review"]
+        self_doc = dict(second)["self_review"]
+        assert "INCREMENTAL RE-REVIEW" in self_doc and "in its entirety" in self_doc
+        assert dict(second)["opposing_counsel"] == REVISED
@@ -0,0 +1,111 @@
+"""
+Unit tests for json_repair.py
+
+Tests local repair of fenced, wrapped, truncated and mistyped output, and
+that the paid retry only fires when repair fails.
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.core import WePublicDefender
+from wepublic_defender.json_repair import repair_stats, repair_structured
+from wepublic_defender.models.legal_responses import (
+    CitationVerificationResult,
+    DocumentReviewResult,
+    OpposingCounselReview,
+)
+
+
+REVIEW = {"critical_issues": [], "major_issues": ["Thin facts"], "minor_issues": [], "ready_to_file": False, "iteration": 1, "confidence": 80}
+
+
+class TestRepairStructured:
+    """Test what repair can and cannot salvage."""
+
+    def test_truncation_after_required_fields(self):
+        text = '{"ready_to_file": false, "iteration": 1, "confidence": 80, "major_issues": ["Thin facts", "No dam'
+        parsed, _, steps = repair_structured(text, DocumentReviewResult)
+        assert parsed.major_issues == ["Thin facts", "No dam"]
+        assert "close_truncated" in steps
+
+    def test_missing_required_field_fails(self):
+        assert repair_structured('{"major_issues": [], "ready_to_file": true}', DocumentReviewResult) is None
+
+    def test_type_slips_are_coerced(self):
+        text = '{"ready_to_file": "No", "iteration": "2", "confidence": "75%", "major_issues": null, "minor_issues": [{"issue": "Typo"}]}'
+        parsed, payload, _ = repair_structured(text, DocumentReviewResult)
+        assert (parsed.ready_to_file, parsed.iteration, parsed.confidence) == (False, 2, 75)
+        assert parsed.major_issues == [] and parsed.minor_issues == ["Typo"]
+        assert payload["confidence"] == 75
+
+    def test_list_keeps_valid_items(self):
+        good = {"case_name": "Smith v. Jones", "citation": "1 F.4th 2", "still_good_law": True, "verified_date": "2025-01-01", "confidence": 90}
+        text = json.dumps({"citations": [good, {"case_name": "No cite"}, dict(good, citation="3 F.4th 4", confidence="70")]})
+        parsed, payload, steps = repair_structured(text, CitationVerificationResult, expects_list=True)
+        assert [c.citation for c in parsed] == ["1 F.4th 2", "3 F.4th 4"]
+        assert "drop_item[1]" in steps and len(payload) == 2
+
+    def test_nested_list_items_are_dropped_individually(self):
+        text = json.dumps({
+            "weaknesses_found": [
+                {"issue": "No standing", "severity": "Critical", "explanation": "x"},
+                {"issue": "Bad", "severity": "catastrophic", "explanation": "y"},
+            ],
+            "overall_strength": "Weak",
+            "confidence": 70,
+        })
+        parsed, _, steps = repair_structured(text, OpposingCounselReview)
+        assert [w.severity for w in parsed.weaknesses_found] == ["critical"]
+        assert parsed.overall_strength == "weak"
+        assert "drop:weaknesses_found[1]" in steps
+
+    def test_stats_count_outcomes(self):
+        before = repair_stats()
+        repair_structured("no json here", DocumentReviewResult)
+        repair_structured(json.dumps(REVIEW), DocumentReviewResult)
+        after = repair_stats()
+        assert after["attempts"] - before["attempts"] == 2
+        assert after["failed"] - before["failed"] == 1
+
+
+class TestCoreRepair:
+    """Test that _finish_agent_result repairs locally before retrying."""
+
+    @pytest.fixture
+    def wpd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        wpd.cache_mode = "off"
+        return wpd
+
+    @staticmethod
+    def _replies(*texts):
+        queue = list(texts)
+
+        async def fake_complete(**kwargs):
+            return {"text": queue.pop(0), "usage": {"input": 10, "output": 5}, "meta": {}}
+
+        return fake_complete
+
+    @pytest.mark.asyncio
+    async def test_repaired_output_skips_paid_retry(self, wpd):
+        text = "Review below.\n```json\n" + json.dumps(REVIEW)[:-1] + ",\n```"
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=self._replies(text)) as calls:
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5")
+        assert calls.call_count == 1
+        assert result["structured"]["major_issues"] == ["Thin facts"]
+        assert "strip_fences" in result["json_repair"]
+
+    @pytest.mark.asyncio
+    async def test_unrepairable_output_falls_back_to_retry(self, wpd):
+        replies = self._replies("I could not review this document.", json.dumps(REVIEW))
+        with patch("wepublic_defender.core.async_chat_complete", side_effect=replies) as calls:
+            result = await wpd.call_agent("self_review", "Doc", mode="external-llm", override_model="gpt-5")
+        assert calls.call_count == 2
+        assert result["structured"]["confidence"] == 80
+        assert "json_repair" not in result
@@ -0,0 +1,54 @@
+"""
+Unit tests for jsonio.py
+
+Tests orjson/stdlib parity, compact vs pretty storage and payload
+extraction with the balanced-bracket scanner.
+"""
+
+from datetime import date
+
+import pytest
+
+from wepublic_defender import jsonio
+
+
+SAMPLE = {"case": "Smith v. Jones", "verified": date(2025, 1, 2), "issues": ["§ 1983 — élan"], "empty": [], "nested": {"x": 1.5}, 3: None}
+
+
+class TestCodec:
+    """Test serialization backends and file helpers."""
+
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_backends_produce_identical_output(self, monkeypatch, pretty):
+        fast = jsonio.dumps(SAMPLE, pretty=pretty)
+        monkeypatch.setattr(jsonio, "orjson", None)
+        assert jsonio.backend() == "json"
+        assert jsonio.dumps(SAMPLE, pretty=pretty) == fast
+        assert jsonio.loads(fast)["verified"] == "2025-01-02"
+
+    def test_values_orjson_rejects_fall_back_to_stdlib(self):
+        assert jsonio.dumps({"n": 2 ** 70}) == '{"n":1180591620717411303424}'
+
+    def test_write_json_is_compact_unless_asked(self, tmp_path, monkeypatch):
+        path = jsonio.write_json(tmp_path / "r.json", {"a": [1, 2]})
+        assert path.read_text(encoding="utf-8") == '{"a":[1,2]}'
+        monkeypatch.setenv("WPD_PRETTY_JSON", "1")
+        jsonio.write_json(path, {"a": [1, 2]})
+        assert "\n" in path.read_text(encoding="utf-8")
+        assert jsonio.read_json(path) == {"a": [1, 2]}
+
+
+class TestParsePayload:
+    """Test extraction of JSON from model prose."""
+
+    def test_braces_inside_strings_do_not_confuse_scanner(self):
+        text = 'Note {draft}: {"issue": "Count {I} lacks \\"facts\\" ]", "ok": false} End.'
+        assert jsonio.parse_json_payload(text) == {"issue": 'Count {I} lacks "facts" ]', "ok": False}
+
+    def test_returns_first_complete_value_not_greedy_span(self):
+        text = 'First: {"a": 1} and later {"b": 2}'
+        assert jsonio.parse_json_payload(text) == {"a": 1}
+
+    def test_truncated_output_is_rejected(self):
+        with pytest.raises(ValueError):
+            jsonio.parse_json_payload('Result: {"a": [1, 2')
@@ -0,0 +1,153 @@
+"""
+Unit tests for llm_client.py
+
+Tests that the sync and native async transports share one request/response contract.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from wepublic_defender.llm_client import LLMConfigError, async_chat_complete, chat_complete
+
+
+def _fake_response():
+    usage = SimpleNamespace(input_tokens=12, output_tokens=7, input_tokens_details=None)
+    return SimpleNamespace(output_text="hello", usage=usage)
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class TestAsyncChatComplete:
+    """Test async_chat_complete against chat_complete."""
+
+    @pytest.mark.asyncio
+    async def test_unknown_model_raises(self):
+        with pytest.raises(LLMConfigError):
+            await async_chat_complete("nonexistent-model", MESSAGES)
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_openai_matches_sync_contract(self, mock_pool):
+        async_client = MagicMock()
+        async_client.with_options.return_value.responses.create = AsyncMock(return_value=_fake_response())
+        sync_client = MagicMock()
+        sync_client.with_options.return_value.responses.create.return_value = _fake_response()
+        mock_pool.return_value.async_openai_client.return_value = async_client
+        mock_pool.return_value.openai_client.return_value = sync_client
+
+        aresult = await async_chat_complete("gpt-5", MESSAGES, effort="low")
+        sresult = chat_complete("gpt-5", MESSAGES, effort="low")
+
+        assert aresult["text"] == sresult["text"] == "hello"
+        assert aresult["meta"] == sresult["meta"]
+        for key in ("input", "output", "cached", "effort", "service_tier", "model"):
+            assert aresult["usage"][key] == sresult["usage"][key]
+        sent = async_client.with_options.return_value.responses.create.await_args.kwargs
+        assert sent == sync_client.with_options.return_value.responses.create.call_args.kwargs
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_missing_openai_client_raises(self, mock_pool):
+        mock_pool.return_value.async_openai_client.return_value = None
+        with pytest.raises(RuntimeError):
+            await async_chat_complete("gpt-5", MESSAGES)
+
+
+class _FakeStream:
+    """Minimal stand-in for the Responses API async stream manager."""
+
+    def __init__(self, deltas, delay=0.0):
+        self._deltas = deltas
+        self._delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        import asyncio
+
+        yield SimpleNamespace(type="response.created")
+        for d in self._deltas:
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield SimpleNamespace(type="response.output_text.delta", delta=d)
+
+    async def get_final_response(self):
+        resp = _fake_response()
+        resp.output_text = "".join(self._deltas)
+        return resp
+
+
+class TestStreaming:
+    """Test streamed responses report deltas and TTFT metrics."""
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_openai_stream_forwards_deltas(self, mock_pool):
+        client = MagicMock()
+        client.with_options.return_value.responses.stream.return_value = _FakeStream(["hel", "lo"])
+        mock_pool.return_value.async_openai_client.return_value = client
+        seen = []
+
+        result = await async_chat_complete("gpt-5", MESSAGES, stream=True, on_delta=seen.append)
+
+        assert seen == ["hel", "lo"]
+        assert result["text"] == "hello"
+        assert result["usage"]["streamed"] is True
+        assert result["usage"]["ttft"] is not None
+        assert result["usage"]["tokens_per_sec"] >= 0
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client._get_configs")
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_stalled_stream_raises(self, mock_pool, mock_configs):
+        from wepublic_defender.config import get_resolved_llm_config
+        from wepublic_defender.llm_client import StreamStalledError
+
+        resolved = get_resolved_llm_config()
+        profile = resolved.profile("gpt-5")
+        provider_cfg, model_cfg, root_cfg = profile.provider_cfg, profile.model_cfg, dict(resolved.root)
+        root_cfg["timeoutConfig"] = dict(root_cfg["timeoutConfig"], firstTokenTimeout=0.05)
+        root_cfg["retryConfig"] = {"max_attempts": 1}
+        mock_configs.return_value = (provider_cfg, model_cfg, root_cfg)
+        client = MagicMock()
+        client.with_options.return_value.responses.stream.return_value = _FakeStream(["late"], delay=1.0)
+        mock_pool.return_value.async_openai_client.return_value = client
+
+        with pytest.raises(StreamStalledError):
+            await async_chat_complete("gpt-5", MESSAGES, stream=True)
+
+
+class TestCachedTokens:
+    """Test cached prompt token extraction from SDK objects."""
+
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    def test_openai_details_object(self, mock_pool):
+        usage = SimpleNamespace(input_tokens=2000, output_tokens=10, input_tokens_details=SimpleNamespace(cached_tokens=1536))
+        client = MagicMock()
+        client.with_options.return_value.responses.create.return_value = SimpleNamespace(output_text="ok", usage=usage)
+        mock_pool.return_value.openai_client.return_value = client
+
+        result = chat_complete("gpt-5", MESSAGES)
+        assert result["usage"]["cached"] == 1536
+
+    def test_xai_cached_prompt_text_tokens(self):
+        from wepublic_defender.llm_client import _xai_result
+
+        ctx = {
+            "model_key": "grok-4", "wire_model": "grok-4", "max_tokens": 10, "temperature": None,
+            "supports_temperature": False, "supports_reasoning": True, "effort": None,
+            "effort_applied": False, "service_tier": "auto", "timeout": 1.0,
+        }
+        usage = SimpleNamespace(prompt_tokens=3000, completion_tokens=5, cached_prompt_text_tokens=2048)
+        result = _xai_result(SimpleNamespace(usage=usage), "ok", ctx, 0.1)
+        assert result["usage"]["cached"] == 2048
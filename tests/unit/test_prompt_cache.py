@@ -0,0 +1,74 @@
+"""
+Unit tests for prompt_cache.py
+
+Tests system prompt reuse and invalidation on settings and prompt file changes.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.core import WePublicDefender
+
+
+@pytest.fixture
+def wpd(monkeypatch):
+    monkeypatch.setattr("wepublic_defender.prompt_cache._cache", None)
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+        with patch('wepublic_defender.core.OpenAI'):
+            return WePublicDefender()
+
+
+def _system(wpd, agent="self_review", **overrides):
+    messages, _, _ = wpd._build_messages(agent, "Doc", **overrides)
+    return "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+
+
+class TestPromptCache:
+    """Test that rendered system prompts are reused and invalidated correctly."""
+
+    def test_repeat_calls_skip_disk_and_schema_work(self, wpd):
+        with patch.object(wpd, "_load_agent_prompt", wraps=wpd._load_agent_prompt) as load:
+            first = _system(wpd)
+            second = _system(wpd)
+        assert first == second
+        assert load.call_count == 1
+        assert "You MUST return ONLY JSON" in first
+
+    def test_overrides_get_their_own_entry(self, wpd):
+        default = _system(wpd)
+        federal = _system(wpd, jurisdiction="Federal", court="D.S.C.")
+        assert federal != default
+        assert "- Court: D.S.C." in federal
+        assert _system(wpd) == default
+
+    def test_settings_change_rebuilds(self, wpd):
+        before = _system(wpd)
+        wpd.review_settings.setdefault("workflowConfig", {})["jurisdictionConfig"] = {"jurisdiction": "Atlantis"}
+        after = _system(wpd)
+        assert after != before
+        assert "Atlantis" in after
+
+    def test_prompt_file_change_invalidates(self, wpd, tmp_path, monkeypatch):
+        monkeypatch.setenv("WPD_CONFIG_CHECK_INTERVAL", "0")
+        monkeypatch.setattr("wepublic_defender.prompt_cache.PROMPTS_DIR", tmp_path)
+        prompt = tmp_path / "drafter.md"
+        prompt.write_text("Draft v1.", encoding="utf-8")
+        assert _system(wpd, "drafter").startswith("Draft v1.")
+
+        prompt.write_text("Draft version two.", encoding="utf-8")
+        assert _system(wpd, "drafter").startswith("Draft version two.")
+
+
+class TestMessageLayout:
+    """Test the prompt-cache-friendly message order."""
+
+    def test_static_prefix_is_identical_across_overrides(self, wpd):
+        base, _, _ = wpd._build_messages("self_review", "Doc A")
+        other, _, _ = wpd._build_messages("self_review", "Doc B", jurisdiction="Federal", court="D.S.C.")
+        assert other[0]["content"] == base[0]["content"]
+        assert "JURISDICTION CONTEXT" not in other[0]["content"]
+        assert other[1]["role"] == "system" and "D.S.C." in other[1]["content"]
+        assert other[-1] == {"role": "user", "content": "Doc B"}
+        # Schema sits in the static prefix
+        assert "You MUST return ONLY JSON" in base[0]["content"]
@@ -0,0 +1,177 @@
+"""
+Unit tests for rate_limiter.py
+
+Tests token buckets, concurrency caps, fair admission, cross-process state,
+off-loop waiting with backoff, and lease renewal.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from wepublic_defender.rate_limiter import (
+    RateLimiter,
+    _FileBackend,
+    _MemoryBackend,
+    scopes_for,
+)
+
+
+def _scopes(**limits):
+    return [("provider:test", limits)]
+
+
+class TestTokenBuckets:
+    """Test requests/min and tokens/min buckets."""
+
+    def test_rpm_exhausted_returns_wait(self):
+        limiter = RateLimiter(_MemoryBackend())
+        scopes = _scopes(requests_per_minute=1)
+
+        assert limiter._try_take(scopes, 10, "a") == 0.0
+        wait = limiter._try_take(scopes, 10, "b")
+        assert 59.0 < wait <= 60.0
+
+    def test_tpm_reconciled_on_release(self):
+        limiter = RateLimiter(_MemoryBackend())
+        scopes = _scopes(tokens_per_minute=1000)
+
+        lease = limiter.acquire(scopes, 900)
+        assert limiter._try_take(scopes, 500, "x") > 0
+        lease.release(actual_tokens=100)  # refund 800 over-estimated tokens
+        assert limiter._try_take(scopes, 500, "y") == 0.0
+
+    def test_unlimited_scopes_skip_limiter(self):
+        limiter = RateLimiter(_MemoryBackend())
+        lease = limiter.acquire([], 10)
+        assert lease.waited == 0.0
+        assert scopes_for("openai", {}, "gpt-5", {}) == []
+
+
+class TestConcurrency:
+    """Test the in-flight cap from asyncio and threads."""
+
+    @pytest.mark.asyncio
+    async def test_async_max_concurrent(self):
+        limiter = RateLimiter(_MemoryBackend(), poll_interval=0.005)
+        scopes = _scopes(max_concurrent=2)
+        active = 0
+        peak = 0
+
+        async def _call():
+            nonlocal active, peak
+            lease = await limiter.acquire_async(scopes, 1)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            lease.release(1)
+
+        await asyncio.gather(*[_call() for _ in range(6)])
+        assert peak == 2
+
+    def test_thread_max_concurrent(self):
+        limiter = RateLimiter(_MemoryBackend(), poll_interval=0.005)
+        scopes = _scopes(max_concurrent=1)
+        lock = threading.Lock()
+        active = [0, 0]  # current, peak
+
+        def _call():
+            lease = limiter.acquire(scopes, 1)
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            lease.release(1)
+
+        threads = [threading.Thread(target=_call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert active[1] == 1
+
+    def test_cross_process_state_file(self, tmp_path):
+        path = tmp_path / "rate_limits.json"
+        # Two limiters over one file behave like two processes on the host
+        first = RateLimiter(_FileBackend(path))
+        second = RateLimiter(_FileBackend(path))
+        scopes = _scopes(max_concurrent=1)
+
+        lease = first.acquire(scopes, 1)
+        assert second._try_take(scopes, 1, "other") > 0
+        lease.release(1)
+        assert second._try_take(scopes, 1, "other") == 0.0
+
+
+class TestFairness:
+    """Test least-recently-served agents are admitted first."""
+
+    @pytest.mark.asyncio
+    async def test_round_robin_across_agents(self):
+        limiter = RateLimiter(_MemoryBackend(), poll_interval=0.005)
+        scopes = _scopes(max_concurrent=1)
+        order = []
+
+        blocker = await limiter.acquire_async(scopes, 1, agent="blocker")
+
+        async def _call(agent):
+            lease = await limiter.acquire_async(scopes, 1, agent=agent)
+            order.append(agent)
+            await asyncio.sleep(0.005)
+            lease.release(1)
+
+        tasks = [asyncio.create_task(_call(a)) for a in ("self_review", "self_review", "self_review", "citation_verify")]
+        await asyncio.sleep(0.02)  # all four queued
+        blocker.release(1)
+        await asyncio.gather(*tasks)
+
+        assert order[:2] == ["self_review", "citation_verify"]
+
+
+class TestWaiting:
+    """Test how waiters poll the shared state and keep their leases."""
+
+    @pytest.mark.asyncio
+    async def test_async_wait_backs_off_off_the_loop(self):
+        backend = _MemoryBackend()
+        threads = []
+        transact = backend.transact
+        backend.transact = lambda fn: threads.append(threading.get_ident()) or transact(fn)
+        limiter = RateLimiter(backend, poll_interval=0.01)
+        scopes = _scopes(max_concurrent=1)
+
+        holder = await limiter.acquire_async(scopes, 1)
+        waiter = asyncio.create_task(limiter.acquire_async(scopes, 1))
+        await asyncio.sleep(0.5)
+        attempts = len(threads) - 1
+        # Fixed 10ms polling would be ~50 attempts; doubling backoff needs ~6
+        assert 1 <= attempts <= 10
+        assert threading.get_ident() not in threads
+
+        await holder.release_async(1)
+        lease = await asyncio.wait_for(waiter, 0.2)  # woken by the release, not the backoff
+        await lease.release_async(1)
+
+    def test_heartbeat_renews_leases_until_release(self, tmp_path):
+        path = tmp_path / "rate_limits.json"
+        first = RateLimiter(_FileBackend(path), lease_seconds=60)
+        second = RateLimiter(_FileBackend(path), lease_seconds=60)
+        scopes = _scopes(max_concurrent=1)
+
+        lease = first.acquire(scopes, 1)
+        assert first._heartbeat is not None and first._heartbeat.is_alive()
+
+        def expire(state):
+            state["inflight"]["provider:test"][lease.lease_id][1] = time.time() - 1
+
+        first._backend.transact(expire)
+        first._renew(list(first._active.values()))  # what the heartbeat does
+        assert second._try_take(scopes, 1, "other") > 0
+        lease.release(1)
+        assert first._active == {}
+        assert second._try_take(scopes, 1, "other") == 0.0
@@ -0,0 +1,136 @@
+"""
+Unit tests for response_cache.py
+
+Tests cache keys, TTL expiry, LRU eviction (and when puts trigger it)
+and TTL resolution.
+"""
+
+import os
+import time
+
+from pydantic import BaseModel
+
+from wepublic_defender.response_cache import (
+    ResponseCache,
+    make_cache_key,
+    resolve_cache_config,
+    resolve_ttl_seconds,
+)
+
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "doc"}]
+
+
+def _key(**overrides):
+    params = dict(
+        model_key="gpt-5",
+        wire_model="gpt-5",
+        effort="high",
+        service_tier="auto",
+        web_search=False,
+        pydantic_model=None,
+        messages=MESSAGES,
+    )
+    params.update(overrides)
+    return make_cache_key(**params)
+
+
+class _SchemaA(BaseModel):
+    a: int
+
+
+class _SchemaB(BaseModel):
+    b: str
+
+
+class TestCacheKey:
+    """Test that every call option participates in the key."""
+
+    def test_same_inputs_same_key(self):
+        assert _key() == _key()
+
+    def test_each_option_changes_key(self):
+        base = _key()
+        assert _key(wire_model="gpt-5-2025") != base
+        assert _key(service_tier="priority") != base
+        assert _key(web_search=True) != base
+        assert _key(messages=MESSAGES + [{"role": "user", "content": "x"}]) != base
+
+    def test_schema_changes_key(self):
+        assert _key(pydantic_model=_SchemaA) != _key(pydantic_model=_SchemaB)
+
+
+class TestResponseCache:
+    """Test storage, expiry and eviction."""
+
+    def test_put_then_get(self, tmp_path):
+        cache = ResponseCache(root=tmp_path)
+        key = _key()
+        cache.put(key, {"text": "ok", "usage": {"input": 10}, "meta": {"api_type": "openai_responses"}, "raw": object()})
+
+        entry = cache.get(key)
+        assert entry["text"] == "ok"
+        assert entry["usage"]["input"] == 10
+        assert entry["meta"]["api_type"] == "openai_responses"
+        assert "raw" not in entry
+
+    def test_expired_entry_is_miss(self, tmp_path):
+        cache = ResponseCache(root=tmp_path)
+        key = _key()
+        path = cache.put(key, {"text": "ok"})
+        entry = cache.get(key)
+        entry["created_at"] = time.time() - 7200
+        path.write_text(__import__("json").dumps(entry), encoding="utf-8")
+
+        assert cache.get(key, ttl_seconds=3600) is None
+        assert not path.exists()
+
+    def test_corrupt_entry_is_miss(self, tmp_path):
+        cache = ResponseCache(root=tmp_path)
+        key = _key()
+        path = cache.put(key, {"text": "ok"})
+        path.write_text("{not json", encoding="utf-8")
+
+        assert cache.get(key) is None
+
+    def test_lru_eviction_keeps_recently_used(self, tmp_path):
+        cache = ResponseCache(root=tmp_path, max_size_mb=100)
+        keys = [_key(effort=str(i)) for i in range(3)]
+        paths = [cache.put(k, {"text": "x" * 200}) for k in keys]
+        # Age all entries, then touch the first so it becomes most recent
+        for i, p in enumerate(paths):
+            os.utime(p, (time.time() - 100 + i, time.time() - 100 + i))
+        cache.get(keys[0])
+
+        # created_at digits vary, so entry sizes can differ by a byte
+        entry_size = max(p.stat().st_size for p in paths)
+        removed = cache.evict(max_bytes=entry_size * 2)
+
+        assert removed == 1
+        assert paths[0].exists()
+        assert not paths[1].exists()
+        assert paths[2].exists()
+
+    def test_put_scans_only_when_the_size_estimate_crosses_the_cap(self, tmp_path):
+        cache = ResponseCache(root=tmp_path, max_size_mb=100)
+        scans = []
+        real_evict = cache.evict
+        cache.evict = lambda max_bytes=None: scans.append(1) or real_evict(max_bytes)
+
+        paths = [cache.put(_key(effort=str(i)), {"text": "x" * 200}) for i in range(5)]
+        assert scans == []
+        assert cache._size == sum(p.stat().st_size for p in paths)
+
+        cache.max_bytes = cache._size
+        cache.put(_key(effort="late"), {"text": "x" * 200})
+        assert scans == [1]
+        assert cache.size_bytes() <= cache.max_bytes
+
+
+class TestTTLResolution:
+    """Test per-agent TTL overrides."""
+
+    def test_agent_override_wins(self):
+        cfg = resolve_cache_config({"responseCacheConfig": {"web_search_ttl_hours": 6}})
+        assert resolve_ttl_seconds(cfg, {"cache_ttl_hours": 1}, True) == 3600.0
+        assert resolve_ttl_seconds(cfg, {}, True) == 6 * 3600.0
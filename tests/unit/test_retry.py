@@ -0,0 +1,215 @@
+"""
+Unit tests for retry.py
+
+Tests error classification, backoff, Retry-After handling, the retry budget and
+the router integration in llm_client.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from wepublic_defender.llm_client import LLMConfigError, _compute_timeout, async_chat_complete, chat_complete
+from wepublic_defender.retry import aretry, backoff_delay, classify_error, retry
+
+
+NO_WAIT = {"max_attempts": 3, "base_delay": 0.0, "max_delay": 0.0, "retry_budget_seconds": 300}
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class _StatusError(Exception):
+    """Stand-in for openai.APIStatusError (status_code + response.headers)."""
+
+    def __init__(self, status, headers=None, code=None):
+        super().__init__(f"status {status}")
+        self.status_code = status
+        self.code = code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class _RpcError(Exception):
+    """Stand-in for grpc.RpcError raised by the xAI SDK."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._name = name
+
+    def code(self):
+        return SimpleNamespace(name=self._name)
+
+
+def _fake_response():
+    usage = SimpleNamespace(input_tokens=12, output_tokens=7, input_tokens_details=None)
+    return SimpleNamespace(output_text="hello", usage=usage)
+
+
+def _fake_xai_response():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=7, cached_prompt_text_tokens=0)
+    return SimpleNamespace(content="hello", usage=usage)
+
+
+class TestClassifyError:
+    """Test retryable vs terminal classification."""
+
+    @pytest.mark.parametrize("status", [408, 429, 500, 502, 503, 504])
+    def test_transient_status_is_retryable(self, status):
+        assert classify_error(_StatusError(status)).retryable
+
+    @pytest.mark.parametrize("status", [400, 401, 403, 404, 422])
+    def test_client_errors_are_terminal(self, status):
+        assert not classify_error(_StatusError(status)).retryable
+
+    def test_insufficient_quota_is_terminal(self):
+        assert not classify_error(_StatusError(429, code="insufficient_quota")).retryable
+
+    def test_grpc_codes(self):
+        assert classify_error(_RpcError("UNAVAILABLE")).retryable
+        assert classify_error(_RpcError("DEADLINE_EXCEEDED")).retryable
+        assert not classify_error(_RpcError("INVALID_ARGUMENT")).retryable
+        assert not classify_error(_RpcError("PERMISSION_DENIED")).retryable
+
+    def test_config_and_unknown_errors_are_terminal(self):
+        assert not classify_error(LLMConfigError("bad model")).retryable
+        assert not classify_error(RuntimeError("API key not set")).retryable
+
+    def test_retry_after_header(self):
+        assert classify_error(_StatusError(429, {"retry-after": "12"})).retry_after == 12.0
+        assert classify_error(_StatusError(429, {"retry-after-ms": "250"})).retry_after == 0.25
+        assert classify_error(_StatusError(503)).retry_after is None
+
+
+class TestBackoff:
+    """Test delay computation and the retry loop."""
+
+    def test_backoff_is_capped(self):
+        cfg = {"base_delay": 1.0, "max_delay": 5.0}
+        assert all(0.0 <= backoff_delay(10, cfg) <= 5.0 for _ in range(50))
+
+    def test_retry_after_overrides_backoff(self):
+        assert backoff_delay(1, {"base_delay": 1.0, "max_delay": 5.0}, retry_after=9.0) == 9.0
+
+    def test_retries_until_success(self):
+        calls = []
+
+        def fn(attempt):
+            calls.append(attempt)
+            if attempt < 3:
+                raise TimeoutError("slow")
+            return "ok"
+
+        result, state = retry(fn, NO_WAIT)
+        assert result == "ok"
+        assert calls == [1, 2, 3]
+        assert state.as_usage()["retry_errors"] == ["timeout", "timeout"]
+
+    def test_terminal_error_not_retried(self):
+        fn = MagicMock(side_effect=_StatusError(401))
+        with pytest.raises(_StatusError) as exc:
+            retry(fn, NO_WAIT)
+        assert fn.call_count == 1
+        assert exc.value.wpd_attempts == 1
+
+    def test_gives_up_after_max_attempts(self):
+        fn = MagicMock(side_effect=_StatusError(503))
+        with pytest.raises(_StatusError) as exc:
+            retry(fn, NO_WAIT)
+        assert fn.call_count == 3
+        assert exc.value.wpd_retry_errors == ["http_503"] * 3
+
+    def test_budget_stops_retries(self):
+        fn = MagicMock(side_effect=_StatusError(429, {"retry-after": "60"}))
+        with pytest.raises(_StatusError):
+            retry(fn, dict(NO_WAIT, retry_budget_seconds=30))
+        assert fn.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_async_veto_stops_retries(self):
+        fn = AsyncMock(side_effect=TimeoutError("stalled"))
+        with pytest.raises(TimeoutError):
+            await aretry(fn, NO_WAIT, should_retry=lambda: False)
+        assert fn.await_count == 1
+
+
+class TestAttemptTimeout:
+    """Test retry_attempt_N timeout multipliers."""
+
+    ROOT = {
+        "timeoutConfig": {
+            "globalDefault": 100,
+            "multipliers": {"retry_attempt_2": 1.5, "retry_attempt_3": 2.0},
+            "maxTimeout": 1000,
+        }
+    }
+
+    def test_attempt_multipliers(self):
+        assert _compute_timeout(self.ROOT) == 100
+        assert _compute_timeout(self.ROOT, attempt=2) == 150
+        assert _compute_timeout(self.ROOT, attempt=3) == 200
+        # Beyond the configured attempts the highest multiplier applies
+        assert _compute_timeout(self.ROOT, attempt=5) == 200
+
+
+class TestRouterRetries:
+    """Test that both routers retry through the engine and record attempts."""
+
+    @patch("wepublic_defender.llm_client.resolve_retry_config", return_value=NO_WAIT)
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    def test_sync_router_retries(self, mock_pool, _cfg):
+        client = MagicMock()
+        client.with_options.return_value.responses.create.side_effect = [_StatusError(503), _fake_response()]
+        mock_pool.return_value.openai_client.return_value = client
+
+        result = chat_complete("gpt-5", MESSAGES)
+
+        assert result["text"] == "hello"
+        assert result["usage"]["attempts"] == 2
+        assert result["usage"]["retry_errors"] == ["http_503"]
+        timeouts = [c.kwargs["timeout"] for c in client.with_options.call_args_list]
+        assert timeouts[1] > timeouts[0]
+        assert all(c.kwargs["max_retries"] == 0 for c in client.with_options.call_args_list)
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client.resolve_retry_config", return_value=NO_WAIT)
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_async_router_retries(self, mock_pool, _cfg):
+        client = MagicMock()
+        client.with_options.return_value.responses.create = AsyncMock(
+            side_effect=[ConnectionError("reset"), _fake_response()]
+        )
+        mock_pool.return_value.async_openai_client.return_value = client
+
+        result = await async_chat_complete("gpt-5", MESSAGES)
+
+        assert result["usage"]["attempts"] == 2
+        assert result["usage"]["retry_errors"] == ["connection"]
+
+    @patch("wepublic_defender.llm_client.resolve_retry_config", return_value=NO_WAIT)
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    def test_sync_xai_router_grows_the_deadline(self, mock_pool, _cfg):
+        client = MagicMock()
+        client.chat.create.return_value.sample.side_effect = [_RpcError("DEADLINE_EXCEEDED"), _fake_xai_response()]
+        mock_pool.return_value.xai_client.return_value = client
+
+        result = chat_complete("grok-4", MESSAGES)
+
+        assert result["text"] == "hello"
+        assert result["usage"]["attempts"] == 2
+        timeouts = [c.kwargs["timeout"] for c in mock_pool.return_value.xai_client.call_args_list]
+        assert timeouts[1] > timeouts[0]
+
+    @pytest.mark.asyncio
+    @patch("wepublic_defender.llm_client.resolve_retry_config", return_value=NO_WAIT)
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    async def test_async_xai_router_grows_the_deadline(self, mock_pool, _cfg):
+        client = MagicMock()
+        client.chat.create.return_value.sample = AsyncMock(side_effect=[TimeoutError("slow"), _fake_xai_response()])
+        mock_pool.return_value.async_xai_client.return_value = client
+
+        with patch("wepublic_defender.llm_client.asyncio.timeout", wraps=asyncio.timeout) as deadline:
+            result = await async_chat_complete("grok-4", MESSAGES)
+
+        assert result["usage"]["attempts"] == 2
+        timeouts = [c.args[0] for c in deadline.call_args_list]
+        assert len(timeouts) == 2 and timeouts[1] > timeouts[0]
@@ -0,0 +1,102 @@
+"""
+Unit tests for run_manifest.py
+
+Tests checkpoint bookkeeping (iterations, stages, revisions), persistence,
+and resuming an interrupted wpd-review-pipeline run without repeating
+finished stages.
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.cli import review_pipeline
+from wepublic_defender.run_manifest import document_hash, latest_run, load_run, new_run, save_run
+from wepublic_defender.side_effects import get_side_effect_writer
+
+
+DRAFT = "# MOTION\n\nThe complaint fails to state a claim.\n"
+
+
+class TestManifest:
+    """Test manifest bookkeeping and persistence."""
+
+    def test_stage_results_survive_save_and_load(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        output = tmp_path / "self_review.json"
+        output.write_text(json.dumps({"structured": {"critical_issues": []}}), encoding="utf-8")
+        manifest = new_run(Path("brief.md"), DRAFT, {"max_iters": 3})
+        manifest.begin_iteration(1, document_hash(DRAFT))
+        manifest.record_stage(1, "self_review", "self_review", output)
+        save_run(manifest)
+
+        loaded = load_run(manifest.id)
+        assert loaded.settings == {"max_iters": 3}
+        assert loaded.stage_result(1, "self_review") == {"structured": {"critical_issues": []}}
+        assert loaded.stage_result(1, "final_review") is None
+        assert latest_run(DRAFT).id == manifest.id and latest_run("other text") is None
+
+    def test_missing_output_or_new_draft_means_rerun(self, tmp_path):
+        manifest = new_run(tmp_path / "brief.md", DRAFT)
+        manifest.begin_iteration(1, document_hash(DRAFT))
+        manifest.record_stage(1, "self_review", "self_review", tmp_path / "gone.json")
+        assert manifest.stage_result(1, "self_review") is None
+        assert manifest.begin_iteration(1, document_hash("edited")).stages == {}
+
+    def test_resume_point_follows_revisions(self, tmp_path):
+        brief = tmp_path / "brief.md"
+        brief.write_text(DRAFT, encoding="utf-8")
+        manifest = new_run(brief, DRAFT)
+        manifest.begin_iteration(1, document_hash(DRAFT))
+        assert manifest.resume_point() == 1 and manifest.current_text() == DRAFT
+
+        revision = tmp_path / "brief.rev1.md"
+        revision.write_text("revised", encoding="utf-8")
+        manifest.record_revision(1, revision, "revised")
+        assert manifest.resume_point() == 2 and manifest.current_text() == "revised"
+
+        revision.write_text("edited by hand", encoding="utf-8")
+        with pytest.raises(ValueError, match="changed"):
+            manifest.current_text()
+
+
+class TestPipelineResume:
+    """Test --resume through review_pipeline.main."""
+
+    @staticmethod
+    def _fake_call_agent(calls, fail_on=None):
+        async def call_agent(self, agent, text, **kwargs):
+            calls.append(agent)
+            if agent == fail_on:
+                raise ConnectionError("laptop went to sleep")
+            structured = {"critical_issues": [], "major_issues": [], "minor_issues": []}
+            return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": structured}
+
+        return call_agent
+
+    @pytest.mark.asyncio
+    async def test_interrupted_run_resumes_without_repeating_stages(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "brief.md").write_text(DRAFT, encoding="utf-8")
+        monkeypatch.setattr(sys, "argv", ["wpd-review-pipeline", "--file", "brief.md", "--max-parallel", "1"])
+
+        first = []
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", self._fake_call_agent(first, "final_review")):
+                with pytest.raises(ConnectionError):
+                    await review_pipeline.main()
+        await get_side_effect_writer().flush()
+        assert first == ["self_review", "citation_verify", "opposing_counsel", "final_review"]
+
+        run_id = latest_run(DRAFT).id
+        monkeypatch.setattr(sys, "argv", ["wpd-review-pipeline", "--resume", run_id])
+        second = []
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", self._fake_call_agent(second)):
+                assert await review_pipeline.main() == 0
+
+        assert second == ["final_review"]
+        assert load_run(run_id).status == "complete"
@@ -0,0 +1,108 @@
+"""
+Unit tests for side_effects.py
+
+Tests per-file batching and ordering, synchronous fallback outside an event
+loop, draining on cancellation and the usage/citation log writers.
+"""
+
+import asyncio
+import csv
+from datetime import date
+
+import pytest
+
+from wepublic_defender import side_effects
+from wepublic_defender.models.legal_responses import CitationVerificationResult
+from wepublic_defender.research_log import log_citation_verifications
+from wepublic_defender.side_effects import SideEffectWriter
+from wepublic_defender.usage_logger import log_agent_call
+
+
+def _recorder(calls):
+    def flush_fn(path, payloads):
+        calls.append((path.name, list(payloads)))
+
+    return flush_fn
+
+
+class TestWriter:
+    """Test queueing, batching and flushing."""
+
+    @pytest.mark.asyncio
+    async def test_submissions_are_batched_per_file_in_order(self, tmp_path):
+        writer = SideEffectWriter()
+        calls = []
+        record = _recorder(calls)
+        for i in range(5):
+            writer.submit(tmp_path / "a.csv", i, record)
+            writer.submit(tmp_path / "b.csv", i, record)
+        assert calls == []  # nothing written on the caller's turn of the loop
+        await writer.flush()
+        assert sorted(calls) == [("a.csv", [0, 1, 2, 3, 4]), ("b.csv", [0, 1, 2, 3, 4])]
+        assert writer.pending() == 0 and writer.batches == 2
+
+    def test_without_running_loop_writes_immediately(self, tmp_path):
+        writer = SideEffectWriter()
+        calls = []
+        writer.submit(tmp_path / "a.csv", "row", _recorder(calls))
+        assert calls == [("a.csv", ["row"])]
+
+    def test_cancelled_writer_drains_synchronously(self, tmp_path):
+        writer = SideEffectWriter()
+        calls = []
+
+        async def submit_and_exit():
+            writer.submit(tmp_path / "a.csv", "row", _recorder(calls))
+
+        # asyncio.run cancels the still-pending writer task on shutdown
+        asyncio.run(submit_and_exit())
+        assert calls == [("a.csv", ["row"])]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_counted_not_raised(self, tmp_path):
+        writer = SideEffectWriter()
+
+        def broken(path, payloads):
+            raise OSError("disk full")
+
+        writer.submit(tmp_path / "a.csv", "row", broken)
+        await writer.flush()
+        assert writer.errors == 1 and writer.pending() == 0
+
+
+class TestLogWriters:
+    """Test the usage CSV and citation log on the shared writer."""
+
+    @pytest.mark.asyncio
+    async def test_parallel_usage_rows_share_one_csv_append(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / ".wepublic_defender").mkdir()
+        before = side_effects.get_side_effect_writer().batches
+
+        async def call(i):
+            log_agent_call("self_review", "gpt-5", "doc.md", i, 1, 0, 0.01, 1.0)
+
+        await asyncio.gather(*(call(i) for i in range(4)))
+        await side_effects.get_side_effect_writer().flush()
+
+        with open(tmp_path / ".wepublic_defender" / "usage_log.csv", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [r["input_tokens"] for r in rows] == ["0", "1", "2", "3"]
+        assert side_effects.get_side_effect_writer().batches - before == 1
+
+    @pytest.mark.asyncio
+    async def test_citation_results_are_upserted_together(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+
+        def result(case, good):
+            return CitationVerificationResult(
+                case_name=case, citation="1 F.4th 2", still_good_law=good, verified_date=date(2025, 1, 1), confidence=90
+            )
+
+        path = log_citation_verifications([result("Smith v. Jones", True)])
+        log_citation_verifications([result("Smith v. Jones", False), result("Doe v. Roe", True)])
+        await side_effects.get_side_effect_writer().flush()
+
+        text = (tmp_path / path).read_text(encoding="utf-8")
+        assert text.count("## Smith v. Jones") == 1
+        assert "Still good law: No" in text and "## Doe v. Roe" in text
@@ -0,0 +1,111 @@
+"""
+Unit tests for speculative.py
+
+Tests the early refinement decision and speculative drafting in
+wpd-review-pipeline --speculative (cancelling or merging the reviewers
+still running, redrafting on late findings, and discarding a draft a late
+review makes unnecessary).
+"""
+
+import asyncio
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from wepublic_defender.cli import review_pipeline
+from wepublic_defender.run_manifest import latest_run
+from wepublic_defender.side_effects import get_side_effect_writer
+from wepublic_defender.speculative import refinement_reason
+
+
+DRAFT = "# MOTION\n\n## ARGUMENT\n\nThe complaint fails to state a claim.\n"
+CLEAN = {"critical_issues": [], "major_issues": [], "minor_issues": [], "ready_to_file": True, "iteration": 1, "confidence": 90}
+
+
+def _res(structured):
+    return {"text": "ok", "model": "gpt-5", "usage": {}, "structured": structured}
+
+
+class TestDecision:
+    """Test when the thresholds are already out of reach."""
+
+    def test_final_review_takes_precedence_over_self_review(self):
+        over = _res(dict(CLEAN, major_issues=["a", "b", "c"]))
+        assert refinement_reason({"final_review": over}, ["self_review"], max_major=2) == "final_review is over the thresholds"
+        assert refinement_reason({"final_review": _res(CLEAN), "self_review": over}, [], max_major=2) is None
+        assert refinement_reason({"self_review": over}, ["final_review"], max_major=2) is None
+        assert refinement_reason({"self_review": over}, ["opposing_counsel"], max_major=2) == "self_review is over the thresholds"
+
+    def test_critical_self_review_decides_only_when_configured(self):
+        critical = {"self_review": _res(dict(CLEAN, critical_issues=["No jurisdiction"]))}
+        assert refinement_reason(critical, ["final_review"], max_major=2) == "self_review found a critical issue"
+        assert refinement_reason(critical, ["final_review"], max_major=2, cfg={"self_review_decides": False}) is None
+
+
+class TestPipelineSpeculative:
+    """Test review_pipeline.main with --speculative."""
+
+    @staticmethod
+    def _fake_call_agent(calls, delays, results):
+        async def call_agent(self, agent, text, **kwargs):
+            calls.append(("start", agent))
+            if agent == "drafter":
+                calls.append(("brief", text))
+            await asyncio.sleep(delays.get(agent, 0))
+            calls.append(("end", agent))
+            if agent == "drafter":
+                return {"text": DRAFT + "\nRevised.\n", "model": "gpt-5", "usage": {}}
+            return _res(results.get(agent, CLEAN))
+
+        return call_agent
+
+    async def _run(self, tmp_path, monkeypatch, calls, delays, results, cfg=None):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "brief.md").write_text(DRAFT, encoding="utf-8")
+        monkeypatch.setattr(sys, "argv", ["wpd-review-pipeline", "--file", "brief.md", "--max-iters", "1", "--speculative"])
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test", "XAI_API_KEY": "test"}):
+            with patch.object(review_pipeline.WePublicDefender, "call_agent", self._fake_call_agent(calls, delays, results)):
+                if cfg is not None:
+                    monkeypatch.setattr(review_pipeline, "resolve_speculative_config", lambda s: cfg)
+                assert await review_pipeline.main() == 0
+        await get_side_effect_writer().flush()
+
+    @pytest.mark.asyncio
+    async def test_critical_opposition_drafts_at_once_and_cancels_the_rest(self, tmp_path, monkeypatch, capsys):
+        calls = []
+        critical = {"weaknesses_found": [{"issue": "No standing", "severity": "Critical", "explanation": ""}]}
+        await self._run(tmp_path, monkeypatch, calls, {"final_review": 30, "self_review": 30}, {"opposing_counsel": critical})
+
+        assert ("start", "drafter") in calls
+        assert ("end", "final_review") not in calls and ("end", "self_review") not in calls
+        assert (tmp_path / "brief.rev1.md").exists()
+        out = capsys.readouterr().out
+        assert "=== Speculation ===" in out and "cancelled=self_review,final_review" in out
+
+    @pytest.mark.asyncio
+    async def test_late_pass_discards_the_speculative_draft_when_merging(self, tmp_path, monkeypatch):
+        calls = []
+        results = {"self_review": dict(CLEAN, critical_issues=["Missing standard of review"]), "opposing_counsel": {"weaknesses_found": []}}
+        cfg = {"remaining": "merge", "self_review_decides": True}
+        await self._run(tmp_path, monkeypatch, calls, {"final_review": 0.05, "drafter": 30}, results, cfg)
+
+        assert ("start", "drafter") in calls and ("end", "drafter") not in calls
+        assert not (tmp_path / "brief.rev1.md").exists()
+        assert latest_run(DRAFT) is None  # the run met the thresholds
+
+    @pytest.mark.asyncio
+    async def test_late_findings_restart_the_drafter_when_merging(self, tmp_path, monkeypatch, capsys):
+        calls = []
+        weakness = {"weaknesses_found": [{"issue": "No exhaustion of remedies", "severity": "Major", "explanation": ""}]}
+        results = {"self_review": dict(CLEAN, critical_issues=["Missing standard of review"]), "opposing_counsel": weakness}
+        cfg = {"remaining": "merge", "self_review_decides": True}
+        delays = {"opposing_counsel": 0.05, "final_review": 0.05, "drafter": 0.3}
+        await self._run(tmp_path, monkeypatch, calls, delays, dict(results, final_review=results["self_review"]), cfg)
+
+        briefs = [text for kind, text in calls if kind == "brief"]
+        assert len(briefs) == 2 and calls.count(("end", "drafter")) == 1
+        assert "No exhaustion of remedies" not in briefs[0] and "No exhaustion of remedies" in briefs[1]
+        assert (tmp_path / "brief.rev1.md").exists()
+        out = capsys.readouterr().out
+        assert "drafter restarted 1x" in out and "opposing_counsel" in out.split("merged=")[1].split(" |")[0]
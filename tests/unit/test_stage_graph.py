@@ -0,0 +1,98 @@
+"""
+Unit tests for stage_graph.py
+
+Tests stage parsing and validation, dependency order, the parallelism cap
+and error handling of the pipeline stage executor.
+"""
+
+import asyncio
+
+import pytest
+
+from wepublic_defender.stage_graph import parse_stages, resolve_pipeline_config, run_stage_graph, stage_levels
+
+
+def _runner(log, active, delays=None, fail=None):
+    async def run(stage):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        log.append(("start", stage.name))
+        await asyncio.sleep((delays or {}).get(stage.name, 0.01))
+        active["now"] -= 1
+        log.append(("end", stage.name))
+        if stage.name == fail:
+            raise RuntimeError(f"{stage.name} failed")
+        return {"agent": stage.agent}
+
+    return run
+
+
+class TestParsing:
+    """Test stage declarations."""
+
+    def test_default_stages_are_independent(self):
+        stages = parse_stages(resolve_pipeline_config({})["stages"])
+        assert [s.name for s in stages] == ["self_review", "citation_verify", "opposing_counsel", "final_review"]
+        assert stage_levels(stages) == [["self_review", "citation_verify", "opposing_counsel", "final_review"]]
+
+    def test_agent_alias_and_dependency_order(self):
+        stages = parse_stages({
+            "final": {"agent": "final_review", "needs": ["self_review"]},
+            "self_review": {},
+            "_comment": "ignored",
+        })
+        assert [(s.name, s.agent) for s in stages] == [("self_review", "self_review"), ("final", "final_review")]
+
+    def test_invalid_graphs_are_rejected(self):
+        with pytest.raises(ValueError, match="cycle"):
+            parse_stages({"a": {"needs": ["b"]}, "b": {"needs": ["a"]}})
+        with pytest.raises(ValueError, match="unknown stage"):
+            parse_stages({"a": {"needs": "missing"}})
+        with pytest.raises(ValueError, match="no stages"):
+            parse_stages({})
+
+
+class TestExecutor:
+    """Test running stages."""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap_up_to_cap(self):
+        stages = parse_stages(resolve_pipeline_config({})["stages"])
+        active = {"now": 0, "peak": 0}
+        done = []
+        results = await run_stage_graph(
+            stages, _runner([], active), max_parallel=3, on_done=lambda stage, res, secs: done.append(stage.name)
+        )
+        assert active["peak"] == 3
+        assert set(results) == set(done) == {s.name for s in stages}
+
+    @pytest.mark.asyncio
+    async def test_dependent_stage_waits_for_its_needs(self):
+        stages = parse_stages({"a": {}, "b": {}, "c": {"needs": ["a", "b"]}})
+        log = []
+        await run_stage_graph(stages, _runner(log, {"now": 0, "peak": 0}, delays={"a": 0.03}), max_parallel=4)
+        assert log.index(("start", "c")) > log.index(("end", "a"))
+
+    @pytest.mark.asyncio
+    async def test_failure_stops_new_stages_but_running_ones_finish(self):
+        stages = parse_stages({"a": {}, "b": {}, "c": {"needs": ["a"]}})
+        log = []
+        with pytest.raises(RuntimeError, match="a failed"):
+            await run_stage_graph(stages, _runner(log, {"now": 0, "peak": 0}, delays={"b": 0.03}, fail="a"), max_parallel=4)
+        assert ("end", "b") in log
+        assert ("start", "c") not in log
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_running_stages_and_returns_finished(self):
+        stages = parse_stages({"a": {}, "b": {}, "c": {"needs": ["a"]}})
+        log = []
+        stop = asyncio.Event()
+        results = await run_stage_graph(
+            stages,
+            _runner(log, {"now": 0, "peak": 0}, delays={"b": 5}),
+            max_parallel=4,
+            on_done=lambda stage, res, secs: stop.set(),
+            stop=stop,
+        )
+        assert list(results) == ["a"]
+        assert ("end", "b") not in log and ("start", "c") not in log
@@ -0,0 +1,117 @@
+"""
+Unit tests for token_estimator.py
+
+Tests pre-flight token estimates, the context-window guard and rerouting.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from wepublic_defender.config import get_resolved_llm_config
+from wepublic_defender.core import WePublicDefender
+from wepublic_defender.llm_client import chat_complete
+from wepublic_defender.token_estimator import (
+    ContextWindowExceededError,
+    TokenEstimator,
+    check_context_window,
+    estimate_request,
+)
+
+
+def _messages(chars):
+    return [{"role": "system", "content": "Review."}, {"role": "user", "content": "x" * chars}]
+
+
+def _root(**guard):
+    root = dict(get_resolved_llm_config().root)
+    root["contextGuard"] = dict(root.get("contextGuard", {}), **guard)
+    return root
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken(monkeypatch):
+    """Pin a fresh, uncalibrated character-based estimator so results do not depend on other tests."""
+    monkeypatch.setattr("wepublic_defender.token_estimator._estimator", None)
+    with patch("wepublic_defender.token_estimator.tiktoken", None):
+        yield
+
+
+class TestEstimateRequest:
+    """Test size, limit and cost estimation."""
+
+    def test_small_request_fits_with_cost(self):
+        est = estimate_request("gpt-5", _messages(4000), root_cfg=_root())
+        assert est.fits
+        assert est.method == "chars"
+        assert 1000 <= est.input_tokens <= 1020
+        assert 0 < est.input_cost < est.estimated_cost < est.max_cost
+
+    def test_oversized_input_does_not_fit(self):
+        est = estimate_request("gpt-4o", _messages(4 * 130_000), root_cfg=_root())
+        assert not est.fits
+        assert "max_input_tokens" in est.reason
+
+    def test_output_reservation_is_clamped_to_context(self):
+        # gpt-4o: 128k total context, 16k output; ~115k input leaves less than 16k
+        est = estimate_request("gpt-4o", _messages(4 * 115_000), root_cfg=_root(safety_margin=0))
+        assert est.fits
+        assert est.max_output_tokens < 16384
+
+    def test_calibration_moves_ratio(self):
+        estimator = TokenEstimator()
+        before = estimator.chars_per_token("gpt-5")
+        estimator.observe("gpt-5", 3000, 1000)
+        assert estimator.chars_per_token("gpt-5") == pytest.approx(3.0)
+        assert before == 4.0
+
+
+class TestContextGuard:
+    """Test reject and reroute behavior."""
+
+    def test_reject(self):
+        with pytest.raises(ContextWindowExceededError):
+            check_context_window("gpt-4o", _messages(4 * 130_000), root_cfg=_root(on_overflow="reject"))
+
+    def test_reroute_to_configured_fallback(self):
+        root = _root(on_overflow="reroute", fallback_models={"gpt-4o": ["gpt-5"]})
+        est = check_context_window("gpt-4o", _messages(4 * 130_000), root_cfg=root)
+        assert est.model_key == "gpt-5"
+        assert est.rerouted_from == "gpt-4o"
+
+    def test_nothing_fits_raises(self):
+        root = _root(on_overflow="reroute", fallback_models={})
+        with patch.dict("os.environ", {}, clear=True):
+            with pytest.raises(ContextWindowExceededError):
+                check_context_window("gpt-4o", _messages(4 * 3_000_000), root_cfg=root)
+
+    @patch("wepublic_defender.llm_client.get_client_pool")
+    def test_router_reports_estimate(self, mock_pool):
+        usage = SimpleNamespace(input_tokens=12, output_tokens=7, input_tokens_details=None)
+        client = MagicMock()
+        client.with_options.return_value.responses.create.return_value = SimpleNamespace(output_text="ok", usage=usage)
+        mock_pool.return_value.openai_client.return_value = client
+
+        result = chat_complete("gpt-5", _messages(400))
+
+        assert result["usage"]["estimated_input"] > 0
+        assert "estimated_cost" in result["usage"]
+        assert "rerouted_from" not in result["usage"]
+
+
+class TestAgentEstimate:
+    """Test WePublicDefender.estimate_agent_call."""
+
+    def test_estimates_every_configured_model(self):
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test', 'XAI_API_KEY': 'test'}):
+            with patch('wepublic_defender.core.OpenAI'):
+                wpd = WePublicDefender()
+        configured = wpd.review_settings["reviewAgentConfig"]["self_review_agent"]["models"]
+
+        estimates = wpd.estimate_agent_call("self_review", "Short brief.")
+        assert [e.model_key for e in estimates] == configured
+        assert all(e.fits and e.input_tokens > 0 for e in estimates)
+
+        single = wpd.estimate_agent_call("self_review", "Short brief.", override_model="gpt-5-mini")
+        assert [e.model_key for e in single] == ["gpt-5-mini"]
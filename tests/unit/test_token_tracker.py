@@ -314,3 +314,41 @@ class TestTokenTrackerAggregation:
 
         assert abs(in_cost - expected_in) < 1e-9
         assert abs(out_cost - expected_out) < 1e-9
+
+
+class TestCacheHitAccounting:
+    """Test response-cache hits are tracked apart from billed usage."""
+
+    def test_cache_hits_not_billed(self, sample_llm_config):
+        tracker = TokenTracker(sample_llm_config)
+        tracker.add(model="gpt-5", inp=1000, out=500)
+        tracker.add_cache_hit(model="gpt-5", inp=1_000_000, out=0, notes="agent:self_review")
+
+        assert tracker.usage_total().input == 1000
+        stats = tracker.cache_hit_stats()
+        assert stats["hits"] == 1
+        assert stats["cost_avoided"] == pytest.approx(1.25)
+        assert "CACHE HITS" in tracker.report() or "Cache hits" in tracker.report()
+
+    def test_clear_resets_cache_hits(self, sample_llm_config):
+        tracker = TokenTracker(sample_llm_config)
+        tracker.add_cache_hit(model="gpt-5", inp=10, out=5)
+        tracker.clear()
+        assert tracker.cache_hit_stats()["hits"] == 0
+
+
+class TestPromptCacheStats:
+    """Test provider prompt-cache hit ratios per agent and model."""
+
+    def test_ratio_per_agent_and_model(self, sample_llm_config):
+        tracker = TokenTracker(sample_llm_config)
+        tracker.add(model="gpt-5", inp=4000, out=100, cache=3000, notes="agent:self_review")
+        tracker.add(model="gpt-5", inp=4000, out=100, cache=0, notes="agent:self_review")
+        tracker.add(model="gpt-5", inp=1000, out=100, cache=0, notes="agent:final_review")
+
+        stats = tracker.prompt_cache_stats()
+        assert stats[("self_review", "gpt-5")]["hit_ratio"] == pytest.approx(0.375)
+        assert stats[("self_review", "gpt-5")]["calls"] == 2
+        assert stats[("final_review", "gpt-5")]["hit_ratio"] == 0.0
+        report = tracker.report()
+        assert "self_review/gpt-5 38%" in report
@@ -0,0 +1,468 @@
+"""
+OpenAI Batch API backend for non-interactive agent runs.
+
+Overnight re-reviews do not need interactive latency. This module packages
+many Responses API requests (built exactly as `llm_client.chat_complete`
+would build them) into one OpenAI Batch job, billed at the batch discount.
+
+Lifecycle:
+- build_batch_request(): one JSONL line per (agent, model) call
+- submit_batch(): upload the JSONL, create the job and persist a manifest to
+  .wepublic_defender/batches/<batch_id>.json (the input JSONL is kept next to
+  it as <batch_id>.input.jsonl)
+- refresh_batch() / wait_for_batch(): poll the job, with exponential backoff
+- fetch_batch_results(): download the output and map each line to the
+  chat_complete return contract ({"text", "usage", "meta", "raw"})
+
+Only `openai_responses` models can be batched; xAI models have no batch
+endpoint and are reported as skipped by the caller. Usage from a batch is
+recorded with service_tier "batch" so TokenTracker prices it at the
+discount (`batch_multiplier`, default 0.5).
+
+Settings come from the root `batchConfig` block of llm_providers.json:
+
+    "batchConfig": {
+      "completion_window": "24h",
+      "poll_base_delay": 30.0,
+      "poll_max_delay": 600.0,
+      "max_wait_seconds": 86400
+    }
+
+WePublicDefender.submit_agent_batch() / collect_agent_batch() wrap this
+module at the agent level.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field
+
+try:
+    from openai.lib._parsing._responses import type_to_text_format_param
+except Exception:  # pragma: no cover - allow import to fail gracefully at runtime
+    type_to_text_format_param = None  # type: ignore
+
+from .client_pool import get_client_pool
+from .config import get_resolved_llm_config
+from .llm_client import LLMConfigError, _build_openai_request, _get_configs, _openai_result, _route
+from .jsonio import dumps, loads
+from .logging_utils import get_logger
+
+
+DEFAULT_BATCH_CONFIG: Dict[str, Any] = {
+    "completion_window": "24h",
+    "poll_base_delay": 30.0,
+    "poll_max_delay": 600.0,
+    "max_wait_seconds": 86400.0,
+}
+
+BATCH_ENDPOINT = "/v1/responses"
+
+# Batch statuses after which nothing will change
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchNotSupportedError(LLMConfigError):
+    """Raised when a model's provider has no batch endpoint."""
+
+
+class BatchJob(BaseModel):
+    """Local manifest of a submitted batch, persisted under .wepublic_defender/batches/."""
+
+    id: str
+    input_file_id: str
+    status: str = "validating"
+    label: str = ""
+    created_at: float = Field(default_factory=time.time)
+    completion_window: str = "24h"
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_counts: Dict[str, int] = Field(default_factory=dict)
+    # custom_id -> caller metadata plus the request ctx used to shape results
+    requests: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    # Calls that could not be batched: [{"key", "agent", "model", "reason"}]
+    skipped: List[Dict[str, Any]] = Field(default_factory=list)
+    # Caller context needed at collection time (CLI, source file, ...)
+    extra: Dict[str, Any] = Field(default_factory=dict)
+    collected_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+def resolve_batch_config(root_cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with the `batchConfig` block.
+
+    Examples:
+        >>> resolve_batch_config({})["completion_window"]
+        '24h'
+        >>> resolve_batch_config({"batchConfig": {"poll_base_delay": 5}})["poll_base_delay"]
+        5
+    """
+    if root_cfg is None:
+        root_cfg = get_resolved_llm_config().root
+    cfg = dict(DEFAULT_BATCH_CONFIG)
+    cfg.update({k: v for k, v in (root_cfg.get("batchConfig", {}) or {}).items() if not k.startswith("_")})
+    return cfg
+
+
+def batches_dir() -> Path:
+    """Return the case batches directory (.wepublic_defender/batches under CWD)."""
+    return Path.cwd() / ".wepublic_defender" / "batches"
+
+
+def batch_supported(model_key: str) -> bool:
+    """
+    True if `model_key` is served by the OpenAI Responses API (the only batchable api_type).
+
+    Examples:
+        >>> batch_supported("gpt-5")
+        True
+        >>> batch_supported("grok-4")
+        False
+        >>> batch_supported("no-such-model")
+        False
+    """
+    try:
+        _, model_cfg, _ = _get_configs(model_key)
+    except LLMConfigError:
+        return False
+    return model_cfg.get("api_type") == "openai_responses"
+
+
+def build_batch_request(
+    custom_id: str,
+    model_key: str,
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build one Batch API JSONL line plus the ctx needed to shape its result.
+
+    The body matches what `chat_complete` sends, except that a schema is
+    passed as a `text.format` json_schema (responses.parse is not available
+    in batch), so the result text is JSON validated by the caller.
+
+    Raises:
+        BatchNotSupportedError: If the model is not an openai_responses model
+    """
+    api_type, _, model_cfg, root_cfg = _route(model_key, effort, web_search)
+    if api_type != "openai_responses":
+        raise BatchNotSupportedError(
+            f"Model '{model_key}' ({api_type}) has no batch endpoint; only openai_responses models can be batched"
+        )
+    body, ctx = _build_openai_request(
+        model_cfg,
+        root_cfg,
+        messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier="auto",
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+    )
+    text_format = body.pop("text_format", None)
+    if text_format is not None and type_to_text_format_param is not None:
+        body["text"] = {"format": type_to_text_format_param(text_format)}
+    ctx["structured"] = False
+    ctx["service_tier"] = "batch"
+    line = {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+    return line, ctx
+
+
+def _client(model_key: str) -> Any:
+    provider_cfg, model_cfg, root_cfg = _get_configs(model_key)
+    client = get_client_pool().openai_client(model_cfg.get("provider", "openai"), provider_cfg, root_cfg)
+    if client is None:
+        raise LLMConfigError(
+            f"Missing API key for provider '{model_cfg.get('provider')}'. Set env var {provider_cfg.get('api_key_env_var')}"
+        )
+    return client
+
+
+def _job_client(job: BatchJob, client: Any = None) -> Any:
+    if client is not None:
+        return client
+    models = [meta.get("model") for meta in job.requests.values() if meta.get("model")]
+    return _client(models[0] if models else "gpt-5")
+
+
+def _manifest_path(batch_id: str) -> Path:
+    return batches_dir() / f"{batch_id}.json"
+
+
+def _input_path(batch_id: str) -> Path:
+    return batches_dir() / f"{batch_id}.input.jsonl"
+
+
+def save_job(job: BatchJob) -> Path:
+    """Write the job manifest and return its path."""
+    path = _manifest_path(job.id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(job.model_dump_json(indent=2), encoding="utf-8")
+    return path
+
+
+def load_job(batch_id: str) -> BatchJob:
+    """Load a job manifest saved by submit_batch (FileNotFoundError if unknown)."""
+    path = _manifest_path(batch_id)
+    if not path.exists():
+        raise FileNotFoundError(f"No batch manifest for {batch_id} in {batches_dir()}")
+    return BatchJob.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def list_jobs() -> List[BatchJob]:
+    """Return all saved jobs, newest first."""
+    jobs: List[BatchJob] = []
+    for path in batches_dir().glob("*.json"):
+        try:
+            jobs.append(BatchJob.model_validate_json(path.read_text(encoding="utf-8")))
+        except Exception:
+            continue
+    return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+
+def read_batch_input(job: BatchJob) -> Dict[str, Dict[str, Any]]:
+    """Return the submitted JSONL lines keyed by custom_id ({} if the input file is gone)."""
+    lines: Dict[str, Dict[str, Any]] = {}
+    path = _input_path(job.id)
+    if not path.exists():
+        return lines
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            if raw.strip():
+                line = loads(raw)
+                lines[line["custom_id"]] = line
+    return lines
+
+
+def submit_batch(
+    items: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    *,
+    label: str = "",
+    skipped: Optional[List[Dict[str, Any]]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    client: Any = None,
+    root_cfg: Optional[Dict[str, Any]] = None,
+) -> BatchJob:
+    """
+    Upload `items` (JSONL line, request metadata) as one batch job and persist its manifest.
+
+    Request metadata must include "model" and should include the "ctx"
+    returned by build_batch_request.
+    """
+    if not items:
+        raise ValueError("Nothing to batch")
+    cfg = resolve_batch_config(root_cfg)
+    if client is None:
+        client = _client(items[0][1]["model"])
+
+    folder = batches_dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    staging = folder / f"{stamp}_{re.sub(r'[^A-Za-z0-9_.-]+', '-', label or 'batch')}.input.jsonl"
+    with open(staging, "w", encoding="utf-8") as f:
+        for line, _ in items:
+            f.write(dumps(line) + "\n")
+
+    with open(staging, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=cfg["completion_window"],
+        metadata={"label": (label or "wepublic_defender")[:512]},
+    )
+    staging.replace(_input_path(batch.id))
+
+    job = BatchJob(
+        id=batch.id,
+        input_file_id=uploaded.id,
+        status=str(getattr(batch, "status", "validating") or "validating"),
+        label=label,
+        completion_window=cfg["completion_window"],
+        requests={line["custom_id"]: meta for line, meta in items},
+        skipped=list(skipped or []),
+        extra=dict(extra or {}),
+    )
+    save_job(job)
+    try:
+        get_logger().info(
+            "Batch submitted | id=%s | requests=%s | skipped=%s | label=%s",
+            job.id, len(items), len(job.skipped), label,
+        )
+    except Exception:
+        pass
+    return job
+
+
+def refresh_batch(job: BatchJob, client: Any = None) -> BatchJob:
+    """Fetch the job's current status from the provider and update its manifest."""
+    batch = _job_client(job, client).batches.retrieve(job.id)
+    job.status = str(getattr(batch, "status", job.status) or job.status)
+    job.output_file_id = getattr(batch, "output_file_id", None) or job.output_file_id
+    job.error_file_id = getattr(batch, "error_file_id", None) or job.error_file_id
+    counts = getattr(batch, "request_counts", None)
+    if counts is not None:
+        job.request_counts = {
+            k: int(getattr(counts, k, 0) or 0) for k in ("total", "completed", "failed")
+        }
+    save_job(job)
+    try:
+        get_logger().info("Batch status | id=%s | status=%s | counts=%s", job.id, job.status, job.request_counts)
+    except Exception:
+        pass
+    return job
+
+
+def wait_for_batch(
+    job: BatchJob,
+    *,
+    client: Any = None,
+    max_wait: Optional[float] = None,
+    root_cfg: Optional[Dict[str, Any]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> BatchJob:
+    """
+    Poll until the job reaches a terminal status or `max_wait` seconds pass.
+
+    The delay starts at poll_base_delay and doubles up to poll_max_delay.
+    max_wait defaults to batchConfig.max_wait_seconds.
+    """
+    cfg = resolve_batch_config(root_cfg)
+    limit = float(cfg["max_wait_seconds"] if max_wait is None else max_wait)
+    delay = float(cfg["poll_base_delay"])
+    waited = 0.0
+    while True:
+        job = refresh_batch(job, client)
+        if job.done or waited >= limit:
+            return job
+        step = min(delay, limit - waited)
+        sleep(step)
+        waited += step
+        delay = min(delay * 2, float(cfg["poll_max_delay"]))
+
+
+def _output_text(body: Dict[str, Any]) -> str:
+    """Concatenate output_text parts from a raw Responses API body."""
+    if body.get("output_text"):
+        return str(body["output_text"])
+    parts: List[str] = []
+    for item in body.get("output", []) or []:
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []) or []:
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+def batch_result(body: Dict[str, Any], ctx: Dict[str, Any], batch_id: str) -> Dict[str, Any]:
+    """
+    Map one batch output body to the chat_complete return contract.
+
+    Examples:
+        >>> ctx = {"model_key": "gpt-5", "wire_model": "gpt-5", "timeout": 0.0, "tokens_param": "max_output_tokens",
+        ...        "max_tokens": 100, "temperature": None, "supports_temperature": False, "supports_reasoning": True,
+        ...        "effort": None, "effort_applied": False, "service_tier": "batch", "structured": False}
+        >>> body = {"output": [{"type": "message", "content": [{"type": "output_text", "text": "ok"}]}],
+        ...         "usage": {"input_tokens": 10, "output_tokens": 2, "input_tokens_details": {"cached_tokens": 4}}}
+        >>> r = batch_result(body, ctx, "batch_1")
+        >>> r["text"], r["usage"]["input"], r["usage"]["cached"], r["usage"]["service_tier"], r["usage"]["batch_id"]
+        ('ok', 10, 4, 'batch', 'batch_1')
+    """
+    usage = body.get("usage") or {}
+    resp = SimpleNamespace(
+        output_text=_output_text(body),
+        usage=SimpleNamespace(
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            input_tokens_details=usage.get("input_tokens_details"),
+        ),
+    )
+    result = _openai_result(resp, ctx, 0.0)
+    result["usage"]["batch_id"] = batch_id
+    result["meta"]["batch"] = True
+    result["raw"] = body
+    return result
+
+
+def _error_message(record: Dict[str, Any]) -> Optional[str]:
+    err = record.get("error")
+    if err:
+        return str(err.get("message") or err) if isinstance(err, dict) else str(err)
+    response = record.get("response") or {}
+    if int(response.get("status_code", 200) or 200) >= 400:
+        body_err = (response.get("body") or {}).get("error") or {}
+        return f"HTTP {response.get('status_code')}: {body_err.get('message', body_err) if isinstance(body_err, dict) else body_err}"
+    return None
+
+
+def fetch_batch_results(job: BatchJob, client: Any = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Download a completed job's output and error files.
+
+    Returns:
+        custom_id -> chat_complete-shaped result, or {"error": message} for
+        requests that failed or are missing from the output
+    """
+    client = _job_client(job, client)
+    results: Dict[str, Dict[str, Any]] = {}
+    for file_id in (job.output_file_id, job.error_file_id):
+        if not file_id:
+            continue
+        content = client.files.content(file_id)
+        text = getattr(content, "text", content)
+        for raw in str(text).splitlines():
+            if not raw.strip():
+                continue
+            record = loads(raw)
+            cid = record.get("custom_id")
+            if cid not in job.requests:
+                continue
+            message = _error_message(record)
+            if message:
+                results[cid] = {"error": message}
+                continue
+            body = (record.get("response") or {}).get("body") or {}
+            results[cid] = batch_result(body, job.requests[cid].get("ctx", {}), job.id)
+    for cid in job.requests:
+        results.setdefault(cid, {"error": f"no result for {cid} in batch output (status={job.status})"})
+    return results
+
+
+__all__ = [
+    "BATCH_ENDPOINT",
+    "BatchJob",
+    "BatchNotSupportedError",
+    "DEFAULT_BATCH_CONFIG",
+    "TERMINAL_STATUSES",
+    "batch_result",
+    "batch_supported",
+    "batches_dir",
+    "build_batch_request",
+    "fetch_batch_results",
+    "list_jobs",
+    "load_job",
+    "read_batch_input",
+    "refresh_batch",
+    "resolve_batch_config",
+    "save_job",
+    "submit_batch",
+    "wait_for_batch",
+]
@@ -0,0 +1,536 @@
+"""
+Dollar-budget scheduling for agent calls and pipelines.
+
+Before each external-llm call the scheduler projects its cost and picks the
+most capable configuration that still fits what is left of the budget:
+
+- input tokens come from the pre-flight estimate (`estimate_request`)
+- output tokens come from the historical distribution for the agent/model
+  (`output_percentile` of past calls, from the TokenTracker and
+  .wepublic_defender/usage_log.csv), falling back to the context guard's
+  default allowance, scaled down for lower effort
+- prices come from TokenTracker, so `priority_tier`, `tiered_pricing` and
+  flex/batch multipliers are applied exactly as they will be billed
+
+Options are tried in order of quality lost: a cheaper service tier first
+(priority -> auto -> flex), then lower reasoning effort (down to
+`min_effort`), then the model's configured downgrade (gpt-5 -> gpt-5-mini).
+The primary model must fit; additional models of a multi-model agent are
+optional and are downgraded or skipped. If not even the cheapest primary
+option fits, BudgetExceededError is raised before any money is spent.
+
+Money in flight is reserved when a call is planned and replaced by the
+actual billed cost when it returns, so parallel agents cannot jointly
+overspend. The actual cost includes the paid JSON retry and any completed
+hedge call that lost (`usage["extra_billed"]`); the JSON retry is only sent
+if it fits, and may draw on the `reserve_fraction` held back for it. Models a completion policy leaves running keep their reservation
+until they finish; a call cancelled in flight is charged its input cost,
+since the provider may already have processed the prompt. `report()` shows projected vs actual spend per call.
+
+Settings live in the `budgetConfig` block of legal_review_settings.json:
+
+    "budgetConfig": {
+      "reserve_fraction": 0.1,
+      "output_percentile": 80,
+      "min_samples": 3,
+      "min_effort": "low",
+      "effort_output_factor": {"high": 1.0, "medium": 0.7, "low": 0.45, "minimal": 0.3},
+      "flex_models": ["gpt-5", "gpt-5-mini", "gpt-5-nano"],
+      "downgrades": {"gpt-5": "gpt-5-mini", "grok-4": "grok-4-fast"}
+    }
+
+Examples:
+    >>> scheduler = BudgetScheduler(1.00)
+    >>> scheduler.remaining()
+    0.9
+    >>> effort_ladder("high", "low")
+    ['high', 'medium', 'low']
+"""
+
+from __future__ import annotations
+
+import csv
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from .config import get_resolved_llm_config
+from .hedging import percentile
+from .logging_utils import get_logger
+from .models.token_tracker import TokenTracker, TokenUsage
+from .token_estimator import TokenEstimate, estimate_request, resolve_context_guard
+from .usage_logger import usage_log_path
+
+
+DEFAULT_BUDGET_CONFIG: Dict[str, Any] = {
+    "reserve_fraction": 0.1,
+    "output_percentile": 80,
+    "min_samples": 3,
+    "min_effort": "low",
+    "effort_output_factor": {"high": 1.0, "medium": 0.7, "low": 0.45, "minimal": 0.3},
+    "flex_models": ["gpt-5", "gpt-5-mini", "gpt-5-nano"],
+    "downgrades": {"gpt-5": "gpt-5-mini", "gpt-4o": "gpt-5-mini", "gpt-5-mini": "gpt-5-nano", "grok-4": "grok-4-fast"},
+    "rewrite_agents": ["drafter"],
+}
+
+EFFORT_LEVELS = ["high", "medium", "low", "minimal"]
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when no configuration of the next call fits the remaining budget."""
+
+
+class PlannedCall(BaseModel):
+    """One model call chosen by the scheduler."""
+
+    model: str
+    effort: Optional[str] = None
+    service_tier: str = "auto"
+    input_tokens: int = 0
+    output_tokens: int = 0
+    projected_cost: float = 0.0
+    downgraded_from: Optional[str] = None
+    changes: List[str] = Field(default_factory=list)
+    # Pre-flight estimate the projection used; reused by the call's context check
+    estimate: Optional[TokenEstimate] = Field(default=None, exclude=True)
+
+
+class BudgetPlan(BaseModel):
+    """The scheduler's decision for one agent call."""
+
+    agent: str
+    calls: List[PlannedCall] = Field(default_factory=list)
+    skipped: List[Dict[str, Any]] = Field(default_factory=list)
+    actual_cost: Optional[float] = None
+
+    @property
+    def projected_cost(self) -> float:
+        return sum(c.projected_cost for c in self.calls)
+
+    def call(self, model: str) -> PlannedCall:
+        """The planned call that runs `model`."""
+        return next(c for c in self.calls if c.model == model)
+
+
+def resolve_budget_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge defaults with the `budgetConfig` block (keys starting with "_" are ignored).
+
+    Examples:
+        >>> resolve_budget_config({"budgetConfig": {"min_effort": "minimal", "_comment": "x"}})["min_effort"]
+        'minimal'
+    """
+    cfg = dict(DEFAULT_BUDGET_CONFIG)
+    if review_settings:
+        cfg.update({k: v for k, v in (review_settings.get("budgetConfig", {}) or {}).items() if not k.startswith("_")})
+    return cfg
+
+
+def effort_ladder(effort: Optional[str], min_effort: Optional[str]) -> List[Optional[str]]:
+    """Efforts to try, from the configured one down to `min_effort` (never raised)."""
+    if effort not in EFFORT_LEVELS:
+        return [effort]
+    start = EFFORT_LEVELS.index(effort)
+    stop = EFFORT_LEVELS.index(min_effort) if min_effort in EFFORT_LEVELS else start
+    return EFFORT_LEVELS[start:max(start, stop) + 1]
+
+
+def tier_ladder(model: str, service_tier: str, flex_models: Sequence[str]) -> List[str]:
+    """Service tiers to try for `model`, most expensive (configured) first."""
+    tiers = [service_tier or "auto"]
+    if tiers[0] == "priority":
+        tiers.append("auto")
+    if model in flex_models and "flex" not in tiers:
+        tiers.append("flex")
+    return tiers
+
+
+class OutputHistory:
+    """Observed output tokens per agent/model from the tracker and the usage CSV."""
+
+    def __init__(self, token_tracker: Optional[TokenTracker] = None, csv_path: Optional[Path] = None):
+        self.token_tracker = token_tracker
+        self._csv_path = csv_path
+        self._csv_samples: Optional[Dict[tuple, List[float]]] = None
+
+    def _load_csv(self) -> Dict[tuple, List[float]]:
+        if self._csv_samples is not None:
+            return self._csv_samples
+        samples: Dict[tuple, List[float]] = {}
+        try:
+            with open(self._csv_path or usage_log_path(), "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    if row.get("status", "success") != "success":
+                        continue
+                    try:
+                        out = float(row.get("output_tokens") or 0)
+                    except ValueError:
+                        continue
+                    if out > 0:
+                        samples.setdefault((row.get("agent", ""), row.get("model", "")), []).append(out)
+        except OSError:
+            pass
+        self._csv_samples = samples
+        return samples
+
+    def samples(self, agent: str, model: str, effort: Optional[str] = None) -> List[float]:
+        """Output token counts of past `agent` calls on `model` (same effort first if enough)."""
+        tracked: List[float] = []
+        if self.token_tracker is not None:
+            note = f"agent:{agent}"
+            for u in self.token_tracker._history:
+                if u.model == model and u.notes == note and u.output > 0 and (effort is None or u.effort == effort):
+                    tracked.append(float(u.output))
+        return tracked + self._load_csv().get((agent, model), [])
+
+    def projected(self, agent: str, model: str, effort: Optional[str], cfg: Dict[str, Any]) -> Optional[int]:
+        """Percentile of past output tokens, or None if history is too thin."""
+        min_samples = int(cfg.get("min_samples", 3))
+        values = self.samples(agent, model, effort)
+        if len(values) < min_samples:
+            values = self.samples(agent, model)
+        if len(values) < min_samples:
+            return None
+        p = percentile(values, float(cfg.get("output_percentile", 80)))
+        return int(p) if p is not None else None
+
+
+def _usage_cost(model: Optional[str], u: Dict[str, Any], pricing: TokenTracker) -> float:
+    if u.get("cache_hit") or not model or model not in pricing.cfg:
+        return 0.0
+    tier = u.get("service_tier") if u.get("service_tier") in ("auto", "flex", "standard", "priority", "batch") else "auto"
+    usage = TokenUsage(
+        model=model,
+        input=int(u.get("input", 0) or 0),
+        output=int(u.get("output", 0) or 0),
+        cached=int(u.get("cached", 0) or 0),
+        service_tier=tier,
+    )
+    return pricing.cost_for_usage(usage)[3]
+
+
+def result_cost(result: Dict[str, Any], pricing: Optional[TokenTracker] = None) -> float:
+    """
+    Billed cost of an agent result from its usage (cache hits are free).
+
+    Includes the extra calls billed for the result (`usage["extra_billed"]`:
+    a paid JSON retry, a completed hedge call that lost), each a usage dict
+    with its own "model".
+
+    Examples:
+        >>> result_cost({"model": "gpt-5", "usage": {"input": 1000, "cache_hit": True}})
+        0.0
+        >>> one = result_cost({"model": "gpt-5", "usage": {"input": 1000}})
+        >>> result_cost({"model": "gpt-5", "usage": {"input": 1000, "extra_billed": [{"model": "gpt-5", "input": 1000}]}}) == 2 * one
+        True
+    """
+    u = result.get("usage", {}) or {}
+    pricing = pricing or TokenTracker()
+    model = (u.get("hedge") or {}).get("billed_model") or result.get("model")
+    extra = sum(_usage_cost(e.get("model"), e, pricing) for e in u.get("extra_billed") or [])
+    return _usage_cost(model, u, pricing) + extra
+
+
+class BudgetScheduler:
+    """Plans agent calls against a dollar budget and tracks projected vs actual spend."""
+
+    def __init__(
+        self,
+        budget: float,
+        token_tracker: Optional[TokenTracker] = None,
+        review_settings: Optional[Dict[str, Any]] = None,
+        history: Optional[OutputHistory] = None,
+    ):
+        if budget <= 0:
+            raise ValueError("budget must be positive")
+        self.budget = float(budget)
+        self.cfg = resolve_budget_config(review_settings)
+        self.token_tracker = token_tracker
+        self.history = history or OutputHistory(token_tracker)
+        self.plans: List[BudgetPlan] = []
+        self._reserved: Dict[int, float] = {}
+        self._spent = 0.0
+        self._lock = threading.Lock()
+        self._pricing = TokenTracker()
+
+    # ----- accounting ---------------------------------------------------------
+    def spendable(self) -> float:
+        """Budget minus the safety reserve for parse retries and repairs."""
+        return self.budget * (1.0 - float(self.cfg.get("reserve_fraction", 0.0) or 0.0))
+
+    def spent(self) -> float:
+        """Actual cost of finished calls."""
+        return self._spent
+
+    def remaining(self) -> float:
+        """What the next call may cost: spendable minus spent and in-flight reservations."""
+        with self._lock:
+            return round(self.spendable() - self._spent - sum(self._reserved.values()), 6)
+
+    def cost_of(self, result: Dict[str, Any]) -> float:
+        """Billed cost of an agent result from its usage (cache hits are free)."""
+        return result_cost(result, self._pricing)
+
+    def affords(self, cost: float) -> bool:
+        """
+        Whether an unplanned extra call (a JSON retry) costing `cost` still fits.
+
+        Unlike `remaining()` this may draw on the reserve, which is held back
+        for exactly these calls.
+        """
+        with self._lock:
+            return cost <= self.budget - self._spent - sum(self._reserved.values()) + 1e-9
+
+    # ----- planning -----------------------------------------------------------
+    def price(self, model: str, input_tokens: int, output_tokens: int, service_tier: str) -> float:
+        """Cost of a call with the given token counts, priced like TokenTracker bills it."""
+        if model not in self._pricing.cfg:
+            return 0.0
+        usage = TokenUsage(model=model, input=input_tokens, output=output_tokens, service_tier=service_tier)
+        return self._pricing.cost_for_usage(usage)[3]
+
+    def _project(
+        self,
+        agent: str,
+        model: str,
+        effort: Optional[str],
+        service_tier: str,
+        base: Any,
+        configured_effort: Optional[str],
+    ) -> PlannedCall:
+        """Project one option from the model's pre-flight estimate and output history."""
+        expected = self.history.projected(agent, model, effort, self.cfg)
+        if expected is None:
+            guard_default = int(resolve_context_guard(get_resolved_llm_config().root).get("default_output_tokens", 4000))
+            expected = min(guard_default, int(base.max_output_tokens)) if base.max_output_tokens else guard_default
+            if agent in self.cfg.get("rewrite_agents", []):
+                # A rewrite returns roughly the whole document
+                expected = max(expected, base.input_tokens)
+            if effort and configured_effort and effort != configured_effort:
+                factors = self.cfg.get("effort_output_factor", {})
+                ratio = float(factors.get(effort, 1.0)) / float(factors.get(configured_effort, 1.0) or 1.0)
+                expected = int(expected * min(1.0, ratio))
+        if base.max_output_tokens:
+            expected = min(expected, int(base.max_output_tokens))
+        return PlannedCall(
+            model=model,
+            effort=effort,
+            service_tier=service_tier,
+            input_tokens=base.input_tokens,
+            output_tokens=expected,
+            projected_cost=self.price(model, base.input_tokens, expected, service_tier),
+            estimate=base,
+        )
+
+    def _options(self, model: str, effort: Optional[str], service_tier: str) -> List[tuple]:
+        """(model, effort, tier) options in order of quality lost."""
+        options: List[tuple] = []
+        seen = set()
+        current: Optional[str] = model
+        while current and current not in seen:
+            seen.add(current)
+            profile = get_resolved_llm_config().profile(current)
+            efforts = effort_ladder(effort, self.cfg.get("min_effort")) if profile and profile.supports_reasoning else [None]
+            for e in efforts:
+                for tier in tier_ladder(current, service_tier, self.cfg.get("flex_models", [])):
+                    options.append((current, e, tier))
+            current = (self.cfg.get("downgrades") or {}).get(current)
+        return options
+
+    def _pick(
+        self,
+        agent: str,
+        model: str,
+        effort: Optional[str],
+        service_tier: str,
+        messages: List[Dict[str, Any]],
+        model_cls: Any,
+        available: float,
+    ) -> tuple:
+        """Return (chosen call or None, cheapest projection seen or None)."""
+        cheapest: Optional[PlannedCall] = None
+        bases: Dict[str, Any] = {}
+        for option_model, option_effort, tier in self._options(model, effort, service_tier):
+            if option_model not in bases:
+                # Token counting is per model; price each tier/effort from the same count
+                bases[option_model] = estimate_request(option_model, messages, pydantic_model=model_cls)
+            if not bases[option_model].fits:
+                continue
+            call = self._project(agent, option_model, option_effort, tier, bases[option_model], effort)
+            if cheapest is None or call.projected_cost < cheapest.projected_cost:
+                cheapest = call
+            if call.projected_cost <= available:
+                if option_model != model:
+                    call.downgraded_from = model
+                    call.changes.append(f"model {model}->{option_model}")
+                if option_effort != effort and call.effort is not None:
+                    call.changes.append(f"effort {effort}->{option_effort}")
+                if tier != service_tier:
+                    call.changes.append(f"tier {service_tier}->{tier}")
+                return call, cheapest
+        return None, cheapest
+
+    def plan(
+        self,
+        agent: str,
+        models: Sequence[str],
+        messages: List[Dict[str, Any]],
+        model_cls: Any = None,
+        *,
+        effort: Optional[str] = None,
+        service_tier: str = "auto",
+    ) -> BudgetPlan:
+        """
+        Choose model/effort/tier for each of `models` (first = required) and reserve the projected cost.
+
+        Raises:
+            BudgetExceededError: If even the cheapest option of the primary model does not fit
+        """
+        plan = BudgetPlan(agent=agent)
+        available = self.remaining()
+        for i, model in enumerate(models):
+            call, cheapest = self._pick(agent, model, effort, service_tier, messages, model_cls, available)
+            if call is None:
+                floor = f"${cheapest.projected_cost:.4f}" if cheapest else "n/a (does not fit any context window)"
+                if i == 0:
+                    raise BudgetExceededError(
+                        f"{agent}: cheapest option costs ~{floor} but only ${max(available, 0.0):.4f} "
+                        f"of the ${self.budget:.2f} budget remains"
+                    )
+                plan.skipped.append({"model": model, "reason": f"needs ~{floor}, ${max(available, 0.0):.4f} left"})
+                continue
+            if any(c.model == call.model for c in plan.calls):
+                # Downgraded onto a model that already runs: a second copy adds no diversity
+                plan.skipped.append({"model": model, "reason": f"would duplicate {call.model}"})
+                continue
+            plan.calls.append(call)
+            available -= call.projected_cost
+        with self._lock:
+            self._reserved[id(plan)] = plan.projected_cost
+            self.plans.append(plan)
+        try:
+            get_logger().info(
+                "Budget plan | agent=%s | calls=%s | skipped=%s | projected=$%.4f | remaining=$%.4f",
+                agent,
+                [f"{c.model}/{c.effort}/{c.service_tier}" for c in plan.calls],
+                [s["model"] for s in plan.skipped],
+                plan.projected_cost,
+                self.remaining(),
+            )
+        except Exception:
+            pass
+        return plan
+
+    def record(
+        self,
+        plan: BudgetPlan,
+        results: Sequence[Dict[str, Any]],
+        *,
+        pending: Sequence[str] = (),
+        cancelled: Sequence[str] = (),
+    ) -> float:
+        """
+        Replace the plan's reservation with the actual cost of its results; returns that cost.
+
+        Calls in `pending` (models left running after the caller returned)
+        keep their share of the reservation until `settle`; calls in
+        `cancelled` are charged their `input_share`.
+        """
+        actual = sum(self.cost_of(r) for r in results)
+        actual += sum(self.input_share(plan.call(m)) for m in cancelled)
+        keep = sum(plan.call(m).projected_cost for m in pending)
+        with self._lock:
+            if keep > 0:
+                self._reserved[id(plan)] = keep
+            else:
+                self._reserved.pop(id(plan), None)
+            self._spent += actual
+        plan.actual_cost = (plan.actual_cost or 0.0) + actual
+        return actual
+
+    def settle(self, plan: BudgetPlan, model: str, result: Optional[Dict[str, Any]]) -> float:
+        """
+        Replace a pending call's reservation with its actual cost; returns that cost.
+
+        `result` is None for a call cancelled in flight, which is charged its
+        `input_share`.
+        """
+        call = plan.call(model)
+        cost = self.cost_of(result) if result is not None else self.input_share(call)
+        with self._lock:
+            left = self._reserved.get(id(plan), 0.0) - call.projected_cost
+            if left > 1e-12:
+                self._reserved[id(plan)] = left
+            else:
+                self._reserved.pop(id(plan), None)
+            self._spent += cost
+        plan.actual_cost = (plan.actual_cost or 0.0) + cost
+        return cost
+
+    def input_share(self, call: PlannedCall) -> float:
+        """Conservative cost of a call cancelled in flight: the provider may already have billed its prompt."""
+        return self.price(call.model, call.input_tokens, 0, call.service_tier)
+
+    def cancel(self, plan: BudgetPlan) -> float:
+        """Drop the reservation of a plan whose calls were cancelled in flight, charging each its input share."""
+        return self.record(plan, [], cancelled=[c.model for c in plan.calls])
+
+    def release(self, plan: BudgetPlan) -> None:
+        """Drop a plan's reservation without spending (the call never ran)."""
+        with self._lock:
+            self._reserved.pop(id(plan), None)
+
+    # ----- reporting ----------------------------------------------------------
+    def summary(self) -> Dict[str, Any]:
+        """Projected vs actual totals plus one entry per planned agent call."""
+        projected = sum(p.projected_cost for p in self.plans)
+        return {
+            "budget": self.budget,
+            "projected": round(projected, 6),
+            "actual": round(self._spent, 6),
+            "remaining": round(self.budget - self._spent, 6),
+            "calls": [
+                {
+                    "agent": p.agent,
+                    "models": [c.model for c in p.calls],
+                    "changes": [ch for c in p.calls for ch in c.changes],
+                    "skipped": p.skipped,
+                    "projected": round(p.projected_cost, 6),
+                    "actual": None if p.actual_cost is None else round(p.actual_cost, 6),
+                }
+                for p in self.plans
+            ],
+        }
+
+    def report(self) -> str:
+        """Human-readable projected vs actual spend."""
+        s = self.summary()
+        lines = [
+            f"Budget ${s['budget']:.2f} | projected ${s['projected']:.4f} | actual ${s['actual']:.4f} | "
+            f"left ${s['remaining']:.4f}"
+        ]
+        for call in s["calls"]:
+            actual = "-" if call["actual"] is None else f"${call['actual']:.4f}"
+            extra = f" | {', '.join(call['changes'])}" if call["changes"] else ""
+            skipped = f" | skipped {', '.join(x['model'] for x in call['skipped'])}" if call["skipped"] else ""
+            lines.append(
+                f"  {call['agent']:<17} {','.join(call['models']):<22} projected ${call['projected']:.4f} | actual {actual}{extra}{skipped}"
+            )
+        return "\n".join(lines)
+
+
+__all__ = [
+    "BudgetExceededError",
+    "BudgetPlan",
+    "BudgetScheduler",
+    "DEFAULT_BUDGET_CONFIG",
+    "EFFORT_LEVELS",
+    "OutputHistory",
+    "PlannedCall",
+    "effort_ladder",
+    "resolve_budget_config",
+    "result_cost",
+    "tier_ladder",
+]
@@ -0,0 +1,382 @@
+"""
+Chunked map-reduce review for long documents.
+
+`_run_single_model` sends the whole document as one user message. Long
+complaints with exhibits then run into context limits, and high-effort
+latency grows with length. For the section-oriented agents (self_review,
+citation_verify, final_review) the document can instead be:
+
+1. split on `##` / `###` headings (outside code fences) into sections
+2. packed into chunks of at most `max_chunk_tokens`; a single oversized
+   section is split on paragraph boundaries
+3. given `overlap_tokens` of the previous chunk's tail as read-only context
+4. reviewed chunk by chunk, at most `max_concurrency` at a time
+5. merged back into one DocumentReviewResult / citation list, with issues
+   deduplicated and attributed to the section(s) they came from
+
+Settings live in the `chunkingConfig` block of legal_review_settings.json:
+
+    "chunkingConfig": {
+      "enabled": false,
+      "min_document_tokens": 24000,
+      "max_chunk_tokens": 12000,
+      "overlap_tokens": 400,
+      "max_concurrency": 4
+    }
+
+Agents opt in or out with `"chunked": true/false` in reviewAgentConfig and
+can override any of the numbers under `"chunking": {...}`. Documents under
+`min_document_tokens` are always reviewed whole.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+DEFAULT_CHUNKING_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "min_document_tokens": 24000,
+    "max_chunk_tokens": 12000,
+    "overlap_tokens": 400,
+    "max_concurrency": 4,
+}
+
+# Agents whose findings are local to a section and can be merged back together
+CHUNKABLE_AGENTS = ("self_review", "citation_verify", "final_review")
+
+PREAMBLE = "(preamble)"
+
+_HEADING_RE = re.compile(r"^(#{2,3})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_ATTRIBUTION_RE = re.compile(r"^\[[^\]]*\]\s*")
+
+
+class Section(BaseModel):
+    """A heading-delimited slice of the document (`title` is "A > B" for a ### under ##)."""
+
+    title: str
+    text: str
+
+
+class Chunk(BaseModel):
+    """One unit of review: whole sections (or pieces of one) plus overlap context."""
+
+    index: int
+    sections: List[str] = Field(default_factory=list)
+    body: str
+    overlap: str = ""
+    tokens: int = 0
+
+    def label(self) -> str:
+        """Section attribution used in merged findings, e.g. "FACTS; CLAIMS > Count I"."""
+        return "; ".join(self.sections) or PREAMBLE
+
+    def prompt(self, total: int) -> str:
+        """The user message for this chunk: a short header, overlap context, then the body."""
+        header = (
+            f"DOCUMENT EXCERPT {self.index + 1} of {total} (sections: {self.label()}). "
+            "The other sections are reviewed separately; review ONLY the text of this excerpt "
+            "and do not report sections as missing because they are not shown."
+        )
+        parts = [header]
+        if self.overlap:
+            parts.append(
+                "--- CONTEXT FROM PREVIOUS EXCERPT (already reviewed; do not report issues in it) ---\n"
+                + self.overlap
+                + "\n--- END CONTEXT ---"
+            )
+        parts.append(self.body)
+        return "\n\n".join(parts)
+
+
+def resolve_chunking_config(
+    review_settings: Optional[Dict[str, Any]],
+    agent_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Merge defaults, `chunkingConfig` and the agent's `chunked` / `chunking` overrides.
+
+    Examples:
+        >>> resolve_chunking_config({})["enabled"]
+        False
+        >>> cfg = resolve_chunking_config({"chunkingConfig": {"max_chunk_tokens": 8000}}, {"chunked": True, "chunking": {"overlap_tokens": 0}})
+        >>> cfg["enabled"], cfg["max_chunk_tokens"], cfg["overlap_tokens"]
+        (True, 8000, 0)
+    """
+    cfg = dict(DEFAULT_CHUNKING_CONFIG)
+    if review_settings:
+        cfg.update({k: v for k, v in (review_settings.get("chunkingConfig", {}) or {}).items() if not k.startswith("_")})
+    if agent_config:
+        if agent_config.get("chunked") is not None:
+            cfg["enabled"] = bool(agent_config["chunked"])
+        cfg.update(agent_config.get("chunking", {}) or {})
+    return cfg
+
+
+def split_sections(text: str) -> List[Section]:
+    """
+    Split markdown on `##` / `###` headings; text before the first heading is the preamble.
+
+    Examples:
+        >>> doc = "# Title\\nIntro\\n## FACTS\\nf\\n### Timeline\\nt\\n## CLAIMS\\nc\\n"
+        >>> [s.title for s in split_sections(doc)]
+        ['(preamble)', 'FACTS', 'FACTS > Timeline', 'CLAIMS']
+        >>> "".join(s.text for s in split_sections(doc)) == doc
+        True
+    """
+    sections: List[Section] = []
+    title, parent = PREAMBLE, ""
+    buf: List[str] = []
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line.rstrip("\r\n"))
+        if match:
+            if buf:
+                sections.append(Section(title=title, text="".join(buf)))
+            heading = match.group(2).strip()
+            if len(match.group(1)) == 2:
+                parent = title = heading
+            else:
+                title = f"{parent} > {heading}" if parent else heading
+            buf = [line]
+        else:
+            buf.append(line)
+    if buf:
+        sections.append(Section(title=title, text="".join(buf)))
+    return sections
+
+
+def _hard_split(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """Cut text with no usable paragraph breaks into pieces of about max_tokens."""
+    tokens = max(1, count_tokens(text))
+    width = max(1, int(len(text) * max_tokens / tokens))
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+def _split_oversized(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """Split one section larger than max_tokens on blank lines, packing paragraphs greedily."""
+    paragraphs = [p + "\n\n" for p in re.split(r"\n\s*\n", text) if p.strip()]
+    pieces: List[str] = []
+    current = ""
+    for para in paragraphs:
+        if count_tokens(para) > max_tokens:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(_hard_split(para, count_tokens, max_tokens))
+            continue
+        if current and count_tokens(current + para) > max_tokens:
+            pieces.append(current)
+            current = ""
+        current += para
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _tail(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> str:
+    """Trailing paragraphs of text totalling at most max_tokens (cut mid-paragraph if needed)."""
+    if max_tokens <= 0 or not text.strip():
+        return ""
+    paragraphs = [p for p in re.split(r"\n\s*\n", text.strip()) if p.strip()]
+    kept: List[str] = []
+    for para in reversed(paragraphs):
+        candidate = "\n\n".join([para] + kept)
+        if count_tokens(candidate) > max_tokens:
+            break
+        kept.insert(0, para)
+    if kept:
+        return "\n\n".join(kept)
+    last = paragraphs[-1]
+    return _hard_split(last, count_tokens, max_tokens)[-1]
+
+
+def build_chunks(
+    text: str,
+    count_tokens: Callable[[str], int],
+    max_tokens: int,
+    overlap_tokens: int = 0,
+) -> List[Chunk]:
+    """
+    Pack heading sections into chunks of at most `max_tokens`, each with overlap from the previous one.
+
+    Examples:
+        >>> doc = "## A\\n" + "a " * 50 + "\\n## B\\n" + "b " * 50 + "\\n## C\\nc\\n"
+        >>> chunks = build_chunks(doc, lambda t: len(t) // 4, max_tokens=40, overlap_tokens=0)
+        >>> [c.sections for c in chunks]
+        [['A'], ['B', 'C']]
+    """
+    pieces: List[Tuple[str, str, int]] = []
+    for section in split_sections(text):
+        tokens = count_tokens(section.text)
+        if tokens <= max_tokens:
+            pieces.append((section.title, section.text, tokens))
+            continue
+        for part in _split_oversized(section.text, count_tokens, max_tokens):
+            pieces.append((section.title, part, count_tokens(part)))
+
+    groups: List[List[Tuple[str, str, int]]] = []
+    current: List[Tuple[str, str, int]] = []
+    used = 0
+    for piece in pieces:
+        if current and used + piece[2] > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(piece)
+        used += piece[2]
+    if current:
+        groups.append(current)
+
+    chunks: List[Chunk] = []
+    for index, group in enumerate(groups):
+        titles: List[str] = []
+        for title, _, _ in group:
+            if title not in titles:
+                titles.append(title)
+        body = "".join(part for _, part, _ in group)
+        overlap = _tail(chunks[-1].body, count_tokens, overlap_tokens) if chunks else ""
+        chunks.append(
+            Chunk(
+                index=index,
+                sections=titles,
+                body=body,
+                overlap=overlap,
+                tokens=sum(t for _, _, t in group) + (count_tokens(overlap) if overlap else 0),
+            )
+        )
+    return chunks
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", _ATTRIBUTION_RE.sub("", str(text)).lower()).strip()
+
+
+def _merge_findings(parts: Iterable[Tuple[str, Iterable[Any]]]) -> List[str]:
+    """Deduplicate findings across chunks, prefixing each with the sections that raised it."""
+    order: List[str] = []
+    found: Dict[str, Tuple[str, List[str]]] = {}
+    for label, items in parts:
+        for item in items or []:
+            key = _norm(item)
+            if not key:
+                continue
+            if key not in found:
+                order.append(key)
+                found[key] = (_ATTRIBUTION_RE.sub("", str(item)).strip(), [])
+            labels = found[key][1]
+            if label not in labels:
+                labels.append(label)
+    return [f"[{'; '.join(found[k][1])}] {found[k][0]}" for k in order]
+
+
+def merge_review_results(parts: List[Tuple[Chunk, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk DocumentReviewResult dicts into one.
+
+    Issues are deduplicated (case and punctuation insensitive) and prefixed
+    with their section(s). The merged document is ready to file only if
+    every chunk says so and the merged totals still meet the filing rule
+    (no critical, at most two major issues). Confidence is the lowest chunk
+    confidence.
+
+    Examples:
+        >>> a = Chunk(index=0, sections=["FACTS"], body="")
+        >>> b = Chunk(index=1, sections=["CLAIMS"], body="")
+        >>> merged = merge_review_results([
+        ...     (a, {"critical_issues": [], "major_issues": ["Thin facts."], "ready_to_file": True, "iteration": 2, "confidence": 90}),
+        ...     (b, {"critical_issues": [], "major_issues": ["thin facts"], "ready_to_file": True, "iteration": 2, "confidence": 70}),
+        ... ])
+        >>> merged["major_issues"], merged["confidence"], merged["ready_to_file"]
+        (['[FACTS; CLAIMS] Thin facts.'], 70, True)
+    """
+    reviews = [(chunk, review) for chunk, review in parts if isinstance(review, dict)]
+    merged: Dict[str, Any] = {}
+    for field in ("critical_issues", "major_issues", "minor_issues", "strengths"):
+        merged[field] = _merge_findings((chunk.label(), review.get(field)) for chunk, review in reviews)
+    merged["ready_to_file"] = (
+        bool(reviews)
+        and all(bool(review.get("ready_to_file")) for _, review in reviews)
+        and not merged["critical_issues"]
+        and len(merged["major_issues"]) <= 2
+    )
+    merged["iteration"] = next((int(r["iteration"]) for _, r in reviews if r.get("iteration") is not None), 1)
+    confidences = [int(r["confidence"]) for _, r in reviews if r.get("confidence") is not None]
+    merged["confidence"] = min(confidences) if confidences else 0
+    notes = [f"[{chunk.label()}] {review['notes']}" for chunk, review in reviews if review.get("notes")]
+    merged["notes"] = "\n".join(notes) if notes else None
+    return merged
+
+
+def _citation_key(citation: Dict[str, Any]) -> str:
+    return _norm(citation.get("citation") or citation.get("case_name") or "")
+
+
+def merge_citation_results(parts: List[Tuple[Chunk, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Merge per-chunk citation verification lists, one entry per distinct citation.
+
+    A citation cited in several chunks keeps the first verification and
+    folds in the rest: issues, propositions and authorities are unioned,
+    `still_good_law` holds only if every chunk agrees, `supports_position`
+    is False if any chunk found no support, confidence is the lowest, and
+    `applies_to_sections` gains the sections it was cited in.
+
+    Examples:
+        >>> a = Chunk(index=0, sections=["FACTS"], body="")
+        >>> b = Chunk(index=1, sections=["CLAIMS"], body="")
+        >>> cite = {"case_name": "Smith v. Jones", "citation": "1 F.4th 2", "still_good_law": True, "confidence": 90, "issues_found": []}
+        >>> merged = merge_citation_results([(a, [cite]), (b, [dict(cite, citation="1 F.4th 2.", confidence=60, issues_found=["Wrong pin"])])])
+        >>> len(merged), merged[0]["confidence"], merged[0]["issues_found"], merged[0]["applies_to_sections"]
+        (1, 60, ['Wrong pin'], ['FACTS', 'CLAIMS'])
+    """
+    order: List[str] = []
+    merged: Dict[str, Dict[str, Any]] = {}
+    for chunk, citations in parts:
+        for citation in citations or []:
+            if not isinstance(citation, dict):
+                continue
+            key = _citation_key(citation)
+            if key not in merged:
+                order.append(key)
+                merged[key] = dict(citation)
+                merged[key]["applies_to_sections"] = list(citation.get("applies_to_sections") or [])
+            else:
+                current = merged[key]
+                for field in ("issues_found", "supported_propositions", "contrary_authority", "key_passages", "pin_cites"):
+                    values = list(current.get(field) or [])
+                    for value in citation.get(field) or []:
+                        if value not in values:
+                            values.append(value)
+                    current[field] = values
+                current["still_good_law"] = bool(current.get("still_good_law")) and bool(citation.get("still_good_law"))
+                if citation.get("supports_position") is False or current.get("supports_position") is None:
+                    current["supports_position"] = citation.get("supports_position", current.get("supports_position"))
+                if citation.get("confidence") is not None:
+                    current["confidence"] = min(int(current.get("confidence", 100)), int(citation["confidence"]))
+                for section in citation.get("applies_to_sections") or []:
+                    if section not in current["applies_to_sections"]:
+                        current["applies_to_sections"].append(section)
+            for section in chunk.sections or [PREAMBLE]:
+                if section not in merged[key]["applies_to_sections"]:
+                    merged[key]["applies_to_sections"].append(section)
+    return [merged[k] for k in order]
+
+
+__all__ = [
+    "CHUNKABLE_AGENTS",
+    "Chunk",
+    "DEFAULT_CHUNKING_CONFIG",
+    "PREAMBLE",
+    "Section",
+    "build_chunks",
+    "merge_citation_results",
+    "merge_review_results",
+    "resolve_chunking_config",
+    "split_sections",
+]
@@ -0,0 +1,330 @@
+"""
+Per-citation verification for citation_verify.
+
+The default citation_verify call sends the whole brief to one model and asks
+for a JSON array. Latency grows with the number of citations, one malformed
+item can invalidate the whole array, and nothing carries over between runs.
+In per-citation mode the agent instead:
+
+1. extracts reporter citations ("550 U.S. 544, 570 (2007)") locally, with
+   the case name, the proposition they are cited for, the surrounding
+   paragraph and the section heading
+2. verifies each distinct citation in its own small call (same system prompt,
+   so provider prompt caching applies), at most `max_concurrency` at a time
+3. caches each verification under the normalized citation + proposition
+   (+ model and jurisdiction), so an unchanged citation is not re-verified
+   when the surrounding draft changes
+4. reports each result as it arrives and returns the usual list of
+   CitationVerificationResult dicts, in document order
+
+Settings live in the `perCitationConfig` block of legal_review_settings.json:
+
+    "perCitationConfig": {
+      "enabled": false,
+      "max_concurrency": 6,
+      "context_chars": 1500,
+      "max_citations": 150
+    }
+
+The citation_verifier agent opts in or out with `"per_citation": true/false`
+in reviewAgentConfig. Documents with no extractable reporter citation (e.g.
+only statutes) fall back to the whole-document call.
+
+Cache:
+- .wepublic_defender/cache/citations/<hash[:2]>/<hash>.json
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .jsonio import dumps
+
+
+DEFAULT_PER_CITATION_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "max_concurrency": 6,
+    "context_chars": 1500,
+    "max_citations": 150,
+}
+
+# Bump when the prompt or key layout changes so cached verifications become misses
+CITATION_CACHE_VERSION = 1
+
+_CITE_RE = re.compile(
+    r"\b(?P<volume>\d{1,4})\s+"
+    r"(?P<reporter>(?:[A-Z][A-Za-z]{0,6}\.\s?){1,4}(?:(?:2d|3d|4th|5th)\b)?(?:\s?App'x)?)"
+    r"\s*(?P<page>\d{1,5})\b"
+    r"(?:,\s*(?P<pin>\d{1,5}(?:[-–]\d{1,5})?))?"
+    r"(?:\s*\((?P<paren>[^()]{0,60}?\d{4})\))?"
+)
+# Rules and codes that look like reporters ("12 Fed. R. Civ. P. 8")
+_NOT_REPORTERS = ("fed. r.", "u.s.c.", "c.f.r.")
+_IN_RE_RE = re.compile(r"\b((?:In re|Ex parte) [^,;:()]{1,80}?),?\s*$")
+_SIGNALS = {"see", "also", "cf.", "accord", "but", "compare", "e.g.,", "generally"}
+# Lowercase words allowed inside a party name ("Board of Education", "ex rel.")
+_NAME_CONNECTORS = {"of", "the", "and", "&", "for", "ex", "rel.", "de", "la", "in", "on", "to"}
+# Abbreviations longer than four letters that do not end a sentence
+_LONG_ABBREVIATIONS = {"Indus.", "Servs.", "Assocs.", "Mgmt.", "Equip.", "Comput."}
+_SIGNAL_RE = re.compile(r"^(?:see(?: also| generally)?|cf\.|accord|e\.g\.,?|but see|compare)[\s,]*", re.IGNORECASE)
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_SENTENCE_END_RE = re.compile(r"(?:[a-z]{3,}|\d|\))[.!?][\"”']?\s+")
+
+
+class ExtractedCitation(BaseModel):
+    """A distinct citation found in the document, with what it is cited for."""
+
+    citation: str = Field(..., description="Citation as first written (volume reporter page)")
+    normalized: str
+    case_name: Optional[str] = None
+    propositions: List[str] = Field(default_factory=list)
+    contexts: List[str] = Field(default_factory=list)
+    sections: List[str] = Field(default_factory=list)
+    pin_cites: List[str] = Field(default_factory=list)
+    first_offset: int = 0
+
+    def prompt(self) -> str:
+        """User message for verifying this one citation."""
+        props = "\n".join(f"- {p}" for p in self.propositions) or "- (not stated; infer from context)"
+        context = "\n\n---\n\n".join(self.contexts)
+        return (
+            f"CITATION TO VERIFY: {self.citation}\n"
+            f"CASE NAME AS WRITTEN: {self.case_name or 'unknown'}\n"
+            f"PIN CITES USED: {', '.join(self.pin_cites) or 'none'}\n"
+            f"SECTIONS: {', '.join(self.sections) or 'n/a'}\n"
+            f"CITED FOR:\n{props}\n\n"
+            f"CONTEXT FROM THE DOCUMENT:\n{context}\n\n"
+            "Verify ONLY this citation and whether it supports the proposition(s) above. "
+            "Return a JSON array containing exactly one object."
+        )
+
+
+def resolve_per_citation_config(
+    review_settings: Optional[Dict[str, Any]],
+    agent_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Merge defaults, `perCitationConfig` and the agent's `per_citation` flag.
+
+    Examples:
+        >>> resolve_per_citation_config({})["enabled"]
+        False
+        >>> resolve_per_citation_config({"perCitationConfig": {"max_concurrency": 3}}, {"per_citation": True})
+        {'enabled': True, 'max_concurrency': 3, 'context_chars': 1500, 'max_citations': 150}
+    """
+    cfg = dict(DEFAULT_PER_CITATION_CONFIG)
+    if review_settings:
+        cfg.update({k: v for k, v in (review_settings.get("perCitationConfig", {}) or {}).items() if not k.startswith("_")})
+    if agent_config and agent_config.get("per_citation") is not None:
+        cfg["enabled"] = bool(agent_config["per_citation"])
+    return cfg
+
+
+def normalize_citation(citation: str) -> str:
+    """
+    Canonical "volume reporter page" form: spacing, case and pin cites removed.
+
+    Examples:
+        >>> normalize_citation("550 U.S. 544, 570")
+        '550 u.s. 544'
+        >>> normalize_citation("123 F. 3d 456") == normalize_citation("123  F.3d 456")
+        True
+        >>> normalize_citation("1 F. Supp. 2d 2") == normalize_citation("1 F.Supp.2d 2")
+        True
+    """
+    match = _CITE_RE.search(citation)
+    if match:
+        reporter = re.sub(r"\s+", "", match.group("reporter")).lower()
+        return f"{match.group('volume')} {reporter} {match.group('page')}"
+    return re.sub(r"\s+", " ", citation).strip().lower()
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[*_`]", "", text)).strip()
+
+
+def _case_name(lead: str) -> Optional[str]:
+    """
+    Case name ending right before a citation: "Bell Atl. Corp. v. Twombly" from "... See Bell Atl. Corp. v. Twombly,".
+
+    Examples:
+        >>> _case_name("Pleading standards are settled. See Bell Atl. Corp. v. Twombly,")
+        'Bell Atl. Corp. v. Twombly'
+        >>> _case_name("as held in In re Smith,")
+        'In re Smith'
+        >>> _case_name("no case here,") is None
+        True
+    """
+    lead = lead.rstrip().rstrip(",").rstrip()
+    idx = lead.rfind(" v. ")
+    if idx < 0:
+        match = _IN_RE_RE.search(lead)
+        return match.group(1).strip() if match else None
+    second = lead[idx + 4:].strip()
+    if not second or len(second) > 100 or any(ch in second for ch in ";:()"):
+        return None
+    first: List[str] = []
+    for word in reversed(lead[:idx].split()):
+        if word.lower() in _SIGNALS:
+            break
+        if word.endswith(".") and len(word) > 5 and word not in _LONG_ABBREVIATIONS:
+            break  # previous sentence ends here
+        if not (word[0].isupper() or word[0].isdigit() or word.lower() in _NAME_CONNECTORS):
+            break
+        first.insert(0, word)
+        if len(first) >= 10:
+            break
+    while first and first[0].lower() in _NAME_CONNECTORS:
+        first.pop(0)
+    if not first:
+        return None
+    return f"{' '.join(first)} v. {second}"
+
+
+def _proposition(paragraph: str, end: int) -> str:
+    """The statement a citation supports: its sentence, or the previous one after a bare signal."""
+    before = paragraph[:end]
+    bounds = [m.end() for m in _SENTENCE_END_RE.finditer(before)]
+    start = bounds[-1] if bounds else 0
+    prop = _SIGNAL_RE.sub("", _clean(before[start:])).strip(" ,;:")
+    if len(prop) < 20 and len(bounds) >= 1:
+        # "...states a claim. See Smith v. Jones, ..." - the claim is the prior sentence
+        prev_start = bounds[-2] if len(bounds) >= 2 else 0
+        prop = _clean(before[prev_start:start]).strip(" ,;:")
+    return prop
+
+
+def _paragraph_at(document: str, pos: int, max_chars: int) -> str:
+    start = document.rfind("\n\n", 0, pos)
+    start = 0 if start < 0 else start + 2
+    end = document.find("\n\n", pos)
+    end = len(document) if end < 0 else end
+    if end - start > max_chars:
+        half = max_chars // 2
+        start, end = max(start, pos - half), min(end, pos + half)
+    return document[start:end].strip()
+
+
+def extract_citations(document: str, context_chars: int = 1500, max_citations: Optional[int] = None) -> List[ExtractedCitation]:
+    """
+    Extract distinct reporter citations in document order, merging repeat citations.
+
+    Short forms ("Id.", "550 U.S. at 570") and statutes are not extracted.
+
+    Examples:
+        >>> doc = "## ARGUMENT\\n\\nA complaint must plead plausible facts. See *Bell Atl. Corp. v. Twombly*, 550 U.S. 544, 570 (2007)."
+        >>> [c] = extract_citations(doc)
+        >>> c.citation, c.case_name, c.pin_cites, c.sections
+        ('550 U.S. 544', 'Bell Atl. Corp. v. Twombly', ['570'], ['ARGUMENT'])
+        >>> c.propositions
+        ['A complaint must plead plausible facts.']
+    """
+    headings = [(m.start(), _clean(m.group(1))) for m in _HEADING_RE.finditer(document)]
+    found: Dict[str, ExtractedCitation] = {}
+    for match in _CITE_RE.finditer(document):
+        reporter = match.group("reporter").lower()
+        if any(reporter.replace(" ", "").startswith(bad.replace(" ", "")) for bad in _NOT_REPORTERS):
+            continue
+        pos = match.start()
+        norm = normalize_citation(match.group(0))
+        paragraph_start = document.rfind("\n\n", 0, pos)
+        paragraph_start = 0 if paragraph_start < 0 else paragraph_start + 2
+        before = _clean(document[paragraph_start:pos])
+        tail_start = max(0, len(before) - 200)
+        case_name = _case_name(before[tail_start:])
+        if case_name:
+            # Proposition is the text before the case name in its paragraph
+            cut = before.rfind(case_name.split(" ")[0], tail_start)
+            before = before[:cut] if cut >= 0 else before
+        proposition = _proposition(before, len(before))
+        section = next((title for start, title in reversed(headings) if start < pos), None)
+
+        entry = found.get(norm)
+        if entry is None:
+            if max_citations is not None and len(found) >= max_citations:
+                continue
+            reporter_text = re.sub(r"\s+", " ", match.group("reporter")).strip()
+            entry = ExtractedCitation(
+                citation=f"{match.group('volume')} {reporter_text} {match.group('page')}",
+                normalized=norm,
+                first_offset=pos,
+            )
+            found[norm] = entry
+        if case_name and not entry.case_name:
+            entry.case_name = case_name
+        if proposition and proposition not in entry.propositions:
+            entry.propositions.append(proposition)
+        context = _paragraph_at(document, pos, context_chars)
+        if context and context not in entry.contexts and len(entry.contexts) < 3:
+            entry.contexts.append(context)
+        if section and section not in entry.sections:
+            entry.sections.append(section)
+        pin = match.group("pin")
+        if pin and pin not in entry.pin_cites:
+            entry.pin_cites.append(pin)
+    return sorted(found.values(), key=lambda c: c.first_offset)
+
+
+def citation_cache_key(citation: ExtractedCitation, *, model_key: str, jurisdiction: Any = None) -> str:
+    """
+    Hash the normalized citation and propositions with the verifying model and jurisdiction.
+
+    The surrounding context is deliberately not part of the key: editing
+    other text in the paragraph does not change what the case must support.
+
+    Examples:
+        >>> a = ExtractedCitation(citation="550 U.S. 544", normalized="550 u.s. 544", propositions=["Plausibility."])
+        >>> b = a.model_copy(update={"contexts": ["Rewritten paragraph."]})
+        >>> citation_cache_key(a, model_key="gpt-5") == citation_cache_key(b, model_key="gpt-5")
+        True
+        >>> citation_cache_key(a, model_key="gpt-5") == citation_cache_key(a, model_key="grok-4")
+        False
+    """
+    props = sorted({_clean(p).lower() for p in citation.propositions})
+    blob = dumps(
+        {
+            "v": CITATION_CACHE_VERSION,
+            "model": model_key,
+            "citation": citation.normalized,
+            "propositions": props,
+            "jurisdiction": jurisdiction,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def citation_cache_dir() -> Path:
+    """Return the per-citation verification cache directory."""
+    return Path.cwd() / ".wepublic_defender" / "cache" / "citations"
+
+
+def pick_result(citation: ExtractedCitation, items: Any) -> Optional[Dict[str, Any]]:
+    """Choose the verification for `citation` from a model's list (it may verify extra cases)."""
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        return None
+    candidates = [i for i in items if isinstance(i, dict)]
+    for item in candidates:
+        if normalize_citation(str(item.get("citation", ""))) == citation.normalized:
+            return item
+    return candidates[0] if candidates else None
+
+
+__all__ = [
+    "CITATION_CACHE_VERSION",
+    "DEFAULT_PER_CITATION_CONFIG",
+    "ExtractedCitation",
+    "citation_cache_dir",
+    "citation_cache_key",
+    "extract_citations",
+    "normalize_citation",
+    "pick_result",
+    "resolve_per_citation_config",
+]
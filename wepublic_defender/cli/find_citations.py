@@ -7,7 +7,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from wepublic_defender.providers.courtlistener_client import search_opinions
-from wepublic_defender.config import load_review_settings
+from wepublic_defender.config import get_review_settings
 from wepublic_defender.logging_utils import enable_console_logging, get_logger
 
 
@@ -41,7 +41,7 @@ def _load_props(args: argparse.Namespace) -> List[str]:
 
 
 def _juris_defaults() -> Dict[str, Optional[str]]:
-    s = load_review_settings()
+    s = get_review_settings()
     j = (s.get("workflowConfig", {}).get("jurisdictionConfig", {}) or {})
     return {
         "jurisdiction": j.get("jurisdiction"),
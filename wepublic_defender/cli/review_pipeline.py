@@ -1,16 +1,61 @@
 import argparse
 import asyncio
+import contextvars
 import io
-import json
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from wepublic_defender.budget import BudgetExceededError, result_cost
+from wepublic_defender.client_pool import get_client_pool
 from wepublic_defender.core import WePublicDefender
+from wepublic_defender.document_batch import (
+    DocumentReport,
+    DocumentSpec,
+    expand_files,
+    format_document_summary,
+    load_document_manifest,
+    parse_provider_limits,
+    resolve_documents_config,
+    run_documents,
+    summarize_documents,
+)
+from wepublic_defender.incremental import (
+    INCREMENTAL_AGENTS,
+    finish_incremental,
+    plan_incremental,
+    prepare_incremental,
+    resolve_incremental_config,
+)
+from wepublic_defender.speculative import (
+    SpeculationReport,
+    refinement_reason,
+    resolve_speculative_config,
+    summarize_speculation,
+    typical_duration,
+)
+from wepublic_defender.side_effects import flush_on_signals, get_side_effect_writer, queue_json, queue_write
+from wepublic_defender.stage_graph import parse_stages, resolve_pipeline_config, run_stage_graph, stage_levels
 from wepublic_defender.logging_utils import enable_console_logging, get_logger
-from wepublic_defender.config import load_review_settings
+from wepublic_defender.rate_limiter import GLOBAL_SCOPE, set_limit_overrides
+from wepublic_defender.run_manifest import RunManifest, document_hash, latest_run, load_run, new_run, runs_dir, save_run
+from wepublic_defender.streaming import StreamProgress
+from wepublic_defender.config import get_review_settings
+
+
+# Name of the document a task is reviewing, when several are reviewed at once (--files / --manifest)
+_document_label: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("wpd_document_label", default=None)
+
+
+def _say(*values: Any, **kwargs: Any) -> None:
+    """print(), prefixed with the document name while reviewing several documents."""
+    label = _document_label.get()
+    if label:
+        values = (f"[{label}]",) + values
+    print(*values, **kwargs)
 
 
 def _read_text(path: Path) -> str:
@@ -18,7 +63,7 @@ def _read_text(path: Path) -> str:
 
 
 def _pick_alt_model(agent_key: str, primary: Optional[str]) -> Optional[str]:
-    s = load_review_settings()
+    s = get_review_settings()
     cfg = s.get("reviewAgentConfig", {}).get(agent_key, {})
     models = cfg.get("models") or []
     for m in models:
@@ -32,7 +77,7 @@ async def _heartbeat(label: str, interval: int) -> None:
     while True:
         await asyncio.sleep(interval)
         t += interval
-        print(f"[progress] {label} running... t={t}s", flush=True)
+        _say(f"[progress] {label} running... t={t}s", flush=True)
 
 
 def _counts_from_self_review(sr: Dict[str, Any]) -> Tuple[int, int, int]:
@@ -70,19 +115,92 @@ async def _run_agent(
     effort: Optional[str],
     service_tier: Optional[str],
     heartbeat_sec: int,
+    progress: Optional[StreamProgress] = None,
+    report: Optional[DocumentReport] = None,
 ) -> Dict[str, Any]:
     hb = asyncio.create_task(_heartbeat(f"{agent}/{model or 'auto'}", heartbeat_sec))
     try:
-        return await wpd.call_agent(
+        res = await wpd.call_agent(
             agent,
             text,
             web_search=web_search,
             override_model=model,
             override_effort=effort,
             override_service_tier=service_tier,
+            stream=progress is not None,
+            on_delta=progress,
         )
     finally:
         hb.cancel()
+    if report is not None:
+        # Per-document spend when several documents share one tracker
+        report.calls += 1
+        report.cost += result_cost(res, wpd.token_tracker)
+    return res
+
+
+def _drafter_prompt(results: Dict[str, Dict[str, Any]]) -> str:
+    """Drafter instructions with a brief of the review findings (self review and opposing counsel; final review if no self review)."""
+    structured = {k: r.get("structured") for k, r in results.items() if isinstance((r or {}).get("structured"), dict)}
+    sr = structured.get("self_review") or structured.get("final_review")
+    oc = structured.get("opposing_counsel")
+    summary = []
+    if sr:
+        crit_sr, maj_sr, _ = _counts_from_self_review(sr)
+        label = "Self Review" if structured.get("self_review") else "Final Review"
+        summary.append(f"{label}: Critical={crit_sr}, Major={maj_sr}")
+        if sr.get("critical_issues"):
+            summary.append("Critical: " + "; ".join(sr.get("critical_issues", [])[:5]))
+        if sr.get("major_issues"):
+            summary.append("Major: " + "; ".join(sr.get("major_issues", [])[:5]))
+    if oc:
+        wk = oc.get("weaknesses_found", [])
+        crit_w = [w.get("issue") for w in wk if (w.get("severity") or '').lower() == 'critical']
+        maj_w = [w.get("issue") for w in wk if (w.get("severity") or '').lower() == 'major']
+        if crit_w:
+            summary.append("Opposing (critical): " + "; ".join(crit_w[:5]))
+        if maj_w:
+            summary.append("Opposing (major): " + "; ".join(maj_w[:5]))
+    brief = "\n".join(summary)
+    return (
+        "Revise the following markdown draft to address the issues found. Prioritize fixing CRITICAL then MAJOR items.\n"
+        "Preserve headings, citations, and add key quotes + pin cites from verified authorities where relevant.\n"
+        f"Issues summary:\n{brief}\n\n"
+        "Return ONLY the revised markdown in the output."
+    )
+
+
+def _speculation_savings(
+    wpd: WePublicDefender,
+    speculation: SpeculationReport,
+    agents: Dict[str, str],
+    stage_started: Dict[str, float],
+    drafted_at: float,
+    stopped_at: float,
+    text: str,
+    models: Dict[str, Optional[str]],
+    service_tier: Optional[str],
+) -> Tuple[float, float]:
+    """
+    (estimated cost of the cancelled stages, seconds the draft started before every review would have finished).
+
+    `drafted_at` is when the draft that landed started. A cancelled stage
+    would have run for its agent's typical duration; without history it
+    counts as ending when it was cancelled. Merged stages finished before
+    the draft started, so they save no time.
+    """
+    cost = 0.0
+    ends: List[float] = []
+    for name in speculation.cancelled:
+        try:
+            estimates = wpd.estimate_agent_call(agents[name], text, override_model=models.get(name), override_service_tier=service_tier)
+            cost += sum(e.estimated_cost for e in estimates)
+        except Exception:
+            pass
+        typical = typical_duration(agents[name], wpd.latency_history)
+        started = stage_started.get(name, stopped_at)
+        ends.append(max(stopped_at, started + typical) if typical is not None else stopped_at)
+    return round(cost, 6), round(max(0.0, max(ends, default=drafted_at) - drafted_at), 2)
 
 
 def _save_single_agent_output(
@@ -100,11 +218,9 @@ def _save_single_agent_output(
     doc_stem = doc_path.stem
     base_name = f"{doc_stem}_{timestamp}_iter{iteration}"
 
-    json_path = reviews_dir / f"{base_name}_{agent_name}.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False, default=str)
+    json_path = queue_json(reviews_dir / f"{base_name}_{agent_name}.json", result)
 
-    print(f"[saved] {agent_name} output to {json_path.relative_to(case_root)}", flush=True)
+    _say(f"[saved] {agent_name} output to {json_path.relative_to(case_root)}", flush=True)
     return json_path
 
 
@@ -229,55 +345,186 @@ def _save_review_outputs(
 
     # Save markdown summary
     md_path = reviews_dir / f"{base_name}_SUMMARY.md"
-    md_path.write_text("\n".join(md_lines), encoding="utf-8")
+    queue_write(md_path, "\n".join(md_lines))
 
-    print(f"[saved] Review summary to {md_path.relative_to(case_root)}", flush=True)
+    _say(f"[saved] Review summary to {md_path.relative_to(case_root)}", flush=True)
 
 
-async def main() -> int:
+def _evaluate_iteration(
+    path: Path,
+    iteration: int,
+    self_res: Dict[str, Any],
+    cite_res: Dict[str, Any],
+    opp_res: Dict[str, Any],
+    final_res: Dict[str, Any],
+    max_major: int,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[Dict[str, Any]], bool]:
+    """Count issues, print and log the iteration summary, save it, and return (sr, fr, oc, ready)."""
     logger = get_logger()
-
-    # UTF-8 stdout/stderr to avoid Windows cp1252
+    i = iteration
+    # Extract structured
+    sr = (self_res.get("structured") or {}) if isinstance(self_res.get("structured"), dict) else None
+    fr = (final_res.get("structured") or {}) if isinstance(final_res.get("structured"), dict) else None
+    oc = (opp_res.get("structured") or {}) if isinstance(opp_res.get("structured"), dict) else None
+
+    # Evaluate
+    crit_sr, maj_sr, _ = _counts_from_self_review(sr or {})
+    crit_fr, maj_fr, _ = _counts_from_self_review(fr or {})
+    has_crit_opp = _has_critical_opposition(oc or {})
+
+    _say(
+        f"[summary] iter={i} | self: crit={crit_sr} maj={maj_sr} | final: crit={crit_fr} maj={maj_fr} | opp_critical={has_crit_opp}",
+        flush=True,
+    )
+
+    # Log iteration results
     try:
-        if hasattr(sys.stdout, "reconfigure"):
-            sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-            sys.stderr.reconfigure(encoding="utf-8", errors="replace")
-        else:
-            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")  # type: ignore
-            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")  # type: ignore
+        logger.info(
+            "Pipeline iteration results | iter=%s | self_crit=%s | self_maj=%s | final_crit=%s | final_maj=%s | opp_critical=%s",
+            i,
+            crit_sr,
+            maj_sr,
+            crit_fr,
+            maj_fr,
+            has_crit_opp,
+        )
     except Exception:
         pass
 
-    ap = argparse.ArgumentParser(prog="wpd-review-pipeline", description="Run multi-step review pipeline with recursion")
-    ap.add_argument("--file", required=True, help="Path to input markdown/text file")
-    ap.add_argument("--max-iters", type=int, default=2, help="Max refinement iterations (default 2)")
-    ap.add_argument("--max-major", type=int, default=2, help="Allowable major issues threshold (default 2)")
-    ap.add_argument("--model", help="Override model for all agents")
-    ap.add_argument("--effort", choices=["minimal", "low", "medium", "high"], help="Override reasoning effort if supported")
-    ap.add_argument("--service-tier", choices=["auto", "flex", "standard", "priority"], help="Override service tier")
-    ap.add_argument("--parallel", action="store_true", help="Run self_review and citation_verify in parallel")
-    ap.add_argument("--run-both", action="store_true", help="Attempt to run alternate provider second and aggregate")
-    ap.add_argument("--verbose", action="store_true")
-    ap.add_argument("--debug", action="store_true")
-    ap.add_argument("--heartbeat", type=int, default=int(os.getenv("WPD_HEARTBEAT_SEC", 15)), help="Heartbeat seconds (default 15)")
-    ap.add_argument("--plan-only", action="store_true", help="Print the planned sequence of commands and exit (Claude can run them)")
-    args = ap.parse_args()
+    # Save review outputs to disk
+    _save_review_outputs(
+        doc_path=path,
+        iteration=i,
+        self_res=self_res,
+        cite_res=cite_res,
+        opp_res=opp_res,
+        final_res=final_res,
+        sr=sr,
+        fr=fr,
+        oc=oc,
+        crit_sr=crit_sr,
+        maj_sr=maj_sr,
+        crit_fr=crit_fr,
+        maj_fr=maj_fr,
+        has_crit_opp=has_crit_opp,
+    )
+
+    ready = _ready_by_threshold(sr, fr, max_major) and not has_crit_opp
+    return sr, fr, oc, ready
+
+
+def _submit_batch(
+    args: argparse.Namespace,
+    wpd: WePublicDefender,
+    path: Path,
+    text: str,
+    planned: List[Tuple[str, Optional[str], bool]],
+) -> int:
+    """Submit the four review agents of one iteration as a single OpenAI Batch job."""
+    calls = [
+        {
+            "agent_type": agent,
+            "document": text,
+            "override_model": args.model or model,
+            "web_search": ws,
+            "override_effort": args.effort,
+        }
+        for agent, model, ws in planned
+    ]
+    try:
+        job = wpd.submit_agent_batch(
+            calls,
+            label=f"pipeline:{path.name}",
+            extra={"cli": "wpd-review-pipeline", "file": str(path), "max_major": args.max_major},
+        )
+    except Exception as e:
+        _say(f"[error] Batch submission failed: {e}", flush=True)
+        return 1
+    for skip in job.skipped:
+        _say(f"[skip] {skip['agent']}/{skip['model']}: {skip['reason']} (run it without --batch)", flush=True)
+    _say(f"[batch] submitted {len(job.requests)} request(s) | id={job.id} | status={job.status}", flush=True)
+    _say(f"[next] wpd-review-pipeline --batch collect --batch-id {job.id}", flush=True)
+    return 0
 
-    if args.verbose or args.debug:
-        enable_console_logging()
-    if args.debug:
-        os.environ["WPD_DEBUG"] = "1"
 
-    path = Path(args.file)
-    if not path.exists():
-        print(f"[error] file not found: {path}")
+async def _collect_batch(args: argparse.Namespace) -> int:
+    """Collect a batched review iteration: save each agent's output and the iteration summary."""
+    if not args.batch_id:
+        _say("[error] --batch collect requires --batch-id", flush=True)
         return 2
-
-    text = _read_text(path)
     wpd = WePublicDefender()
+    try:
+        collected = await wpd.collect_agent_batch(args.batch_id, wait=args.wait)
+    except FileNotFoundError as e:
+        _say(f"[error] {e}", flush=True)
+        return 2
+    counts = collected.get("request_counts") or {}
+    _say(
+        f"[batch] id={collected['batch_id']} | status={collected['status']} | "
+        f"completed={counts.get('completed', 0)}/{counts.get('total', 0)} failed={counts.get('failed', 0)}",
+        flush=True,
+    )
+    if collected["status"] != "completed":
+        if collected["status"] in ("failed", "expired", "cancelled"):
+            return 1
+        _say("[info] Batch not finished yet; collect again later (or add --wait)", flush=True)
+        return 0
+
+    extra = collected.get("extra", {})
+    path = Path(args.file or extra.get("file", "document.md"))
+    results = collected["results"]
+    agent_results: Dict[str, Dict[str, Any]] = {}
+    for agent in ("self_review", "citation_verify", "opposing_counsel", "final_review"):
+        res = results.get(agent)
+        if res is None:
+            res = {"error": "not in batch (skipped); run this agent without --batch"}
+        _save_single_agent_output(path, 1, agent, res)
+        agent_results[agent] = res
+
+    _, _, _, ready = _evaluate_iteration(
+        path,
+        1,
+        agent_results["self_review"],
+        agent_results["citation_verify"],
+        agent_results["opposing_counsel"],
+        agent_results["final_review"],
+        int(extra.get("max_major", args.max_major)),
+    )
+    if ready:
+        _say("[result] Document meets thresholds. Pipeline complete.", flush=True)
+    else:
+        _say(
+            f"[next] Revise the draft (wpd-run-agent --agent drafter --file {path} --mode external-llm), "
+            "then submit another batch for the revision",
+            flush=True,
+        )
+    _say("=== Usage Summary ===", flush=True)
+    _say(wpd.get_cost_report(), flush=True)
+    return 0
+
+
+async def _finish_stragglers(wpd: WePublicDefender) -> None:
+    """Let detached calls cut by a completion policy finish, save their .late.json and settle their budget."""
+    for late in await wpd.wait_for_stragglers():
+        status = "failed" if late["result"].get("error") else "finished"
+        _say(f"[late] {late['agent']}/{late['model']} {status} | saved_to={late.get('saved_to', '-')}", flush=True)
+
+
+async def _review_document(
+    args: argparse.Namespace,
+    wpd: WePublicDefender,
+    path: Path,
+    text: str,
+    manifest: Optional[RunManifest],
+    progress: Optional[StreamProgress],
+    report: DocumentReport,
+) -> int:
+    """Review one document with a (possibly shared) WePublicDefender; fills `report` and returns an exit code."""
+    logger = get_logger()
+    started = time.perf_counter()
 
     # Load per-agent defaults
-    s = load_review_settings()
+    s = get_review_settings()
     rac = s.get("reviewAgentConfig", {})
     def _agent_defaults(key: str) -> Tuple[Optional[str], bool]:
         cfg = rac.get(key, {})
@@ -285,26 +532,47 @@ async def main() -> int:
         ws = bool(cfg.get("web_search", False))
         return (models[0] if models else None, ws)
 
-    model_self, ws_self = _agent_defaults("self_review_agent")
-    model_cite, ws_cite = _agent_defaults("citation_verifier_agent")
-    model_opp, ws_opp = _agent_defaults("opposing_counsel_agent")
-    model_final, ws_final = _agent_defaults("final_review_agent")
+    # Review stages of one iteration and their dependencies (workflowConfig.pipeline)
+    pipeline_cfg = resolve_pipeline_config(s)
+    try:
+        stages = parse_stages(pipeline_cfg.get("stages", {}))
+    except ValueError as e:
+        _say(f"[error] workflowConfig.pipeline: {e}")
+        return 2
+    max_parallel = args.max_parallel or int(pipeline_cfg.get("max_parallel") or 1)
+    incremental_cfg = resolve_incremental_config(s)
+    incremental_on = bool(incremental_cfg.get("enabled")) and not args.full_review
+    try:
+        speculative_cfg = resolve_speculative_config(s)
+    except ValueError as e:
+        _say(f"[error] {e}")
+        return 2
+    drafter_model = (rac.get("drafter_agent", {}).get("models") or [None])[0]
+    stage_defaults = {
+        st.agent: _agent_defaults("citation_verifier_agent" if st.agent == "citation_verify" else f"{st.agent}_agent")
+        for st in stages
+    }
 
     # Apply global overrides
     gm = args.model
     effort = args.effort
     tier = args.service_tier
 
-    print(f"[plan] pipeline start | file={path.name} | iters={args.max_iters} | max_major={args.max_major} | parallel={args.parallel}", flush=True)
+    _say(
+        f"[plan] pipeline start | file={path.name} | iters={args.max_iters} | max_major={args.max_major} | "
+        f"stages={' -> '.join('+'.join(wave) for wave in stage_levels(stages))} | max_parallel={max_parallel}",
+        flush=True,
+    )
 
     # Log pipeline start
     try:
         logger.info(
-            "Review pipeline started | file=%s | max_iters=%s | max_major=%s | parallel=%s | model=%s | effort=%s | tier=%s",
+            "Review pipeline started | file=%s | max_iters=%s | max_major=%s | stages=%s | max_parallel=%s | model=%s | effort=%s | tier=%s",
             path.name,
             args.max_iters,
             args.max_major,
-            args.parallel,
+            [st.name for st in stages],
+            max_parallel,
             gm or "per-agent",
             effort or "per-agent",
             tier or "auto",
@@ -312,6 +580,11 @@ async def main() -> int:
     except Exception:
         pass
 
+    if args.batch == "submit":
+        # One request per review agent; batch results are keyed by agent
+        planned_calls = [(agent, model, ws) for agent, (model, ws) in stage_defaults.items()]
+        return _submit_batch(args, wpd, path, text, planned_calls)
+
     if args.plan_only:
         # Emit a command plan Claude can run step-by-step
         cmds: List[str] = []
@@ -320,180 +593,596 @@ async def main() -> int:
             hb = f" --verbose --heartbeat {args.heartbeat}"
             # Model override string
             mo = f" --model {args.model}" if args.model else ""
-            # Self + Citations
-            if args.parallel:
-                cmds.append(f"{pre} --agent self_review --file {path} {mo}{hb}")
-                cmds.append(f"{pre} --agent citation_verify --file {path} --web-search {mo}{hb}")
-                cmds.append("# Wait for both to finish, then:")
-            else:
-                cmds.append(f"{pre} --agent self_review --file {path} {mo}{hb}")
-                cmds.append(f"{pre} --agent citation_verify --file {path} --web-search {mo}{hb}")
-            # Opposing counsel and final
-            cmds.append(f"{pre} --agent opposing_counsel --file {path} --web-search {mo}{hb}")
-            cmds.append(f"{pre} --agent final_review --file {path} {mo}{hb}")
+            # Review stages, one wave of independent stages at a time
+            by_name = {st.name: st for st in stages}
+            for wave in stage_levels(stages):
+                if len(wave) > 1:
+                    cmds.append(f"# These {len(wave)} can run in parallel:")
+                for name in wave:
+                    agent = by_name[name].agent
+                    ws = " --web-search" if stage_defaults[agent][1] else ""
+                    cmds.append(f"{pre} --agent {agent} --file {path}{ws} {mo}{hb}")
+                if len(wave) > 1:
+                    cmds.append("# Wait for all to finish, then:")
             cmds.append("# If thresholds not met or critical issues remain, revise the draft, then repeat:")
             cmds.append(f"{pre} --agent drafter --file {path} {mo}{hb}")
-        print("[commands]")
+        _say("[commands]")
         for c in cmds:
-            print(c)
-        print("[note] Execute commands in order. After each iteration, check issue counts and decide whether to continue.")
-        print("=== Plan Only ===", flush=True)
-        print("[hint] To execute automatically, run this pipeline without --plan-only.", flush=True)
-        print("=== Usage Summary ===", flush=True)
-        print(wpd.get_cost_report(), flush=True)
+            _say(c)
+        # Pre-flight estimates for one iteration (drafter output size is unknown until it runs)
+        _say("[estimate] per iteration (input tokens from the current draft; output at default allowance)")
+        iter_cost = 0.0
+        planned = [(st.agent, stage_defaults[st.agent][0]) for st in stages]
+        for agent, agent_model in planned:
+            for est in wpd.estimate_agent_call(agent, text, override_model=gm or agent_model, override_service_tier=tier):
+                iter_cost += est.estimated_cost
+                fit = "" if est.fits else f" | DOES NOT FIT: {est.reason}"
+                _say(
+                    f"  {agent:<17} {est.model_key:<12} ~{est.input_tokens} in | "
+                    f"est ${est.estimated_cost:.4f} (max ${est.max_cost:.4f}){fit}"
+                )
+        _say(f"[estimate] ~${iter_cost:.4f} per iteration | ~${iter_cost * args.max_iters:.4f} for {args.max_iters} iteration(s)")
+        _say("[note] Execute commands in order. After each iteration, check issue counts and decide whether to continue.")
+        _say("=== Plan Only ===", flush=True)
+        _say("[hint] To execute automatically, run this pipeline without --plan-only.", flush=True)
+        _say("=== Usage Summary ===", flush=True)
+        _say(wpd.get_cost_report(), flush=True)
         return 0
 
-    current_text = text
-    for i in range(1, args.max_iters + 1):
-        print(f"[step] iteration {i}", flush=True)
-
-        # Log iteration start
-        try:
-            logger.info("Pipeline iteration started | iter=%s | max_iters=%s", i, args.max_iters)
-        except Exception:
-            pass
-
-        # Self review and citation verify
-        if args.parallel:
-            self_task = asyncio.create_task(
-                _run_agent(wpd, "self_review", current_text, model=gm or model_self, web_search=ws_self, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-            )
-            cite_task = asyncio.create_task(
-                _run_agent(wpd, "citation_verify", current_text, model=gm or model_cite, web_search=ws_cite, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-            )
-            self_res, cite_res = await asyncio.gather(self_task, cite_task)
-            # Save immediately after parallel completion
-            _save_single_agent_output(path, i, "self_review", self_res)
-            _save_single_agent_output(path, i, "citation_verify", cite_res)
-        else:
-            self_res = await _run_agent(wpd, "self_review", current_text, model=gm or model_self, web_search=ws_self, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-            _save_single_agent_output(path, i, "self_review", self_res)
-            cite_res = await _run_agent(wpd, "citation_verify", current_text, model=gm or model_cite, web_search=ws_cite, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-            _save_single_agent_output(path, i, "citation_verify", cite_res)
-
-        # Opposing counsel
-        opp_res = await _run_agent(wpd, "opposing_counsel", current_text, model=gm or model_opp, web_search=ws_opp, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-        _save_single_agent_output(path, i, "opposing_counsel", opp_res)
-
-        # Final review
-        final_res = await _run_agent(wpd, "final_review", current_text, model=gm or model_final, web_search=ws_final, effort=effort, service_tier=tier, heartbeat_sec=args.heartbeat)
-        _save_single_agent_output(path, i, "final_review", final_res)
-
-        # Extract structured
-        sr = (self_res.get("structured") or {}) if isinstance(self_res.get("structured"), dict) else None
-        fr = (final_res.get("structured") or {}) if isinstance(final_res.get("structured"), dict) else None
-        oc = (opp_res.get("structured") or {}) if isinstance(opp_res.get("structured"), dict) else None
-
-        # Evaluate
-        crit_sr, maj_sr, _ = _counts_from_self_review(sr or {})
-        crit_fr, maj_fr, _ = _counts_from_self_review(fr or {})
-        has_crit_opp = _has_critical_opposition(oc or {})
-
-        print(
-            f"[summary] iter={i} | self: crit={crit_sr} maj={maj_sr} | final: crit={crit_fr} maj={maj_fr} | opp_critical={has_crit_opp}",
-            flush=True,
+    # Checkpoint after every stage so a crashed or interrupted run can resume
+    if manifest is None:
+        manifest = new_run(
+            path,
+            text,
+            {k: getattr(args, k) for k in ("max_iters", "max_major", "model", "effort", "service_tier")},
         )
+    try:
+        current_text = manifest.current_text()
+    except (OSError, ValueError) as e:
+        _say(f"[error] cannot resume run {manifest.id}: {e}")
+        return 2
+    report.run_id = manifest.id
+    start_iter = manifest.resume_point()
+    manifest.status = "running"
+    save_run(manifest)
+    _say(f"[run] id={manifest.id} | resume with: wpd-review-pipeline --resume {manifest.id}", flush=True)
+    if start_iter > 1 or manifest.iterations:
+        _say(f"[resume] continuing at iteration {start_iter} | draft={Path(manifest.current_draft).name}", flush=True)
+
+    speculations: List[SpeculationReport] = []
+
+    # Previous iteration's draft and reviews, for re-reviewing only what the drafter changed
+    previous_text: Optional[str] = None
+    previous_results: Dict[str, Dict[str, Any]] = {}
+    if incremental_on and start_iter > 1:
+        previous_text = manifest.reviewed_text(start_iter - 1)
+        for st in stages:
+            saved = manifest.stage_result(start_iter - 1, st.name)
+            if saved is not None:
+                previous_results[st.name] = saved
 
-        # Log iteration results
-        try:
-            logger.info(
-                "Pipeline iteration results | iter=%s | self_crit=%s | self_maj=%s | final_crit=%s | final_maj=%s | opp_critical=%s",
-                i,
-                crit_sr,
-                maj_sr,
-                crit_fr,
-                maj_fr,
-                has_crit_opp,
-            )
-        except Exception:
-            pass
-
-        # Save review outputs to disk
-        _save_review_outputs(
-            doc_path=path,
-            iteration=i,
-            self_res=self_res,
-            cite_res=cite_res,
-            opp_res=opp_res,
-            final_res=final_res,
-            sr=sr,
-            fr=fr,
-            oc=oc,
-            crit_sr=crit_sr,
-            maj_sr=maj_sr,
-            crit_fr=crit_fr,
-            maj_fr=maj_fr,
-            has_crit_opp=has_crit_opp,
-        )
+    try:
+        for i in range(start_iter, args.max_iters + 1):
+            _say(f"[step] iteration {i}", flush=True)
+            checkpoint = manifest.begin_iteration(i, document_hash(current_text))
+            reused = set()
+            changes = None
+            if incremental_on and previous_text is not None and previous_results:
+                changes = plan_incremental(previous_text, current_text, incremental_cfg)
+                if changes is None:
+                    _say("[incremental] revision touched most of the draft; running a full review", flush=True)
+
+            # Log iteration start
+            try:
+                logger.info("Pipeline iteration started | iter=%s | max_iters=%s", i, args.max_iters)
+            except Exception:
+                pass
 
-        if _ready_by_threshold(sr, fr, args.max_major) and not has_crit_opp:
-            print("[result] Document meets thresholds. Pipeline complete.", flush=True)
+            # Speculative refinement: draft as soon as the finished stages rule out "ready"
+            finished: Dict[str, Dict[str, Any]] = {}
+            stage_started: Dict[str, float] = {}
+            stop = asyncio.Event()
+            speculation: Optional[SpeculationReport] = None
+            drafter_task: Optional["asyncio.Task[Dict[str, Any]]"] = None
+            drafter_brief = ""
+            drafted_at = 0.0
+
+            async def draft(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+                return await _run_agent(
+                    wpd,
+                    "drafter",
+                    f"{_drafter_prompt(results)}\n\n---\n\n{current_text}",
+                    model=gm or drafter_model,
+                    web_search=False,
+                    effort=effort,
+                    service_tier=tier,
+                    heartbeat_sec=args.heartbeat,
+                    progress=progress,
+                    report=report,
+                )
+
+            def start_draft() -> None:
+                nonlocal drafter_task, drafter_brief, drafted_at
+                drafter_brief = _drafter_prompt(finished)
+                drafted_at = time.perf_counter()
+                drafter_task = asyncio.create_task(draft(dict(finished)), name=f"wpd-speculative-drafter:{i}")
+                # A finished draft ends the iteration's reviews (a cancelled one does not)
+                drafter_task.add_done_callback(lambda t: None if t.cancelled() else stop.set())
+
+            def speculate(stage_name: str) -> None:
+                nonlocal speculation, drafter_task
+                pending = [st.name for st in stages if st.name not in finished]
+                if speculation is None:
+                    reason = refinement_reason(finished, pending, args.max_major, speculative_cfg)
+                    if not reason or not pending:
+                        return
+                    speculation = SpeculationReport(
+                        iteration=i,
+                        reason=reason,
+                        decided_after=time.perf_counter() - iter_start,
+                        policy=speculative_cfg["remaining"],
+                    )
+                    _say(
+                        f"[speculative] {reason}: drafting now; "
+                        f"{'cancelling' if speculation.policy == 'cancel' else 'merging'} {', '.join(pending)}",
+                        flush=True,
+                    )
+                    start_draft()
+                    if speculation.policy == "cancel":
+                        stop.set()
+                    return
+                if drafter_task is None or drafter_task.done() or speculation.policy != "merge":
+                    # The draft already landed: this review is saved but only the next iteration sees it
+                    return
+                if refinement_reason(finished, pending, args.max_major, speculative_cfg) is None:
+                    # A late review says the draft may be ready after all: drop the speculative draft
+                    drafter_task.cancel()
+                    drafter_task = None
+                    speculation.discarded = True
+                    _say(f"[speculative] {stage_name} passed; discarding the speculative draft", flush=True)
+                    return
+                speculation.merged.append(stage_name)
+                if _drafter_prompt(finished) != drafter_brief:
+                    # New findings before the draft landed: restart the drafter with them
+                    drafter_task.cancel()
+                    speculation.redrafts += 1
+                    _say(f"[speculative] {stage_name} added findings; restarting the drafter", flush=True)
+                    start_draft()
+
+            # Review stages: every stage whose dependencies are done runs concurrently
+            async def run_stage(stage):
+                saved = manifest.stage_result(i, stage.name)
+                if saved is not None:
+                    reused.add(stage.name)
+                    _say(f"[resume] {stage.name}: reusing {Path(checkpoint.stages[stage.name].output).name}", flush=True)
+                    return saved
+                stage_started[stage.name] = time.perf_counter()
+                agent_model, agent_ws = stage_defaults[stage.agent]
+                prior = previous_results.get(stage.name)
+                if changes is None or stage.agent not in INCREMENTAL_AGENTS or not prior or prior.get("error"):
+                    return await _run_agent(
+                        wpd,
+                        stage.agent,
+                        current_text,
+                        model=gm or agent_model,
+                        web_search=agent_ws,
+                        effort=effort,
+                        service_tier=tier,
+                        heartbeat_sec=args.heartbeat,
+                        progress=progress,
+                        report=report,
+                    )
+                document, carried = prepare_incremental(
+                    stage.agent, prior, changes, int(incremental_cfg.get("digest_chars") or 160)
+                )
+                fresh = None
+                if document is not None:
+                    fresh = await _run_agent(
+                        wpd,
+                        stage.agent,
+                        document,
+                        model=gm or agent_model,
+                        web_search=agent_ws,
+                        effort=effort,
+                        service_tier=tier,
+                        heartbeat_sec=args.heartbeat,
+                        progress=progress,
+                        report=report,
+                    )
+                res = finish_incremental(stage.agent, prior, fresh, changes, carried, document, max_major=args.max_major)
+                inc = res.get("incremental") or {}
+                _say(
+                    f"[incremental] {stage.name}: {len(changes.changed)}/{len(changes.titles)} sections changed | "
+                    f"~{inc.get('tokens_sent', 0):,} of {inc.get('tokens_full', 0):,} tokens sent | "
+                    f"carried {inc.get('carried', 0)} finding(s)" + ("" if document is not None else " | no call needed"),
+                    flush=True,
+                )
+                try:
+                    logger.info(
+                        "Incremental review | iter=%s | stage=%s | changed=%s | unchanged=%s | carried=%s | tokens_sent=%s | tokens_full=%s",
+                        i,
+                        stage.name,
+                        len(changes.changed),
+                        len(changes.unchanged),
+                        inc.get("carried", 0),
+                        inc.get("tokens_sent", 0),
+                        inc.get("tokens_full", 0),
+                    )
+                except Exception:
+                    pass
+                return res
+
+            def stage_done(stage, res, seconds):
+                if stage.name in reused:
+                    return
+                _say(f"[stage] {stage.name} done in {seconds:.1f}s", flush=True)
+                # Save as each stage finishes rather than after the slowest one
+                output = _save_single_agent_output(path, i, stage.name, res)
+                manifest.record_stage(i, stage.name, stage.agent, output)
+                save_run(manifest)
+
+            def review_done(stage, res, seconds):
+                stage_done(stage, res, seconds)
+                finished[stage.name] = res
+                if args.speculative:
+                    speculate(stage.name)
+
+            iter_start = time.perf_counter()
+            try:
+                stage_results = await run_stage_graph(
+                    stages,
+                    run_stage,
+                    max_parallel=max_parallel,
+                    on_done=review_done,
+                    stop=stop if args.speculative else None,
+                )
+            except BaseException:
+                if drafter_task is not None:
+                    drafter_task.cancel()
+                raise
+            drafter_res = None
+            if drafter_task is not None:
+                stopped_at = time.perf_counter()
+                drafter_res = await drafter_task
+                speculation.cancelled = [st.name for st in stages if st.name not in stage_results]
+                # Estimates and usage-log history read files: keep them off the event loop
+                speculation.saved_cost, speculation.saved_seconds = await asyncio.to_thread(
+                    _speculation_savings,
+                    wpd,
+                    speculation,
+                    {st.name: st.agent for st in stages},
+                    stage_started,
+                    drafted_at,
+                    stopped_at,
+                    current_text,
+                    {st.name: gm or stage_defaults[st.agent][0] for st in stages},
+                    tier,
+                )
+            if speculation is not None:
+                speculations.append(speculation)
+                _say(f"[speculative] {speculation.line()}", flush=True)
+                try:
+                    logger.info(
+                        "Speculative refinement | iter=%s | reason=%s | cancelled=%s | merged=%s | redrafts=%s | discarded=%s | saved_cost=%.4f | saved_seconds=%.1f",
+                        i,
+                        speculation.reason,
+                        speculation.cancelled,
+                        speculation.merged,
+                        speculation.redrafts,
+                        speculation.discarded,
+                        speculation.saved_cost,
+                        speculation.saved_seconds,
+                    )
+                except Exception:
+                    pass
+            _say(f"[stage] iteration {i} reviews finished in {time.perf_counter() - iter_start:.1f}s", flush=True)
+            self_res = stage_results.get("self_review", {})
+            cite_res = stage_results.get("citation_verify", {})
+            opp_res = stage_results.get("opposing_counsel", {})
+            final_res = stage_results.get("final_review", {})
+
+            sr, fr, oc, ready = _evaluate_iteration(path, i, self_res, cite_res, opp_res, final_res, args.max_major)
+            crit_sr, maj_sr, _ = _counts_from_self_review(sr or {})
+            crit_fr, maj_fr, _ = _counts_from_self_review(fr or {})
+            checkpoint.ready = ready
+            save_run(manifest)
+            report.iterations, report.ready = i, ready
+
+            if ready:
+                manifest.status = "complete"
+                _say("[result] Document meets thresholds. Pipeline complete.", flush=True)
+                try:
+                    logger.info("Pipeline completed successfully | iter=%s | thresholds_met=True", i)
+                except Exception:
+                    pass
+                break
+
+            # Otherwise try to refine draft with drafter
+            _say("[action] Refining draft based on findings...", flush=True)
+
+            # Log refinement decision
             try:
-                logger.info("Pipeline completed successfully | iter=%s | thresholds_met=True", i)
+                logger.info("Pipeline refining draft | iter=%s | crit_issues=%s | maj_issues=%s", i, crit_fr or crit_sr, maj_fr or maj_sr)
             except Exception:
                 pass
-            break
 
-        # Otherwise try to refine draft with drafter
-        print("[action] Refining draft based on findings...", flush=True)
+            if drafter_res is None:
+                drafter_res = await draft({"self_review": self_res, "opposing_counsel": opp_res, "final_review": final_res})
+            new_text = drafter_res.get("text") or current_text
+            # Save iteration output next to original
+            out_path = path.with_name(f"{path.stem}.rev{i}{path.suffix}")
+            out_path.write_text(new_text, encoding="utf-8")
+            _say(f"[write] {out_path.name}", flush=True)
+            manifest.record_revision(i, out_path, new_text)
+            save_run(manifest)
+
+            # Log draft revision write
+            try:
+                logger.info("Pipeline draft revised | iter=%s | output=%s", i, out_path.name)
+            except Exception:
+                pass
 
-        # Log refinement decision
+            previous_text, previous_results = current_text, stage_results
+            current_text = new_text
+    except BudgetExceededError as e:
+        manifest.status = "stopped"
+        _say(f"[budget] stopping before the next call: {e}", flush=True)
+        _say(f"[run] finished stages are checkpointed; continue with: wpd-review-pipeline --resume {manifest.id}", flush=True)
         try:
-            logger.info("Pipeline refining draft | iter=%s | crit_issues=%s | maj_issues=%s", i, crit_fr or crit_sr, maj_fr or maj_sr)
+            logger.info("Pipeline stopped by budget | file=%s | reason=%s", path.name, e)
         except Exception:
             pass
+    if manifest.status == "running":
+        manifest.status = "finished"
+    save_run(manifest)
+    if speculations:
+        _say("=== Speculation ===", flush=True)
+        _say(summarize_speculation(speculations), flush=True)
+    report.status = manifest.status
+    report.seconds = time.perf_counter() - started
+    return 0
+
 
-        # Build a brief summary for drafter
-        summary = []
-        if sr:
-            summary.append(f"Self Review: Critical={crit_sr}, Major={maj_sr}")
-            if sr.get("critical_issues"):
-                summary.append("Critical: " + "; ".join(sr.get("critical_issues", [])[:5]))
-            if sr.get("major_issues"):
-                summary.append("Major: " + "; ".join(sr.get("major_issues", [])[:5]))
-        if oc:
-            wk = oc.get("weaknesses_found", [])
-            crit_w = [w.get("issue") for w in wk if (w.get("severity") or '').lower() == 'critical']
-            maj_w = [w.get("issue") for w in wk if (w.get("severity") or '').lower() == 'major']
-            if crit_w:
-                summary.append("Opposing (critical): " + "; ".join(crit_w[:5]))
-            if maj_w:
-                summary.append("Opposing (major): " + "; ".join(maj_w[:5]))
-        brief = "\n".join(summary)
-        drafter_prompt = (
-            "Revise the following markdown draft to address the issues found. Prioritize fixing CRITICAL then MAJOR items.\n"
-            "Preserve headings, citations, and add key quotes + pin cites from verified authorities where relevant.\n"
-            f"Issues summary:\n{brief}\n\n"
-            "Return ONLY the revised markdown in the output."
+def _new_defender(args: argparse.Namespace) -> Optional[WePublicDefender]:
+    """WePublicDefender with the run's cache and budget flags applied (None after printing an error)."""
+    if args.budget is not None and args.budget <= 0:
+        _say("[error] --budget must be positive")
+        return None
+    wpd = WePublicDefender()
+    if args.no_cache:
+        wpd.cache_mode = "off"
+    elif args.refresh:
+        wpd.cache_mode = "refresh"
+    if args.budget is not None:
+        wpd.set_budget(args.budget)
+    return wpd
+
+
+
+async def _review_documents(args: argparse.Namespace) -> int:
+    """Review every document of --files / --manifest with one shared WePublicDefender."""
+    logger = get_logger()
+    if args.file or args.resume or args.plan_only or args.batch:
+        _say("[error] --files/--manifest cannot be combined with --file, --resume, --plan-only or --batch")
+        return 2
+    try:
+        specs = load_document_manifest(Path(args.manifest)) if args.manifest else expand_files(args.files)
+        cli_limits = parse_provider_limits(args.provider_limit)
+    except (OSError, ValueError) as e:
+        _say(f"[error] {e}")
+        return 2
+    if not specs:
+        _say(f"[error] no documents match {args.files or args.manifest}")
+        return 2
+
+    docs_cfg = resolve_documents_config(get_review_settings())
+    max_docs = args.max_docs or int(docs_cfg.get("max_documents") or 1)
+    max_calls = args.max_concurrent or docs_cfg.get("max_concurrent_calls")
+    provider_limits = {**(docs_cfg.get("provider_limits") or {}), **cli_limits}
+    overrides = {f"provider:{name}": {"max_concurrent": int(n)} for name, n in provider_limits.items()}
+    if max_calls:
+        overrides[GLOBAL_SCOPE] = {"max_concurrent": int(max_calls)}
+
+    # One defender for all documents: settings, token tracker, budget, cache and client pool are shared
+    wpd = _new_defender(args)
+    if wpd is None:
+        return 2
+    progress = StreamProgress() if args.stream else None
+    _say(
+        f"[documents] {len(specs)} document(s) | max_docs={max_docs} | max_concurrent_calls={max_calls or 'unlimited'} | "
+        f"provider_limits={provider_limits or 'per llm_providers.json'}",
+        flush=True,
+    )
+    try:
+        logger.info(
+            "Multi-document review started | documents=%s | max_docs=%s | max_calls=%s | provider_limits=%s",
+            len(specs),
+            max_docs,
+            max_calls,
+            provider_limits,
         )
-        drafter_input = f"{drafter_prompt}\n\n---\n\n{current_text}"
-        drafter_res = await _run_agent(
-            wpd,
-            "drafter",
-            drafter_input,
-            model=gm or (load_review_settings().get("reviewAgentConfig", {}).get("drafter_agent", {}).get("models", [None])[0]),
-            web_search=False,
-            effort=effort,
-            service_tier=tier,
-            heartbeat_sec=args.heartbeat,
+    except Exception:
+        pass
+
+    async def review(spec: DocumentSpec) -> DocumentReport:
+        path = Path(spec.file)
+        _document_label.set(path.name)
+        report = DocumentReport(file=str(path), status="error")
+        doc_args = argparse.Namespace(**vars(args))
+        for key, value in spec.settings.items():
+            setattr(doc_args, key, value)
+        doc_args.file = str(path)
+        doc_args.max_iters = doc_args.max_iters if doc_args.max_iters is not None else 2
+        doc_args.max_major = doc_args.max_major if doc_args.max_major is not None else 2
+        if not path.exists():
+            report.error = "file not found"
+            return report
+        code = await _review_document(doc_args, wpd, path, _read_text(path), None, progress, report)
+        if code != 0 and report.status == "error":
+            report.error = report.error or f"exit code {code}"
+        return report
+
+    def document_done(report: DocumentReport) -> None:
+        _say(
+            f"[document] {report.status} | iters={report.iterations} | "
+            f"calls={report.calls} | ${report.cost:.4f} | {report.seconds:.1f}s"
+            + (f" | run={report.run_id}" if report.run_id else "")
+            + (f" | {report.error}" if report.error else ""),
+            flush=True,
         )
-        new_text = drafter_res.get("text") or current_text
-        # Save iteration output next to original
-        out_path = path.with_name(f"{path.stem}.rev{i}{path.suffix}")
-        out_path.write_text(new_text, encoding="utf-8")
-        print(f"[write] {out_path.name}", flush=True)
 
-        # Log draft revision write
+    set_limit_overrides(overrides)
+    started = time.perf_counter()
+    try:
+        reports = await run_documents(specs, review, max_documents=max_docs, on_done=document_done)
+    finally:
+        set_limit_overrides(None)
+    await _finish_stragglers(wpd)
+    summary = summarize_documents(reports, time.perf_counter() - started)
+
+    reviews_dir = Path.cwd() / ".wepublic_defender" / "reviews"
+    reviews_dir.mkdir(parents=True, exist_ok=True)
+    summary_path = queue_json(
+        reviews_dir / f"documents_{datetime.now().strftime('%Y%m%d_%H%M%S')}_SUMMARY.json",
+        {"summary": summary, "documents": [r.model_dump() for r in reports]},
+    )
+    _say("=== Documents ===", flush=True)
+    _say(format_document_summary(reports, summary), flush=True)
+    _say(f"[saved] Document summary to {summary_path.relative_to(Path.cwd())}", flush=True)
+    _say("=== Usage Summary ===", flush=True)
+    _say(wpd.get_cost_report(), flush=True)
+    if wpd.budget is not None:
+        _say("=== Budget ===", flush=True)
+        _say(wpd.budget.report(), flush=True)
+    try:
+        logger.info(
+            "Multi-document review finished | documents=%s | ready=%s | errors=%s | cost=%.4f | wall=%.2fs",
+            summary["documents"],
+            summary["ready"],
+            summary["errors"],
+            summary["cost"],
+            summary["wall_seconds"],
+        )
+    except Exception:
+        pass
+    return 1 if summary["errors"] else 0
+
+
+async def main() -> int:
+    logger = get_logger()
+
+    # UTF-8 stdout/stderr to avoid Windows cp1252
+    try:
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+            sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+        else:
+            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")  # type: ignore
+            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")  # type: ignore
+    except Exception:
+        pass
+
+    ap = argparse.ArgumentParser(prog="wpd-review-pipeline", description="Run multi-step review pipeline with recursion")
+    ap.add_argument("--file", help="Path to input markdown/text file (required unless --batch collect, --files or --manifest)")
+    docs_group = ap.add_mutually_exclusive_group()
+    docs_group.add_argument("--files", metavar="GLOB", help="Review every matching document in one process (e.g. '07_DRAFTS_AND_WORK_PRODUCT/*.md'; drafter revisions *.revN.md are skipped)")
+    docs_group.add_argument("--manifest", metavar="JSON", help="Review the documents listed in a JSON manifest, with optional per-document settings")
+    ap.add_argument("--max-docs", type=int, help="With --files/--manifest: documents reviewed at once (default workflowConfig.pipeline.documents.max_documents)")
+    ap.add_argument("--max-concurrent", type=int, help="With --files/--manifest: LLM calls in flight across all documents (default workflowConfig.pipeline.documents.max_concurrent_calls)")
+    ap.add_argument("--provider-limit", action="append", metavar="PROVIDER=N", help="With --files/--manifest: max concurrent calls to one provider (repeatable)")
+    ap.add_argument("--max-iters", type=int, help="Max refinement iterations (default 2; a resumed run keeps its own)")
+    ap.add_argument("--max-major", type=int, help="Allowable major issues threshold (default 2; a resumed run keeps its own)")
+    ap.add_argument("--model", help="Override model for all agents")
+    ap.add_argument("--effort", choices=["minimal", "low", "medium", "high"], help="Override reasoning effort if supported")
+    ap.add_argument("--service-tier", choices=["auto", "flex", "standard", "priority"], help="Override service tier")
+    ap.add_argument("--parallel", action="store_true", help="Deprecated: review stages now run concurrently per workflowConfig.pipeline (see --max-parallel)")
+    ap.add_argument("--max-parallel", type=int, help="Max review stages running at once (default workflowConfig.pipeline.max_parallel; 1 runs them in order)")
+    ap.add_argument("--run-both", action="store_true", help="Attempt to run alternate provider second and aggregate")
+    ap.add_argument("--stream", action="store_true", help="Stream agent responses with live progress; partial output goes to .wepublic_defender/reviews/")
+    cache_group = ap.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache (no lookup, no store)")
+    cache_group.add_argument("--refresh", action="store_true", help="Ignore cached responses but store fresh results")
+    ap.add_argument("--verbose", action="store_true")
+    ap.add_argument("--debug", action="store_true")
+    ap.add_argument("--heartbeat", type=int, default=int(os.getenv("WPD_HEARTBEAT_SEC", 15)), help="Heartbeat seconds (default 15)")
+    ap.add_argument("--plan-only", action="store_true", help="Print the planned sequence of commands and exit (Claude can run them)")
+    ap.add_argument("--batch", choices=["submit", "collect"], help="OpenAI Batch API mode (about half price, results within 24h): submit one review iteration, or collect it by --batch-id")
+    ap.add_argument("--batch-id", help="Batch id printed by --batch submit (used with --batch collect)")
+    ap.add_argument("--wait", action="store_true", help="With --batch collect: poll with backoff until the batch finishes")
+    ap.add_argument("--budget", type=float, help="Dollar cap for the whole run (e.g. 2.50): tier, effort and model are chosen per call to fit, and the pipeline stops before a call that cannot")
+    ap.add_argument("--speculative", action="store_true", help="Start the drafter as soon as finished reviews rule out meeting the thresholds; remaining reviewers are cancelled or merged (workflowConfig.pipeline.speculative)")
+    ap.add_argument("--full-review", action="store_true", help="Send every reviewer the whole draft each iteration (default: after a revision, section reviewers see only the changed sections)")
+    ap.add_argument("--resume", metavar="RUN_ID", help="Resume a checkpointed run (id printed at start, or 'latest' with --file): finished stages are reloaded, not re-run")
+    args = ap.parse_args()
+
+    if args.verbose or args.debug:
+        enable_console_logging()
+    if args.debug:
+        os.environ["WPD_DEBUG"] = "1"
+
+    if args.batch == "collect":
+        return await _collect_batch(args)
+    if args.files or args.manifest:
+        return await _review_documents(args)
+
+    # Resuming: settings not given on the command line come from the run manifest
+    manifest: Optional[RunManifest] = None
+    if args.resume:
         try:
-            logger.info("Pipeline draft revised | iter=%s | output=%s", i, out_path.name)
-        except Exception:
-            pass
+            if args.resume == "latest":
+                if not args.file:
+                    _say("[error] --resume latest needs --file")
+                    return 2
+                manifest = latest_run(_read_text(Path(args.file)))
+                if manifest is None:
+                    raise FileNotFoundError(f"No unfinished run for {args.file} in {runs_dir()}")
+            else:
+                manifest = load_run(args.resume)
+        except (FileNotFoundError, ValueError) as e:
+            _say(f"[error] {e}")
+            return 2
+        if manifest.status == "complete":
+            _say(f"[info] Run {manifest.id} already met thresholds; nothing to resume")
+            return 0
+        args.file = args.file or manifest.file
+        for key in ("max_iters", "max_major", "model", "effort", "service_tier"):
+            if getattr(args, key) is None:
+                setattr(args, key, manifest.settings.get(key))
+    if args.max_iters is None:
+        args.max_iters = 2
+    if args.max_major is None:
+        args.max_major = 2
+
+    if not args.file:
+        _say("[error] --file is required")
+        return 2
 
-        current_text = new_text
+    path = Path(args.file)
+    if not path.exists():
+        _say(f"[error] file not found: {path}")
+        return 2
+
+    text = _read_text(path)
+    if manifest is not None and document_hash(text) != manifest.document_hash:
+        _say(f"[error] {path} changed since run {manifest.id} started; start a new run")
+        return 2
+    wpd = _new_defender(args)
+    if wpd is None:
+        return 2
+    progress = StreamProgress() if args.stream else None
+    report = DocumentReport(file=str(path), status="running")
+    code = await _review_document(args, wpd, path, text, manifest, progress, report)
+    await _finish_stragglers(wpd)
+    if report.run_id is None:
+        # Plan-only, batch submit, or an error before the run started
+        return code
 
     # Final cost summary
-    print("=== Usage Summary ===", flush=True)
-    print(wpd.get_cost_report(), flush=True)
+    _say("=== Usage Summary ===", flush=True)
+    _say(wpd.get_cost_report(), flush=True)
+    if wpd.budget is not None:
+        _say("=== Budget ===", flush=True)
+        _say(wpd.budget.report(), flush=True)
 
     # Log pipeline completion
     try:
@@ -501,8 +1190,18 @@ async def main() -> int:
     except Exception:
         pass
 
-    return 0
+    return code
+
+
+async def _main_closing() -> int:
+    """Run the pipeline, then flush queued writes and close async provider clients before the loop shuts down."""
+    try:
+        return await main()
+    finally:
+        await get_side_effect_writer().flush()
+        await get_client_pool().aclose_async_clients()
 
 
 if __name__ == "__main__":
-    raise SystemExit(asyncio.run(main()))
+    flush_on_signals()
+    raise SystemExit(asyncio.run(_main_closing()))
@@ -5,9 +5,12 @@ import io
 import os
 from pathlib import Path
 
+from wepublic_defender.client_pool import get_client_pool
 from wepublic_defender.core import WePublicDefender
-from wepublic_defender.config import load_review_settings, update_agent_preference
+from wepublic_defender.side_effects import flush_on_signals, get_side_effect_writer, queue_json, queue_write
+from wepublic_defender.config import get_review_settings, update_agent_preference
 from wepublic_defender.logging_utils import enable_console_logging, get_logger
+from wepublic_defender.streaming import StreamProgress
 from wepublic_defender.usage_logger import log_agent_call
 
 
@@ -23,7 +26,8 @@ async def _amain(args: argparse.Namespace) -> int:
     logger = get_logger()
 
     try:
-        content = _read_text(args.file, args.text)
+        # Collecting a batch needs only its id; the input was stored at submission
+        content = "" if args.batch == "collect" else _read_text(args.file, args.text)
     except FileNotFoundError:
         print(f"[error] input file not found: {args.file}")
         return 2
@@ -35,6 +39,17 @@ async def _amain(args: argparse.Namespace) -> int:
         enable_console_logging()
 
     wpd = WePublicDefender()
+    if args.no_cache:
+        wpd.cache_mode = "off"
+    elif args.refresh:
+        wpd.cache_mode = "refresh"
+    if args.budget is not None:
+        if args.budget <= 0:
+            print("[error] --budget must be positive")
+            return 2
+        wpd.set_budget(args.budget)
+    # Live progress for streamed responses (partial text also goes to .wepublic_defender/reviews/)
+    progress = StreamProgress() if args.stream else None
 
     def _print_result(tag: str, res: dict) -> None:
         # Handle guidance mode output differently
@@ -51,7 +66,6 @@ async def _amain(args: argparse.Namespace) -> int:
     async def _save_result(agent: str, model: str, result: dict, file_or_text: str) -> None:
         """Save agent result immediately to prevent data loss on timeout."""
         from datetime import datetime
-        import json
 
         try:
             # Create reviews directory if doesn't exist
@@ -73,9 +87,8 @@ async def _amain(args: argparse.Namespace) -> int:
             # Format: YYYYMMDD_HHMMSS_agent_filename_model
             base_name = f"{timestamp}_{agent}_{file_base}_{safe_model}"
 
-            # Save JSON
-            json_path = reviews_dir / f"{base_name}.json"
-            json_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+            # Save JSON (queued on the background writer; flushed before exit)
+            json_path = queue_json(reviews_dir / f"{base_name}.json", result)
 
             # Save markdown summary
             md_path = reviews_dir / f"{base_name}.md"
@@ -84,14 +97,17 @@ async def _amain(args: argparse.Namespace) -> int:
             md_content += f"**File/Text:** {file_or_text}\n\n"
             md_content += "## Result\n\n"
             md_content += result.get("text", "(no text output)")
-            md_path.write_text(md_content, encoding="utf-8")
+            queue_write(md_path, md_content)
 
             print(f"[saved] {agent}/{model} result saved to {json_path.name}", flush=True)
         except Exception as e:
             print(f"[warn] Failed to save {agent}/{model} result: {e}", flush=True)
 
+    if args.batch:
+        return await _run_batch(args, wpd, content, _save_result, _print_result)
+
     # Pre-compute planned model and effort for progress display
-    settings = load_review_settings()
+    settings = get_review_settings()
     agent_key = f"{args.agent}_agent" if not args.agent.endswith("_agent") else args.agent
     agent_cfg = settings.get("reviewAgentConfig", {}).get(agent_key, {})
     models = agent_cfg.get("models") or ([])
@@ -166,7 +182,7 @@ async def _amain(args: argparse.Namespace) -> int:
             )
         if args.run_both:
             # Determine alternate model upfront
-            settings = load_review_settings()
+            settings = get_review_settings()
             agent_key = f"{args.agent}_agent" if not args.agent.endswith("_agent") else args.agent
             agent_cfg = settings.get("reviewAgentConfig", {}).get(agent_key, {})
             models = agent_cfg.get("models") or ([agent_cfg.get("model")] if agent_cfg.get("model") else [])
@@ -207,6 +223,8 @@ async def _amain(args: argparse.Namespace) -> int:
                         override_court=args.court,
                         override_circuit=args.circuit,
                         override_preferred_authority=[s.strip() for s in args.prefer_authority.split(',')] if args.prefer_authority else None,
+                        stream=args.stream,
+                        on_delta=progress,
                     )
                     # Save result immediately, even if the other model hasn't finished yet
                     if not isinstance(res, Exception):
@@ -226,6 +244,8 @@ async def _amain(args: argparse.Namespace) -> int:
                         override_court=args.court,
                         override_circuit=args.circuit,
                         override_preferred_authority=[s.strip() for s in args.prefer_authority.split(',')] if args.prefer_authority else None,
+                        stream=args.stream,
+                        on_delta=progress,
                     )
                     # Save result immediately, even if the other model hasn't finished yet
                     if not isinstance(res, Exception):
@@ -269,6 +289,7 @@ async def _amain(args: argparse.Namespace) -> int:
                             error=str(err),
                         )
                     else:
+                        # Successful calls get their usage CSV row (and cost) from WePublicDefender
                         logger.info(
                             "Agent run completed | agent=%s | model=%s | in=%s | out=%s | cached=%s | dur=%.2fs",
                             args.agent,
@@ -278,24 +299,6 @@ async def _amain(args: argparse.Namespace) -> int:
                             u.get("cached", 0),
                             u.get("duration", 0),
                         )
-                        # Calculate cost for this call using ppm (price per million) rates
-                        model_cfg = wpd.llm_config["modelConfigurations"].get(primary.get("model", ""), {})
-                        input_cost = (int(u.get("input", 0)) / 1_000_000) * model_cfg.get("input_token_ppm", 0)
-                        output_cost = (int(u.get("output", 0)) / 1_000_000) * model_cfg.get("output_token_ppm", 0)
-                        cached_cost = (int(u.get("cached", 0)) / 1_000_000) * model_cfg.get("input_token_cached_ppm", 0)
-                        total_cost = input_cost + output_cost + cached_cost
-
-                        log_agent_call(
-                            agent=args.agent,
-                            model=primary.get("model", "unknown"),
-                            file_or_text=args.file or "text",
-                            input_tokens=int(u.get("input", 0)),
-                            output_tokens=int(u.get("output", 0)),
-                            cached_tokens=int(u.get("cached", 0)),
-                            cost=total_cost,
-                            duration=float(u.get("duration", 0)),
-                            status="success",
-                        )
                 except Exception:
                     pass
 
@@ -337,24 +340,6 @@ async def _amain(args: argparse.Namespace) -> int:
                             u2.get("cached", 0),
                             u2.get("duration", 0),
                         )
-                        # Calculate cost for this call using ppm (price per million) rates
-                        model_cfg = wpd.llm_config["modelConfigurations"].get(secondary.get("model", ""), {})
-                        input_cost = (int(u2.get("input", 0)) / 1_000_000) * model_cfg.get("input_token_ppm", 0)
-                        output_cost = (int(u2.get("output", 0)) / 1_000_000) * model_cfg.get("output_token_ppm", 0)
-                        cached_cost = (int(u2.get("cached", 0)) / 1_000_000) * model_cfg.get("input_token_cached_ppm", 0)
-                        total_cost = input_cost + output_cost + cached_cost
-
-                        log_agent_call(
-                            agent=args.agent,
-                            model=secondary.get("model", alt_model),
-                            file_or_text=args.file or "text",
-                            input_tokens=int(u2.get("input", 0)),
-                            output_tokens=int(u2.get("output", 0)),
-                            cached_tokens=int(u2.get("cached", 0)),
-                            cost=total_cost,
-                            duration=float(u2.get("duration", 0)),
-                            status="success",
-                        )
                 except Exception:
                     pass
 
@@ -382,10 +367,21 @@ async def _amain(args: argparse.Namespace) -> int:
                     override_court=args.court,
                     override_circuit=args.circuit,
                     override_preferred_authority=[s.strip() for s in args.prefer_authority.split(',')] if args.prefer_authority else None,
+                    stream=args.stream,
+                    on_delta=progress,
+                    completion_policy=args.completion,
                 )
             finally:
                 hb.cancel()
 
+            completion = result.get("completion") or {}
+            if completion.get("cut"):
+                print(
+                    f"[info] Completion policy {completion['policy']} met | completed={','.join(completion['completed'])} | "
+                    f"{'cancelled' if completion['stragglers'] == 'cancel' else 'still running'}={','.join(completion['cut'])}",
+                    flush=True,
+                )
+
             # Log single-run completion
             u = result.get("usage", {})
             err = result.get("error")
@@ -414,24 +410,6 @@ async def _amain(args: argparse.Namespace) -> int:
                         u.get("cached", 0),
                         u.get("duration", 0),
                     )
-                    # Calculate cost for this call using ppm (price per million) rates
-                    model_cfg = wpd.llm_config["modelConfigurations"].get(result.get("model", ""), {})
-                    input_cost = (int(u.get("input", 0)) / 1_000_000) * model_cfg.get("input_token_ppm", 0)
-                    output_cost = (int(u.get("output", 0)) / 1_000_000) * model_cfg.get("output_token_ppm", 0)
-                    cached_cost = (int(u.get("cached", 0)) / 1_000_000) * model_cfg.get("input_token_cached_ppm", 0)
-                    total_cost = input_cost + output_cost + cached_cost
-
-                    log_agent_call(
-                        agent=args.agent,
-                        model=result.get("model", "unknown"),
-                        file_or_text=args.file or "text",
-                        input_tokens=int(u.get("input", 0)),
-                        output_tokens=int(u.get("output", 0)),
-                        cached_tokens=int(u.get("cached", 0)),
-                        cost=total_cost,
-                        duration=float(u.get("duration", 0)),
-                        status="success",
-                    )
             except Exception:
                 pass
 
@@ -453,8 +431,11 @@ async def _amain(args: argparse.Namespace) -> int:
                 if err:
                     print(f"[error] {args.agent} failed: {err}", flush=True)
                 else:
+                    stream_str = ""
+                    if u.get("streamed") and u.get("ttft") is not None:
+                        stream_str = f" ttft={u['ttft']:.1f}s tok/s={float(u.get('tokens_per_sec') or 0):.1f}"
                     print(
-                        f"[status] Completed {args.agent} | model={result.get('model')} | in={u.get('input',0)} out={u.get('output',0)} cache={u.get('cached',0)} dur={u.get('duration',0):.1f}s",
+                        f"[status] Completed {args.agent} | model={result.get('model')} | in={u.get('input',0)} out={u.get('output',0)} cache={u.get('cached',0)} dur={u.get('duration',0):.1f}s{stream_str}",
                         flush=True,
                     )
             _print_result("single", result)
@@ -489,11 +470,92 @@ async def _amain(args: argparse.Namespace) -> int:
                 pass
             print(f"[warn] Failed to save preference: {e}")
 
+    # Detached models cut by the completion policy still cost money; let them finish and save
+    for late in await wpd.wait_for_stragglers():
+        status = "failed" if late["result"].get("error") else "finished"
+        print(f"[late] {late['agent']}/{late['model']} {status} | saved_to={late.get('saved_to', '-')}", flush=True)
+
     print("=== Usage Summary ===")
     print(wpd.get_cost_report())
+    if wpd.budget is not None:
+        print("=== Budget ===")
+        print(wpd.budget.report())
     return 0
 
 
+async def _run_batch(args: argparse.Namespace, wpd: WePublicDefender, content: str, save_result, print_result) -> int:
+    """Submit this agent run as an OpenAI Batch job, or collect a finished one."""
+    if args.batch == "submit":
+        if args.run_both or args.stream:
+            print("[info] --run-both/--stream do not apply to batch mode; submitting configured model(s)", flush=True)
+        call = {
+            "agent_type": args.agent,
+            "document": content,
+            "override_model": args.model,
+            "web_search": True if args.web_search else None,
+            "override_effort": args.effort,
+            "override_jurisdiction": args.jurisdiction,
+            "override_court": args.court,
+            "override_circuit": args.circuit,
+            "override_preferred_authority": [p.strip() for p in args.prefer_authority.split(",")] if args.prefer_authority else None,
+        }
+        try:
+            job = wpd.submit_agent_batch(
+                [call],
+                label=f"{args.agent}:{args.file or 'text'}",
+                extra={"cli": "wpd-run-agent", "agent": args.agent, "file": args.file or "text"},
+            )
+        except Exception as e:
+            print(f"[error] Batch submission failed: {e}", flush=True)
+            return 1
+        for s in job.skipped:
+            print(f"[skip] {s['agent']}/{s['model']}: {s['reason']} (run it without --batch)", flush=True)
+        print(f"[batch] submitted {len(job.requests)} request(s) | id={job.id} | status={job.status}", flush=True)
+        print(f"[next] wpd-run-agent --agent {args.agent} --batch collect --batch-id {job.id}", flush=True)
+        return 0
+
+    if not args.batch_id:
+        print("[error] --batch collect requires --batch-id", flush=True)
+        return 2
+    try:
+        collected = await wpd.collect_agent_batch(args.batch_id, wait=args.wait)
+    except FileNotFoundError as e:
+        print(f"[error] {e}", flush=True)
+        return 2
+    counts = collected.get("request_counts") or {}
+    print(
+        f"[batch] id={collected['batch_id']} | status={collected['status']} | "
+        f"completed={counts.get('completed', 0)}/{counts.get('total', 0)} failed={counts.get('failed', 0)}",
+        flush=True,
+    )
+    if collected["status"] != "completed":
+        if collected["status"] in ("failed", "expired", "cancelled"):
+            return 1
+        print("[info] Batch not finished yet; collect again later (or add --wait)", flush=True)
+        return 0
+    source = collected.get("extra", {}).get("file", "text")
+    for result in collected["results"].values():
+        agent = result.get("agent", args.agent)
+        for res in [result] + list(result.get("alternate_results", [])):
+            if res.get("error"):
+                print(f"[error] {agent}/{res.get('model')}: {res['error']}", flush=True)
+            else:
+                await save_result(agent, res.get("model", "unknown"), res, source)
+        print_result("batch", result)
+    print("=== Usage Summary ===")
+    print(wpd.get_cost_report())
+    return 0
+
+
+async def _amain_closing(args: argparse.Namespace) -> int:
+    """Run the agent, then flush queued writes and close async provider clients before the loop shuts down."""
+    try:
+        return await _amain(args)
+    finally:
+        await get_side_effect_writer().flush()
+        await get_client_pool().aclose_async_clients()
+
+
 def main() -> int:
     # Ensure UTF-8 stdout/stderr to avoid Windows cp1252 encode errors
     try:
@@ -520,14 +582,24 @@ def main() -> int:
     ap.add_argument("--court", help="Court override (e.g., 'D.S.C.', 'Richland County')")
     ap.add_argument("--circuit", help="Circuit override (e.g., 'Fourth Circuit')")
     ap.add_argument("--prefer-authority", help="Comma-separated preferred authority order (e.g., 'US Supreme Court,Fourth Circuit,South Carolina Supreme Court')")
+    ap.add_argument("--completion", help="Multi-model completion policy: all (default) | first_success | quorum:k | deadline:<seconds>")
+    ap.add_argument("--stream", action="store_true", help="Stream responses: show live progress, time-to-first-token and write partial output to .wepublic_defender/reviews/")
+    cache_group = ap.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache (no lookup, no store)")
+    cache_group.add_argument("--refresh", action="store_true", help="Ignore cached responses but store fresh results")
     ap.add_argument("--verbose", action="store_true", help="Print extra info; detailed logs always go to .wepublic_defender/logs/wpd.log")
     ap.add_argument("--debug", action="store_true", help="Enable DEBUG logging (same as setting WPD_DEBUG=1)")
     ap.add_argument("--heartbeat", help="Heartbeat interval seconds (default 15; or set WPD_HEARTBEAT_SEC)")
+    ap.add_argument("--batch", choices=["submit", "collect"], help="OpenAI Batch API mode (about half price, results within 24h): submit the run, or collect a submitted batch by --batch-id")
+    ap.add_argument("--batch-id", help="Batch id printed by --batch submit (used with --batch collect)")
+    ap.add_argument("--wait", action="store_true", help="With --batch collect: poll with backoff until the batch finishes")
+    ap.add_argument("--budget", type=float, help="Dollar cap for this run (e.g. 0.50): tier, effort and model are chosen to fit; extra models are downgraded or skipped")
 
     args = ap.parse_args()
     if args.debug:
         os.environ["WPD_DEBUG"] = "1"
-    return asyncio.run(_amain(args))
+    flush_on_signals()
+    return asyncio.run(_amain_closing(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,403 @@
+"""
+Process-wide registry of reusable provider clients.
+
+Creating an SDK client per request throws away the underlying HTTP/gRPC
+connection each time, so every agent call pays TLS handshake and connection
+setup again and parallel fan-outs never share keep-alive connections. This
+module keeps one client per (provider, base_url, api_key) and hands the same
+instance to every caller.
+
+Connection pool limits come from the optional `connectionPool` block in
+`llm_providers.json` (global defaults) and the optional `connection_pool`
+block on each provider entry (per-provider overrides):
+
+    "connectionPool": {
+      "max_connections": 20,
+      "max_keepalive_connections": 10,
+      "keepalive_expiry": 30.0
+    }
+
+Async clients (AsyncOpenAI, xai_sdk.AsyncClient) hold connections bound to
+the event loop that created them, so they are pooled per running loop and
+dropped automatically when that loop is garbage collected.
+
+Usage:
+    from wepublic_defender.client_pool import get_client_pool
+
+    client = get_client_pool().openai_client("openai", provider_cfg, root_cfg)
+    aclient = get_client_pool().async_openai_client("openai", provider_cfg, root_cfg)
+    ...
+    await get_client_pool().aclose_async_clients()  # before the loop exits
+    shutdown_client_pool()  # optional; also registered with atexit
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import hashlib
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+except Exception:  # pragma: no cover - allow import to fail gracefully at runtime
+    OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
+    DefaultHttpxClient = None  # type: ignore
+    DefaultAsyncHttpxClient = None  # type: ignore
+
+try:
+    import httpx
+except Exception:  # pragma: no cover - httpx ships with openai but stay defensive
+    httpx = None  # type: ignore
+
+try:
+    from xai_sdk import Client as XAIClient, AsyncClient as AsyncXAIClient
+except Exception:  # pragma: no cover - allow import to fail gracefully at runtime
+    XAIClient = None  # type: ignore
+    AsyncXAIClient = None  # type: ignore
+
+from .logging_utils import get_logger
+
+
+DEFAULT_POOL_LIMITS: Dict[str, Any] = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0,
+}
+
+ClientKey = Tuple[str, str, str, str]
+
+
+def _key_fingerprint(api_key: str) -> str:
+    """Return a short, non-reversible fingerprint so raw keys are never used as dict keys."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def xai_api_host(base_url: Optional[str]) -> str:
+    """
+    The gRPC host the xAI SDK dials for a provider `base_url` ("" for the SDK default).
+
+    Examples:
+        >>> xai_api_host("https://api.x.ai/v1")
+        'api.x.ai'
+        >>> xai_api_host("grok.internal:8443"), xai_api_host(None)
+        ('grok.internal:8443', '')
+    """
+    if not base_url:
+        return ""
+    return urlsplit(base_url).netloc if "//" in base_url else base_url.split("/", 1)[0]
+
+
+def resolve_pool_limits(
+    provider_cfg: Dict[str, Any],
+    root_cfg: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Merge pool limits: built-in defaults -> root `connectionPool` -> provider `connection_pool`.
+
+    Examples:
+        >>> resolve_pool_limits({})["max_connections"]
+        20
+        >>> resolve_pool_limits(
+        ...     {"connection_pool": {"max_connections": 5}},
+        ...     {"connectionPool": {"max_connections": 50, "keepalive_expiry": 10}},
+        ... ) == {"max_connections": 5, "max_keepalive_connections": 10, "keepalive_expiry": 10}
+        True
+    """
+    limits = dict(DEFAULT_POOL_LIMITS)
+    if root_cfg:
+        limits.update(root_cfg.get("connectionPool", {}) or {})
+    limits.update(provider_cfg.get("connection_pool", {}) or {})
+    return limits
+
+
+class ClientPool:
+    """
+    Thread-safe registry of provider SDK clients.
+
+    Clients are created lazily on first use and reused for every subsequent
+    call with the same provider, base_url and API key. `close_all()` releases
+    every pooled connection; the pool stays usable afterwards and simply
+    recreates clients on demand.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: Dict[ClientKey, Any] = {}
+        # Async clients are bound to the loop that created them
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    # ----- lookup -------------------------------------------------------------
+    @staticmethod
+    def _api_key(provider_cfg: Dict[str, Any]) -> Optional[str]:
+        api_key_env = provider_cfg.get("api_key_env_var")
+        if not api_key_env:
+            return None
+        return os.getenv(api_key_env) or None
+
+    def _get_or_create(self, key: ClientKey, factory) -> Any:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                if client is not None:
+                    self._clients[key] = client
+            return client
+
+    def _get_or_create_async(self, key: ClientKey, factory) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            per_loop = self._async_clients.setdefault(loop, {})
+            client = per_loop.get(key)
+            if client is None:
+                client = factory()
+                if client is not None:
+                    per_loop[key] = client
+            return client
+
+    # ----- OpenAI (Responses API) --------------------------------------------
+    def openai_client(
+        self,
+        provider_name: str,
+        provider_cfg: Dict[str, Any],
+        root_cfg: Optional[Dict[str, Any]] = None,
+    ) -> Optional[OpenAI]:
+        """
+        Return a shared OpenAI-compatible client for the provider.
+
+        Returns None if the OpenAI SDK is missing or the API key is not set,
+        matching the contract of `llm_client._create_client`.
+        """
+        if OpenAI is None:
+            return None
+        api_key = self._api_key(provider_cfg)
+        if not api_key:
+            return None
+        base_url = provider_cfg.get("base_url") or ""
+        key: ClientKey = ("openai", provider_name, base_url, _key_fingerprint(api_key))
+
+        def _factory() -> Optional[OpenAI]:
+            params: Dict[str, Any] = {"api_key": api_key}
+            if base_url:
+                params["base_url"] = base_url
+            http_client = self._build_http_client(resolve_pool_limits(provider_cfg, root_cfg))
+            if http_client is not None:
+                params["http_client"] = http_client
+            try:
+                client = OpenAI(**params)
+            except Exception:
+                return None
+            try:
+                get_logger().info(
+                    "Client pool created OpenAI client | provider=%s | base_url=%s",
+                    provider_name,
+                    base_url or "default",
+                )
+            except Exception:
+                pass
+            return client
+
+        return self._get_or_create(key, _factory)
+
+    def async_openai_client(
+        self,
+        provider_name: str,
+        provider_cfg: Dict[str, Any],
+        root_cfg: Optional[Dict[str, Any]] = None,
+    ) -> Optional[AsyncOpenAI]:
+        """
+        Return a shared AsyncOpenAI client for the provider on the running loop.
+
+        Must be called from inside a coroutine. Returns None if the SDK is
+        missing or the API key is not set.
+        """
+        if AsyncOpenAI is None:
+            return None
+        api_key = self._api_key(provider_cfg)
+        if not api_key:
+            return None
+        base_url = provider_cfg.get("base_url") or ""
+        key: ClientKey = ("openai-async", provider_name, base_url, _key_fingerprint(api_key))
+
+        def _factory() -> Optional[AsyncOpenAI]:
+            params: Dict[str, Any] = {"api_key": api_key}
+            if base_url:
+                params["base_url"] = base_url
+            http_client = self._build_http_client(
+                resolve_pool_limits(provider_cfg, root_cfg), async_client=True
+            )
+            if http_client is not None:
+                params["http_client"] = http_client
+            try:
+                return AsyncOpenAI(**params)
+            except Exception:
+                return None
+
+        return self._get_or_create_async(key, _factory)
+
+    @staticmethod
+    def _build_http_client(limits: Dict[str, Any], async_client: bool = False) -> Any:
+        """Build an httpx client honoring pool limits; None falls back to the SDK default."""
+        factory = DefaultAsyncHttpxClient if async_client else DefaultHttpxClient
+        if factory is None or httpx is None:
+            return None
+        try:
+            return factory(
+                limits=httpx.Limits(
+                    max_connections=int(limits["max_connections"]),
+                    max_keepalive_connections=int(limits["max_keepalive_connections"]),
+                    keepalive_expiry=float(limits["keepalive_expiry"]),
+                )
+            )
+        except Exception:
+            return None
+
+    # ----- xAI native SDK -----------------------------------------------------
+    def xai_client(
+        self,
+        provider_name: str,
+        provider_cfg: Dict[str, Any],
+        root_cfg: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Return a shared xAI native SDK client for the provider.
+
+        The sync SDK applies one deadline to every call on a client, so a
+        `timeout` gets its own client (one per distinct timeout value).
+
+        Raises:
+            RuntimeError: If xai_sdk is not installed or the API key is missing
+        """
+        if XAIClient is None:
+            raise RuntimeError("xai_sdk not available. Install with: pip install xai-sdk")
+        api_key = self._api_key(provider_cfg)
+        if not api_key:
+            raise RuntimeError(
+                f"xAI API key not found in environment variable: {provider_cfg.get('api_key_env_var')}"
+            )
+        host = xai_api_host(provider_cfg.get("base_url"))
+        kind = "xai" if timeout is None else f"xai:{float(timeout):g}s"
+        key: ClientKey = (kind, provider_name, host, _key_fingerprint(api_key))
+
+        def _factory() -> Any:
+            kwargs: Dict[str, Any] = {"api_host": host} if host else {}
+            if timeout is not None:
+                kwargs["timeout"] = float(timeout)
+            client = XAIClient(api_key=api_key, **kwargs)
+            try:
+                get_logger().info(
+                    "Client pool created xAI client | provider=%s | host=%s | timeout=%s",
+                    provider_name,
+                    host or "default",
+                    timeout,
+                )
+            except Exception:
+                pass
+            return client
+
+        return self._get_or_create(key, _factory)
+
+    def async_xai_client(
+        self,
+        provider_name: str,
+        provider_cfg: Dict[str, Any],
+        root_cfg: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Return a shared xai_sdk.AsyncClient for the provider on the running loop.
+
+        Raises:
+            RuntimeError: If xai_sdk is not installed or the API key is missing
+        """
+        if AsyncXAIClient is None:
+            raise RuntimeError("xai_sdk not available. Install with: pip install xai-sdk")
+        api_key = self._api_key(provider_cfg)
+        if not api_key:
+            raise RuntimeError(
+                f"xAI API key not found in environment variable: {provider_cfg.get('api_key_env_var')}"
+            )
+        host = xai_api_host(provider_cfg.get("base_url"))
+        key: ClientKey = ("xai-async", provider_name, host, _key_fingerprint(api_key))
+        return self._get_or_create_async(
+            key, lambda: AsyncXAIClient(api_key=api_key, **({"api_host": host} if host else {}))
+        )
+
+    # ----- lifecycle ----------------------------------------------------------
+    def size(self) -> int:
+        """Return the number of live pooled clients (sync plus async on all loops)."""
+        return len(self._clients) + sum(len(c) for c in list(self._async_clients.values()))
+
+    def close_all(self) -> None:
+        """Close every pooled sync client and forget all async clients."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            # Async clients can only be closed from their own loop; drop references
+            self._async_clients.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    async def aclose_async_clients(self) -> None:
+        """Close the async clients that belong to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = list(self._async_clients.pop(loop, {}).values())
+        for client in clients:
+            close = getattr(client, "close", None)
+            if not callable(close):
+                continue
+            try:
+                res = close()
+                if asyncio.iscoroutine(res):
+                    await res
+            except Exception:
+                pass
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    """Return the process-wide client pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ClientPool()
+    return _pool
+
+
+def shutdown_client_pool() -> None:
+    """Close all pooled clients. Safe to call more than once."""
+    if _pool is not None:
+        _pool.close_all()
+
+
+atexit.register(shutdown_client_pool)
+
+
+__all__ = [
+    "ClientPool",
+    "DEFAULT_POOL_LIMITS",
+    "get_client_pool",
+    "resolve_pool_limits",
+    "shutdown_client_pool",
+    "xai_api_host",
+]
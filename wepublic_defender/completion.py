@@ -0,0 +1,199 @@
+"""
+Completion policies for multi-model agent calls.
+
+A multi-model `call_agent` used to wait for every model. A completion
+policy decides when the fan-out is good enough to return:
+
+- `all`: wait for every model (default)
+- `first_success`: return as soon as one model succeeds
+- `quorum:k`: return once k models succeed
+- `deadline:<seconds>`: return whatever finished by the deadline (if nothing
+  has finished yet, the first result to arrive is returned)
+
+Any policy also returns early if every model has finished. Models still
+running ("stragglers") are either cancelled or detached: a detached call
+keeps running in the background, is tracked and logged as usual when it
+finishes, and its output is saved to .wepublic_defender/reviews/ as
+`<timestamp>_<agent>_<model>.late.json`.
+
+Settings live in the `completionConfig` block of legal_review_settings.json:
+
+    "completionConfig": {
+      "policy": "all",
+      "stragglers": "detach"
+    }
+
+Agents override the policy with `"completion_policy"` in reviewAgentConfig,
+and call_agent(completion_policy=...) overrides both.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .logging_utils import get_logger
+
+
+DEFAULT_COMPLETION_CONFIG: Dict[str, Any] = {
+    "policy": "all",
+    "stragglers": "detach",
+}
+
+POLICY_KINDS = ("all", "first_success", "quorum", "deadline")
+STRAGGLER_MODES = ("detach", "cancel")
+
+
+class CompletionPolicy(NamedTuple):
+    kind: str
+    value: Optional[float] = None
+
+    def __str__(self) -> str:
+        if self.value is None:
+            return self.kind
+        value = int(self.value) if float(self.value).is_integer() else self.value
+        return f"{self.kind}:{value}"
+
+
+def parse_completion_policy(spec: Optional[str]) -> CompletionPolicy:
+    """
+    Parse a policy string such as "all", "first_success", "quorum:2" or "deadline:90".
+
+    Raises:
+        ValueError: For an unknown policy or a missing/invalid parameter
+
+    Examples:
+        >>> parse_completion_policy("quorum:2")
+        CompletionPolicy(kind='quorum', value=2.0)
+        >>> str(parse_completion_policy("deadline:90"))
+        'deadline:90'
+        >>> parse_completion_policy(None).kind
+        'all'
+        >>> parse_completion_policy("fastest")
+        Traceback (most recent call last):
+            ...
+        ValueError: Unknown completion policy 'fastest'; use all, first_success, quorum:k or deadline:<seconds>
+    """
+    text = (spec or "all").strip().lower()
+    kind, _, arg = text.partition(":")
+    if kind not in POLICY_KINDS:
+        raise ValueError(
+            f"Unknown completion policy '{spec}'; use all, first_success, quorum:k or deadline:<seconds>"
+        )
+    if kind in ("all", "first_success"):
+        if arg:
+            raise ValueError(f"Completion policy '{kind}' takes no parameter")
+        return CompletionPolicy(kind)
+    try:
+        value = float(arg)
+    except ValueError:
+        raise ValueError(f"Completion policy '{kind}' needs a number, e.g. {kind}:2") from None
+    if value <= 0 or (kind == "quorum" and not value.is_integer()):
+        raise ValueError(f"Completion policy '{spec}' needs a positive {'integer' if kind == 'quorum' else 'number'}")
+    return CompletionPolicy(kind, value)
+
+
+def resolve_completion_config(
+    review_settings: Optional[Dict[str, Any]],
+    agent_config: Optional[Dict[str, Any]] = None,
+    override: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Merge defaults, `completionConfig`, the agent's `completion_policy` and an explicit override.
+
+    Examples:
+        >>> resolve_completion_config({})["policy"]
+        'all'
+        >>> resolve_completion_config({"completionConfig": {"policy": "quorum:2"}}, {"completion_policy": "first_success"})["policy"]
+        'first_success'
+        >>> resolve_completion_config({}, {"completion_policy": "quorum:2"}, override="deadline:60")["policy"]
+        'deadline:60'
+    """
+    cfg = dict(DEFAULT_COMPLETION_CONFIG)
+    if review_settings:
+        cfg.update({k: v for k, v in (review_settings.get("completionConfig", {}) or {}).items() if not k.startswith("_")})
+    if agent_config and agent_config.get("completion_policy"):
+        cfg["policy"] = agent_config["completion_policy"]
+    if override:
+        cfg["policy"] = override
+    if cfg.get("stragglers") not in STRAGGLER_MODES:
+        cfg["stragglers"] = DEFAULT_COMPLETION_CONFIG["stragglers"]
+    return cfg
+
+
+def _satisfied(policy: CompletionPolicy, successes: int, total: int) -> bool:
+    if policy.kind == "first_success":
+        return successes >= 1
+    if policy.kind == "quorum":
+        return successes >= min(int(policy.value or 1), total)
+    return False
+
+
+async def run_with_policy(
+    calls: List[Tuple[str, Awaitable[Dict[str, Any]]]],
+    policy: CompletionPolicy,
+    is_success: Callable[[Dict[str, Any]], bool],
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, "asyncio.Task[Dict[str, Any]]"]]]:
+    """
+    Run named calls concurrently and stop waiting once `policy` is met.
+
+    A call that raises is reported as {"model": name, "error": str(exc)}.
+
+    Returns:
+        (completed, cut) - completed is [(name, result)] in finishing order;
+        cut is [(name, task)] for calls still running, left for the caller
+        to cancel or detach
+    """
+    loop = asyncio.get_running_loop()
+    names: Dict["asyncio.Task[Dict[str, Any]]", str] = {}
+    for name, coro in calls:
+        names[asyncio.ensure_future(coro)] = name
+    pending = set(names)
+    completed: List[Tuple[str, Dict[str, Any]]] = []
+    successes = 0
+    deadline = loop.time() + float(policy.value or 0) if policy.kind == "deadline" else None
+
+    while pending and not _satisfied(policy, successes, len(names)):
+        timeout = None
+        if deadline is not None:
+            remaining = deadline - loop.time()
+            if remaining <= 0 and completed:
+                break
+            # Past the deadline with nothing finished: wait for the first result
+            timeout = remaining if remaining > 0 else None
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = names[task]
+            if task.cancelled():
+                result: Dict[str, Any] = {"model": name, "error": "cancelled"}
+            elif task.exception() is not None:
+                result = {"model": name, "error": str(task.exception())}
+            else:
+                result = task.result()
+            completed.append((name, result))
+            if is_success(result):
+                successes += 1
+
+    cut = [(names[task], task) for task in names if task in pending]
+    if cut:
+        try:
+            get_logger().info(
+                "Completion policy met | policy=%s | completed=%s | cut=%s",
+                policy,
+                [name for name, _ in completed],
+                [name for name, _ in cut],
+            )
+        except Exception:
+            pass
+    return completed, cut
+
+
+__all__ = [
+    "CompletionPolicy",
+    "DEFAULT_COMPLETION_CONFIG",
+    "POLICY_KINDS",
+    "STRAGGLER_MODES",
+    "parse_completion_policy",
+    "resolve_completion_config",
+    "run_with_policy",
+]
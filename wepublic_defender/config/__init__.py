@@ -312,8 +312,24 @@ def get_agent_config(agent_name: str) -> Dict[str, Any]:
     return settings['reviewAgentConfig'][agent_name]
 
 
+from .resolved import (  # noqa: E402 - resolved imports helpers defined above
+    ModelProfile,
+    ResolvedLLMConfig,
+    get_resolved_llm_config,
+    get_review_settings,
+    invalidate_llm_config_cache,
+    invalidate_review_settings_cache,
+)
+
+
 __all__ = [
     'load_llm_providers',
+    'get_resolved_llm_config',
+    'invalidate_llm_config_cache',
+    'get_review_settings',
+    'invalidate_review_settings_cache',
+    'ModelProfile',
+    'ResolvedLLMConfig',
     'load_review_settings',
     'save_review_settings',
     'get_review_settings_path',
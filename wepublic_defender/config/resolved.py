@@ -0,0 +1,249 @@
+"""
+Memoized, mtime-invalidated view of the LLM provider configuration.
+
+`load_llm_providers()` re-opens and parses `llm_providers.json`, probes the
+per-case settings directory and deep-merges the override on every call. The
+hot paths (`chat_complete`, `WePublicDefender._run_single_model`,
+`TokenTracker`) only need the merged result, so this module resolves it once
+and keeps it until the package file or the per-case override changes
+(mtime or size), or the active case directory itself changes.
+
+The freshness check is throttled to at most once per `WPD_CONFIG_CHECK_INTERVAL`
+seconds (default 1.0), so back-to-back LLM calls never touch the disk.
+
+Per-model lookups (provider config, api_type, timeouts, pricing, feature
+flags) are precomputed into `ModelProfile` objects.
+
+Returned dicts are shared between callers; treat them as read-only.
+
+`get_review_settings()` does the same for legal_review_settings.json, but
+returns a private deep copy (callers such as WePublicDefender adjust their
+settings in place) and checks freshness on every call instead of throttling,
+since it is read once per instance rather than once per LLM call.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..logging_utils import get_logger
+
+
+PRICING_KEYS = (
+    "input_token_ppm",
+    "input_token_cached_ppm",
+    "output_token_ppm",
+    "cached_discount_percent",
+    "priority_tier",
+    "tiered_pricing",
+    "priority_multiplier",
+)
+
+Fingerprint = Tuple[Optional[str], Optional[Tuple[int, int]], Optional[Tuple[int, int]]]
+
+
+class ModelProfile(BaseModel):
+    """Precomputed per-model lookups resolved from llm_providers.json."""
+
+    model_key: str
+    provider_name: str
+    provider_cfg: Dict[str, Any] = Field(default_factory=dict)
+    model_cfg: Dict[str, Any] = Field(default_factory=dict)
+    api_type: Optional[str] = None
+    wire_model: str
+    timeouts: Dict[str, float] = Field(default_factory=dict)
+    pricing: Dict[str, Any] = Field(default_factory=dict)
+    features: Dict[str, Any] = Field(default_factory=dict)
+    supports_reasoning: bool = False
+    supports_temperature: bool = False
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+
+
+class ResolvedLLMConfig:
+    """Merged provider configuration plus precomputed per-model profiles."""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self.models: Dict[str, Dict[str, Any]] = root.get("modelConfigurations", {}) or {}
+        self.providers: Dict[str, Dict[str, Any]] = root.get("llm_providers", {}) or {}
+        self.profiles: Dict[str, ModelProfile] = {}
+        for model_key, model_cfg in self.models.items():
+            provider_name = model_cfg.get("provider")
+            if provider_name not in self.providers:
+                # Leave it out; callers report the missing provider with context
+                continue
+            self.profiles[model_key] = self._build_profile(
+                model_key, provider_name, self.providers[provider_name], model_cfg
+            )
+
+    @staticmethod
+    def _build_profile(
+        model_key: str,
+        provider_name: str,
+        provider_cfg: Dict[str, Any],
+        model_cfg: Dict[str, Any],
+    ) -> ModelProfile:
+        timeouts = {k: float(v) for k, v in (model_cfg.get("timeouts", {}) or {}).items()}
+        pricing = {k: model_cfg[k] for k in PRICING_KEYS if k in model_cfg}
+        features = dict(model_cfg.get("supported_features", {}) or {})
+        return ModelProfile.model_construct(
+            model_key=model_key,
+            provider_name=provider_name,
+            provider_cfg=provider_cfg,
+            model_cfg=model_cfg,
+            api_type=model_cfg.get("api_type"),
+            wire_model=model_cfg.get("model_name", model_key),
+            timeouts=timeouts,
+            pricing=pricing,
+            features=features,
+            supports_reasoning=bool(features.get("reasoning", False)),
+            supports_temperature=bool(model_cfg.get("supports_temperature", False)),
+            temperature=model_cfg.get("temperature"),
+            max_output_tokens=model_cfg.get("max_output_tokens"),
+        )
+
+    def profile(self, model_key: str) -> Optional[ModelProfile]:
+        """Return the profile for a model key, or None if unknown."""
+        return self.profiles.get(model_key)
+
+    def model_config(self, model_key: str) -> Dict[str, Any]:
+        """Return the raw model configuration (empty dict if unknown)."""
+        return self.models.get(model_key, {})
+
+
+_lock = threading.Lock()
+_cached: Optional[ResolvedLLMConfig] = None
+_fingerprint: Optional[Fingerprint] = None
+_last_check: float = 0.0
+
+
+def _check_interval() -> float:
+    try:
+        return float(os.getenv("WPD_CONFIG_CHECK_INTERVAL", "1.0"))
+    except ValueError:
+        return 1.0
+
+
+def _stat(path: Optional[Path]) -> Optional[Tuple[int, int]]:
+    if path is None:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _current_fingerprint(filename: str = "llm_providers.json") -> Fingerprint:
+    # Resolve through the package module so monkeypatched _case_settings_dir is honored
+    from .. import config as config_pkg
+
+    case_dir = config_pkg._case_settings_dir()
+    pkg_path = Path(config_pkg.__file__).parent / filename
+    case_path = case_dir / filename if case_dir else None
+    return (
+        str(case_dir) if case_dir else None,
+        _stat(pkg_path),
+        _stat(case_path),
+    )
+
+
+def get_resolved_llm_config() -> ResolvedLLMConfig:
+    """
+    Return the memoized provider configuration, reloading only when the files change.
+
+    Example:
+        >>> cfg = get_resolved_llm_config()
+        >>> cfg.profile("gpt-5").api_type
+        'openai_responses'
+        >>> cfg.profile("grok-4").provider_name
+        'xai'
+    """
+    global _cached, _fingerprint, _last_check
+
+    now = time.monotonic()
+    cached = _cached
+    if cached is not None and now - _last_check < _check_interval():
+        return cached
+
+    with _lock:
+        fp = _current_fingerprint()
+        _last_check = time.monotonic()
+        if _cached is not None and fp == _fingerprint:
+            return _cached
+
+        from .. import config as config_pkg
+
+        resolved = ResolvedLLMConfig(config_pkg.load_llm_providers())
+        if _cached is not None:
+            try:
+                get_logger().info("LLM provider config changed on disk; reloaded")
+            except Exception:
+                pass
+        _cached = resolved
+        _fingerprint = fp
+        return resolved
+
+
+def invalidate_llm_config_cache() -> None:
+    """Drop the memoized configuration so the next lookup re-reads from disk."""
+    global _cached, _fingerprint, _last_check
+    with _lock:
+        _cached = None
+        _fingerprint = None
+        _last_check = 0.0
+
+
+_settings_lock = threading.RLock()
+_settings: Optional[Dict[str, Any]] = None
+_settings_fingerprint: Optional[Fingerprint] = None
+
+REVIEW_SETTINGS_FILE = "legal_review_settings.json"
+
+
+def get_review_settings() -> Dict[str, Any]:
+    """
+    Return a private copy of the review settings, re-reading only when the files change.
+
+    Example:
+        >>> a, b = get_review_settings(), get_review_settings()
+        >>> a == b and a is not b
+        True
+    """
+    global _settings, _settings_fingerprint
+
+    with _settings_lock:
+        if _settings is None or _current_fingerprint(REVIEW_SETTINGS_FILE) != _settings_fingerprint:
+            from .. import config as config_pkg
+
+            loaded = config_pkg.load_review_settings()
+            # load_review_settings may write the per-case file back; fingerprint afterwards
+            _settings, _settings_fingerprint = loaded, _current_fingerprint(REVIEW_SETTINGS_FILE)
+        return copy.deepcopy(_settings)
+
+
+def invalidate_review_settings_cache() -> None:
+    """Drop the memoized review settings so the next lookup re-reads from disk."""
+    global _settings, _settings_fingerprint
+    with _settings_lock:
+        _settings = None
+        _settings_fingerprint = None
+
+
+__all__ = [
+    "ModelProfile",
+    "REVIEW_SETTINGS_FILE",
+    "ResolvedLLMConfig",
+    "get_resolved_llm_config",
+    "get_review_settings",
+    "invalidate_llm_config_cache",
+    "invalidate_review_settings_cache",
+]
@@ -6,10 +6,9 @@ providers (OpenAI GPT-5, xAI Grok 4) for redundancy and adversarial testing.
 """
 
 import os
-import json
-import re
 import asyncio
-from typing import Dict, List, Optional, Tuple, Literal, Any, Type
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Literal, Any, Type
 from pathlib import Path
 
 try:
@@ -20,9 +19,30 @@ except ImportError:
     AsyncOpenAI = None
 
 from .models.settings_manager import SettingsManager
-from .models.token_tracker import TokenTracker, TokenUsage
-from .config import load_llm_providers, load_review_settings
-from .llm_client import chat_complete
+from .models.token_tracker import HedgeEvent, TokenTracker, TokenUsage
+from .client_pool import get_client_pool
+from .config import get_resolved_llm_config, get_review_settings
+from .llm_client import async_chat_complete
+from .token_estimator import TokenEstimate, check_context_window, estimate_request, get_token_estimator
+from .batch import (
+    BatchJob,
+    batch_supported,
+    build_batch_request,
+    fetch_batch_results,
+    load_job,
+    read_batch_input,
+    refresh_batch,
+    save_job,
+    submit_batch,
+    wait_for_batch,
+)
+from .response_cache import (
+    CacheMode,
+    ResponseCache,
+    make_cache_key,
+    resolve_cache_config,
+    resolve_ttl_seconds,
+)
 from .document_handlers import convert_markdown_to_word, DocumentFormatConfig
 from pydantic import BaseModel, ValidationError
 from .models.legal_responses import (
@@ -33,9 +53,50 @@ from .models.legal_responses import (
     StrategyRecommendation,
 )
 from .research_log import log_citation_verifications
+from .json_repair import repair_stats, repair_structured
+from .jsonio import dumps, loads, parse_json_payload
+from .side_effects import get_side_effect_writer, queue_json
+from .streaming import PartialOutputWriter, reviews_dir
+from .prompt_cache import get_prompt_cache, prompt_path, schema_block
+from .budget import BudgetPlan, BudgetScheduler, result_cost
+from .hedging import LatencyHistory, resolve_hedge_config, run_hedged
+from .completion import parse_completion_policy, resolve_completion_config, run_with_policy
+from .chunking import (
+    CHUNKABLE_AGENTS,
+    Chunk,
+    build_chunks,
+    merge_citation_results,
+    merge_review_results,
+    resolve_chunking_config,
+)
+from .citation_engine import (
+    ExtractedCitation,
+    citation_cache_dir,
+    citation_cache_key,
+    extract_citations,
+    pick_result,
+    resolve_per_citation_config,
+)
+from .rate_limiter import current_agent
 from .logging_utils import get_logger
 
 
+_dotenv_loaded = False
+
+
+def _load_dotenv_once() -> None:
+    """Load the nearest .env into os.environ (existing variables win); later calls are no-ops."""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    try:
+        from dotenv import load_dotenv, find_dotenv
+        load_dotenv(find_dotenv(usecwd=True), override=False)
+    except Exception:
+        pass
+
+
 class WePublicDefender:
     """
     Adversarial legal review system using multiple AI providers.
@@ -55,24 +116,33 @@ class WePublicDefender:
         Loads configurations from package config files:
         - llm_providers.json: Provider configs, pricing, capabilities
         - legal_review_settings.json: Agent and workflow configs
+
+        Construction is cheap: both files come from memoized loaders and no
+        provider client is built here. `openai_client` / `grok_client` are
+        borrowed from the shared client pool on first use, so guidance-only
+        runs never pay for SDK clients.
         """
-        # Load .env if present (supports system env vars by default)
-        try:
-            from dotenv import load_dotenv, find_dotenv
-            load_dotenv(find_dotenv(usecwd=True), override=False)
-        except Exception:
-            pass
-        # Load configurations from package
-        self.llm_config = load_llm_providers()
-        self.review_settings = load_review_settings()
+        # Load .env if present (supports system env vars by default); once per process
+        _load_dotenv_once()
+        # Review settings are memoized until the files change; each instance gets its own copy
+        self.review_settings = get_review_settings()
+
+        # Token tracker reads pricing from the memoized resolved config
+        self.token_tracker = TokenTracker()
+
+        # LLM response cache: "use" (read+write), "refresh" (write only), "off"
+        self.cache_mode: CacheMode = "use"
+        self._response_cache: Optional[ResponseCache] = None
 
-        # Initialize clients
-        self.openai_client = self._create_openai_client()
-        self.grok_client = self._create_grok_client()
+        # Per-model latency history used to decide when to hedge slow calls
+        self.latency_history = LatencyHistory(self.token_tracker)
 
-        # Initialize token tracker with model configurations
-        models_config = self.llm_config["modelConfigurations"]
-        self.token_tracker = TokenTracker(models_config)
+        # Multi-model calls cut by a completion policy but left running (see completion.py)
+        self._stragglers: List["asyncio.Task[Dict[str, Any]]"] = []
+        self._late_results: List[Dict[str, Any]] = []
+
+        # Optional dollar budget shared by every external-llm call (see set_budget / budget.py)
+        self.budget: Optional[BudgetScheduler] = None
 
         # Store markdown format instructions
         self.markdown_format_instructions = """
@@ -90,25 +160,57 @@ This format will be automatically converted to Word when ready for filing.
 """
 
         self.logger = get_logger()
-        self.logger.info("WePublicDefender initialized")
+        self._providers_logged = False
+        try:
+            self.logger.info("WePublicDefender initialized")
+        except Exception:
+            pass
+
+    @property
+    def llm_config(self) -> Dict[str, Any]:
+        """Merged llm_providers.json (package + per-case), memoized until the files change."""
+        return get_resolved_llm_config().root
+
+    @property
+    def openai_client(self):
+        """Pooled OpenAI client, created on first use (None without OPENAI_API_KEY)."""
+        return self._pooled_client("openai")
+
+    @property
+    def grok_client(self):
+        """Pooled xAI client (OpenAI-compatible), created on first use (None without XAI_API_KEY)."""
+        return self._pooled_client("xai")
+
+    def _pooled_client(self, provider_name: str):
+        root = self.llm_config
+        provider_cfg = root.get("llm_providers", {}).get(provider_name)
+        if not provider_cfg:
+            return None
+        return get_client_pool().openai_client(provider_name, provider_cfg, root)
+
+    def _log_providers_once(self) -> None:
+        """Log configured providers/models on the first external call (keeps construction cheap)."""
+        if self._providers_logged:
+            return
+        self._providers_logged = True
         try:
             self.logger.info(
                 "Providers: %s | Models: %s",
                 list(self.llm_config['llm_providers'].keys()),
-                list(models_config.keys()),
+                list(self.llm_config['modelConfigurations'].keys()),
             )
         except Exception:
             pass
 
-    def _build_jurisdiction_context(
+    def _resolve_jurisdiction(
         self,
         *,
         jurisdiction: Optional[str] = None,
         court: Optional[str] = None,
         circuit: Optional[str] = None,
         preferred_authority_order: Optional[List[str]] = None,
-    ) -> Optional[str]:
-        """Create a jurisdiction context string for prompts based on settings + overrides."""
+    ) -> Dict[str, Any]:
+        """Merge workflowConfig.jurisdictionConfig with per-call overrides."""
         wf = self.review_settings.get("workflowConfig", {})
         jcfg = dict(wf.get("jurisdictionConfig", {}) or {})
 
@@ -121,6 +223,23 @@ This format will be automatically converted to Word when ready for filing.
             jcfg["circuit"] = circuit
         if preferred_authority_order is not None:
             jcfg["preferred_authority_order"] = preferred_authority_order
+        return jcfg
+
+    def _build_jurisdiction_context(
+        self,
+        *,
+        jurisdiction: Optional[str] = None,
+        court: Optional[str] = None,
+        circuit: Optional[str] = None,
+        preferred_authority_order: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Create a jurisdiction context string for prompts based on settings + overrides."""
+        jcfg = self._resolve_jurisdiction(
+            jurisdiction=jurisdiction,
+            court=court,
+            circuit=circuit,
+            preferred_authority_order=preferred_authority_order,
+        )
 
         # If we have nothing, return None
         if not any(jcfg.get(k) for k in ("jurisdiction", "court", "circuit", "preferred_authority_order")):
@@ -170,28 +289,36 @@ This format will be automatically converted to Word when ready for filing.
         return mapping.get(agent_type, (None, False))
 
     def _schema_block(self, model_cls: Type[BaseModel]) -> str:
-        schema = model_cls.model_json_schema()
-        return (
-            "You MUST return ONLY JSON matching this JSON schema (no extra text):\n"
-            + json.dumps(schema, indent=2)
-        )
+        return schema_block(model_cls)
 
     def _parse_json_payload(self, text: str) -> Any:
-        """Attempt to parse JSON from text; try to extract JSON substring if needed."""
+        """Attempt to parse JSON from text; extract the embedded JSON value if needed."""
+        return parse_json_payload(text)
+
+    def _repair_structured(
+        self,
+        agent_type: str,
+        model: str,
+        text: str,
+        model_cls: Type[BaseModel],
+        expects_list: bool,
+    ) -> Optional[Tuple[Any, Any, List[str]]]:
+        """Locally repair unparseable output (see json_repair.py); log the outcome and running success rate."""
+        outcome = repair_structured(text, model_cls, expects_list)
+        stats = repair_stats()
         try:
-            return json.loads(text)
+            self.logger.info(
+                "JSON repair %s | agent=%s | model=%s | steps=%s | success_rate=%d/%d",
+                "ok" if outcome is not None else "failed",
+                agent_type,
+                model,
+                ",".join(outcome[2]) if outcome is not None else "-",
+                stats["repaired"],
+                stats["attempts"],
+            )
         except Exception:
-            # Try to extract JSON object or array heuristically
-            obj_match = re.search(r"\{[\s\S]*\}", text)
-            arr_match = re.search(r"\[[\s\S]*\]", text)
-            snippet = None
-            if arr_match:
-                snippet = arr_match.group(0)
-            elif obj_match:
-                snippet = obj_match.group(0)
-            if snippet:
-                return json.loads(snippet)
-            raise
+            pass
+        return outcome
 
     def _load_agent_prompt(self, agent_type: str) -> str:
         """
@@ -208,7 +335,7 @@ This format will be automatically converted to Word when ready for filing.
         if agent_type == "citation_verify":
             file_agent_type = "citation_verify"  # Keep as is for the file
 
-        prompt_file = Path(__file__).parent / "prompts" / "agent_prompts" / f"{file_agent_type}.md"
+        prompt_file = prompt_path(file_agent_type)
 
         # Fallback to simple prompts if file doesn't exist
         simple_prompts = {
@@ -390,31 +517,206 @@ This format will be automatically converted to Word when ready for filing.
             self.logger.warning(f"Failed to generate claude_prompt for {agent_type}: {e}")
             return None
 
-    def _create_openai_client(self):
-        """Create OpenAI client from environment."""
-        if OpenAI is None:
-            raise ImportError("OpenAI library not installed")
+    def _get_response_cache(self) -> ResponseCache:
+        """Return the on-disk response cache, created on first use."""
+        if self._response_cache is None:
+            cfg = resolve_cache_config(self.review_settings)
+            self._response_cache = ResponseCache(max_size_mb=cfg.get("max_size_mb", 256))
+        return self._response_cache
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("Warning: OPENAI_API_KEY not set in environment")
-            return None
+    async def _complete(
+        self,
+        agent_type: str,
+        cache_mode: Optional[CacheMode],
+        on_delta: Optional[Callable[[str], Any]] = None,
+        **call_kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Run async_chat_complete through the response cache.
+
+        Hits return the stored text/usage/meta with usage["cache_hit"] = True
+        and are not re-billed. Only non-empty responses are stored. When
+        `on_delta` is given the call is streamed (a cache hit delivers its
+        text as a single delta).
+        """
+        if on_delta is not None:
+            call_kwargs["stream"] = True
+            call_kwargs["on_delta"] = on_delta
+
+        mode = cache_mode or self.cache_mode
+        cache_cfg = resolve_cache_config(self.review_settings)
+        if mode == "off" or not cache_cfg.get("enabled", True):
+            return await async_chat_complete(**call_kwargs)
+
+        model = call_kwargs["model_key"]
+        web_search = bool(call_kwargs.get("web_search", False))
+        profile = get_resolved_llm_config().profile(model)
+        key = make_cache_key(
+            model_key=model,
+            wire_model=profile.wire_model if profile else model,
+            effort=call_kwargs.get("effort"),
+            service_tier=call_kwargs.get("service_tier"),
+            web_search=web_search,
+            pydantic_model=call_kwargs.get("pydantic_model"),
+            messages=call_kwargs["messages"],
+        )
+        cache = self._get_response_cache()
+
+        if mode == "use":
+            started = time.time()
+            agent_config = self.review_settings.get("reviewAgentConfig", {}).get(
+                self._resolve_agent_key(agent_type)
+            )
+            entry = await cache.get_async(key, resolve_ttl_seconds(cache_cfg, agent_config, web_search))
+            if entry is not None:
+                usage = dict(entry.get("usage", {}))
+                usage["original_duration"] = usage.get("duration", 0.0)
+                usage["duration"] = time.time() - started
+                usage["cache_hit"] = True
+                try:
+                    self.logger.info(
+                        "Response cache hit | agent=%s | model=%s | key=%s",
+                        agent_type,
+                        model,
+                        key[:12],
+                    )
+                except Exception:
+                    pass
+                if on_delta is not None:
+                    on_delta(entry.get("text", ""))
+                return {"text": entry.get("text", ""), "usage": usage, "meta": entry.get("meta", {}), "raw": None}
 
-        return OpenAI(api_key=api_key)
+        result = await async_chat_complete(**call_kwargs)
+        if result.get("text"):
+            await cache.put_async(key, result, agent=agent_type, model=model)
+        return result
 
-    def _create_grok_client(self):
-        """Create Grok client (OpenAI-compatible) from environment."""
-        if OpenAI is None:
-            raise ImportError("OpenAI library not installed")
+    def _hedge_result_valid(
+        self,
+        result: Dict[str, Any],
+        model_cls: Optional[Type[BaseModel]],
+        expects_list: bool,
+    ) -> bool:
+        """A hedge contender wins only with non-empty text that fits the agent schema."""
+        text = result.get("text", "")
+        if not text:
+            return False
+        if model_cls is None:
+            return True
+        try:
+            payload = self._parse_json_payload(text)
+            items = payload if isinstance(payload, list) else [payload]
+            if not expects_list and not isinstance(payload, dict):
+                return False
+            for item in items:
+                model_cls.model_validate(item)
+            return True
+        except Exception:
+            return False
 
-        api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
-            print("Warning: XAI_API_KEY not set in environment")
-            return None
+    async def _complete_hedged(
+        self,
+        agent_type: str,
+        agent_config: Optional[Dict[str, Any]],
+        cache_mode: Optional[CacheMode],
+        on_delta: Optional[Callable[[str], Any]],
+        model_cls: Optional[Type[BaseModel]],
+        expects_list: bool,
+        **call_kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Run `_complete`, hedging to the configured backup if the call outlives its latency threshold.
+
+        Without hedgingConfig enabled, a backup for this model, or enough
+        latency history, this is a plain `_complete` call. Only the primary
+        streams. Losing calls that completed are still billed: they are
+        tracked and listed in the winner's `usage["extra_billed"]` so budgets
+        see them. The hedge itself is recorded in the token tracker's hedge
+        ledger.
+        """
+        model = call_kwargs["model_key"]
+        cfg = resolve_hedge_config(self.review_settings, agent_config)
+        spec = (cfg.get("backups") or {}).get(model) if cfg.get("enabled") else None
+        delay = self.latency_history.threshold(model, cfg, call_kwargs.get("effort")) if spec else None
+        if delay is None:
+            return await self._complete(agent_type, cache_mode, on_delta=on_delta, **call_kwargs)
+
+        backup_kwargs = dict(call_kwargs, model_key=spec.get("model", model))
+        for key in ("service_tier", "effort"):
+            if spec.get(key):
+                backup_kwargs[key] = spec[key]
+        backup_model = backup_kwargs["model_key"]
+
+        result, outcome = await run_hedged(
+            lambda: self._complete(agent_type, cache_mode, on_delta=on_delta, **call_kwargs),
+            lambda: self._complete(agent_type, cache_mode, **backup_kwargs),
+            delay,
+            lambda r: self._hedge_result_valid(r, model_cls, expects_list),
+            label=f"{agent_type}:{model}",
+        )
+        if not outcome["fired"]:
+            return result
+
+        backup_usage: Optional[TokenUsage] = None
+        for role, res in outcome["completed"]:
+            u = res.get("usage", {}) or {}
+            role_model = model if role == "primary" else backup_model
+            if role == "backup" and not u.get("cache_hit"):
+                backup_usage = TokenUsage(
+                    model=backup_model,
+                    input=int(u.get("input", 0)),
+                    output=int(u.get("output", 0)),
+                    cached=int(u.get("cached", 0)),
+                    service_tier=str(u.get("service_tier", "auto")),
+                    duration=float(u.get("duration", 0.0)),
+                )
+            if res is not result:
+                # Completed but lost (invalid output): still billed
+                self._track_usage(role_model, u, notes=f"agent:{agent_type}:hedge-{role}")
+                result.setdefault("usage", {}).setdefault("extra_billed", []).append(self._billed_usage(role_model, u))
+
+        self.token_tracker.add_hedge(
+            HedgeEvent(
+                primary_model=model,
+                backup_model=backup_model,
+                threshold=delay,
+                winner=outcome["winner"],
+                backup_usage=backup_usage,
+                notes=f"agent:{agent_type}",
+            )
+        )
+        result.setdefault("usage", {})["hedge"] = {
+            "threshold": delay,
+            "winner": outcome["winner"],
+            "backup_model": backup_model,
+            "billed_model": backup_model if outcome["winner"] == "backup" else model,
+        }
+        return result
+
+    @staticmethod
+    def _billed_usage(model: str, u: Dict[str, Any]) -> Dict[str, Any]:
+        """The pricing fields of an extra billed call, for `usage["extra_billed"]`."""
+        return {
+            "model": model,
+            "input": int(u.get("input", 0) or 0),
+            "output": int(u.get("output", 0) or 0),
+            "cached": int(u.get("cached", 0) or 0),
+            "service_tier": u.get("service_tier", "auto"),
+            "cache_hit": bool(u.get("cache_hit")),
+        }
 
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://api.x.ai/v1"
+    def _track_usage(self, model: str, u: Dict[str, Any], notes: str) -> None:
+        """Record usage in the token tracker; cache hits go to the cache-hit ledger."""
+        record = self.token_tracker.add_cache_hit if u.get("cache_hit") else self.token_tracker.add
+        record(
+            model=model,
+            inp=int(u.get("input", 0)),
+            out=int(u.get("output", 0)),
+            cache=int(u.get("cached", 0)),
+            effort=u.get("effort", None),
+            notes=notes,
+            service_tier=str(u.get("service_tier", "auto")),
+            duration=float(u.get("duration", 0.0)),
         )
 
     async def call_agent(
@@ -430,6 +732,13 @@ This format will be automatically converted to Word when ready for filing.
         override_court: Optional[str] = None,
         override_circuit: Optional[str] = None,
         override_preferred_authority: Optional[List[str]] = None,
+        cache_mode: Optional[CacheMode] = None,
+        stream: bool = False,
+        on_delta: Optional[Callable[[str, str, str], Any]] = None,
+        completion_policy: Optional[str] = None,
+        chunked: Optional[bool] = None,
+        per_citation: Optional[bool] = None,
+        budget: Optional[float] = None,
         **kwargs
     ) -> Dict:
         """
@@ -451,6 +760,26 @@ This format will be automatically converted to Word when ready for filing.
                   NOTE: organize and fact_verify ONLY support guidance mode (need file access)
             web_search: Override web search setting
             override_model: Run single specific model (bypasses multi-model)
+            cache_mode: Response cache policy - "use", "refresh" (skip lookup,
+                        store fresh result) or "off" (default: self.cache_mode)
+            stream: Stream responses; partial output is written to
+                    .wepublic_defender/reviews/*.partial.md while in flight
+            on_delta: Optional callback(agent_type, model, delta) for streamed text
+                    (its `start(agent_type, model)` method, if any, is called
+                    before each request)
+            completion_policy: When a multi-model call returns - "all",
+                    "first_success", "quorum:k" or "deadline:<seconds>"
+                    (default: completionConfig / agent `completion_policy`)
+            chunked: Map-reduce long documents section by section (self_review,
+                    citation_verify, final_review); None follows chunkingConfig /
+                    agent `chunked`, False always sends the whole document
+            per_citation: citation_verify only - verify each extracted citation
+                    in its own cached call; None follows perCitationConfig /
+                    agent `per_citation`
+            budget: Dollar cap for this call alone; model, effort and service
+                    tier are chosen to fit it and optional extra models are
+                    downgraded or skipped (default: the set_budget scheduler,
+                    if any). Raises BudgetExceededError if nothing fits
             **kwargs: Additional context for prompt
 
         Returns:
@@ -469,7 +798,13 @@ This format will be automatically converted to Word when ready for filing.
                 "text": "...",
                 "usage": {...},
                 "multi_model": true,  # If multiple models ran
-                "alternate_results": [...]  # If multiple models ran
+                "alternate_results": [...],  # If multiple models ran
+                "completion": {  # If multiple models ran
+                    "policy": "quorum:2",
+                    "completed": ["gpt-5", "grok-4"],
+                    "cut": ["gpt-5-mini"],
+                    "stragglers": "detach"
+                }
             }
 
         Example:
@@ -494,6 +829,7 @@ This format will be automatically converted to Word when ready for filing.
             return self._load_guidance(agent_type, document, **kwargs)
 
         # For external-llm mode, proceed with API calls
+        self._log_providers_once()
         # Get agent config from review settings
         agent_key = self._resolve_agent_key(agent_type)
         agent_config = self.review_settings.get("reviewAgentConfig", {}).get(agent_key)
@@ -505,6 +841,35 @@ This format will be automatically converted to Word when ready for filing.
         elif agent_config.get("model"):
             candidates = [agent_config["model"]]
 
+        # Under a budget, pick model/effort/tier per call before anything is sent
+        scheduler = BudgetScheduler(budget, self.token_tracker, self.review_settings) if budget is not None else self.budget
+        plan: Optional[BudgetPlan] = None
+        if scheduler is not None:
+            plan = self._plan_budget(
+                scheduler,
+                agent_type,
+                [override_model] if override_model else candidates,
+                agent_config,
+                document,
+                override_effort=override_effort,
+                override_service_tier=override_service_tier,
+                override_jurisdiction=override_jurisdiction,
+                override_court=override_court,
+                override_circuit=override_circuit,
+                override_preferred_authority=override_preferred_authority,
+            )
+            candidates = [c.model for c in plan.calls]
+            override_model = candidates[0] if len(candidates) == 1 else None
+
+        def effort_for(model: str) -> Optional[str]:
+            return plan.call(model).effort or override_effort if plan is not None else override_effort
+
+        def tier_for(model: str) -> Optional[str]:
+            return plan.call(model).service_tier if plan is not None else override_service_tier
+
+        def preflight_for(model: str) -> Optional[TokenEstimate]:
+            return plan.call(model).estimate if plan is not None else None
+
         # Multi-model logic: run all models in parallel if 2+ configured and no override
         if len(candidates) > 1 and not override_model:
             try:
@@ -517,28 +882,75 @@ This format will be automatically converted to Word when ready for filing.
             except Exception:
                 pass
 
+            completion = resolve_completion_config(self.review_settings, agent_config, completion_policy)
+            policy = parse_completion_policy(completion["policy"])
+
             # Run all models in parallel
-            tasks = [
-                self._run_single_model(
-                    agent_type=agent_type,
-                    model=model,
-                    document=document,
-                    web_search=web_search,
-                    override_effort=override_effort,
-                    override_service_tier=override_service_tier,
-                    override_jurisdiction=override_jurisdiction,
-                    override_court=override_court,
-                    override_circuit=override_circuit,
-                    override_preferred_authority=override_preferred_authority,
+            calls = [
+                (
+                    model,
+                    self._run_single_model(
+                        agent_type=agent_type,
+                        model=model,
+                        document=document,
+                        web_search=web_search,
+                        override_effort=effort_for(model),
+                        override_service_tier=tier_for(model),
+                        override_jurisdiction=override_jurisdiction,
+                        override_court=override_court,
+                        override_circuit=override_circuit,
+                        override_preferred_authority=override_preferred_authority,
+                        cache_mode=cache_mode,
+                        stream=stream,
+                        on_delta=on_delta,
+                        chunked=chunked,
+                        per_citation=per_citation,
+                        preflight=preflight_for(model),
+                        budget=scheduler,
+                    ),
                 )
                 for model in candidates
             ]
-            results = await asyncio.gather(*tasks)
+            try:
+                finished, cut = await run_with_policy(calls, policy, lambda r: not r.get("error"))
+            except BaseException as e:
+                if plan is not None:
+                    self._abandon_budget(scheduler, plan, e)
+                raise
+            detached = completion["stragglers"] != "cancel"
+            self._handle_stragglers(
+                agent_type,
+                cut,
+                completion["stragglers"],
+                budget=(scheduler, plan) if plan is not None else None,
+            )
+
+            # Keep configured model order; under an early-return policy successes come first
+            by_model = dict(finished)
+            results = [by_model[m] for m in candidates if m in by_model]
+            if policy.kind != "all":
+                results.sort(key=lambda r: bool(r.get("error")))
 
             # Primary result is first model, others are alternates
             primary = results[0]
             primary["multi_model"] = True
             primary["alternate_results"] = results[1:]
+            primary["completion"] = {
+                "policy": str(policy),
+                "completed": [name for name, _ in finished],
+                "cut": [name for name, _ in cut],
+                "stragglers": completion["stragglers"],
+            }
+            if plan is not None:
+                cut_models = [name for name, _ in cut]
+                self._record_budget(
+                    scheduler,
+                    plan,
+                    primary,
+                    results,
+                    pending=cut_models if detached else [],
+                    cancelled=[] if detached else cut_models,
+                )
 
             return primary
 
@@ -551,55 +963,479 @@ This format will be automatically converted to Word when ready for filing.
         if not model:
             raise ValueError(f"No model configured for agent {agent_type}")
 
-        return await self._run_single_model(
-            agent_type=agent_type,
-            model=model,
-            document=document,
-            web_search=web_search,
-            override_effort=override_effort,
-            override_service_tier=override_service_tier,
-            override_jurisdiction=override_jurisdiction,
-            override_court=override_court,
-            override_circuit=override_circuit,
-            override_preferred_authority=override_preferred_authority,
+        try:
+            result = await self._run_single_model(
+                agent_type=agent_type,
+                model=model,
+                document=document,
+                web_search=web_search,
+                override_effort=effort_for(model),
+                override_service_tier=tier_for(model),
+                override_jurisdiction=override_jurisdiction,
+                override_court=override_court,
+                override_circuit=override_circuit,
+                override_preferred_authority=override_preferred_authority,
+                cache_mode=cache_mode,
+                stream=stream,
+                on_delta=on_delta,
+                chunked=chunked,
+                per_citation=per_citation,
+                preflight=preflight_for(model),
+                budget=scheduler,
+            )
+        except BaseException as e:
+            if plan is not None:
+                self._abandon_budget(scheduler, plan, e)
+            raise
+        if plan is not None:
+            self._record_budget(scheduler, plan, result, [result])
+        return result
+
+    def set_budget(self, dollars: Optional[float]) -> Optional[BudgetScheduler]:
+        """
+        Cap the total spend of this instance's external-llm calls at `dollars` (None removes the cap).
+
+        Every later call_agent plans against what is left: it downgrades
+        tier, effort or model to fit, skips optional extra models, and raises
+        BudgetExceededError before sending a call that cannot fit.
+        `self.budget.report()` shows projected vs actual spend.
+        """
+        self.budget = (
+            BudgetScheduler(dollars, self.token_tracker, self.review_settings) if dollars is not None else None
         )
+        return self.budget
 
-    async def _run_single_model(
+    def _plan_budget(
         self,
+        scheduler: BudgetScheduler,
         agent_type: str,
-        model: str,
+        models: List[str],
+        agent_config: Dict[str, Any],
         document: str,
-        web_search: Optional[bool],
+        *,
         override_effort: Optional[str],
         override_service_tier: Optional[str],
         override_jurisdiction: Optional[str],
         override_court: Optional[str],
         override_circuit: Optional[str],
         override_preferred_authority: Optional[List[str]],
-    ) -> Dict:
-        """Run agent with single model. Extracted for parallel execution support."""
-        # Get agent config
-        agent_key = self._resolve_agent_key(agent_type)
-        agent_config = self.review_settings.get("reviewAgentConfig", {}).get(agent_key)
-        use_web_search = web_search if web_search is not None else agent_config.get("web_search", False)
+    ) -> BudgetPlan:
+        """Plan an agent call against the scheduler with the same prompt and effort/tier call_agent would use."""
+        if not models:
+            raise ValueError(f"No model configured for agent {agent_type}")
+        messages, model_cls, _ = self._build_messages(
+            agent_type,
+            document,
+            jurisdiction=override_jurisdiction,
+            court=override_court,
+            circuit=override_circuit,
+            preferred_authority=override_preferred_authority,
+        )
+        workflow = self.review_settings.get("workflowConfig", {})
+        effort = override_effort if override_effort is not None else (agent_config.get("effort") or workflow.get("default_effort"))
+        service_tier = override_service_tier or workflow.get("service_tier", "auto")
+        return scheduler.plan(agent_type, models, messages, model_cls, effort=effort, service_tier=service_tier)
 
-        # Load enhanced prompt from file (or fallback to simple prompt)
-        base_role = self._load_agent_prompt(agent_type)
+    def _record_budget(
+        self,
+        scheduler: BudgetScheduler,
+        plan: BudgetPlan,
+        primary: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        pending: Sequence[str] = (),
+        cancelled: Sequence[str] = (),
+    ) -> None:
+        """
+        Book the actual cost of a planned call and attach the budget summary to its result.
 
-        # Prepare messages for OpenAI-compatible chat
-        sys_content = f"{base_role}\n\n{self.markdown_format_instructions}".strip()
-        jctx = self._build_jurisdiction_context(
+        Detached models (`pending`) stay reserved until `_save_straggler`
+        settles them; models cut by a cancelling policy are charged their
+        input share.
+        """
+        actual = scheduler.record(plan, results, pending=pending, cancelled=cancelled)
+        primary["budget"] = {
+            "projected": round(plan.projected_cost, 6),
+            "actual": round(actual, 6),
+            "remaining": round(scheduler.budget - scheduler.spent(), 6),
+            "changes": [ch for c in plan.calls for ch in c.changes],
+            "skipped": plan.skipped,
+        }
+        if pending:
+            primary["budget"]["pending"] = list(pending)
+
+    @staticmethod
+    def _abandon_budget(scheduler: BudgetScheduler, plan: BudgetPlan, exc: BaseException) -> None:
+        """Settle a plan whose call raised: cancelled in flight pays the input share, anything else releases."""
+        if isinstance(exc, (asyncio.CancelledError, KeyboardInterrupt)):
+            scheduler.cancel(plan)
+        else:
+            scheduler.release(plan)
+
+    def _handle_stragglers(
+        self,
+        agent_type: str,
+        cut: List[Tuple[str, "asyncio.Task[Dict[str, Any]]"]],
+        mode: str,
+        budget: Optional[Tuple[BudgetScheduler, BudgetPlan]] = None,
+    ) -> None:
+        """Cancel calls cut by a completion policy, or leave them running and save their output when done."""
+        for model, task in cut:
+            if mode == "cancel":
+                task.cancel()
+                continue
+            self._stragglers.append(task)
+            task.add_done_callback(
+                lambda t, model=model: self._save_straggler(agent_type, model, t, budget)
+            )
+
+    def _save_straggler(
+        self,
+        agent_type: str,
+        model: str,
+        task: "asyncio.Task[Dict[str, Any]]",
+        budget: Optional[Tuple[BudgetScheduler, BudgetPlan]] = None,
+    ) -> None:
+        """Done-callback for a detached model call: settle its budget reservation and write reviews/*.late.json."""
+        if task in self._stragglers:
+            self._stragglers.remove(task)
+        if task.cancelled():
+            if budget is not None:
+                budget[0].settle(budget[1], model, None)
+            return
+        exc = task.exception()
+        result = {"model": model, "error": str(exc)} if exc is not None else task.result()
+        if budget is not None:
+            budget[0].settle(budget[1], model, result)
+        late = {"agent": agent_type, "model": model, "result": result}
+        try:
+            out_dir = reviews_dir()
+            out_dir.mkdir(parents=True, exist_ok=True)
+            ts = time.strftime("%Y%m%d_%H%M%S")
+            path = out_dir / f"{ts}_{agent_type}_{model}.late.json"
+            queue_json(path, late)
+            late["saved_to"] = str(path)
+        except Exception as e:
+            late["save_error"] = str(e)
+        self._late_results.append(late)
+        try:
+            self.logger.info(
+                "Late model result | agent=%s | model=%s | error=%s | saved_to=%s",
+                agent_type,
+                model,
+                bool(result.get("error")),
+                late.get("saved_to"),
+            )
+        except Exception:
+            pass
+
+    async def wait_for_stragglers(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Wait for detached multi-model calls to finish and return their late results.
+
+        Each entry is {"agent", "model", "result", "saved_to"}. Calls still
+        running after `timeout` seconds are cancelled.
+        """
+        pending = list(self._stragglers)
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.gather(*still_running, return_exceptions=True)
+            # Let done-callbacks scheduled by the final completions run
+            await asyncio.sleep(0)
+            await self.flush()
+        late, self._late_results = self._late_results, []
+        return late
+
+    async def flush(self) -> None:
+        """
+        Wait for queued side effects (usage CSV, citation log, saved reviews) to reach disk.
+
+        Agent calls queue these writes on a background writer instead of
+        blocking the event loop; call this before reading those files back
+        or before the event loop exits.
+        """
+        await get_side_effect_writer().flush()
+
+    def estimate_agent_call(
+        self,
+        agent_type: str,
+        document: str,
+        override_model: Optional[str] = None,
+        override_service_tier: Optional[str] = None,
+        override_jurisdiction: Optional[str] = None,
+        override_court: Optional[str] = None,
+        override_circuit: Optional[str] = None,
+        override_preferred_authority: Optional[List[str]] = None,
+    ) -> List[TokenEstimate]:
+        """
+        Estimate input tokens and cost of an external-llm agent call without sending it.
+
+        Returns one TokenEstimate per model `call_agent` would run (the
+        override model, or every configured model). Estimates that do not fit
+        the context window have `fits=False` and a `reason`; no rerouting is
+        applied here.
+        """
+        models = self._candidate_models(agent_type, override_model)
+        messages, model_cls, _ = self._build_messages(
+            agent_type,
+            document,
             jurisdiction=override_jurisdiction,
             court=override_court,
             circuit=override_circuit,
-            preferred_authority_order=override_preferred_authority,
+            preferred_authority=override_preferred_authority,
         )
-        if jctx:
-            sys_content = f"{sys_content}\n\n{jctx}"
+        service_tier = override_service_tier or self.review_settings.get("workflowConfig", {}).get("service_tier", "auto")
+        resolved = get_resolved_llm_config()
+        return [
+            estimate_request(
+                model,
+                messages,
+                max_output_tokens=resolved.model_config(model).get("max_output_tokens"),
+                service_tier=service_tier,
+                pydantic_model=model_cls,
+            )
+            for model in models
+        ]
+
+    def _candidate_models(self, agent_type: str, override_model: Optional[str] = None) -> List[str]:
+        """Models `call_agent` would run for an agent: the override, or every configured model."""
+        if override_model:
+            return [override_model]
+        agent_config = self.review_settings.get("reviewAgentConfig", {}).get(
+            self._resolve_agent_key(agent_type)
+        ) or {}
+        if isinstance(agent_config.get("models"), list):
+            return [m for m in agent_config["models"] if isinstance(m, str) and m]
+        return [agent_config["model"]] if agent_config.get("model") else []
 
-        # Determine if we expect structured JSON output
+    def submit_agent_batch(self, calls: List[Dict[str, Any]], label: str = "", extra: Optional[Dict[str, Any]] = None) -> BatchJob:
+        """
+        Submit external-llm agent calls as one OpenAI Batch job (billed at the batch discount).
+
+        Each call is a dict with "agent_type" and "document", an optional
+        "key" (defaults to the agent type; results are grouped by it) and the
+        same optional overrides as call_agent: override_model, web_search,
+        override_effort, override_jurisdiction, override_court,
+        override_circuit, override_preferred_authority. Every configured
+        model becomes one batch request; models without a batch endpoint
+        (xAI) are recorded in `job.skipped`.
+
+        Returns:
+            The persisted BatchJob; pass `job.id` to collect_agent_batch later
+        """
+        default_effort = self.review_settings.get("workflowConfig", {}).get("default_effort")
+        items: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        skipped: List[Dict[str, Any]] = []
+        for index, call in enumerate(calls):
+            agent_type = call["agent_type"]
+            key = call.get("key") or agent_type
+            agent_config = self.review_settings.get("reviewAgentConfig", {}).get(
+                self._resolve_agent_key(agent_type)
+            ) or {}
+            web_search = call.get("web_search")
+            use_web_search = web_search if web_search is not None else agent_config.get("web_search", False)
+            override_effort = call.get("override_effort")
+            effort = override_effort if override_effort is not None else (agent_config.get("effort") or default_effort)
+            messages, model_cls, _ = self._build_messages(
+                agent_type,
+                call["document"],
+                jurisdiction=call.get("override_jurisdiction"),
+                court=call.get("override_court"),
+                circuit=call.get("override_circuit"),
+                preferred_authority=call.get("override_preferred_authority"),
+            )
+            for order, model in enumerate(self._candidate_models(agent_type, call.get("override_model"))):
+                model_cfg = get_resolved_llm_config().model_config(model)
+                estimate = check_context_window(
+                    model,
+                    messages,
+                    max_output_tokens=model_cfg.get("max_output_tokens"),
+                    pydantic_model=model_cls,
+                )
+                if estimate.rerouted_from:
+                    model = estimate.model_key
+                    model_cfg = get_resolved_llm_config().model_config(model)
+                if not batch_supported(model):
+                    skipped.append({"key": key, "agent": agent_type, "model": model, "reason": "no batch endpoint"})
+                    continue
+                line, ctx = build_batch_request(
+                    f"{index}-{agent_type}-{model}",
+                    model,
+                    messages,
+                    temperature=model_cfg.get("temperature", 0.01),
+                    max_output_tokens=estimate.max_output_tokens or model_cfg.get("max_output_tokens"),
+                    effort=effort,
+                    web_search=use_web_search,
+                    pydantic_model=model_cls,
+                )
+                items.append((line, {
+                    "key": key,
+                    "agent": agent_type,
+                    "model": model,
+                    "order": order,
+                    "web_search": use_web_search,
+                    "effort": effort,
+                    "file_label": self._usage_label(call["document"]),
+                    "rerouted_from": estimate.rerouted_from,
+                    "ctx": ctx,
+                }))
+        if not items:
+            raise ValueError(
+                "No batchable requests: only OpenAI Responses API models support batch mode "
+                f"(skipped: {', '.join(s['agent'] + '/' + s['model'] for s in skipped) or 'none'})"
+            )
+        return submit_batch(items, label=label, skipped=skipped, extra=extra)
+
+    async def collect_agent_batch(
+        self,
+        batch_id: str,
+        wait: bool = False,
+        max_wait: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Check a submitted batch and, once complete, turn its output into agent results.
+
+        Results have the same shape as call_agent's external-llm output
+        (multi-model calls return the first model's result with
+        `multi_model` and `alternate_results`) and their usage is tracked and
+        logged like a live call, priced at the batch discount.
+
+        Args:
+            batch_id: Id returned by submit_agent_batch
+            wait: Poll with backoff until the job finishes (up to max_wait seconds)
+
+        Returns:
+            {"batch_id", "status", "request_counts", "skipped", "extra",
+             "results": {key: agent result}} - results is empty until the
+             job has completed
+        """
+        job = load_job(batch_id)
+        if not job.done:
+            if wait:
+                job = await asyncio.to_thread(wait_for_batch, job, max_wait=max_wait)
+            else:
+                job = await asyncio.to_thread(refresh_batch, job)
+        out: Dict[str, Any] = {
+            "batch_id": job.id,
+            "status": job.status,
+            "request_counts": job.request_counts,
+            "skipped": job.skipped,
+            "extra": job.extra,
+            "results": {},
+        }
+        if job.status != "completed":
+            return out
+
+        raw_results = await asyncio.to_thread(fetch_batch_results, job)
+        inputs = read_batch_input(job)
+        grouped: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for cid, meta in job.requests.items():
+            agent_type, model = meta["agent"], meta["model"]
+            raw = raw_results[cid]
+            if "error" in raw:
+                res: Dict[str, Any] = {
+                    "model": model,
+                    "web_search": meta.get("web_search", False),
+                    "error": raw["error"],
+                    "note": "Batch request failed",
+                    "batch_id": job.id,
+                }
+            else:
+                model_cls, expects_list = self._agent_model(agent_type)
+                res = await self._finish_agent_result(
+                    agent_type,
+                    model,
+                    raw,
+                    messages=(inputs.get(cid) or {}).get("body", {}).get("input", []),
+                    model_cls=model_cls,
+                    expects_list=expects_list,
+                    use_web_search=bool(meta.get("web_search", False)),
+                    effort=meta.get("effort"),
+                    cache_mode="off",
+                    file_label=meta.get("file_label", "text"),
+                    rerouted_from=meta.get("rerouted_from"),
+                )
+                res["batch_id"] = job.id
+            grouped.setdefault(meta["key"], []).append((int(meta.get("order", 0)), res))
+
+        for key, entries in grouped.items():
+            ordered = [r for _, r in sorted(entries, key=lambda e: e[0])]
+            primary = ordered[0]
+            if len(ordered) > 1:
+                primary["multi_model"] = True
+                primary["alternate_results"] = ordered[1:]
+            out["results"][key] = primary
+
+        job.collected_at = time.time()
+        save_job(job)
+        try:
+            self.logger.info("Batch collected | id=%s | results=%s", job.id, len(job.requests))
+        except Exception:
+            pass
+        return out
+
+    def _build_messages(
+        self,
+        agent_type: str,
+        document: str,
+        jurisdiction: Optional[str] = None,
+        court: Optional[str] = None,
+        circuit: Optional[str] = None,
+        preferred_authority: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, str]], Optional[Type[BaseModel]], bool]:
+        """
+        Return (messages, schema model, expects_list) for an agent call.
+
+        Layout is ordered for provider prompt caching: a static, byte-identical
+        system prefix per agent (prompt file, format rules, schema) first, then
+        the per-call jurisdiction context as its own system message, then the
+        document. Both parts are rendered once and served from the
+        process-wide prompt cache after that.
+        """
         model_cls, expects_list = self._agent_model(agent_type)
+        cache = get_prompt_cache()
+        static = cache.get(
+            ("static", agent_type, model_cls, self.markdown_format_instructions),
+            agent_type,
+            lambda: self._render_static_prompt(agent_type, model_cls),
+        )
+        jcfg = self._resolve_jurisdiction(
+            jurisdiction=jurisdiction,
+            court=court,
+            circuit=circuit,
+            preferred_authority_order=preferred_authority,
+        )
+        jctx = cache.get(
+            (
+                "jurisdiction",
+                jcfg.get("jurisdiction"),
+                jcfg.get("court"),
+                jcfg.get("circuit"),
+                tuple(jcfg.get("preferred_authority_order") or ()),
+            ),
+            "jurisdiction",
+            lambda: self._build_jurisdiction_context(
+                jurisdiction=jurisdiction,
+                court=court,
+                circuit=circuit,
+                preferred_authority_order=preferred_authority,
+            ) or "",
+        )
+        messages = [{"role": "system", "content": static}]
+        if jctx:
+            messages.append({"role": "system", "content": jctx})
+        messages.append({"role": "user", "content": document})
+        return messages, model_cls, expects_list
+
+    def _render_static_prompt(self, agent_type: str, model_cls: Optional[Type[BaseModel]]) -> str:
+        """Assemble an agent's static system prefix (prompt file, format rules, schema)."""
+        # Load enhanced prompt from file (or fallback to simple prompt)
+        base_role = self._load_agent_prompt(agent_type)
+        sys_content = f"{base_role}\n\n{self.markdown_format_instructions}".strip()
 
+        # Structured agents get the JSON schema appended
         if model_cls is not None:
             extra_rules = [self._schema_block(model_cls)]
             if agent_type == "citation_verify":
@@ -607,13 +1443,104 @@ This format will be automatically converted to Word when ready for filing.
                     "If multiple citations are present, return a JSON array of objects, one per citation."
                 )
             sys_content = f"{sys_content}\n\n" + "\n".join(extra_rules)
+        return sys_content
 
-        messages = [
-            {"role": "system", "content": sys_content},
-            {"role": "user", "content": document},
-        ]
+    async def _run_single_model(
+        self,
+        agent_type: str,
+        model: str,
+        document: str,
+        web_search: Optional[bool],
+        override_effort: Optional[str],
+        override_service_tier: Optional[str],
+        override_jurisdiction: Optional[str],
+        override_court: Optional[str],
+        override_circuit: Optional[str],
+        override_preferred_authority: Optional[List[str]],
+        cache_mode: Optional[CacheMode] = None,
+        stream: bool = False,
+        on_delta: Optional[Callable[[str, str, str], Any]] = None,
+        chunked: Optional[bool] = None,
+        per_citation: Optional[bool] = None,
+        preflight: Optional[TokenEstimate] = None,
+        budget: Optional[BudgetScheduler] = None,
+    ) -> Dict:
+        """
+        Run agent with single model. Extracted for parallel execution support.
+
+        `preflight` is the budget scheduler's estimate of the same prompt; its
+        token count is reused by the context check. The resulting estimate is
+        handed to the transport so the request is counted once. `budget`
+        decides whether a paid JSON retry may still be sent.
+        """
+        # Label this task's LLM calls so the rate limiter can queue fairly across agents
+        current_agent.set(agent_type)
+        # Get agent config
+        agent_key = self._resolve_agent_key(agent_type)
+        agent_config = self.review_settings.get("reviewAgentConfig", {}).get(agent_key)
+        use_web_search = web_search if web_search is not None else agent_config.get("web_search", False)
+
+        # Citation verification: one cached call per extracted citation (see citation_engine.py)
+        if agent_type == "citation_verify" and per_citation is not False:
+            cite_cfg = resolve_per_citation_config(self.review_settings, agent_config)
+            if cite_cfg.get("enabled") or per_citation:
+                citations = extract_citations(
+                    document,
+                    context_chars=int(cite_cfg.get("context_chars") or 1500),
+                    max_citations=cite_cfg.get("max_citations"),
+                )
+                if citations:
+                    return await self._run_per_citation(
+                        model,
+                        citations,
+                        max_concurrency=int(cite_cfg.get("max_concurrency") or 1),
+                        agent_config=agent_config,
+                        on_delta=on_delta,
+                        web_search=web_search,
+                        override_effort=override_effort,
+                        override_service_tier=override_service_tier,
+                        override_jurisdiction=override_jurisdiction,
+                        override_court=override_court,
+                        override_circuit=override_circuit,
+                        override_preferred_authority=override_preferred_authority,
+                        cache_mode=cache_mode,
+                    )
+                try:
+                    self.logger.info("No reporter citations extracted; verifying the whole document")
+                except Exception:
+                    pass
+
+        # Long documents: review section chunks concurrently and merge (see chunking.py)
+        if chunked is not False and agent_type in CHUNKABLE_AGENTS:
+            plan = self._chunk_plan(agent_config, model, document, force=chunked is True)
+            if plan is not None:
+                chunks, chunk_cfg = plan
+                return await self._run_chunked(
+                    agent_type,
+                    model,
+                    chunks,
+                    max_concurrency=int(chunk_cfg.get("max_concurrency") or 1),
+                    web_search=web_search,
+                    override_effort=override_effort,
+                    override_service_tier=override_service_tier,
+                    override_jurisdiction=override_jurisdiction,
+                    override_court=override_court,
+                    override_circuit=override_circuit,
+                    override_preferred_authority=override_preferred_authority,
+                    cache_mode=cache_mode,
+                )
+
+        messages, model_cls, expects_list = self._build_messages(
+            agent_type,
+            document,
+            jurisdiction=override_jurisdiction,
+            court=override_court,
+            circuit=override_circuit,
+            preferred_authority=override_preferred_authority,
+        )
 
         # Execute against configured model via provider-agnostic client
+        partial: Optional[PartialOutputWriter] = None
         try:
             try:
                 self.logger.info(
@@ -646,17 +1573,63 @@ This format will be automatically converted to Word when ready for filing.
 
             service_tier = override_service_tier or self.review_settings.get("workflowConfig", {}).get("service_tier", "auto")
 
-            # Run sync chat_complete in thread pool for true parallel execution
-            result = await asyncio.to_thread(
-                chat_complete,
+            model_cfg = get_resolved_llm_config().model_config(model)
+
+            # Pre-flight: fail fast (or move to a larger-context model) before paying a round trip
+            estimate = check_context_window(
+                model,
+                messages,
+                max_output_tokens=model_cfg.get("max_output_tokens"),
+                service_tier=service_tier,
+                pydantic_model=model_cls,
+                prior=preflight,
+            )
+            if estimate.rerouted_from:
+                model = estimate.model_key
+                model_cfg = get_resolved_llm_config().model_config(model)
+            try:
+                self.logger.info(
+                    "Agent estimate | agent=%s | model=%s | est_input=%s | est_cost=$%.4f | method=%s",
+                    agent_type,
+                    model,
+                    estimate.input_tokens,
+                    estimate.estimated_cost,
+                    estimate.method,
+                )
+            except Exception:
+                pass
+
+            # Streaming: persist deltas as they arrive and forward to the caller
+            handle_delta: Optional[Callable[[str], None]] = None
+            if stream:
+                partial = PartialOutputWriter.for_agent(agent_type, model)
+
+                def handle_delta(delta: str) -> None:
+                    partial.write(delta)
+                    if on_delta is not None:
+                        on_delta(agent_type, model, delta)
+
+                start = getattr(on_delta, "start", None)
+                if callable(start):
+                    start(agent_type, model)
+
+            # Native async transport: no executor thread is held while waiting
+            result = await self._complete_hedged(
+                agent_type,
+                agent_config,
+                cache_mode,
+                handle_delta,
+                model_cls,
+                expects_list,
                 model_key=model,
                 messages=messages,
-                temperature=self.llm_config["modelConfigurations"].get(model, {}).get("temperature", 0.01),
-                max_output_tokens=self.llm_config["modelConfigurations"].get(model, {}).get("max_output_tokens"),
+                temperature=model_cfg.get("temperature", 0.01),
+                max_output_tokens=model_cfg.get("max_output_tokens"),
                 service_tier=service_tier,
                 effort=effort,
                 web_search=use_web_search,
                 pydantic_model=model_cls,
+                estimate=estimate,
             )
         except Exception as e:
             # Surface minimal context; keep raw exception text
@@ -669,25 +1642,412 @@ This format will be automatically converted to Word when ready for filing.
                 )
             except Exception:
                 pass
-            return {
+            failed: Dict[str, Any] = {
                 "model": model,
                 "web_search": use_web_search,
                 "error": str(e),
                 "note": "LLM call failed; check API keys and provider availability",
             }
+            # Retry engine tags the final exception with its attempt history
+            if hasattr(e, "wpd_attempts"):
+                failed["attempts"] = e.wpd_attempts
+                failed["retry_errors"] = getattr(e, "wpd_retry_errors", [])
+            # Keep whatever streamed before the failure
+            partial_path = partial.close(keep=True) if partial is not None else None
+            if partial_path:
+                failed["partial_output"] = str(partial_path)
+            return failed
+
+        if partial is not None:
+            partial.close(keep=False)
+
+        return await self._finish_agent_result(
+            agent_type,
+            model,
+            result,
+            messages=messages,
+            model_cls=model_cls,
+            expects_list=expects_list,
+            use_web_search=use_web_search,
+            effort=effort,
+            cache_mode=cache_mode,
+            file_label=self._usage_label(document),
+            rerouted_from=estimate.rerouted_from,
+            service_tier=service_tier,
+            budget=budget,
+        )
 
-        # Track token usage
-        u = result.get("usage", {})
-        self.token_tracker.add(
-            model=model,
-            inp=int(u.get("input", 0)),
-            out=int(u.get("output", 0)),
-            cache=int(u.get("cached", 0)),
-            effort=u.get("effort", None),
-            notes=f"agent:{agent_type}",
-            service_tier=str(u.get("service_tier", "auto")),
-            duration=float(u.get("duration", 0.0)),
+    def _chunk_plan(
+        self,
+        agent_config: Optional[Dict[str, Any]],
+        model: str,
+        document: str,
+        force: bool = False,
+    ) -> Optional[Tuple[List[Chunk], Dict[str, Any]]]:
+        """Return (chunks, config) if this document should be reviewed in chunks, else None."""
+        cfg = resolve_chunking_config(self.review_settings, agent_config)
+        if not (cfg.get("enabled") or force):
+            return None
+        estimator = get_token_estimator()
+
+        def count(text: str) -> int:
+            return estimator.count(model, text)
+
+        if not force and count(document) < int(cfg.get("min_document_tokens") or 0):
+            return None
+        chunks = build_chunks(
+            document,
+            count,
+            max_tokens=max(1, int(cfg.get("max_chunk_tokens") or 1)),
+            overlap_tokens=int(cfg.get("overlap_tokens") or 0),
         )
+        return (chunks, cfg) if len(chunks) > 1 else None
+
+    async def _run_chunked(
+        self,
+        agent_type: str,
+        model: str,
+        chunks: List[Chunk],
+        max_concurrency: int,
+        **call_kwargs: Any,
+    ) -> Dict:
+        """
+        Map-reduce one model over document chunks and merge the structured outputs.
+
+        Each chunk is a normal single-model call (tracked, cached and logged
+        on its own). The merged output has the usual agent shape plus a
+        `chunked` entry with per-chunk timings.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        started = time.perf_counter()
+        try:
+            self.logger.info(
+                "Chunked review start | agent=%s | model=%s | chunks=%d | max_concurrency=%d",
+                agent_type,
+                model,
+                len(chunks),
+                max_concurrency,
+            )
+        except Exception:
+            pass
+
+        async def run_chunk(chunk: Chunk) -> Tuple[Chunk, Dict[str, Any], float, float]:
+            async with semaphore:
+                queued = time.perf_counter() - started
+                t0 = time.perf_counter()
+                res = await self._run_single_model(
+                    agent_type=agent_type,
+                    model=model,
+                    document=chunk.prompt(len(chunks)),
+                    chunked=False,
+                    **call_kwargs,
+                )
+                return chunk, res, queued, time.perf_counter() - t0
+
+        outputs = await asyncio.gather(*(run_chunk(c) for c in chunks))
+        wall = time.perf_counter() - started
+
+        timings = [
+            {
+                "index": chunk.index,
+                "sections": chunk.sections,
+                "tokens": chunk.tokens,
+                "queued": round(queued, 3),
+                "duration": round(duration, 3),
+                "model": res.get("model"),
+                "error": res.get("error"),
+            }
+            for chunk, res, queued, duration in outputs
+        ]
+        ok = [(chunk, res) for chunk, res, _, _ in outputs if not res.get("error") and res.get("structured") is not None]
+        failed = [t for t in timings if t["error"] or t["index"] not in {c.index for c, _ in ok}]
+
+        usages = [res.get("usage", {}) for _, res, _, _ in outputs]
+        usage: Dict[str, Any] = {
+            "input": sum(int(u.get("input", 0)) for u in usages),
+            "output": sum(int(u.get("output", 0)) for u in usages),
+            "cached": sum(int(u.get("cached", 0)) for u in usages),
+            "duration": wall,
+            "effort": next((u.get("effort") for u in usages if u.get("effort")), None),
+            "service_tier": next((u.get("service_tier") for u in usages if u.get("service_tier")), None),
+            "cache_hit": bool(usages) and all(u.get("cache_hit") for u in usages),
+        }
+        chunk_info = {"chunks": len(chunks), "max_concurrency": max_concurrency, "failed": len(failed), "timings": timings}
+
+        try:
+            self.logger.info(
+                "Chunked review done | agent=%s | model=%s | chunks=%d | failed=%d | wall=%.2fs | slowest=%.2fs",
+                agent_type,
+                model,
+                len(chunks),
+                len(failed),
+                wall,
+                max((t["duration"] for t in timings), default=0.0),
+            )
+        except Exception:
+            pass
+
+        if not ok:
+            return {
+                "model": model,
+                "agent": agent_type,
+                "error": f"All {len(chunks)} chunks failed: " + "; ".join(str(t["error"]) for t in failed if t["error"]),
+                "usage": usage,
+                "chunked": chunk_info,
+            }
+
+        parsed: Any = None
+        if agent_type == "citation_verify":
+            structured: Any = merge_citation_results([(c, r["structured"]) for c, r in ok])
+            try:
+                parsed = [CitationVerificationResult.model_validate(item) for item in structured]
+            except Exception:
+                parsed = None
+        else:
+            structured = merge_review_results([(c, r["structured"]) for c, r in ok])
+            if failed:
+                # A partial merge must not look like a clean bill of health
+                structured["ready_to_file"] = False
+            try:
+                parsed = DocumentReviewResult.model_validate(structured)
+            except Exception:
+                parsed = None
+
+        out: Dict[str, Any] = {
+            "model": model,
+            "web_search": ok[0][1].get("web_search"),
+            "agent": agent_type,
+            "text": dumps(structured, pretty=True),
+            "usage": usage,
+            "structured": structured,
+            "raw_json": structured,
+            "chunked": chunk_info,
+        }
+        if failed:
+            out["error_chunks"] = failed
+        claude_prompt = self._generate_claude_prompt(agent_type, parsed) if parsed is not None else None
+        if claude_prompt:
+            out["claude_prompt"] = claude_prompt
+        return out
+
+    async def _run_per_citation(
+        self,
+        model: str,
+        citations: List[ExtractedCitation],
+        max_concurrency: int,
+        agent_config: Optional[Dict[str, Any]],
+        on_delta: Optional[Callable[[str, str, str], Any]] = None,
+        cache_mode: Optional[CacheMode] = None,
+        **call_kwargs: Any,
+    ) -> Dict:
+        """
+        Verify each extracted citation in its own call and assemble the usual result list.
+
+        Verifications are cached under the normalized citation + propositions
+        (see `citation_cache_key`), so editing the draft around a citation does
+        not re-verify it. Each result is logged (and sent to `on_delta`) as it
+        arrives; the returned `structured` list is in document order and the
+        output carries a `per_citation` entry with per-citation timings.
+        """
+        agent_type = "citation_verify"
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        started = time.perf_counter()
+        mode = cache_mode or self.cache_mode
+        cache_cfg = resolve_cache_config(self.review_settings)
+        use_cache = mode != "off" and cache_cfg.get("enabled", True)
+        cache = ResponseCache(root=citation_cache_dir(), max_size_mb=cache_cfg.get("max_size_mb", 256))
+        web_search = call_kwargs.get("web_search")
+        use_web_search = web_search if web_search is not None else (agent_config or {}).get("web_search", False)
+        ttl = resolve_ttl_seconds(cache_cfg, agent_config, bool(use_web_search))
+        jurisdiction = self._resolve_jurisdiction(
+            jurisdiction=call_kwargs.get("override_jurisdiction"),
+            court=call_kwargs.get("override_court"),
+            circuit=call_kwargs.get("override_circuit"),
+            preferred_authority_order=call_kwargs.get("override_preferred_authority"),
+        )
+        done = 0
+        try:
+            self.logger.info(
+                "Per-citation verification start | model=%s | citations=%d | max_concurrency=%d",
+                model,
+                len(citations),
+                max_concurrency,
+            )
+        except Exception:
+            pass
+
+        async def verify(citation: ExtractedCitation) -> Dict[str, Any]:
+            nonlocal done
+            key = citation_cache_key(citation, model_key=model, jurisdiction=jurisdiction)
+            async with semaphore:
+                t0 = time.perf_counter()
+                outcome: Dict[str, Any] = {"citation": citation, "item": None, "usage": {}, "cache_hit": False, "error": None}
+                entry = await cache.get_async(key, ttl) if use_cache and mode == "use" else None
+                if entry is not None:
+                    usage = dict(entry.get("usage", {}))
+                    usage["original_duration"] = usage.get("duration", 0.0)
+                    usage["duration"] = time.perf_counter() - t0
+                    usage["cache_hit"] = True
+                    self._track_usage(model, usage, notes=f"agent:{agent_type}:citation_cache")
+                    try:
+                        outcome["item"] = loads(entry.get("text", ""))
+                    except ValueError:
+                        outcome["item"] = None
+                    outcome.update(usage=usage, cache_hit=outcome["item"] is not None)
+                if outcome["item"] is None:
+                    res = await self._run_single_model(
+                        agent_type=agent_type,
+                        model=model,
+                        document=citation.prompt(),
+                        chunked=False,
+                        per_citation=False,
+                        cache_mode=cache_mode,
+                        **call_kwargs,
+                    )
+                    item = pick_result(citation, res.get("structured"))
+                    if item is not None and citation.sections and not item.get("applies_to_sections"):
+                        item["applies_to_sections"] = list(citation.sections)
+                    outcome.update(item=item, usage=res.get("usage", {}), result=res)
+                    if item is None:
+                        outcome["error"] = res.get("error") or "no verification returned"
+                    elif use_cache:
+                        await cache.put_async(key, {"text": dumps(item), "usage": res.get("usage", {}), "meta": {}}, agent=agent_type, model=model)
+                outcome["duration"] = time.perf_counter() - t0
+
+            # Report each citation as soon as it is verified
+            done += 1
+            item = outcome["item"] or {}
+            status = "ERROR" if outcome["error"] else ("good law" if item.get("still_good_law") else "PROBLEM")
+            try:
+                self.logger.info(
+                    "Citation verified | %d/%d | %s | status=%s | supports=%s | cache_hit=%s | dur=%.2fs",
+                    done,
+                    len(citations),
+                    citation.citation,
+                    status,
+                    item.get("supports_position"),
+                    outcome["cache_hit"],
+                    outcome["duration"],
+                )
+            except Exception:
+                pass
+            if on_delta is not None:
+                on_delta(agent_type, model, f"[{done}/{len(citations)}] {citation.citation}: {status}\n")
+            return outcome
+
+        outcomes = await asyncio.gather(*(verify(c) for c in citations))
+        wall = time.perf_counter() - started
+
+        timings = [
+            {
+                "citation": o["citation"].citation,
+                "duration": round(o["duration"], 3),
+                "cache_hit": o["cache_hit"],
+                "error": o["error"],
+            }
+            for o in outcomes
+        ]
+        ok = [o for o in outcomes if o["item"] is not None]
+        failed = [t for t in timings if t["error"]]
+        usages = [o["usage"] for o in outcomes]
+        usage: Dict[str, Any] = {
+            "input": sum(int(u.get("input", 0)) for u in usages if not u.get("cache_hit")),
+            "output": sum(int(u.get("output", 0)) for u in usages if not u.get("cache_hit")),
+            "cached": sum(int(u.get("cached", 0)) for u in usages if not u.get("cache_hit")),
+            "duration": wall,
+            "effort": next((u.get("effort") for u in usages if u.get("effort")), None),
+            "service_tier": next((u.get("service_tier") for u in usages if u.get("service_tier")), None),
+            "cache_hit": bool(usages) and all(u.get("cache_hit") for u in usages),
+        }
+        cite_info = {
+            "citations": len(citations),
+            "verified": len(ok),
+            "cached": sum(1 for o in outcomes if o["cache_hit"]),
+            "failed": failed,
+            "max_concurrency": max_concurrency,
+            "timings": timings,
+        }
+
+        try:
+            self.logger.info(
+                "Per-citation verification done | model=%s | citations=%d | cached=%d | failed=%d | wall=%.2fs",
+                model,
+                len(citations),
+                cite_info["cached"],
+                len(failed),
+                wall,
+            )
+        except Exception:
+            pass
+
+        if not ok:
+            return {
+                "model": model,
+                "agent": agent_type,
+                "error": f"All {len(citations)} citation checks failed: " + "; ".join(str(t["error"]) for t in failed),
+                "usage": usage,
+                "per_citation": cite_info,
+            }
+
+        structured = [o["item"] for o in ok]
+        try:
+            parsed: Any = [CitationVerificationResult.model_validate(item) for item in structured]
+        except Exception:
+            parsed = None
+        out: Dict[str, Any] = {
+            "model": model,
+            "web_search": use_web_search,
+            "agent": agent_type,
+            "text": dumps(structured, pretty=True),
+            "usage": usage,
+            "structured": structured,
+            "raw_json": structured,
+            "per_citation": cite_info,
+        }
+        log_path = next((o["result"].get("citation_log") for o in ok if o.get("result", {}).get("citation_log")), None)
+        if log_path:
+            out["citation_log"] = log_path
+        claude_prompt = self._generate_claude_prompt(agent_type, parsed) if parsed is not None else None
+        if claude_prompt:
+            out["claude_prompt"] = claude_prompt
+        return out
+
+    @staticmethod
+    def _usage_label(document: str) -> str:
+        """Short label for the usage CSV's file column."""
+        return "text" if len(document) < 100 else document[:100] + "..."
+
+    async def _finish_agent_result(
+        self,
+        agent_type: str,
+        model: str,
+        result: Dict[str, Any],
+        *,
+        messages: List[Dict[str, str]],
+        model_cls: Optional[Type[BaseModel]],
+        expects_list: bool,
+        use_web_search: bool,
+        effort: Optional[str],
+        cache_mode: Optional[CacheMode] = None,
+        file_label: str = "text",
+        rerouted_from: Optional[str] = None,
+        service_tier: Optional[str] = None,
+        budget: Optional[BudgetScheduler] = None,
+    ) -> Dict:
+        """
+        Turn a raw completion into an agent output: track usage, parse the schema, log.
+
+        Shared by live calls (`_run_single_model`) and collected batch results
+        (`collect_agent_batch`), so both produce the same output shape. A paid
+        JSON retry is sent at `service_tier` (the tier the call ran at), only
+        if `budget` still affords it, and is added to `usage["extra_billed"]`.
+        """
+        model_cfg = get_resolved_llm_config().model_config(model)
+
+        # Track token usage (cache hits are recorded separately and not billed)
+        u = result.get("usage", {})
+        billed_model = (u.get("hedge") or {}).get("billed_model", model)
+        self._track_usage(billed_model, u, notes=f"agent:{agent_type}")
         # Log meta parameters used for the call
         try:
             meta = result.get("meta", {})
@@ -715,12 +2075,21 @@ This format will be automatically converted to Word when ready for filing.
                 u.get("cached"),
                 float(u.get("duration", 0.0)),
             )
+            if u.get("streamed"):
+                self.logger.info(
+                    "Agent stream | agent=%s | model=%s | ttft=%s | tokens_per_sec=%.1f",
+                    agent_type,
+                    model,
+                    f"{u['ttft']:.2f}s" if u.get("ttft") is not None else None,
+                    float(u.get("tokens_per_sec") or 0.0),
+                )
         except Exception:
             pass
 
         # Attempt structured parse if a schema was provided
         parsed = None
         raw_json = None
+        repair_steps: Optional[List[str]] = None
         if model_cls is not None:
             text = result.get("text", "")
 
@@ -743,6 +2112,9 @@ This format will be automatically converted to Word when ready for filing.
                     # xAI native SDK should never fail here since it already validated
                     self.logger.warning("xAI parse returned invalid JSON despite native validation: %s", str(e))
                     parsed = None
+                    repaired = self._repair_structured(agent_type, model, text, model_cls, expects_list)
+                    if repaired is not None:
+                        parsed, raw_json, repair_steps = repaired
             else:
                 # OpenAI or other providers - need to validate
                 try:
@@ -760,6 +2132,16 @@ This format will be automatically converted to Word when ready for filing.
                         raise ValidationError("Unexpected JSON shape", model_cls)
                 except Exception as e:
                     self.logger.warning("Initial parse failed for %s: %s", model, str(e))
+                    # Try a free local repair before paying for a second full request
+                    repaired = self._repair_structured(agent_type, model, text, model_cls, expects_list)
+                    if repaired is not None:
+                        parsed, raw_json, repair_steps = repaired
+                retry_cost = budget.cost_of({"model": billed_model, "usage": u}) if budget is not None else 0.0
+                if parsed is None and budget is not None and not budget.affords(retry_cost):
+                    self.logger.warning(
+                        "Skipping JSON retry for %s: ~$%.4f does not fit the remaining budget", model, retry_cost
+                    )
+                elif parsed is None:
                     # Only retry for non-xAI providers (OpenAI might need retry)
                     # Retry once: ask for JSON only
                     retry_messages = messages + [
@@ -768,30 +2150,21 @@ This format will be automatically converted to Word when ready for filing.
                             "content": "Your previous output was not valid JSON per schema. Return ONLY valid JSON now.",
                         }
                     ]
-                    # Run retry in thread pool for parallel execution
-                    retry = await asyncio.to_thread(
-                        chat_complete,
+                    retry = await self._complete(
+                        agent_type,
+                        cache_mode,
                         model_key=model,
                         messages=retry_messages,
-                        temperature=self.llm_config["modelConfigurations"].get(model, {}).get("temperature", 0.01),
-                        max_output_tokens=self.llm_config["modelConfigurations"].get(model, {}).get("max_output_tokens"),
-                        service_tier=self.review_settings.get("workflowConfig", {}).get("service_tier", "auto"),
+                        temperature=model_cfg.get("temperature", 0.01),
+                        max_output_tokens=model_cfg.get("max_output_tokens"),
+                        service_tier=service_tier or self.review_settings.get("workflowConfig", {}).get("service_tier", "auto"),
                         effort=effort,
                         web_search=use_web_search,
                         pydantic_model=model_cls,
                     )
-                    # Track retry tokens
-                    uu = retry.get("usage", {})
-                    self.token_tracker.add(
-                        model=model,
-                        inp=int(uu.get("input", 0)),
-                        out=int(uu.get("output", 0)),
-                        cache=int(uu.get("cached", 0)),
-                        effort=uu.get("effort", None),
-                        notes=f"agent:{agent_type}:retry",
-                        service_tier=str(uu.get("service_tier", "auto")),
-                        duration=float(uu.get("duration", 0.0)),
-                    )
+                    # Track retry tokens; the agent result carries their cost
+                    self._track_usage(model, retry.get("usage", {}), notes=f"agent:{agent_type}:retry")
+                    u.setdefault("extra_billed", []).append(self._billed_usage(model, retry.get("usage", {}) or {}))
                     try:
                         payload = self._parse_json_payload(retry.get("text", ""))
                         raw_json = payload
@@ -803,6 +2176,10 @@ This format will be automatically converted to Word when ready for filing.
                             parsed = model_cls.model_validate(payload)
                     except Exception:
                         parsed = None
+                    if parsed is None:
+                        repaired = self._repair_structured(agent_type, model, retry.get("text", ""), model_cls, expects_list)
+                        if repaired is not None:
+                            parsed, raw_json, repair_steps = repaired
 
         # If we have citation results, optionally log them to research log
         log_path = None
@@ -824,6 +2201,8 @@ This format will be automatically converted to Word when ready for filing.
             "text": result.get("text", ""),
             "usage": u,
         }
+        if rerouted_from:
+            out["rerouted_from"] = rerouted_from
         if parsed is not None:
             if isinstance(parsed, list):
                 out["structured"] = [p.model_dump() for p in parsed]
@@ -832,6 +2211,8 @@ This format will be automatically converted to Word when ready for filing.
             out["raw_json"] = raw_json
         if log_path:
             out["citation_log"] = log_path
+        if repair_steps is not None:
+            out["json_repair"] = repair_steps
 
         # Generate claude_prompt for Claude Code orchestration
         # This tells Claude what to do next based on agent findings
@@ -842,23 +2223,19 @@ This format will be automatically converted to Word when ready for filing.
         # Log usage to CSV
         try:
             from .usage_logger import log_agent_call
-            # Calculate cost for this call using ppm (price per million) rates
-            model_cfg = self.llm_config["modelConfigurations"].get(model, {})
-            input_cost = (int(u.get("input", 0)) / 1_000_000) * model_cfg.get("input_token_ppm", 0)
-            output_cost = (int(u.get("output", 0)) / 1_000_000) * model_cfg.get("output_token_ppm", 0)
-            cached_cost = (int(u.get("cached", 0)) / 1_000_000) * model_cfg.get("input_token_cached_ppm", 0)
-            total_cost = input_cost + output_cost + cached_cost
+            # Same pricing as the token tracker (cached input, tiers, batch discount)
+            total_cost = result_cost({"model": model, "usage": u}, self.token_tracker)
 
             log_agent_call(
                 agent=agent_type,
-                model=model,
-                file_or_text="text" if len(document) < 100 else document[:100] + "...",
+                model=billed_model,
+                file_or_text=file_label,
                 input_tokens=int(u.get("input", 0)),
                 output_tokens=int(u.get("output", 0)),
                 cached_tokens=int(u.get("cached", 0)),
                 cost=total_cost,
                 duration=float(u.get("duration", 0.0)),
-                status="success",
+                status="cache_hit" if u.get("cache_hit") else "success",
             )
         except Exception as e:
             try:
@@ -0,0 +1,264 @@
+"""
+Review several documents in one wpd-review-pipeline process.
+
+`wpd-review-pipeline --file` reviews one document; reviewing a whole drafts
+folder used to mean one cold process per document, each with its own
+client connections, no shared limits, and no combined cost picture. With
+`--files <glob>` or `--manifest <json>` one process reviews them all:
+
+- every document shares one WePublicDefender (settings, token tracker,
+  budget), the response cache and the HTTP client pool
+- at most `max_documents` documents are in flight at once, and LLM calls
+  are capped globally (`max_concurrent_calls`) and per provider
+  (`provider_limits`) through the shared rate limiter
+- each document keeps its own run manifest and review files, and a line is
+  printed as each one finishes; an aggregated cost/latency summary follows
+
+A manifest lists documents with optional per-document settings:
+
+    {
+      "documents": [
+        {"file": "07_DRAFTS_AND_WORK_PRODUCT/motion.md", "max_iters": 3},
+        "07_DRAFTS_AND_WORK_PRODUCT/reply.md"
+      ]
+    }
+
+Relative paths are resolved against the manifest's folder. Defaults come
+from `workflowConfig.pipeline.documents`:
+
+    "documents": {
+      "max_documents": 2,
+      "max_concurrent_calls": 8,
+      "provider_limits": {"xai": 2}
+    }
+
+Examples:
+    >>> specs = [DocumentSpec(file="a.md"), DocumentSpec(file="b.md")]
+    >>> async def review(spec):
+    ...     return DocumentReport(file=spec.file, status="complete", cost=0.5, seconds=2.0)
+    >>> reports = asyncio.run(run_documents(specs, review, max_documents=2))
+    >>> [r.file for r in reports], round(sum(r.cost for r in reports), 2)
+    (['a.md', 'b.md'], 1.0)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import glob
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .logging_utils import get_logger
+
+
+DEFAULT_DOCUMENTS_CONFIG: Dict[str, Any] = {
+    "max_documents": 2,
+    "max_concurrent_calls": 8,
+    "provider_limits": {},
+}
+
+# Per-document settings a manifest entry may set
+DOCUMENT_SETTINGS = ("max_iters", "max_major", "model", "effort", "service_tier", "full_review", "speculative")
+
+# Drafter revisions written next to the original (brief.rev1.md)
+_REVISION_RE = re.compile(r"\.rev\d+$")
+
+
+class DocumentSpec(BaseModel):
+    """One document to review and its per-document settings."""
+
+    file: str
+    settings: Dict[str, Any] = Field(default_factory=dict)
+
+
+class DocumentReport(BaseModel):
+    """Outcome of reviewing one document."""
+
+    file: str
+    status: str
+    run_id: Optional[str] = None
+    iterations: int = 0
+    ready: bool = False
+    calls: int = 0
+    cost: float = 0.0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def resolve_documents_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge defaults with `workflowConfig.pipeline.documents`.
+
+    Examples:
+        >>> resolve_documents_config({})["max_documents"]
+        2
+        >>> resolve_documents_config({"workflowConfig": {"pipeline": {"documents": {"max_documents": 5}}}})["max_documents"]
+        5
+    """
+    cfg = dict(DEFAULT_DOCUMENTS_CONFIG)
+    if review_settings:
+        pipeline = (review_settings.get("workflowConfig", {}) or {}).get("pipeline", {}) or {}
+        cfg.update({k: v for k, v in (pipeline.get("documents", {}) or {}).items() if not k.startswith("_")})
+    return cfg
+
+
+def parse_provider_limits(values: Optional[List[str]]) -> Dict[str, int]:
+    """
+    Parse `--provider-limit PROVIDER=N` values.
+
+    Raises:
+        ValueError: For a value that is not PROVIDER=N with N >= 1
+
+    Examples:
+        >>> parse_provider_limits(["openai=4", "xai=2"])
+        {'openai': 4, 'xai': 2}
+        >>> parse_provider_limits(["openai"])
+        Traceback (most recent call last):
+            ...
+        ValueError: --provider-limit expects PROVIDER=N, got 'openai'
+    """
+    limits: Dict[str, int] = {}
+    for value in values or []:
+        name, _, count = value.partition("=")
+        if not name or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"--provider-limit expects PROVIDER=N, got '{value}'")
+        limits[name.strip()] = int(count)
+    return limits
+
+
+def expand_files(pattern: str) -> List[DocumentSpec]:
+    """Documents matching a glob (`**` recurses), sorted, without drafter revisions (`*.revN.md`)."""
+    paths = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+    return [DocumentSpec(file=str(p)) for p in paths if p.is_file() and not _REVISION_RE.search(p.stem)]
+
+
+def load_document_manifest(path: Path) -> List[DocumentSpec]:
+    """
+    Documents listed in a JSON manifest (a list, or {"documents": [...]}).
+
+    Raises:
+        ValueError: For a malformed manifest or entry
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}: not valid JSON ({e})") from e
+    entries = data.get("documents") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of documents or {{\"documents\": [...]}}")
+    base = Path(path).parent
+    specs: List[DocumentSpec] = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"file": entry}
+        if not isinstance(entry, dict) or not entry.get("file"):
+            raise ValueError(f"{path}: each document needs a \"file\": {entry!r}")
+        file = Path(entry["file"])
+        if not file.is_absolute():
+            file = base / file
+        settings = {k: entry[k] for k in DOCUMENT_SETTINGS if entry.get(k) is not None}
+        specs.append(DocumentSpec(file=str(file), settings=settings))
+    return specs
+
+
+async def run_documents(
+    specs: List[DocumentSpec],
+    review: Callable[[DocumentSpec], Awaitable[DocumentReport]],
+    *,
+    max_documents: int = 2,
+    on_done: Optional[Callable[[DocumentReport], None]] = None,
+) -> List[DocumentReport]:
+    """
+    Review documents at most `max_documents` at a time; reports come back in input order.
+
+    A document whose review raises gets an "error" report; the others carry on.
+    """
+    logger = get_logger()
+    gate = asyncio.Semaphore(max(1, int(max_documents or 1)))
+
+    async def one(spec: DocumentSpec) -> DocumentReport:
+        async with gate:
+            started = time.perf_counter()
+            try:
+                report = await review(spec)
+            except Exception as e:
+                report = DocumentReport(file=spec.file, status="error", error=f"{type(e).__name__}: {e}")
+            if not report.seconds:
+                report.seconds = time.perf_counter() - started
+            try:
+                logger.info(
+                    "Document reviewed | file=%s | status=%s | cost=%.4f | dur=%.2fs",
+                    report.file,
+                    report.status,
+                    report.cost,
+                    report.seconds,
+                )
+            except Exception:
+                pass
+            if on_done is not None:
+                on_done(report)
+            return report
+
+    return list(await asyncio.gather(*(one(spec) for spec in specs)))
+
+
+def summarize_documents(reports: List[DocumentReport], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Aggregate cost and latency over reviewed documents.
+
+    `speedup` is the summed per-document time over the wall-clock time.
+
+    Examples:
+        >>> summary = summarize_documents([DocumentReport(file="a.md", status="complete", cost=0.25, seconds=30), DocumentReport(file="b.md", status="finished", cost=0.5, seconds=30)], 40)
+        >>> summary["documents"], summary["ready"], summary["cost"], summary["speedup"]
+        (2, 1, 0.75, 1.5)
+    """
+    seconds = [r.seconds for r in reports]
+    return {
+        "documents": len(reports),
+        "ready": sum(1 for r in reports if r.status == "complete"),
+        "errors": sum(1 for r in reports if r.status == "error"),
+        "calls": sum(r.calls for r in reports),
+        "cost": round(sum(r.cost for r in reports), 6),
+        "wall_seconds": round(wall_seconds, 2),
+        "document_seconds": round(sum(seconds), 2),
+        "slowest_seconds": round(max(seconds, default=0.0), 2),
+        "speedup": round(sum(seconds) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+def format_document_summary(reports: List[DocumentReport], summary: Dict[str, Any]) -> str:
+    """Plain-text table of per-document results and totals."""
+    width = max([len(Path(r.file).name) for r in reports] + [8])
+    lines = [f"{'Document':<{width}}  {'Status':<9} {'Iters':>5} {'Calls':>5} {'Cost':>10} {'Time':>8}"]
+    for r in reports:
+        lines.append(
+            f"{Path(r.file).name:<{width}}  {r.status:<9} {r.iterations:>5} {r.calls:>5} "
+            f"${r.cost:>9.4f} {r.seconds:>7.1f}s" + (f"  {r.error}" if r.error else "")
+        )
+    lines.append(
+        f"Total: {summary['documents']} document(s), {summary['ready']} ready, {summary['errors']} failed | "
+        f"{summary['calls']} calls | ${summary['cost']:.4f} | wall {summary['wall_seconds']:.1f}s "
+        f"(documents {summary['document_seconds']:.1f}s, slowest {summary['slowest_seconds']:.1f}s, x{summary['speedup']:.2f})"
+    )
+    return "\n".join(lines)
+
+
+__all__ = [
+    "DEFAULT_DOCUMENTS_CONFIG",
+    "DOCUMENT_SETTINGS",
+    "DocumentReport",
+    "DocumentSpec",
+    "expand_files",
+    "format_document_summary",
+    "load_document_manifest",
+    "parse_provider_limits",
+    "resolve_documents_config",
+    "run_documents",
+    "summarize_documents",
+]
@@ -0,0 +1,246 @@
+"""
+Hedged requests for tail-latency control.
+
+A multi-model `call_agent` waits for its slowest model, so a single straggler
+(a high-effort gpt-5 call taking several times its median) holds up the whole
+fan-out. When hedging is enabled, a call that outlives its model's observed
+p90/p95 duration fires a duplicate request to a configured backup (another
+model, or the same model on a faster service tier). The first valid result
+wins and the other request is cancelled.
+
+Latency history comes from the in-process TokenTracker and, until enough
+samples accumulate there, from .wepublic_defender/usage_log.csv.
+
+Settings live in the `hedgingConfig` block of legal_review_settings.json:
+
+    "hedgingConfig": {
+      "enabled": false,
+      "percentile": 95,
+      "min_samples": 5,
+      "min_delay_seconds": 30,
+      "backups": {
+        "gpt-5": {"model": "gpt-5", "service_tier": "priority"},
+        "grok-4": {"model": "gpt-5"}
+      }
+    }
+
+Agents opt in or out individually with `"hedge": true/false` in
+reviewAgentConfig. Hedge spend is recorded in TokenTracker.hedge_stats() so
+the percentile can be tuned against what it costs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import math
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logging_utils import get_logger
+from .usage_logger import usage_log_path
+
+
+DEFAULT_HEDGE_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "percentile": 95,
+    "min_samples": 5,
+    "min_delay_seconds": 30.0,
+    "backups": {},
+}
+
+
+def resolve_hedge_config(
+    review_settings: Optional[Dict[str, Any]],
+    agent_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with `hedgingConfig`; an agent's `hedge` flag overrides `enabled`.
+
+    Examples:
+        >>> resolve_hedge_config({})["enabled"]
+        False
+        >>> resolve_hedge_config({"hedgingConfig": {"enabled": True}}, {"hedge": False})["enabled"]
+        False
+    """
+    cfg = dict(DEFAULT_HEDGE_CONFIG)
+    if review_settings:
+        cfg.update(review_settings.get("hedgingConfig", {}) or {})
+    if agent_config and agent_config.get("hedge") is not None:
+        cfg["enabled"] = bool(agent_config["hedge"])
+    return cfg
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Linear-interpolated percentile of `values` (None when empty).
+
+    Examples:
+        >>> percentile([1, 2, 3, 4, 5], 50)
+        3.0
+        >>> percentile([10, 20], 90)
+        19.0
+        >>> percentile([], 95) is None
+        True
+    """
+    if not values:
+        return None
+    data = sorted(float(v) for v in values)
+    k = (len(data) - 1) * (float(pct) / 100.0)
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return data[int(k)]
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+class LatencyHistory:
+    """
+    Per-model (and per-agent) call durations from the TokenTracker plus the usage log CSV.
+
+    The CSV is re-read only when its mtime changes.
+    """
+
+    def __init__(self, token_tracker: Any = None, csv_path: Optional[Path] = None):
+        self.token_tracker = token_tracker
+        self._csv_path = csv_path
+        self._csv_mtime: Optional[float] = None
+        self._csv_samples: Dict[str, List[float]] = {}
+        self._csv_agent_samples: Dict[str, List[float]] = {}
+
+    def _load_csv(self) -> Dict[str, List[float]]:
+        path = self._csv_path or usage_log_path()
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return {}
+        if mtime == self._csv_mtime:
+            return self._csv_samples
+        samples: Dict[str, List[float]] = {}
+        agents: Dict[str, List[float]] = {}
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    if row.get("status", "success") != "success":
+                        continue
+                    try:
+                        duration = float(row.get("duration") or 0)
+                    except ValueError:
+                        continue
+                    if duration > 0:
+                        samples.setdefault(row.get("model", ""), []).append(duration)
+                        agents.setdefault(row.get("agent", ""), []).append(duration)
+        except Exception:
+            return self._csv_samples
+        self._csv_samples, self._csv_agent_samples, self._csv_mtime = samples, agents, mtime
+        return samples
+
+    def samples(self, model: str, effort: Optional[str] = None, min_samples: int = 1) -> List[float]:
+        """Return durations for `model`: tracker (same effort) first, then tracker + CSV."""
+        tracked: List[float] = []
+        if self.token_tracker is not None:
+            if effort is not None:
+                tracked = self.token_tracker.latency_samples(model, effort)
+                if len(tracked) >= min_samples:
+                    return tracked
+            tracked = self.token_tracker.latency_samples(model)
+            if len(tracked) >= min_samples:
+                return tracked
+        return tracked + self._load_csv().get(model, [])
+
+    def agent_samples(self, agent: str) -> List[float]:
+        """Return durations of `agent` calls: this run's tracker plus the usage log."""
+        tracked = self.token_tracker.agent_latency_samples(agent) if self.token_tracker is not None else []
+        self._load_csv()
+        return tracked + self._csv_agent_samples.get(agent, [])
+
+    def threshold(self, model: str, cfg: Dict[str, Any], effort: Optional[str] = None) -> Optional[float]:
+        """Return seconds to wait before hedging, or None if history is too thin."""
+        min_samples = int(cfg.get("min_samples", 5))
+        values = self.samples(model, effort, min_samples)
+        if len(values) < min_samples:
+            return None
+        p = percentile(values, float(cfg.get("percentile", 95)))
+        return max(float(cfg.get("min_delay_seconds", 0.0) or 0.0), p or 0.0)
+
+
+async def run_hedged(
+    primary: Callable[[], Awaitable[Dict[str, Any]]],
+    backup: Callable[[], Awaitable[Dict[str, Any]]],
+    delay: float,
+    is_valid: Callable[[Dict[str, Any]], bool],
+    *,
+    label: str = "llm",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run `primary`; if it is still running after `delay` seconds, race it against `backup`.
+
+    The first valid result wins and the other task is cancelled. If a result
+    arrives invalid, the other task is awaited instead. If neither is valid,
+    the primary's outcome is returned (or its exception re-raised).
+
+    Returns:
+        (result, outcome) where outcome has keys: fired, winner, threshold,
+        completed (list of (role, result) for every call that finished)
+    """
+    outcome: Dict[str, Any] = {"fired": False, "winner": "primary", "threshold": delay, "completed": []}
+    primary_task = asyncio.ensure_future(primary())
+    done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    if done:
+        result = primary_task.result()
+        outcome["completed"].append(("primary", result))
+        return result, outcome
+
+    outcome["fired"] = True
+    started = time.time()
+    try:
+        get_logger().info("Hedge fired | call=%s | after=%.1fs", label, delay)
+    except Exception:
+        pass
+    backup_task = asyncio.ensure_future(backup())
+    roles = {primary_task: "primary", backup_task: "backup"}
+    pending = set(roles)
+    errors: Dict[str, BaseException] = {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                role = roles[task]
+                if task.exception() is not None:
+                    errors[role] = task.exception()
+                    continue
+                result = task.result()
+                outcome["completed"].append((role, result))
+                if is_valid(result):
+                    outcome["winner"] = role
+                    try:
+                        get_logger().info(
+                            "Hedge settled | call=%s | winner=%s | after_hedge=%.1fs",
+                            label, role, time.time() - started,
+                        )
+                    except Exception:
+                        pass
+                    return result, outcome
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # Nothing valid: fall back to whatever the primary produced
+    outcome["winner"] = "none"
+    for role, result in outcome["completed"]:
+        if role == "primary":
+            return result, outcome
+    if "primary" in errors:
+        raise errors["primary"]
+    return outcome["completed"][0][1], outcome
+
+
+__all__ = [
+    "DEFAULT_HEDGE_CONFIG",
+    "LatencyHistory",
+    "percentile",
+    "resolve_hedge_config",
+    "run_hedged",
+]
@@ -0,0 +1,407 @@
+"""
+Incremental re-review of the sections a revision changed.
+
+After the drafter writes `<stem>.rev{i}.md` the next pipeline iteration
+used to send the whole document to every reviewer again, even when only two
+paragraphs changed. For the section-oriented agents (self_review,
+citation_verify, final_review) the pipeline now:
+
+1. splits the previous and the revised draft on `##` / `###` headings
+   (chunking.split_sections) and hashes each section's text
+2. sends the reviewer only the changed (or new) sections, plus a compact
+   one-line-per-section digest of the unchanged ones for context
+   (citation_verify gets the changed sections only and is skipped when they
+   cite nothing)
+3. carries forward the previous iteration's findings for unchanged
+   sections with their original `[SECTION]` attribution, and merges them
+   with the new findings
+
+Findings are attributed by their `[SECTION]` prefix, else by a section
+heading or a quoted passage they mention. Findings that cannot be tied to
+a section are handed back to the reviewer to re-check instead of being
+carried forward blindly. If no section changed, the previous results are
+reused without any call. opposing_counsel argues against the brief as a
+whole and always sees the full draft.
+
+Settings live in `workflowConfig.pipeline.incremental`:
+
+    "incremental": {
+      "enabled": true,
+      "max_changed_fraction": 0.6,
+      "digest_chars": 160
+    }
+
+When more than `max_changed_fraction` of the draft changed, a full review
+is cheaper to reason about and is used instead.
+
+Examples:
+    >>> old = "## FACTS\\nThe stop.\\n## ARGUMENT\\nWeak point.\\n"
+    >>> new = "## FACTS\\nThe stop.\\n## ARGUMENT\\nStronger point.\\n"
+    >>> plan = plan_incremental(old, new, {"max_changed_fraction": 1.0})
+    >>> plan.changed, plan.unchanged
+    (['ARGUMENT'], ['FACTS'])
+    >>> attribute_finding("[FACTS] Date of stop missing", plan.titles)
+    ['FACTS']
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .chunking import PREAMBLE, Section, split_sections
+from .citation_engine import extract_citations, normalize_citation
+from .jsonio import dumps
+
+
+DEFAULT_INCREMENTAL_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "max_changed_fraction": 0.6,
+    "digest_chars": 160,
+}
+
+# Agents whose findings are local to a section (opposing_counsel argues against the whole brief)
+INCREMENTAL_AGENTS = ("self_review", "citation_verify", "final_review")
+
+FINDING_FIELDS = ("critical_issues", "major_issues", "minor_issues", "strengths")
+
+_ATTRIBUTION_RE = re.compile(r"^\[([^\]]*)\]\s*")
+_QUOTE_RE = re.compile(r"[\"“]([^\"”]{12,})[\"”]")
+
+
+class IncrementalPlan(BaseModel):
+    """Which sections of the revised draft changed, and the text to send for them."""
+
+    titles: List[str] = Field(default_factory=list)
+    changed: List[str] = Field(default_factory=list)
+    unchanged: List[str] = Field(default_factory=list)
+    removed: List[str] = Field(default_factory=list)
+    sections: Dict[str, str] = Field(default_factory=dict)
+    changed_chars: int = 0
+    total_chars: int = 0
+
+    @property
+    def changed_fraction(self) -> float:
+        return self.changed_chars / self.total_chars if self.total_chars else 0.0
+
+    def changed_text(self) -> str:
+        return "".join(self.sections[t] for t in self.changed)
+
+    def unchanged_text(self) -> str:
+        return "".join(self.sections[t] for t in self.unchanged)
+
+    def digest(self, max_chars: int) -> str:
+        """One line per unchanged section: its title and the start of its text (no headings)."""
+        lines = []
+        for title in self.unchanged:
+            body = self.sections[title].split("\n", 1)[1] if title != PREAMBLE and "\n" in self.sections[title] else self.sections[title]
+            flat = " ".join(body.split())
+            lines.append(f"- {title}: {flat[:max_chars]}{'...' if len(flat) > max_chars else ''}")
+        return "\n".join(lines)
+
+    def prompt(self, agent: str, open_findings: List[str], digest_chars: int) -> str:
+        """The document sent to `agent`: instructions, digest and open findings, then the changed sections."""
+        if agent == "citation_verify":
+            # Citations are extracted from the text itself; instructions would only add tokens
+            return self.changed_text()
+        header = (
+            f"INCREMENTAL RE-REVIEW. The draft was revised; only these sections changed: {'; '.join(self.changed)}. "
+            "Review ONLY the changed sections below. Findings for the unchanged sections are carried forward "
+            "separately, so do not report issues in them or report them as missing."
+        )
+        parts = [header + ' Prefix every finding with its section heading in square brackets, e.g. "[FACTS] ...".']
+        if self.unchanged:
+            parts.append(
+                "--- UNCHANGED SECTIONS (digest, context only) ---\n"
+                + self.digest(digest_chars)
+                + "\n--- END DIGEST ---"
+            )
+        if open_findings:
+            parts.append(
+                "--- OPEN FINDINGS FROM THE PREVIOUS REVIEW (not tied to a section; repeat only those that still apply to the changed text) ---\n"
+                + "\n".join(f"- {f}" for f in open_findings)
+                + "\n--- END OPEN FINDINGS ---"
+            )
+        parts.append(self.changed_text())
+        return "\n\n".join(parts)
+
+
+def resolve_incremental_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge defaults with `workflowConfig.pipeline.incremental`.
+
+    Examples:
+        >>> resolve_incremental_config({})["enabled"]
+        True
+        >>> resolve_incremental_config({"workflowConfig": {"pipeline": {"incremental": {"enabled": False}}}})["enabled"]
+        False
+    """
+    cfg = dict(DEFAULT_INCREMENTAL_CONFIG)
+    if review_settings:
+        pipeline = (review_settings.get("workflowConfig", {}) or {}).get("pipeline", {}) or {}
+        cfg.update({k: v for k, v in (pipeline.get("incremental", {}) or {}).items() if not k.startswith("_")})
+    return cfg
+
+
+def _section_hash(text: str) -> str:
+    # Trailing whitespace and blank-line churn are not revisions
+    normalized = "\n".join(line.rstrip() for line in text.strip().splitlines() if line.strip())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _keyed(sections: List[Section]) -> List[Tuple[str, Section]]:
+    """Section titles made unique ("ARGUMENT", "ARGUMENT #2") so repeats can be told apart."""
+    seen: Dict[str, int] = {}
+    keyed = []
+    for section in sections:
+        seen[section.title] = seen.get(section.title, 0) + 1
+        key = section.title if seen[section.title] == 1 else f"{section.title} #{seen[section.title]}"
+        keyed.append((key, section))
+    return keyed
+
+
+def plan_incremental(previous: str, current: str, cfg: Optional[Dict[str, Any]] = None) -> Optional[IncrementalPlan]:
+    """
+    Diff two drafts section by section; None if a full review should be used instead.
+
+    A full review is used when the current draft has no headings to diff
+    on, or when more than `max_changed_fraction` of it changed.
+    """
+    cfg = {**DEFAULT_INCREMENTAL_CONFIG, **(cfg or {})}
+    old = dict((key, _section_hash(s.text)) for key, s in _keyed(split_sections(previous)))
+    new = _keyed(split_sections(current))
+    if len(new) < 2:
+        return None
+    plan = IncrementalPlan(total_chars=len(current))
+    for key, section in new:
+        plan.titles.append(key)
+        plan.sections[key] = section.text
+        if old.get(key) == _section_hash(section.text):
+            plan.unchanged.append(key)
+        elif section.text.strip():
+            plan.changed.append(key)
+            plan.changed_chars += len(section.text)
+    plan.removed = [key for key in old if key not in plan.sections]
+    if plan.changed_fraction > float(cfg.get("max_changed_fraction", 1.0)):
+        return None
+    return plan
+
+
+def attribute_finding(finding: str, titles: List[str], sections: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Sections a finding is about: its `[A; B]` prefix, else headings or quoted passages it mentions.
+
+    Examples:
+        >>> attribute_finding("The QUALIFIED IMMUNITY section cites no circuit authority", ["FACTS", "QUALIFIED IMMUNITY"])
+        ['QUALIFIED IMMUNITY']
+        >>> attribute_finding("Overall tone is too informal", ["FACTS"])
+        []
+    """
+    text = str(finding)
+    match = _ATTRIBUTION_RE.match(text)
+    if match:
+        labels = [part.strip() for part in match.group(1).split(";")]
+        found = [t for t in titles if t in labels]
+        if found:
+            return found
+    lowered = text.lower()
+    mentioned = [t for t in titles if t != PREAMBLE and t.split(" > ")[-1].lower() in lowered]
+    if mentioned:
+        return mentioned
+    quoted = [q.strip().lower() for q in _QUOTE_RE.findall(text)]
+    if quoted and sections:
+        return [t for t in titles if any(q in sections.get(t, "").lower() for q in quoted)]
+    return []
+
+
+def _finding_key(finding: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", _ATTRIBUTION_RE.sub("", str(finding)).lower()).strip()
+
+
+def split_previous_findings(previous: Dict[str, Any], plan: IncrementalPlan) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Split a previous review's findings into ({field: findings to carry forward}, open findings to re-check).
+
+    Findings on unchanged sections are carried with a `[SECTION]` prefix;
+    findings on changed or removed sections are dropped (the sections are
+    reviewed again); findings tied to no section are returned as open.
+    """
+    carried: Dict[str, List[str]] = {field: [] for field in FINDING_FIELDS}
+    open_findings: List[str] = []
+    for field in FINDING_FIELDS:
+        for finding in previous.get(field) or []:
+            where = attribute_finding(finding, plan.titles, plan.sections)
+            if not where:
+                if field != "strengths":
+                    open_findings.append(str(finding))
+                continue
+            if all(t in plan.unchanged for t in where):
+                carried[field].append(f"[{'; '.join(where)}] {_ATTRIBUTION_RE.sub('', str(finding)).strip()}")
+    return carried, open_findings
+
+
+def merge_incremental_review(
+    carried: Dict[str, List[str]],
+    fresh: Optional[Dict[str, Any]],
+    *,
+    max_major: int,
+) -> Dict[str, Any]:
+    """
+    Combine carried-forward findings with a review of the changed sections.
+
+    The result is ready to file only if the fresh review says so and the
+    combined totals still meet the pipeline's filing threshold (no critical,
+    at most `max_major` major issues).
+
+    Examples:
+        >>> carried = {"major_issues": ["[FACTS] Thin facts"]}
+        >>> fresh = {"major_issues": ["[ARGUMENT] No pin cite"], "ready_to_file": True, "confidence": 80}
+        >>> merged = merge_incremental_review(carried, fresh, max_major=2)
+        >>> merged["major_issues"], merged["ready_to_file"]
+        (['[FACTS] Thin facts', '[ARGUMENT] No pin cite'], True)
+        >>> merge_incremental_review(carried, fresh, max_major=1)["ready_to_file"]
+        False
+    """
+    fresh = dict(fresh or {})
+    merged = dict(fresh)
+    for field in FINDING_FIELDS:
+        values: List[str] = []
+        keys = set()
+        for finding in list(carried.get(field) or []) + list(fresh.get(field) or []):
+            key = _finding_key(finding)
+            if key and key not in keys:
+                keys.add(key)
+                values.append(str(finding))
+        merged[field] = values
+    merged["ready_to_file"] = (
+        bool(fresh.get("ready_to_file", True))
+        and not merged["critical_issues"]
+        and len(merged["major_issues"]) <= max_major
+    )
+    merged.setdefault("iteration", 1)
+    merged.setdefault("confidence", 0)
+    return merged
+
+
+def citation_keys(text: str) -> set:
+    """Normalized reporter citations appearing in text."""
+    return {c.normalized for c in extract_citations(text)}
+
+
+def carry_citations(previous: List[Dict[str, Any]], plan: IncrementalPlan) -> List[Dict[str, Any]]:
+    """Previous verifications of citations that appear only in unchanged sections."""
+    changed = citation_keys(plan.changed_text())
+    unchanged_text = plan.unchanged_text()
+    unchanged = citation_keys(unchanged_text)
+    carried = []
+    for item in previous or []:
+        if not isinstance(item, dict):
+            continue
+        raw = str(item.get("citation") or "")
+        key = normalize_citation(raw) if raw else ""
+        if key and key in unchanged and key not in changed:
+            carried.append(item)
+        elif raw and not key and raw in unchanged_text and raw not in plan.changed_text():
+            carried.append(item)
+    return carried
+
+
+def prepare_incremental(
+    agent: str,
+    previous: Dict[str, Any],
+    plan: IncrementalPlan,
+    digest_chars: int = 160,
+) -> Tuple[Optional[str], Any]:
+    """
+    Return (document to send, carried findings) for re-reviewing a revision with `agent`.
+
+    The document is None when no call is needed: nothing changed, or (for
+    citation_verify) the changed sections cite nothing. `previous` is the
+    agent's result for the previous draft.
+    """
+    structured = previous.get("structured")
+    if agent == "citation_verify":
+        carried = carry_citations(structured if isinstance(structured, list) else [], plan)
+        if not plan.changed or not citation_keys(plan.changed_text()):
+            return None, carried
+        return plan.prompt(agent, [], digest_chars), carried
+    carried, open_findings = split_previous_findings(structured if isinstance(structured, dict) else {}, plan)
+    if not plan.changed:
+        return None, carried
+    return plan.prompt(agent, open_findings, digest_chars), carried
+
+
+def finish_incremental(
+    agent: str,
+    previous: Dict[str, Any],
+    fresh: Optional[Dict[str, Any]],
+    plan: IncrementalPlan,
+    carried: Any,
+    sent: Optional[str],
+    *,
+    max_major: int,
+) -> Dict[str, Any]:
+    """
+    Merge carried findings into the re-review result (or the reused previous result when nothing was sent).
+
+    `max_major` is the pipeline's major-issue threshold for `ready_to_file`.
+
+    The result gains an `incremental` block: the changed, unchanged and
+    removed sections, how many findings were carried, and rough token
+    counts (4 chars per token) for the full draft vs. what was sent.
+    """
+    full_tokens = plan.total_chars // 4
+    sent_tokens = len(sent) // 4 if sent else 0
+    if fresh is None:
+        if agent != "citation_verify" and not plan.changed:
+            # Nothing changed: the previous review still stands as it was
+            result = dict(previous)
+        else:
+            result = {k: v for k, v in previous.items() if k not in ("usage", "budget", "chunked")}
+            result["usage"] = {}
+            result["structured"] = list(carried) if agent == "citation_verify" else merge_incremental_review(carried, previous.get("structured"), max_major=max_major)
+            result["text"] = dumps(result["structured"], pretty=True)
+    elif fresh.get("error") or fresh.get("structured") is None:
+        # A failed re-review is reported as failed, not papered over with old findings
+        return fresh
+    else:
+        result = dict(fresh)
+        if agent == "citation_verify":
+            new_items = fresh["structured"] if isinstance(fresh["structured"], list) else [fresh["structured"]]
+            result["structured"] = list(carried) + list(new_items)
+        else:
+            result["structured"] = merge_incremental_review(carried, fresh["structured"], max_major=max_major)
+        result["text"] = dumps(result["structured"], pretty=True)
+    if isinstance(carried, dict):
+        carried_count = sum(len(v) for k, v in carried.items() if k != "strengths")
+    else:
+        carried_count = len(carried or [])
+    result["incremental"] = {
+        "changed": list(plan.changed),
+        "unchanged": list(plan.unchanged),
+        "removed": list(plan.removed),
+        "carried": carried_count,
+        "called": fresh is not None,
+        "tokens_full": full_tokens,
+        "tokens_sent": sent_tokens,
+    }
+    return result
+
+
+__all__ = [
+    "DEFAULT_INCREMENTAL_CONFIG",
+    "INCREMENTAL_AGENTS",
+    "IncrementalPlan",
+    "attribute_finding",
+    "carry_citations",
+    "citation_keys",
+    "finish_incremental",
+    "merge_incremental_review",
+    "plan_incremental",
+    "prepare_incremental",
+    "resolve_incremental_config",
+    "split_previous_findings",
+]
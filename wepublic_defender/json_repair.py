@@ -0,0 +1,445 @@
+"""
+Local repair of malformed structured output before paying for a retry.
+
+When a model's output fails JSON parsing or schema validation, the agent
+used to send a second full request (the whole document again) asking for
+"ONLY valid JSON". Most failures are mechanical and can be fixed locally:
+
+- markdown code fences and leading/trailing prose around the JSON
+- output truncated at `max_output_tokens` (unclosed strings, arrays, objects,
+  trailing commas, a dangling key or half-written `true`/`false`/`null`)
+- type slips: "85" or "85%" for an int, "yes"/"false" for a bool, null or a
+  bare string for a list, objects where a list of strings is expected
+- individual bad fields or list items: invalid optional fields are dropped
+  and invalid list items are skipped, so a salvageable result is kept
+
+Required fields are never invented. If they cannot be recovered, repair
+fails and the caller falls back to the paid retry. Outcomes are counted
+process-wide (`repair_stats()`) so the success rate shows up in the logs.
+
+Usage:
+    outcome = repair_structured(text, DocumentReviewResult)
+    if outcome is not None:
+        parsed, payload, steps = outcome
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import typing
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from .jsonio import dumps, extract_json, loads, scan_balanced
+
+
+_FENCE_RE = re.compile(r"```[a-zA-Z0-9_-]*[ \t]*\r?\n?(.*?)(?:```|$)", re.DOTALL)
+_PARTIAL_LITERALS = {"t": "true", "tr": "true", "tru": "true", "f": "false", "fa": "false", "fal": "false",
+                     "fals": "false", "n": "null", "nu": "null", "nul": "null"}
+_TRUE_WORDS = {"true", "yes", "y", "1"}
+_FALSE_WORDS = {"false", "no", "n", "0"}
+# Keys models use when they return {"issue": ...} objects instead of plain strings
+_TEXT_KEYS = ("issue", "text", "description", "summary", "finding", "message")
+
+
+def strip_fences(text: str) -> str:
+    """
+    Return the contents of the first markdown code fence, or the text unchanged.
+
+    Examples:
+        >>> strip_fences('Here you go:\\n```json\\n{"a": 1}\\n```\\nThanks!')
+        '{"a": 1}\\n'
+        >>> strip_fences('```json\\n{"a": [1, 2')
+        '{"a": [1, 2'
+    """
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket (outside strings)."""
+    out: List[str] = []
+    in_str = False
+    esc = False
+    for ch in text:
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(ch)
+    return "".join(out)
+
+
+def _last_string_start(text: str) -> int:
+    """Index of the quote opening the string that `text` ends with (text ends with '"')."""
+    i = len(text) - 2
+    while i >= 0:
+        if text[i] == '"':
+            backslashes = 0
+            j = i - 1
+            while j >= 0 and text[j] == "\\":
+                backslashes += 1
+                j -= 1
+            if backslashes % 2 == 0:
+                return i
+        i -= 1
+    return 0
+
+
+def close_truncated(text: str) -> str:
+    """
+    Close an unterminated JSON value: finish the open string, drop dangling keys and commas, add closers.
+
+    Examples:
+        >>> close_truncated('{"major_issues": ["Thin fa')
+        '{"major_issues": ["Thin fa"]}'
+        >>> close_truncated('{"ready_to_file": tru')
+        '{"ready_to_file": true}'
+        >>> close_truncated('{"critical_issues": [], "maj')
+        '{"critical_issues": []}'
+        >>> close_truncated('[{"a": 1}, {"b": ')
+        '[{"a": 1}, {}]'
+    """
+    stack: List[str] = []
+    in_str = False
+    esc = False
+    for ch in text:
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    out = text
+    if in_str:
+        if esc:
+            out = out[:-1]
+        out += '"'
+    out = out.rstrip()
+
+    while True:
+        literal = re.search(r"([:\[,]\s*)([a-z]{1,4})$", out)
+        if literal and literal.group(2) in _PARTIAL_LITERALS:
+            out = out[: literal.start(2)] + _PARTIAL_LITERALS[literal.group(2)]
+            continue
+        if out.endswith(","):
+            out = out[:-1].rstrip()
+            continue
+        if out.endswith(":"):
+            # Key with no value: drop the key too
+            out = out[:-1].rstrip()
+            if out.endswith('"'):
+                out = out[: _last_string_start(out)].rstrip()
+            continue
+        if stack and stack[-1] == "{" and out.endswith('"'):
+            before = out[: _last_string_start(out)].rstrip()
+            if before.endswith("{") or before.endswith(","):
+                # Dangling key at the end of an object
+                out = before
+                continue
+        break
+
+    return _strip_trailing_commas(out + "".join("}" if c == "{" else "]" for c in reversed(stack)))
+
+
+def _text_of(value: Any) -> Any:
+    if isinstance(value, dict):
+        for key in _TEXT_KEYS:
+            if isinstance(value.get(key), str):
+                return value[key]
+        return dumps(value)
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    return value
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    """Coerce one value toward `annotation`; anything unrecognised is returned unchanged."""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        options = [a for a in args if a is not type(None)]
+        if value is None:
+            return None
+        if len(options) == 1:
+            return _coerce(value, options[0])
+        return value
+    if origin is typing.Literal:
+        if isinstance(value, str):
+            for choice in args:
+                if isinstance(choice, str) and choice.lower() == value.strip().lower():
+                    return choice
+        return value
+    if origin in (list, List):
+        if value is None:
+            return []
+        if isinstance(value, (str, dict)):
+            value = [value]
+        if isinstance(value, list):
+            inner = args[0] if args else Any
+            return [_coerce(v, inner) for v in value]
+        return value
+    if annotation is bool:
+        if isinstance(value, str) and value.strip().lower() in _TRUE_WORDS | _FALSE_WORDS:
+            return value.strip().lower() in _TRUE_WORDS
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        return value
+    if annotation is int:
+        if isinstance(value, str):
+            cleaned = value.strip().rstrip("%").strip()
+            try:
+                return int(round(float(cleaned)))
+            except ValueError:
+                return value
+        if isinstance(value, float):
+            return int(round(value))
+        return value
+    if annotation is str:
+        return _text_of(value)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel) and isinstance(value, dict):
+        return coerce_fields(value, annotation)
+    return value
+
+
+def coerce_fields(payload: Dict[str, Any], model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Coerce a dict's fields toward `model_cls` field types (unknown keys are kept as-is).
+
+    Examples:
+        >>> from wepublic_defender.models.legal_responses import DocumentReviewResult
+        >>> coerce_fields({"confidence": "85%", "ready_to_file": "no", "major_issues": None,
+        ...                "minor_issues": "Typo", "iteration": 2.0}, DocumentReviewResult)
+        {'confidence': 85, 'ready_to_file': False, 'major_issues': [], 'minor_issues': ['Typo'], 'iteration': 2}
+    """
+    data = dict(payload)
+    for name, field in model_cls.model_fields.items():
+        if name in data:
+            data[name] = _coerce(data[name], field.annotation)
+    return data
+
+
+def validate_partial(payload: Dict[str, Any], model_cls: Type[BaseModel]) -> Tuple[BaseModel, List[str]]:
+    """
+    Validate field by field: drop invalid optional fields and invalid list items, keep the rest.
+
+    Returns (instance, dropped) where dropped names what was removed
+    ("notes", "weaknesses_found[2]").
+
+    Raises:
+        ValidationError: If a required field is missing or invalid
+
+    Examples:
+        >>> from wepublic_defender.models.legal_responses import DocumentReviewResult
+        >>> result, dropped = validate_partial({"ready_to_file": True, "iteration": 1, "confidence": 80,
+        ...                                     "notes": {"x": 1}, "strengths": ["Clear", 3]}, DocumentReviewResult)
+        >>> dropped, result.strengths
+        (['notes', 'strengths[1]'], ['Clear'])
+    """
+    data = dict(payload)
+    dropped: List[str] = []
+    fields = model_cls.model_fields
+    while True:
+        try:
+            return model_cls.model_validate(data), dropped
+        except ValidationError as e:
+            removed = False
+            # Drop list items from the highest index down so earlier indexes stay valid
+            items: Dict[str, List[int]] = {}
+            for err in e.errors():
+                loc = err.get("loc") or ()
+                if not loc or loc[0] not in fields or loc[0] not in data:
+                    continue
+                name = loc[0]
+                if len(loc) > 1 and isinstance(loc[1], int) and isinstance(data[name], list):
+                    items.setdefault(name, []).append(loc[1])
+                elif not fields[name].is_required():
+                    data.pop(name)
+                    dropped.append(name)
+                    removed = True
+            for name, indexes in items.items():
+                if name not in data:
+                    continue
+                values = list(data[name])
+                for idx in sorted(set(indexes), reverse=True):
+                    if idx < len(values):
+                        values.pop(idx)
+                        dropped.append(f"{name}[{idx}]")
+                        removed = True
+                data[name] = values
+            if not removed:
+                raise
+
+
+def _unwrap_list(payload: Any) -> Any:
+    """Accept {"citations": [...]} (a dict holding one list of objects) where a list is expected."""
+    if isinstance(payload, dict):
+        lists = [v for v in payload.values() if isinstance(v, list) and all(isinstance(i, dict) for i in v)]
+        if len(lists) == 1:
+            return lists[0]
+        return [payload]
+    return payload
+
+
+def repair_payload(text: str) -> Tuple[Any, List[str]]:
+    """
+    Recover a JSON value from raw model output.
+
+    Returns (payload, steps), where steps lists the repairs applied.
+
+    Raises:
+        ValueError: If no JSON value can be recovered
+
+    Examples:
+        >>> repair_payload('```json\\n{"a": [1, 2,]}\\n```')
+        ({'a': [1, 2]}, ['strip_fences', 'trailing_commas'])
+        >>> repair_payload('Review follows. {"major_issues": ["Thin')[0]
+        {'major_issues': ['Thin']}
+    """
+    steps: List[str] = []
+    body = text
+    unfenced = strip_fences(body)
+    if unfenced != body:
+        steps.append("strip_fences")
+        body = unfenced
+    try:
+        return loads(body), steps
+    except ValueError:
+        pass
+
+    snippet, truncated = extract_json(body)
+    if snippet is None:
+        raise ValueError("No JSON object or array found in output")
+    if snippet.strip() != body.strip():
+        steps.append("strip_prose")
+    if truncated:
+        steps.append("close_truncated")
+        snippet = close_truncated(snippet)
+    try:
+        return loads(snippet), steps
+    except ValueError:
+        pass
+    fixed = _strip_trailing_commas(snippet)
+    if fixed != snippet:
+        steps.append("trailing_commas")
+    return loads(fixed), steps
+
+
+def repair_structured(
+    text: str,
+    model_cls: Type[BaseModel],
+    expects_list: bool = False,
+) -> Optional[Tuple[Any, Any, List[str]]]:
+    """
+    Repair, coerce and validate model output against `model_cls`.
+
+    Returns (parsed, payload, steps), where parsed is an instance or, for
+    `expects_list`, a non-empty list of instances. Returns None if nothing
+    salvageable remains. The outcome is recorded in `repair_stats()`.
+    """
+    try:
+        payload, steps = repair_payload(text)
+        if expects_list:
+            items = _unwrap_list(payload)
+            if not isinstance(items, list):
+                raise ValueError("Expected a JSON array")
+            parsed = []
+            kept = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    steps.append(f"drop_item[{index}]")
+                    continue
+                try:
+                    instance, dropped = validate_partial(coerce_fields(item, model_cls), model_cls)
+                except ValidationError:
+                    steps.append(f"drop_item[{index}]")
+                    continue
+                steps.extend(f"drop:{name}" for name in dropped)
+                parsed.append(instance)
+                kept.append(instance.model_dump(mode="json"))
+            if not parsed:
+                raise ValueError("No valid items")
+            payload = kept
+        else:
+            if isinstance(payload, list) and len(payload) == 1 and isinstance(payload[0], dict):
+                payload = payload[0]
+                steps.append("unwrap_singleton")
+            if not isinstance(payload, dict):
+                raise ValueError("Expected a JSON object")
+            parsed, dropped = validate_partial(coerce_fields(payload, model_cls), model_cls)
+            steps.extend(f"drop:{name}" for name in dropped)
+            payload = parsed.model_dump(mode="json")
+        steps.append("coerce")
+    except (ValueError, ValidationError):
+        _stats.record(False)
+        return None
+    _stats.record(True, partial=any(s.startswith("drop") for s in steps))
+    return parsed, payload, steps
+
+
+class _RepairStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.repaired = 0
+        self.partial = 0
+
+    def record(self, ok: bool, partial: bool = False) -> None:
+        with self._lock:
+            self.attempts += 1
+            if ok:
+                self.repaired += 1
+                if partial:
+                    self.partial += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rate = self.repaired / self.attempts if self.attempts else 0.0
+            return {
+                "attempts": self.attempts,
+                "repaired": self.repaired,
+                "partial": self.partial,
+                "failed": self.attempts - self.repaired,
+                "success_rate": rate,
+            }
+
+
+_stats = _RepairStats()
+
+
+def repair_stats() -> Dict[str, Any]:
+    """Process-wide repair outcomes: attempts, repaired, partial, failed, success_rate."""
+    return _stats.snapshot()
+
+
+__all__ = [
+    "close_truncated",
+    "coerce_fields",
+    "extract_json",
+    "repair_payload",
+    "repair_stats",
+    "repair_structured",
+    "scan_balanced",
+    "strip_fences",
+    "validate_partial",
+]
@@ -0,0 +1,239 @@
+"""
+JSON codec for agent outputs, caches and review files.
+
+One place for JSON on the hot paths:
+
+- `dumps` / `dumpb` / `loads` use orjson when it is installed (several times
+  faster, native date/datetime/pydantic-friendly output) and fall back to
+  the stdlib otherwise. Output is always UTF-8 (no ASCII escaping);
+  unknown types are rendered with `str`.
+- storage is compact by default. `pretty=True` is for files people read
+  (config, summaries). `WPD_PRETTY_JSON=1` makes `write_json` pretty-print
+  everything, for debugging.
+- `extract_json` / `parse_json_payload` pull a JSON value out of model prose
+  with a balanced-bracket scanner (string and escape aware) instead of
+  greedy regexes over the whole response.
+
+Examples:
+    >>> dumps({"b": 1, "a": [1, 2]})
+    '{"b":1,"a":[1,2]}'
+    >>> loads(dumpb({"ok": True}))
+    {'ok': True}
+    >>> parse_json_payload('Here is the result: {"ok": true} Thanks.')
+    {'ok': True}
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple, Union
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+
+# Cap on candidate start positions tried when extracting JSON from prose
+MAX_EXTRACT_CANDIDATES = 64
+
+
+def backend() -> str:
+    """Name of the active encoder ("orjson" or "json")."""
+    return "orjson" if orjson is not None else "json"
+
+
+def dumpb(
+    obj: Any,
+    *,
+    pretty: bool = False,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] = str,
+) -> bytes:
+    """Serialize to UTF-8 bytes (compact unless `pretty`)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. integers beyond 64 bits; the stdlib handles these
+            pass
+    return dumps_stdlib(obj, pretty=pretty, sort_keys=sort_keys, default=default).encode("utf-8")
+
+
+def dumps(
+    obj: Any,
+    *,
+    pretty: bool = False,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] = str,
+) -> str:
+    """Serialize to str (compact unless `pretty`)."""
+    return dumpb(obj, pretty=pretty, sort_keys=sort_keys, default=default).decode("utf-8")
+
+
+def dumps_stdlib(
+    obj: Any,
+    *,
+    pretty: bool = False,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] = str,
+) -> str:
+    """Stdlib serialization matching `dumps` output."""
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys, default=default)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys, default=default)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parse JSON text or bytes. Raises ValueError (json.JSONDecodeError) on bad input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _pretty_storage() -> bool:
+    return os.getenv("WPD_PRETTY_JSON", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def storage_bytes(obj: Any, *, pretty: bool = False) -> bytes:
+    """Bytes for a JSON file: compact unless `pretty` or WPD_PRETTY_JSON is set."""
+    return dumpb(obj, pretty=pretty or _pretty_storage())
+
+
+def write_json(path: Union[str, Path], obj: Any, *, pretty: bool = False) -> Path:
+    """Write `obj` to `path` (compact unless `pretty` or WPD_PRETTY_JSON is set)."""
+    path = Path(path)
+    path.write_bytes(storage_bytes(obj, pretty=pretty))
+    return path
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file."""
+    return loads(Path(path).read_bytes())
+
+
+def scan_balanced(text: str, start: int) -> Optional[int]:
+    """
+    Return the index just past the bracket that closes `text[start]`, or None if it never closes.
+
+    Brackets inside JSON strings (including escaped quotes) are ignored.
+
+    Examples:
+        >>> text = 'x {"a": "}", "b": [1]} y'
+        >>> text[2:scan_balanced(text, 2)]
+        '{"a": "}", "b": [1]}'
+        >>> scan_balanced('{"a": [1, 2', 0) is None
+        True
+    """
+    depth = 0
+    in_str = False
+    esc = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def extract_json(text: str) -> Tuple[Optional[str], bool]:
+    """
+    Find the JSON value embedded in prose.
+
+    Returns (snippet, truncated): the first top-level balanced `{...}` /
+    `[...]` that parses; otherwise the longest candidate, either a balanced
+    span that still needs repair or the text from an opening bracket that
+    never closes (truncated=True). (None, False) if there is no candidate.
+
+    Examples:
+        >>> extract_json('Result [see below]: {"ok": true} -- done')
+        ('{"ok": true}', False)
+        >>> extract_json('Sure [note]: {"items": [1, 2')
+        ('{"items": [1, 2', True)
+        >>> extract_json('{"a": [1, 2,]}')
+        ('{"a": [1, 2,]}', False)
+    """
+    best: Tuple[Optional[str], bool] = (None, False)
+    tried = 0
+    covered = 0
+    for match in re.finditer(r"[\[{]", text):
+        start = match.start()
+        # Only top-level candidates: brackets nested in an earlier span are part of it
+        if start < covered:
+            continue
+        if tried >= MAX_EXTRACT_CANDIDATES:
+            break
+        tried += 1
+        end = scan_balanced(text, start)
+        covered = len(text) if end is None else end
+        snippet = text[start:] if end is None else text[start:end]
+        if end is not None:
+            try:
+                loads(snippet)
+                return snippet, False
+            except ValueError:
+                pass
+        if best[0] is None or len(snippet) > len(best[0]):
+            best = (snippet, end is None)
+    return best
+
+
+def parse_json_payload(text: str) -> Any:
+    """
+    Parse model output as JSON, extracting the embedded value if there is surrounding prose.
+
+    Raises:
+        ValueError: If no complete JSON value is found
+
+    Examples:
+        >>> parse_json_payload('[{"a": 1}]')
+        [{'a': 1}]
+        >>> parse_json_payload('No JSON here')
+        Traceback (most recent call last):
+            ...
+        ValueError: No JSON object or array found in output
+    """
+    try:
+        return loads(text)
+    except ValueError:
+        pass
+    snippet, truncated = extract_json(text)
+    if snippet is None or truncated:
+        raise ValueError("No JSON object or array found in output")
+    return loads(snippet)
+
+
+__all__ = [
+    "MAX_EXTRACT_CANDIDATES",
+    "backend",
+    "dumpb",
+    "dumps",
+    "dumps_stdlib",
+    "extract_json",
+    "loads",
+    "parse_json_payload",
+    "read_json",
+    "scan_balanced",
+    "storage_bytes",
+    "write_json",
+]
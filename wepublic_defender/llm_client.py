@@ -4,26 +4,44 @@ Provider-agnostic LLM client utilities for WePublicDefender.
 This module reads `wepublic_defender/config/llm_providers.json` and exposes
 helpers to:
 - Resolve provider + model configuration by logical model key (e.g., "gpt-5")
-- Create appropriate client for each provider (OpenAI Responses API, xAI native SDK)
+- Borrow pooled, reusable clients for each provider (OpenAI Responses API, xAI native SDK)
 - Execute chat completions with sensible timeouts and tracking
+- Admit each call through the shared rate limiter (see `rate_limiter`)
+- Retry transient provider failures with backoff (see `retry`)
+- Check each request against the model's context window before sending,
+  rerouting or rejecting oversized requests (see `token_estimator`)
 - Route to provider-specific implementations based on api_type
 
 Architecture:
 - chat_complete(): Router function that dispatches to provider-specific implementations
-- _call_openai_responses(): OpenAI Responses API (for GPT-5 models)
-- _call_xai_native(): xAI native SDK (for Grok models)
+- async_chat_complete(): Native asyncio router with the same return contract
+- _call_openai_responses() / _acall_openai_responses(): OpenAI Responses API (for GPT-5 models)
+- _call_xai_native() / _acall_xai_native(): xAI native SDK (for Grok models)
+
+Streaming (async only): pass `stream=True` and an optional `on_delta` callback
+to async_chat_complete. Text deltas are forwarded as they arrive and the usage
+dict gains `ttft` (seconds to first token) and `tokens_per_sec`. If
+timeoutConfig.firstTokenTimeout is set, a stream that produces no text within
+that many seconds raises StreamStalledError.
+
+Retries: both routers run each call through the retry engine. Every attempt
+takes its own rate-limit lease and a longer timeout (retry_attempt_N), and the
+usage dict records `attempts`, `retry_errors` and `retry_wait`. A stream is
+not retried once it has emitted text, since the caller has already seen it.
 """
 
 from __future__ import annotations
 
-import os
+import asyncio
+import inspect
 import time
-from typing import Any, Dict, List, Optional, Tuple, Type
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
 except Exception:  # pragma: no cover - allow import to fail gracefully at runtime
     OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
 
 try:
     from xai_sdk import Client as XAIClient
@@ -34,18 +52,63 @@ except Exception:  # pragma: no cover - allow import to fail gracefully at runti
     user = None  # type: ignore
     assistant = None  # type: ignore
 
-from .config import load_llm_providers
+from .client_pool import get_client_pool
+from .config import get_resolved_llm_config
 from .logging_utils import get_logger
+from .rate_limiter import get_rate_limiter, scopes_for
+from .retry import aretry, resolve_retry_config, retry
+from .token_estimator import TokenEstimate, check_context_window, get_token_estimator
 
 
 class LLMConfigError(Exception):
     pass
 
 
+class StreamStalledError(TimeoutError):
+    """Raised when a streamed response produces no text before firstTokenTimeout."""
+
+
+# Receives each text delta of a streamed response; may be sync or async
+DeltaCallback = Callable[[str], Any]
+
+
+def _first_token_timeout(root_cfg: Dict[str, Any]) -> Optional[float]:
+    """Return timeoutConfig.firstTokenTimeout in seconds, or None when disabled."""
+    value = (root_cfg.get("timeoutConfig", {}) or {}).get("firstTokenTimeout")
+    return float(value) if value else None
+
+
+async def _emit_delta(on_delta: Optional[DeltaCallback], delta: str) -> None:
+    if on_delta is None or not delta:
+        return
+    res = on_delta(delta)
+    if inspect.isawaitable(res):
+        await res
+
+
+def _apply_stream_metrics(
+    result: Dict[str, Any],
+    started: float,
+    first_token_at: Optional[float],
+    finished: float,
+) -> Dict[str, Any]:
+    """Add ttft/tokens_per_sec to a result's usage dict (tokens/sec measured after first token)."""
+    usage = result["usage"]
+    usage["streamed"] = True
+    usage["ttft"] = (first_token_at - started) if first_token_at else None
+    gen_time = finished - (first_token_at or started)
+    out_tok = int(usage.get("output", 0) or 0)
+    usage["tokens_per_sec"] = (out_tok / gen_time) if gen_time > 0 and out_tok else 0.0
+    return result
+
+
 def _get_configs(model_key: str) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     """
     Return (provider_cfg, model_cfg, root_cfg) for a logical model key.
 
+    Reads from the memoized resolved config, so repeated calls do not
+    re-parse llm_providers.json unless it changed on disk.
+
     Args:
         model_key: Logical model identifier like 'gpt-5' or 'grok-4'
 
@@ -70,21 +133,17 @@ def _get_configs(model_key: str) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[s
         ...     "Unknown model key" in str(e)
         True
     """
-    root = load_llm_providers()
+    resolved = get_resolved_llm_config()
 
-    models = root.get("modelConfigurations", {})
-    if model_key not in models:
+    if model_key not in resolved.models:
         raise LLMConfigError(f"Unknown model key: {model_key}")
-    model_cfg = models[model_key]
 
-    providers = root.get("llm_providers", {})
-    provider_name = model_cfg.get("provider")
-    if provider_name not in providers:
+    profile = resolved.profile(model_key)
+    if profile is None:
         raise LLMConfigError(
-            f"Provider '{provider_name}' not defined for model '{model_key}'"
+            f"Provider '{resolved.models[model_key].get('provider')}' not defined for model '{model_key}'"
         )
-    provider_cfg = providers[provider_name]
-    return provider_cfg, model_cfg, root
+    return profile.provider_cfg, profile.model_cfg, resolved.root
 
 
 def _compute_timeout(
@@ -94,6 +153,7 @@ def _compute_timeout(
     web_search: bool = False,
     effort: Optional[str] = None,
     supports_reasoning: bool = False,
+    attempt: int = 1,
 ) -> float:
     """
     Compute a request timeout using the repo's timeoutConfig policy.
@@ -104,6 +164,7 @@ def _compute_timeout(
     3. Apply effort multiplier (if model supports reasoning)
     4. Apply service tier multiplier
     5. Apply web_search multiplier if configured and web_search is True
+    6. Apply retry_attempt_N multiplier for retries (highest configured N if attempt exceeds it)
 
     Args:
         root_cfg: Root configuration dict
@@ -112,6 +173,7 @@ def _compute_timeout(
         web_search: Whether web search is enabled for this request
         effort: Reasoning effort level (minimal, low, medium, high)
         supports_reasoning: Whether the model supports reasoning/effort
+        attempt: 1-based attempt number from the retry engine
 
     Returns:
         Computed timeout in seconds, capped at maxTimeout
@@ -149,69 +211,69 @@ def _compute_timeout(
         web_search_factor = float(mults.get("web_search", 1.0))
         timeout = timeout * web_search_factor
 
-    # 5. Cap at maxTimeout
+    # 5. Give retries more room: retry_attempt_N, falling back to the highest N configured
+    if attempt > 1:
+        attempt_mults = {
+            int(k.rsplit("_", 1)[1]): float(v)
+            for k, v in mults.items()
+            if k.startswith("retry_attempt_") and k.rsplit("_", 1)[1].isdigit()
+        }
+        eligible = [n for n in attempt_mults if n <= attempt]
+        if eligible:
+            timeout = timeout * attempt_mults[max(eligible)]
+
+    # 6. Cap at maxTimeout
     max_timeout = float(tcfg.get("maxTimeout", 43200))
     return min(timeout, max_timeout)
 
 
-def _create_client(provider_cfg: Dict[str, Any]) -> Optional[OpenAI]:
+def _create_client(
+    provider_cfg: Dict[str, Any],
+    provider_name: Optional[str] = None,
+    root_cfg: Optional[Dict[str, Any]] = None,
+) -> Optional[OpenAI]:
     """
-    Create an OpenAI-compatible client for the given provider config.
+    Borrow an OpenAI-compatible client for the given provider config.
+
+    Clients come from the process-wide pool (see `client_pool`) so repeated
+    calls reuse keep-alive connections instead of reconnecting per request.
     Returns None if api key not present or OpenAI SDK missing.
     """
     if OpenAI is None:
         return None
-
-    api_key_env = provider_cfg.get("api_key_env_var")
-    if not api_key_env:
-        return None
-    api_key = os.getenv(api_key_env)
-    if not api_key:
-        return None
-
-    base_url = provider_cfg.get("base_url")
-    params: Dict[str, Any] = {"api_key": api_key}
-    if base_url:
-        params["base_url"] = base_url
-
-    try:
-        return OpenAI(**params)
-    except Exception:
-        return None
+    name = provider_name or str(provider_cfg.get("name") or "openai")
+    return get_client_pool().openai_client(name, provider_cfg, root_cfg)
 
 
 def ensure_client_for_model(model_key: str) -> Tuple[Optional[OpenAI], Dict[str, Any], Dict[str, Any]]:
     """
-    Resolve provider + model config and create a client.
+    Resolve provider + model config and borrow a pooled client.
 
     Returns (client_or_none, model_cfg, root_cfg).
     """
     provider_cfg, model_cfg, root_cfg = _get_configs(model_key)
-    client = _create_client(provider_cfg)
+    client = _create_client(provider_cfg, model_cfg.get("provider"), root_cfg)
     return client, model_cfg, root_cfg
 
 
-def _call_openai_responses(
-    client: OpenAI,
+def _build_openai_request(
     model_cfg: Dict[str, Any],
     root_cfg: Dict[str, Any],
     messages: List[Dict[str, Any]],
     *,
-    temperature: Optional[float] = None,
-    max_output_tokens: Optional[int] = None,
-    service_tier: str = "auto",
-    effort: Optional[str] = None,
-    web_search: bool = False,
-    pydantic_model: Optional[Type] = None,
+    temperature: Optional[float],
+    max_output_tokens: Optional[int],
+    service_tier: str,
+    effort: Optional[str],
+    web_search: bool,
+    pydantic_model: Optional[Type],
     model_key: str,
-) -> Dict[str, Any]:
+    attempt: int = 1,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
-    Call OpenAI Responses API (for GPT-5 models).
+    Build Responses API request kwargs plus a context dict used to shape the result.
 
-    Uses client.responses.create() with:
-    - reasoning={"effort": "low"} for reasoning models
-    - tools=[{"type": "web_search"}] for web search
-    - response_format=pydantic_model for structured outputs
+    Shared by the sync and async OpenAI paths so both send identical requests.
     """
     logger = get_logger()
     wire_model = model_cfg.get("model_name", model_key)
@@ -228,10 +290,9 @@ def _call_openai_responses(
         model_cfg=model_cfg,
         web_search=web_search,
         effort=effort,
-        supports_reasoning=supports_reasoning
+        supports_reasoning=supports_reasoning,
+        attempt=attempt,
     )
-    started = time.time()
-    req_client = client.with_options(timeout=timeout)
 
     # Build request kwargs
     request_kwargs: Dict[str, Any] = {
@@ -259,6 +320,10 @@ def _call_openai_responses(
     if web_search:
         request_kwargs["tools"] = [{"type": "web_search"}]
 
+    # Structured outputs go through responses.parse() with text_format
+    if pydantic_model is not None:
+        request_kwargs["text_format"] = pydantic_model
+
     # Log request
     try:
         logger.debug(
@@ -278,19 +343,52 @@ def _call_openai_responses(
     except Exception:
         pass
 
-    # Make the API call - use parse() for structured outputs, create() for plain text
-    if pydantic_model is not None:
-        # Use responses.parse() with text_format for structured outputs
-        request_kwargs["text_format"] = pydantic_model
-        resp = req_client.responses.parse(**request_kwargs)
+    ctx = {
+        "model_key": model_key,
+        "wire_model": wire_model,
+        "timeout": timeout,
+        "tokens_param": tokens_param,
+        "max_tokens": max_tokens,
+        "temperature": temp,
+        "supports_temperature": supports_temp_cfg,
+        "supports_reasoning": supports_reasoning,
+        "effort": effort,
+        "effort_applied": effort_applied,
+        "service_tier": service_tier,
+        "structured": pydantic_model is not None,
+    }
+    return request_kwargs, ctx
+
+
+def _cached_tokens(details: Any) -> int:
+    """
+    Read `cached_tokens` from a usage details block, whether an SDK object or a plain dict.
+
+    Examples:
+        >>> _cached_tokens({"cached_tokens": 7})
+        7
+        >>> class Details:
+        ...     cached_tokens = 3
+        >>> _cached_tokens(Details())
+        3
+        >>> _cached_tokens(None)
+        0
+    """
+    if details is None:
+        return 0
+    if isinstance(details, dict):
+        value = details.get("cached_tokens", 0)
     else:
-        # Use responses.create() for plain text
-        resp = req_client.responses.create(**request_kwargs)
+        value = getattr(details, "cached_tokens", 0)
+    return int(value) if isinstance(value, (int, float)) else 0
+
 
-    duration = time.time() - started
+def _openai_result(resp: Any, ctx: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    """Convert a Responses API response into the chat_complete return contract."""
+    logger = get_logger()
 
     # Extract text from response
-    if pydantic_model is not None:
+    if ctx["structured"]:
         # For structured outputs, get the parsed Pydantic object from output_parsed
         # Don't serialize to JSON here - return the object and let core.py handle it
         parsed_obj = getattr(resp, "output_parsed", None)
@@ -308,26 +406,24 @@ def _call_openai_responses(
     in_tok = getattr(usage, "input_tokens", 0) if usage else 0
     out_tok = getattr(usage, "output_tokens", 0) if usage else 0
 
-    # Check for cached tokens in input_tokens_details
-    input_details = getattr(usage, "input_tokens_details", None) if usage else None
-    if input_details and isinstance(input_details, dict):
-        cached_tok = int(input_details.get("cached_tokens", 0))
-    else:
-        cached_tok = 0
+    # Cached prompt tokens (the SDK returns an object; raw batch bodies a dict)
+    cached_tok = _cached_tokens(getattr(usage, "input_tokens_details", None) if usage else None)
+
+    effort_used = ctx["effort"] if ctx["effort_applied"] else None
 
     # Log response
     try:
         logger.info(
             "OpenAI Responses API response | model_key=%s | wire_model=%s | in=%s | out=%s | cached=%s | dur=%.2fs | effort=%s | tier=%s | timeout=%.1fs",
-            model_key,
-            wire_model,
+            ctx["model_key"],
+            ctx["wire_model"],
             int(in_tok or 0),
             int(out_tok or 0),
             int(cached_tok or 0),
             duration,
-            effort if effort_applied else None,
-            service_tier,
-            timeout,
+            effort_used,
+            ctx["service_tier"],
+            ctx["timeout"],
         )
     except Exception:
         pass
@@ -339,26 +435,26 @@ def _call_openai_responses(
             "output": int(out_tok or 0),
             "cached": int(cached_tok or 0),
             "duration": duration,
-            "service_tier": service_tier,
-            "model": model_key,
-            "effort": effort if effort_applied else None,
-            "effort_requested": effort,
+            "service_tier": ctx["service_tier"],
+            "model": ctx["model_key"],
+            "effort": effort_used,
+            "effort_requested": ctx["effort"],
         },
         "meta": {
-            "wire_model": wire_model,
-            "tokens_param": tokens_param,
-            "max_tokens": max_tokens,
-            "temperature": temp,
-            "supports_temperature": supports_temp_cfg,
-            "reasoning_supported": supports_reasoning,
+            "wire_model": ctx["wire_model"],
+            "tokens_param": ctx["tokens_param"],
+            "max_tokens": ctx["max_tokens"],
+            "temperature": ctx["temperature"],
+            "supports_temperature": ctx["supports_temperature"],
+            "reasoning_supported": ctx["supports_reasoning"],
             "api_type": "openai_responses",
         },
         "raw": resp,
     }
 
 
-def _call_xai_native(
-    provider_cfg: Dict[str, Any],
+def _call_openai_responses(
+    client: OpenAI,
     model_cfg: Dict[str, Any],
     root_cfg: Dict[str, Any],
     messages: List[Dict[str, Any]],
@@ -370,28 +466,160 @@ def _call_xai_native(
     web_search: bool = False,
     pydantic_model: Optional[Type] = None,
     model_key: str,
+    attempt: int = 1,
 ) -> Dict[str, Any]:
     """
-    Call xAI native SDK (for Grok models).
+    Call OpenAI Responses API (for GPT-5 models).
 
-    Uses xai_sdk.Client().chat.create() with builder pattern:
-    - chat.append() for messages
-    - chat.sample(search=True) for web search
-    - Native Pydantic support via response_format
+    Uses client.responses.create() with:
+    - reasoning={"effort": "low"} for reasoning models
+    - tools=[{"type": "web_search"}] for web search
+    - response_format=pydantic_model for structured outputs
     """
-    logger = get_logger()
+    request_kwargs, ctx = _build_openai_request(
+        model_cfg,
+        root_cfg,
+        messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    started = time.time()
+    req_client = client.with_options(timeout=ctx["timeout"], max_retries=0)
 
-    if XAIClient is None:
+    # Make the API call - use parse() for structured outputs, create() for plain text
+    if pydantic_model is not None:
+        resp = req_client.responses.parse(**request_kwargs)
+    else:
+        resp = req_client.responses.create(**request_kwargs)
+
+    return _openai_result(resp, ctx, time.time() - started)
+
+
+async def _acall_openai_responses(
+    client: AsyncOpenAI,
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    model_key: str,
+    attempt: int = 1,
+) -> Dict[str, Any]:
+    """Async counterpart of `_call_openai_responses` using AsyncOpenAI."""
+    request_kwargs, ctx = _build_openai_request(
+        model_cfg,
+        root_cfg,
+        messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    started = time.time()
+    req_client = client.with_options(timeout=ctx["timeout"], max_retries=0)
+
+    if pydantic_model is not None:
+        resp = await req_client.responses.parse(**request_kwargs)
+    else:
+        resp = await req_client.responses.create(**request_kwargs)
+
+    return _openai_result(resp, ctx, time.time() - started)
+
+
+async def _astream_openai_responses(
+    client: AsyncOpenAI,
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    model_key: str,
+    on_delta: Optional[DeltaCallback] = None,
+    attempt: int = 1,
+) -> Dict[str, Any]:
+    """Streaming counterpart of `_acall_openai_responses` (responses.stream)."""
+    request_kwargs, ctx = _build_openai_request(
+        model_cfg,
+        root_cfg,
+        messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    started = time.time()
+    first_token_at: Optional[float] = None
+    first_token_timeout = _first_token_timeout(root_cfg)
+    req_client = client.with_options(timeout=ctx["timeout"], max_retries=0)
+
+    try:
+        async with asyncio.timeout(first_token_timeout) as deadline:
+            async with req_client.responses.stream(**request_kwargs) as stream:
+                async for event in stream:
+                    if getattr(event, "type", None) != "response.output_text.delta":
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                        deadline.reschedule(None)
+                    await _emit_delta(on_delta, getattr(event, "delta", "") or "")
+                resp = await stream.get_final_response()
+    except TimeoutError as e:
+        if first_token_at is None and first_token_timeout:
+            raise StreamStalledError(
+                f"No output from '{model_key}' within firstTokenTimeout={first_token_timeout:.0f}s"
+            ) from e
+        raise
+
+    finished = time.time()
+    return _apply_stream_metrics(_openai_result(resp, ctx, finished - started), started, first_token_at, finished)
+
+
+def _build_xai_request(
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    *,
+    temperature: Optional[float],
+    max_output_tokens: Optional[int],
+    service_tier: str,
+    effort: Optional[str],
+    web_search: bool,
+    model_key: str,
+    attempt: int = 1,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build xAI chat.create() kwargs plus a context dict used to shape the result.
+
+    Shared by the sync and async xAI paths so both send identical requests.
+    """
+    if system is None:
         raise RuntimeError(
             "xai_sdk not available. Install with: pip install xai-sdk"
         )
 
-    # Get API key
-    api_key_env = provider_cfg.get("api_key_env_var")
-    api_key = os.getenv(api_key_env) if api_key_env else None
-    if not api_key:
-        raise RuntimeError(f"xAI API key not found in environment variable: {api_key_env}")
-
     wire_model = model_cfg.get("model_name", model_key)
     temp = temperature if temperature is not None else model_cfg.get("temperature")
     max_tokens = max_output_tokens or model_cfg.get("max_output_tokens")
@@ -406,12 +634,9 @@ def _call_xai_native(
         model_cfg=model_cfg,
         web_search=web_search,
         effort=effort,
-        supports_reasoning=supports_reasoning
+        supports_reasoning=supports_reasoning,
+        attempt=attempt,
     )
-    started = time.time()
-
-    # Create xAI client
-    xai_client = XAIClient(api_key=api_key)
 
     # Build create kwargs - all parameters go here, not in sample()
     create_kwargs: Dict[str, Any] = {}
@@ -449,10 +674,25 @@ def _call_xai_native(
         except:
             pass  # Skip web search if SearchParameters not available
 
-    # Build chat with all parameters (DO NOT pass response_format here)
-    chat = xai_client.chat.create(model=wire_model, **create_kwargs)
+    ctx = {
+        "model_key": model_key,
+        "wire_model": wire_model,
+        "timeout": timeout,
+        "max_tokens": max_tokens,
+        "temperature": temp,
+        "supports_temperature": supports_temp_cfg,
+        "supports_reasoning": supports_reasoning,
+        "effort": effort,
+        "effort_applied": effort_applied,
+        "service_tier": service_tier,
+        "web_search": web_search,
+    }
+    return create_kwargs, ctx
+
 
-    # Add messages using xAI SDK helper functions
+def _append_xai_messages(chat: Any, messages: List[Dict[str, Any]], ctx: Dict[str, Any], pydantic_model: Optional[Type]) -> None:
+    """Add messages to an xAI chat using the SDK helper functions and log the request."""
+    logger = get_logger()
     for msg in messages:
         role_str = msg.get("role", "user")
         content = msg.get("content", "")
@@ -467,60 +707,51 @@ def _call_xai_native(
     try:
         logger.debug(
             "xAI native SDK request | model_key=%s | wire_model=%s | max_tokens=%s | temp=%s | tier=%s | timeout=%.1fs | effort=%s | web_search=%s | pydantic=%s | msgs=%s",
-            model_key,
-            wire_model,
-            max_tokens,
-            temp,
-            service_tier,
-            timeout,
-            effort if effort_applied else None,
-            web_search,
+            ctx["model_key"],
+            ctx["wire_model"],
+            ctx["max_tokens"],
+            ctx["temperature"],
+            ctx["service_tier"],
+            ctx["timeout"],
+            ctx["effort"] if ctx["effort_applied"] else None,
+            ctx["web_search"],
             pydantic_model.__name__ if pydantic_model else None,
             [(m.get('role'), len(str(m.get('content','')))) for m in messages],
         )
     except Exception:
         pass
 
-    # Make the API call
-    # xAI SDK uses chat.parse(Model) for structured outputs, not response_format
-    if pydantic_model is not None:
-        # Use parse() for structured outputs
-        resp, parsed_obj = chat.parse(pydantic_model)
-        duration = time.time() - started
-        # Serialize the Pydantic object to JSON for the text field
-        text = parsed_obj.model_dump_json(indent=2) if parsed_obj else ""
-    else:
-        # Use sample() for plain text
-        resp = chat.sample()
-        duration = time.time() - started
-        # Extract text from response
-        text = getattr(resp, "content", "") or getattr(resp, "text", "")
+
+def _xai_result(resp: Any, text: str, ctx: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    """Convert an xAI SDK response into the chat_complete return contract."""
+    logger = get_logger()
 
     # Extract usage information (xAI uses different field names than OpenAI)
     usage = getattr(resp, "usage", None)
     # xAI uses prompt_tokens/completion_tokens instead of input_tokens/output_tokens
     in_tok = getattr(usage, "prompt_tokens", 0) if usage else 0
     out_tok = getattr(usage, "completion_tokens", 0) if usage else 0
-    # Check for cached tokens in prompt_tokens_details
-    prompt_details = getattr(usage, "prompt_tokens_details", None) if usage else None
-    if prompt_details:
-        cached_tok = getattr(prompt_details, "cached_tokens", 0)
-    else:
-        cached_tok = 0
+    # Cached prompt tokens: the native SDK reports cached_prompt_text_tokens
+    cached_tok = getattr(usage, "cached_prompt_text_tokens", 0) if usage else 0
+    cached_tok = int(cached_tok) if isinstance(cached_tok, (int, float)) else 0
+    if not cached_tok and usage:
+        cached_tok = _cached_tokens(getattr(usage, "prompt_tokens_details", None))
+
+    effort_used = ctx["effort"] if ctx["effort_applied"] else None
 
     # Log response
     try:
         logger.info(
             "xAI native SDK response | model_key=%s | wire_model=%s | in=%s | out=%s | cached=%s | dur=%.2fs | effort=%s | tier=%s | timeout=%.1fs",
-            model_key,
-            wire_model,
+            ctx["model_key"],
+            ctx["wire_model"],
             int(in_tok or 0),
             int(out_tok or 0),
             int(cached_tok or 0),
             duration,
-            effort if effort_applied else None,
-            service_tier,
-            timeout,
+            effort_used,
+            ctx["service_tier"],
+            ctx["timeout"],
         )
     except Exception:
         pass
@@ -532,23 +763,271 @@ def _call_xai_native(
             "output": int(out_tok or 0),
             "cached": int(cached_tok or 0),
             "duration": duration,
-            "service_tier": service_tier,
-            "model": model_key,
-            "effort": effort if effort_applied else None,
-            "effort_requested": effort,
+            "service_tier": ctx["service_tier"],
+            "model": ctx["model_key"],
+            "effort": effort_used,
+            "effort_requested": ctx["effort"],
         },
         "meta": {
-            "wire_model": wire_model,
-            "max_tokens": max_tokens,
-            "temperature": temp,
-            "supports_temperature": supports_temp_cfg,
-            "reasoning_supported": supports_reasoning,
+            "wire_model": ctx["wire_model"],
+            "max_tokens": ctx["max_tokens"],
+            "temperature": ctx["temperature"],
+            "supports_temperature": ctx["supports_temperature"],
+            "reasoning_supported": ctx["supports_reasoning"],
             "api_type": "xai_native",
         },
         "raw": resp,
     }
 
 
+def _call_xai_native(
+    provider_cfg: Dict[str, Any],
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    model_key: str,
+    attempt: int = 1,
+) -> Dict[str, Any]:
+    """
+    Call xAI native SDK (for Grok models).
+
+    Uses xai_sdk.Client().chat.create() with builder pattern:
+    - chat.append() for messages
+    - chat.sample(search=True) for web search
+    - Native Pydantic support via response_format
+    """
+    if XAIClient is None:
+        raise RuntimeError(
+            "xai_sdk not available. Install with: pip install xai-sdk"
+        )
+
+    create_kwargs, ctx = _build_xai_request(
+        model_cfg,
+        root_cfg,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    started = time.time()
+
+    # Borrow pooled xAI client (raises if API key is missing); its deadline is this attempt's timeout
+    xai_client = get_client_pool().xai_client(
+        model_cfg.get("provider", "xai"), provider_cfg, root_cfg, timeout=ctx["timeout"]
+    )
+
+    # Build chat with all parameters (DO NOT pass response_format here)
+    chat = xai_client.chat.create(model=ctx["wire_model"], **create_kwargs)
+    _append_xai_messages(chat, messages, ctx, pydantic_model)
+
+    # Make the API call
+    # xAI SDK uses chat.parse(Model) for structured outputs, not response_format
+    if pydantic_model is not None:
+        resp, parsed_obj = chat.parse(pydantic_model)
+        # Serialize the Pydantic object to JSON for the text field
+        text = parsed_obj.model_dump_json(indent=2) if parsed_obj else ""
+    else:
+        resp = chat.sample()
+        text = getattr(resp, "content", "") or getattr(resp, "text", "")
+
+    return _xai_result(resp, text, ctx, time.time() - started)
+
+
+async def _acall_xai_native(
+    provider_cfg: Dict[str, Any],
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    model_key: str,
+    attempt: int = 1,
+) -> Dict[str, Any]:
+    """Async counterpart of `_call_xai_native` using xai_sdk.AsyncClient."""
+    create_kwargs, ctx = _build_xai_request(
+        model_cfg,
+        root_cfg,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    started = time.time()
+
+    xai_client = get_client_pool().async_xai_client(
+        model_cfg.get("provider", "xai"), provider_cfg, root_cfg
+    )
+
+    chat = xai_client.chat.create(model=ctx["wire_model"], **create_kwargs)
+    _append_xai_messages(chat, messages, ctx, pydantic_model)
+
+    async with asyncio.timeout(ctx["timeout"]):
+        if pydantic_model is not None:
+            resp, parsed_obj = await chat.parse(pydantic_model)
+            text = parsed_obj.model_dump_json(indent=2) if parsed_obj else ""
+        else:
+            resp = await chat.sample()
+            text = getattr(resp, "content", "") or getattr(resp, "text", "")
+
+    return _xai_result(resp, text, ctx, time.time() - started)
+
+
+async def _astream_xai_native(
+    provider_cfg: Dict[str, Any],
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    model_key: str,
+    on_delta: Optional[DeltaCallback] = None,
+    attempt: int = 1,
+) -> Dict[str, Any]:
+    """
+    Streaming counterpart of `_acall_xai_native` (chat.stream).
+
+    chat.parse() cannot stream, so structured outputs pass the schema as
+    response_format and validate the accumulated JSON once the stream ends.
+    """
+    create_kwargs, ctx = _build_xai_request(
+        model_cfg,
+        root_cfg,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        model_key=model_key,
+        attempt=attempt,
+    )
+    if pydantic_model is not None:
+        create_kwargs["response_format"] = pydantic_model
+    started = time.time()
+    first_token_at: Optional[float] = None
+    first_token_timeout = _first_token_timeout(root_cfg)
+
+    xai_client = get_client_pool().async_xai_client(
+        model_cfg.get("provider", "xai"), provider_cfg, root_cfg
+    )
+    chat = xai_client.chat.create(model=ctx["wire_model"], **create_kwargs)
+    _append_xai_messages(chat, messages, ctx, pydantic_model)
+
+    resp: Any = None
+    try:
+        async with asyncio.timeout(ctx["timeout"]), asyncio.timeout(first_token_timeout) as deadline:
+            async for resp, chunk in chat.stream():
+                delta = getattr(chunk, "content", "") or ""
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.time()
+                    deadline.reschedule(None)
+                await _emit_delta(on_delta, delta)
+    except TimeoutError as e:
+        if deadline.expired():
+            raise StreamStalledError(
+                f"No output from '{model_key}' within firstTokenTimeout={first_token_timeout:.0f}s"
+            ) from e
+        raise
+
+    text = (getattr(resp, "content", "") or "") if resp is not None else ""
+    if pydantic_model is not None and text:
+        try:
+            # Match chat.parse(): return the validated object re-serialized
+            text = pydantic_model.model_validate_json(text).model_dump_json(indent=2)
+        except Exception:
+            pass  # leave raw text; core parses/validates and may retry
+
+    finished = time.time()
+    return _apply_stream_metrics(_xai_result(resp, text, ctx, finished - started), started, first_token_at, finished)
+
+
+SUPPORTED_API_TYPES = ("openai_responses", "xai_native")
+
+
+def _route(model_key: str, effort: Optional[str], web_search: bool) -> Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Resolve configs and api_type for a model key; shared by sync and async routers."""
+    logger = get_logger()
+
+    # Get configuration
+    provider_cfg, model_cfg, root_cfg = _get_configs(model_key)
+
+    # Get api_type to determine which implementation to use
+    api_type = model_cfg.get("api_type")
+    if not api_type:
+        raise LLMConfigError(
+            f"Model '{model_key}' has no api_type specified in config. "
+            "Add 'api_type' field to model configuration."
+        )
+    if api_type not in SUPPORTED_API_TYPES:
+        raise LLMConfigError(
+            f"Unknown api_type '{api_type}' for model '{model_key}'. "
+            f"Supported types: 'openai_responses', 'xai_native'"
+        )
+
+    logger.debug(
+        "Router dispatch | model_key=%s | api_type=%s | effort=%s | web_search=%s",
+        model_key, api_type, effort, web_search
+    )
+    return api_type, provider_cfg, model_cfg, root_cfg
+
+
+def _limiter_scopes(
+    model_key: str,
+    provider_cfg: Dict[str, Any],
+    model_cfg: Dict[str, Any],
+    root_cfg: Dict[str, Any],
+) -> Tuple[Any, List[Any]]:
+    """Return (limiter, scopes) for a call; scopes is empty when nothing is limited."""
+    limiter = get_rate_limiter(root_cfg)
+    if limiter is None:
+        return None, []
+    provider_name = model_cfg.get("provider") or str(provider_cfg.get("name") or "")
+    return limiter, scopes_for(provider_name, provider_cfg, model_key, model_cfg)
+
+
+def _record_estimate(result: Dict[str, Any], estimate: TokenEstimate, web_search: bool) -> None:
+    """Attach the pre-flight estimate to usage and recalibrate the chars/token ratio."""
+    u = result["usage"]
+    u["estimated_input"] = estimate.input_tokens
+    u["estimated_cost"] = estimate.estimated_cost
+    if estimate.rerouted_from:
+        u["rerouted_from"] = estimate.rerouted_from
+    # Web search results are billed as input tokens, so they would skew calibration
+    if estimate.method == "chars" and not web_search:
+        get_token_estimator().observe(estimate.model_key, estimate.chars, int(u.get("input", 0) or 0))
+
+
+def _actual_tokens(result: Optional[Dict[str, Any]]) -> Optional[int]:
+    if not result:
+        return None
+    u = result.get("usage", {}) or {}
+    return int(u.get("input", 0) or 0) + int(u.get("output", 0) or 0)
+
+
 def chat_complete(
     model_key: str,
     messages: List[Dict[str, Any]],
@@ -559,6 +1038,7 @@ def chat_complete(
     effort: Optional[str] = None,
     web_search: bool = False,
     pydantic_model: Optional[Type] = None,
+    estimate: Optional[TokenEstimate] = None,
 ) -> Dict[str, Any]:
     """
     Router function for chat completions - dispatches to provider-specific implementations.
@@ -577,72 +1057,187 @@ def chat_complete(
         effort: Reasoning effort level ("minimal", "low", "medium", "high")
         web_search: Enable web search (if supported by model)
         pydantic_model: Pydantic model class for structured outputs
+        estimate: Pre-flight estimate the caller already made for these messages
+            with check_context_window; when it is for `model_key` the
+            context-window check here is skipped
 
     Returns:
         Dict with keys: "text", "usage", "meta", "raw"
 
     Raises:
         LLMConfigError: If model_key or api_type is invalid
+        ContextWindowExceededError: If the request cannot fit any allowed model
         RuntimeError: If required SDK or API key is missing
     """
-    logger = get_logger()
-
-    # Get configuration
-    provider_cfg, model_cfg, root_cfg = _get_configs(model_key)
-
-    # Get api_type to determine which implementation to use
-    api_type = model_cfg.get("api_type")
-    if not api_type:
-        raise LLMConfigError(
-            f"Model '{model_key}' has no api_type specified in config. "
-            "Add 'api_type' field to model configuration."
-        )
-
-    logger.debug(
-        "Router dispatch | model_key=%s | api_type=%s | effort=%s | web_search=%s",
-        model_key, api_type, effort, web_search
-    )
-
-    # Route to appropriate implementation
-    if api_type == "openai_responses":
-        # OpenAI Responses API (for GPT models)
-        client = _create_client(provider_cfg)
-        if client is None:
-            raise RuntimeError(
-                f"OpenAI client not available or API key not set for provider '{provider_cfg.get('name')}'"
-            )
-        return _call_openai_responses(
-            client=client,
-            model_cfg=model_cfg,
-            root_cfg=root_cfg,
-            messages=messages,
-            temperature=temperature,
+    # Pre-flight: keep the request inside the context window (may reroute),
+    # unless the caller already checked these messages for this model
+    if estimate is None or estimate.model_key != model_key:
+        estimate = check_context_window(
+            model_key,
+            messages,
             max_output_tokens=max_output_tokens,
             service_tier=service_tier,
-            effort=effort,
-            web_search=web_search,
             pydantic_model=pydantic_model,
-            model_key=model_key,
         )
+    model_key = estimate.model_key
+    max_output_tokens = estimate.max_output_tokens or max_output_tokens
+    api_type, provider_cfg, model_cfg, root_cfg = _route(model_key, effort, web_search)
+    call_kwargs: Dict[str, Any] = dict(
+        model_cfg=model_cfg,
+        root_cfg=root_cfg,
+        messages=messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+    )
+
+    limiter, scopes = _limiter_scopes(model_key, provider_cfg, model_cfg, root_cfg)
+    lease_wait = 0.0
+
+    def _attempt(attempt: int) -> Dict[str, Any]:
+        nonlocal lease_wait
+        # Admission control: wait for a rate-limit lease before sending
+        lease = limiter.acquire(scopes, estimate.input_tokens) if scopes else None
+        result: Optional[Dict[str, Any]] = None
+        try:
+            # Route to appropriate implementation
+            if api_type == "openai_responses":
+                # OpenAI Responses API (for GPT models)
+                client = _create_client(provider_cfg, model_cfg.get("provider"), root_cfg)
+                if client is None:
+                    raise RuntimeError(
+                        f"OpenAI client not available or API key not set for provider '{provider_cfg.get('name')}'"
+                    )
+                result = _call_openai_responses(client=client, attempt=attempt, **call_kwargs)
+            else:
+                # xAI native SDK (for Grok models)
+                result = _call_xai_native(provider_cfg=provider_cfg, attempt=attempt, **call_kwargs)
+        finally:
+            if lease is not None:
+                lease.release(_actual_tokens(result))
+                lease_wait += lease.waited
+        return result
+
+    result, state = retry(_attempt, resolve_retry_config(root_cfg), label=model_key)
+    result["usage"].update(state.as_usage())
+    _record_estimate(result, estimate, web_search)
+    if scopes:
+        result["usage"]["rate_limit_wait"] = lease_wait
+    return result
+
+
+async def async_chat_complete(
+    model_key: str,
+    messages: List[Dict[str, Any]],
+    *,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    effort: Optional[str] = None,
+    web_search: bool = False,
+    pydantic_model: Optional[Type] = None,
+    stream: bool = False,
+    on_delta: Optional[DeltaCallback] = None,
+    estimate: Optional[TokenEstimate] = None,
+) -> Dict[str, Any]:
+    """
+    Native asyncio counterpart of `chat_complete` with the same arguments and return contract.
+
+    Uses AsyncOpenAI for "openai_responses" models and xai_sdk.AsyncClient for
+    "xai_native" models, so in-flight requests do not occupy executor threads
+    and a single process can keep many reviews running concurrently.
 
-    elif api_type == "xai_native":
-        # xAI native SDK (for Grok models)
-        return _call_xai_native(
-            provider_cfg=provider_cfg,
-            model_cfg=model_cfg,
-            root_cfg=root_cfg,
-            messages=messages,
-            temperature=temperature,
+    Args:
+        stream: Stream the response; usage gains "ttft" and "tokens_per_sec"
+        on_delta: Called with each text delta while streaming (sync or async)
+        estimate: Pre-flight estimate already made by the caller (see `chat_complete`)
+
+    Returns:
+        Dict with keys: "text", "usage", "meta", "raw"
+
+    Raises:
+        LLMConfigError: If model_key or api_type is invalid
+        ContextWindowExceededError: If the request cannot fit any allowed model
+        RuntimeError: If required SDK or API key is missing
+    """
+    # Pre-flight: keep the request inside the context window (may reroute),
+    # unless the caller already checked these messages for this model
+    if estimate is None or estimate.model_key != model_key:
+        estimate = check_context_window(
+            model_key,
+            messages,
             max_output_tokens=max_output_tokens,
             service_tier=service_tier,
-            effort=effort,
-            web_search=web_search,
             pydantic_model=pydantic_model,
-            model_key=model_key,
         )
+    model_key = estimate.model_key
+    max_output_tokens = estimate.max_output_tokens or max_output_tokens
+    api_type, provider_cfg, model_cfg, root_cfg = _route(model_key, effort, web_search)
+    call_kwargs: Dict[str, Any] = dict(
+        model_cfg=model_cfg,
+        root_cfg=root_cfg,
+        messages=messages,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        effort=effort,
+        web_search=web_search,
+        pydantic_model=pydantic_model,
+        model_key=model_key,
+    )
 
-    else:
-        raise LLMConfigError(
-            f"Unknown api_type '{api_type}' for model '{model_key}'. "
-            f"Supported types: 'openai_responses', 'xai_native'"
-        )
+    limiter, scopes = _limiter_scopes(model_key, provider_cfg, model_cfg, root_cfg)
+    lease_wait = 0.0
+    emitted = False
+
+    async def _tracked_delta(delta: str) -> None:
+        nonlocal emitted
+        emitted = True
+        await _emit_delta(on_delta, delta)
+
+    async def _attempt(attempt: int) -> Dict[str, Any]:
+        nonlocal lease_wait
+        # Admission control: wait (without blocking the loop) for a rate-limit lease
+        lease = await limiter.acquire_async(scopes, estimate.input_tokens) if scopes else None
+        result: Optional[Dict[str, Any]] = None
+        try:
+            if api_type == "openai_responses":
+                provider_name = model_cfg.get("provider") or str(provider_cfg.get("name") or "openai")
+                client = get_client_pool().async_openai_client(provider_name, provider_cfg, root_cfg)
+                if client is None:
+                    raise RuntimeError(
+                        f"OpenAI client not available or API key not set for provider '{provider_cfg.get('name')}'"
+                    )
+                if stream:
+                    result = await _astream_openai_responses(
+                        client=client, on_delta=_tracked_delta, attempt=attempt, **call_kwargs
+                    )
+                else:
+                    result = await _acall_openai_responses(client=client, attempt=attempt, **call_kwargs)
+            elif stream:
+                result = await _astream_xai_native(
+                    provider_cfg=provider_cfg, on_delta=_tracked_delta, attempt=attempt, **call_kwargs
+                )
+            else:
+                result = await _acall_xai_native(provider_cfg=provider_cfg, attempt=attempt, **call_kwargs)
+        finally:
+            if lease is not None:
+                await lease.release_async(_actual_tokens(result))
+                lease_wait += lease.waited
+        return result
+
+    result, state = await aretry(
+        _attempt,
+        resolve_retry_config(root_cfg),
+        label=model_key,
+        should_retry=lambda: not emitted,
+    )
+    result["usage"].update(state.as_usage())
+    _record_estimate(result, estimate, web_search)
+    if scopes:
+        result["usage"]["rate_limit_wait"] = lease_wait
+    return result
@@ -4,10 +4,11 @@ wepublic_defender.models
 Data models for token tracking and settings management.
 """
 
-from .token_tracker import TokenUsage, TokenTracker
+from .token_tracker import HedgeEvent, TokenUsage, TokenTracker
 from .settings_manager import SettingsManager
 
 __all__ = [
+    "HedgeEvent",
     "TokenUsage",
     "TokenTracker",
     "SettingsManager",
@@ -36,7 +36,7 @@ class TokenUsage(BaseModel):
     duration: Optional[float] = Field(
         default=None, description="Duration of the api call in seconds"
     )
-    service_tier: Literal["auto", "flex", "standard", "priority"] = "auto"
+    service_tier: Literal["auto", "flex", "standard", "priority", "batch"] = "auto"
     timestamp: float = Field(default_factory=time.time)
     # Image/PDF metadata
     image_count: Optional[int] = Field(
@@ -79,18 +79,51 @@ class TokenUsage(BaseModel):
         return self.model is not None and self.input > 0 and self.output > 0
 
 
+# ── HedgeEvent ─────────────────────────────────────────────────────────────────
+class HedgeEvent(BaseModel):
+    """A duplicate request fired because the primary call outlived its latency threshold."""
+
+    primary_model: str
+    backup_model: str
+    threshold: float = Field(description="Seconds waited on the primary before hedging")
+    winner: Literal["primary", "backup", "none"] = "none"
+    backup_usage: Optional[TokenUsage] = Field(
+        default=None, description="Usage of the backup call if it completed (billed)"
+    )
+    notes: Optional[str] = None
+    timestamp: float = Field(default_factory=time.time)
+
+
 class TokenTracker:
     """Track token usage for multiple models."""
 
-    def __init__(self, models_config: Dict[str, Dict[str, float]]):
+    def __init__(self, models_config: Optional[Dict[str, Dict[str, float]]] = None):
         """Initialize with a configuration of models and their token costs.
 
         Args:
             models_config: A dictionary mapping model names to their token costs.
+                If omitted, pricing is read from the memoized resolved provider
+                config, so edits to llm_providers.json are picked up without
+                re-reading the file on every cost calculation.
         """
-        self.cfg = models_config
+        self._cfg = models_config
         self._usage: Dict[str, TokenUsage] = {}
         self._history: list[TokenUsage] = []  # <- keep every individual entry
+        self._cache_hits: list[TokenUsage] = []  # responses served from the local cache (not billed)
+        self._hedges: list[HedgeEvent] = []  # hedged requests (backup usage is also in _history)
+
+    @property
+    def cfg(self) -> Dict[str, Dict[str, Any]]:
+        """Model pricing configuration (explicit, or the resolved provider config)."""
+        if self._cfg is not None:
+            return self._cfg
+        from ..config import get_resolved_llm_config
+
+        return get_resolved_llm_config().models
+
+    @cfg.setter
+    def cfg(self, value: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        self._cfg = value
 
     # ----- ingest --------------------------------------------------------------
     def add(
@@ -101,7 +134,7 @@ class TokenTracker:
         cache: int = 0,
         effort: Literal["minimal", "low", "medium", "high", None] = None,
         notes: str | None = None,
-        service_tier: Literal["auto", "flex", "standard", "priority"] = "auto",
+        service_tier: Literal["auto", "flex", "standard", "priority", "batch"] = "auto",
         duration: Optional[float] = None,
         timestamp: Optional[float] = None,
         image_count: Optional[int] = None,
@@ -174,10 +207,148 @@ class TokenTracker:
         for usage in usages:
             self.add_usage(usage)
 
+    def add_cache_hit(
+        self,
+        model: str,
+        inp: int,
+        out: int,
+        cache: int = 0,
+        effort: Literal["minimal", "low", "medium", "high", None] = None,
+        notes: str | None = None,
+        service_tier: Literal["auto", "flex", "standard", "priority", "batch"] = "auto",
+        duration: Optional[float] = None,
+    ) -> None:
+        """Record a response served from the local response cache.
+
+        Cache hits are kept apart from billed usage: they do not count toward
+        totals or cost, but `cache_hit_stats()` reports the spend they avoided.
+
+        Args:
+            model: The model that originally produced the response.
+            inp: Input tokens of the original (billed) call.
+            out: Output tokens of the original call.
+            cache: Provider-cached tokens of the original call.
+            notes: Optional notes (e.g., "agent:self_review").
+            duration: Time spent serving the hit from disk.
+        """
+        self._cache_hits.append(
+            TokenUsage(
+                model=model,
+                effort=effort,
+                input=inp,
+                output=out,
+                cached=cache,
+                notes=notes,
+                service_tier=service_tier,
+                duration=duration,
+            )
+        )
+
+    def cache_hit_stats(self) -> Dict[str, float]:
+        """Return response-cache hit count, tokens and dollars avoided.
+
+        Returns:
+            Dict with keys: hits, tokens_avoided, cost_avoided
+        """
+        tokens = 0
+        avoided = 0.0
+        for u in self._cache_hits:
+            tokens += u.total
+            if u.model in self.cfg:
+                avoided += self._cost(u.model, u)[3]
+        return {
+            "hits": len(self._cache_hits),
+            "tokens_avoided": tokens,
+            "cost_avoided": avoided,
+        }
+
+    def add_hedge(self, event: HedgeEvent) -> None:
+        """Record a hedged request.
+
+        The backup call's usage must also be recorded with `add()` when it was
+        billed; the hedge ledger only attributes that spend to hedging.
+        """
+        self._hedges.append(event)
+
+    def hedge_stats(self) -> Dict[str, float]:
+        """Return hedge counts and the spend attributable to backup calls.
+
+        Returns:
+            Dict with keys: fired, backup_wins, primary_wins, hedge_cost
+        """
+        cost = 0.0
+        for h in self._hedges:
+            u = h.backup_usage
+            if u is not None and u.model in self.cfg:
+                cost += self._cost(u.model, u)[3]
+        return {
+            "fired": len(self._hedges),
+            "backup_wins": sum(1 for h in self._hedges if h.winner == "backup"),
+            "primary_wins": sum(1 for h in self._hedges if h.winner == "primary"),
+            "hedge_cost": cost,
+        }
+
+    def prompt_cache_stats(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Return provider prompt-cache hit ratios per (agent, model).
+
+        The agent comes from the "agent:<name>" notes prefix written by
+        WePublicDefender (other events are grouped under "-"). hit_ratio is
+        cached input tokens over input tokens.
+
+        Returns:
+            {(agent, model): {"calls", "input", "cached", "hit_ratio"}}
+
+        Examples:
+            >>> t = TokenTracker(models_config={})
+            >>> t.add("gpt-5", 1000, 10, cache=900, notes="agent:self_review:retry")
+            >>> t.add("gpt-5", 1000, 10, notes="agent:self_review")
+            >>> t.prompt_cache_stats()[("self_review", "gpt-5")]["hit_ratio"]
+            0.45
+        """
+        stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for u in self._history:
+            notes = u.notes or ""
+            agent = notes.split(":")[1] if notes.startswith("agent:") and ":" in notes else "-"
+            row = stats.setdefault((agent, u.model or "-"), {"calls": 0, "input": 0, "cached": 0, "hit_ratio": 0.0})
+            row["calls"] += 1
+            row["input"] += u.input
+            row["cached"] += u.cached
+        for row in stats.values():
+            row["hit_ratio"] = (row["cached"] / row["input"]) if row["input"] else 0.0
+        return stats
+
+    def _prompt_cache_summary(self) -> Optional[str]:
+        """One-line per-agent/model cached-input summary, or None if nothing was cached."""
+        stats = self.prompt_cache_stats()
+        if not any(row["cached"] for row in stats.values()):
+            return None
+        parts = [
+            f"{agent}/{model} {row['hit_ratio']:.0%}"
+            for (agent, model), row in sorted(stats.items())
+        ]
+        return " | ".join(parts)
+
+    def latency_samples(self, model: str, effort: Optional[str] = None) -> List[float]:
+        """Return recorded call durations for a model (optionally one effort level)."""
+        return [
+            float(u.duration)
+            for u in self._history
+            if u.model == model
+            and u.duration
+            and (effort is None or u.effort == effort)
+        ]
+
+    def agent_latency_samples(self, agent: str) -> List[float]:
+        """Return recorded durations of an agent's calls (usage noted "agent:<agent>")."""
+        note = f"agent:{agent}"
+        return [float(u.duration) for u in self._history if u.notes == note and u.duration]
+
     def clear(self) -> None:
         """Clear all usage data."""
         self._usage.clear()
         self._history.clear()
+        self._cache_hits.clear()
+        self._hedges.clear()
 
     # ── internals ─────────────────────────────────────────────────────────────────
     def _cost(self, model: str, u: TokenUsage) -> Tuple[float, float, float, float, float]:
@@ -204,6 +375,9 @@ class TokenTracker:
             # Standard pricing with service tier multipliers
             if u.service_tier == "flex":
                 factor = 0.5
+            elif u.service_tier == "batch":
+                # Batch API jobs are billed at a discount (half price at OpenAI)
+                factor = cfg.get("batch_multiplier", 0.5)
             elif u.service_tier == "priority":
                 # Fallback to priority_multiplier if priority_tier not available
                 factor = cfg.get("priority_multiplier", 2.0)
@@ -458,6 +632,21 @@ class TokenTracker:
             dur_str = ""
 
         lines.append(f"ALL MODELS       total ${grand:.6f} | saved ${saved:.6f}{dur_str}")
+        if self._cache_hits:
+            stats = self.cache_hit_stats()
+            lines.append(
+                f"CACHE HITS       {stats['hits']} responses | avoided ${stats['cost_avoided']:.6f} "
+                f"({stats['tokens_avoided']} tokens)"
+            )
+        if self._hedges:
+            hs = self.hedge_stats()
+            lines.append(
+                f"HEDGES           {hs['fired']} fired | backup won {hs['backup_wins']} "
+                f"| hedge cost ${hs['hedge_cost']:.6f}"
+            )
+        prompt_cache = self._prompt_cache_summary()
+        if prompt_cache:
+            lines.append(f"PROMPT CACHE     {prompt_cache}")
         return "\n".join(lines)
 
     def report_for_usage(self, usage: TokenUsage) -> str:
@@ -634,6 +823,24 @@ class TokenTracker:
         table.columns[1].footer = f"${grand:.6f}{dur_str}"
         table.columns[5].footer = f"${saved:.6f}"
 
+        captions = []
+        if self._cache_hits:
+            stats = self.cache_hit_stats()
+            captions.append(
+                f"Cache hits: {stats['hits']} responses | avoided ${stats['cost_avoided']:.6f} "
+                f"({stats['tokens_avoided']} tokens)"
+            )
+        if self._hedges:
+            hs = self.hedge_stats()
+            captions.append(
+                f"Hedges: {hs['fired']} fired | backup won {hs['backup_wins']} | hedge cost ${hs['hedge_cost']:.6f}"
+            )
+        prompt_cache = self._prompt_cache_summary()
+        if prompt_cache:
+            captions.append(f"Prompt cache (cached input): {prompt_cache}")
+        if captions:
+            table.caption = "\n".join(captions)
+
         if console:
             console.print(table)
             return self.report()  # Return text version for compatibility
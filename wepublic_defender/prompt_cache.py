@@ -0,0 +1,151 @@
+"""
+Precompiled per-agent system prompts.
+
+Building an agent's system message means reading
+`prompts/agent_prompts/<agent>.md`, rendering the pydantic schema with
+`json.dumps(indent=2)` and formatting the jurisdiction block. None of that
+changes between the models of a multi-model fan-out, between iterations of a
+pipeline, or between per-citation calls, so the rendered message is built once
+per process and reused.
+
+WePublicDefender caches two parts separately, matching the message layout
+(static prefix first for provider prompt caching): the static per-agent
+prefix, keyed by agent type, schema class and the markdown instructions; and
+the jurisdiction block, keyed by the resolved jurisdiction values (settings
+merged with per-call overrides, so a settings change yields a new key). An
+agent's entries are dropped when its prompt file changes on disk (mtime or
+size); the file is stat'ed at most once per `WPD_CONFIG_CHECK_INTERVAL`
+seconds (default 1.0).
+
+Usage:
+    cache = get_prompt_cache()
+    text = cache.get(key, "self_review", lambda: render(...))
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from .config.resolved import _check_interval, _stat
+from .logging_utils import get_logger
+
+
+PROMPTS_DIR = Path(__file__).parent / "prompts" / "agent_prompts"
+
+
+def prompt_path(agent_type: str) -> Path:
+    """Return the enhanced prompt file for an agent (it may not exist)."""
+    return PROMPTS_DIR / f"{agent_type}.md"
+
+
+@lru_cache(maxsize=None)
+def schema_block(model_cls: Type[Any]) -> str:
+    """
+    Render the "return ONLY JSON" instruction for a schema class (memoized per class).
+
+    Examples:
+        >>> from pydantic import BaseModel
+        >>> class Tiny(BaseModel):
+        ...     ok: bool
+        >>> schema_block(Tiny).splitlines()[0]
+        'You MUST return ONLY JSON matching this JSON schema (no extra text):'
+        >>> schema_block(Tiny) is schema_block(Tiny)
+        True
+    """
+    schema = model_cls.model_json_schema()
+    return (
+        "You MUST return ONLY JSON matching this JSON schema (no extra text):\n"
+        + json.dumps(schema, indent=2)
+    )
+
+
+class PromptCache:
+    """
+    Thread-safe store of rendered system messages, invalidated per agent on prompt file change.
+
+    Examples:
+        >>> cache = PromptCache()
+        >>> cache.get(("demo", 1), "no-such-agent", lambda: "rendered")
+        'rendered'
+        >>> cache.get(("demo", 1), "no-such-agent", lambda: "rebuilt")
+        'rendered'
+        >>> cache.stats()["hits"], cache.stats()["misses"]
+        (1, 1)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[str, str]] = {}  # key -> (agent_type, text)
+        self._file_fps: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._last_check: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self, agent_type: str) -> None:
+        """Drop an agent's entries if its prompt file changed (caller holds the lock)."""
+        now = time.monotonic()
+        if agent_type in self._last_check and now - self._last_check[agent_type] < _check_interval():
+            return
+        self._last_check[agent_type] = now
+        fp = _stat(prompt_path(agent_type))
+        if agent_type in self._file_fps and self._file_fps[agent_type] != fp:
+            stale = [k for k, (agent, _) in self._entries.items() if agent == agent_type]
+            for k in stale:
+                del self._entries[k]
+            try:
+                get_logger().info("Agent prompt changed on disk; dropped %d cached prompt(s) | agent=%s", len(stale), agent_type)
+            except Exception:
+                pass
+        self._file_fps[agent_type] = fp
+
+    def get(self, key: Hashable, agent_type: str, build: Callable[[], str]) -> str:
+        """Return the cached text for `key`, building (and storing) it on a miss."""
+        with self._lock:
+            self._refresh(agent_type)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+        text = build()
+        with self._lock:
+            self._entries[key] = (agent_type, text)
+            self.misses += 1
+        return text
+
+    def clear(self) -> None:
+        """Drop every entry and file fingerprint."""
+        with self._lock:
+            self._entries.clear()
+            self._file_fps.clear()
+            self._last_check.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache: Optional[PromptCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Return the process-wide prompt cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PromptCache()
+    return _cache
+
+
+__all__ = [
+    "PROMPTS_DIR",
+    "PromptCache",
+    "get_prompt_cache",
+    "prompt_path",
+    "schema_block",
+]
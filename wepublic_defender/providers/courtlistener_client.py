@@ -6,7 +6,8 @@ Environment variables:
 - COURTLISTENER_USER_AGENT: Custom UA string (recommended)
 
 Cache:
-- .wepublic_defender/cache/courtlistener/<hash>.json
+- .wepublic_defender/cache/courtlistener/<hash>.json (compact JSON; set
+  WPD_PRETTY_JSON=1 to pretty-print entries)
 """
 
 from __future__ import annotations
@@ -19,6 +20,8 @@ from typing import Any, Dict, Optional
 
 import requests
 
+from ..jsonio import read_json, write_json
+
 
 BASE_URL = os.getenv("COURTLISTENER_BASE_URL", "https://www.courtlistener.com/api")
 CACHE_DIR = Path.cwd() / ".wepublic_defender" / "cache" / "courtlistener"
@@ -45,13 +48,13 @@ def _get(path: str, params: Dict[str, Any], *, use_cache: bool = True) -> Dict[s
     url = f"{BASE_URL.rstrip('/')}/{path.lstrip('/')}"
     ck = _cache_key(url, params)
     if use_cache and ck.exists():
-        return json.loads(ck.read_text(encoding="utf-8"))
+        return read_json(ck)
 
     r = requests.get(url, headers=_headers(), params=params, timeout=30)
     r.raise_for_status()
     data = r.json()
     try:
-        ck.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        write_json(ck, data)
     except Exception:
         pass
     return data
@@ -0,0 +1,625 @@
+"""
+Shared rate limiter and concurrency governor for LLM calls.
+
+Multi-model fan-out, `--run-both` and parallel pipeline stages can hit a
+provider at the same moment. Every call through `llm_client` first takes a
+lease from this limiter, which enforces per-provider and per-model:
+
+- requests per minute (token bucket)
+- tokens per minute (token bucket; estimated before sending, reconciled with
+  actual usage when the call finishes)
+- max concurrent in-flight requests
+
+Limits come from optional `rate_limits` blocks in `llm_providers.json`, on a
+provider entry and/or on a model entry:
+
+    "rate_limits": {
+      "requests_per_minute": 500,
+      "tokens_per_minute": 500000,
+      "max_concurrent": 8
+    }
+
+Global behavior is set by the root `rateLimiting` block:
+
+    "rateLimiting": {
+      "enabled": true,
+      "cross_process": true,
+      "poll_interval": 0.05,
+      "lease_seconds": 60
+    }
+
+A process can tighten or add limits at runtime with `set_limit_overrides`
+(wpd-review-pipeline --files does, for --max-concurrent and
+--provider-limit): overrides are keyed by scope, `"provider:openai"`,
+`"model:gpt-5"`, or `"global"` for a cap on every call.
+
+Waiting requests are admitted fairly: among queued requests for the same
+scope, the agent that was served least recently goes first, so one agent's
+fan-out cannot starve another. The limiter works from asyncio (`acquire_async`)
+and from threads (`acquire`). With `cross_process` enabled, bucket and
+in-flight state is shared by all processes on the host through a locked JSON
+state file in `.wepublic_defender/locks/` (override with WPD_RATE_LIMIT_DIR).
+
+From asyncio every state-file transaction runs in a worker thread, so the
+event loop never waits on the file lock. A waiting request backs off from
+`poll_interval` to `MAX_POLL_INTERVAL` between admission attempts and is
+woken early when a lease is granted or released in this process, so a queue
+of waiters does not rewrite the state file many times a second. In-flight
+leases expire after `lease_seconds` unless renewed; a heartbeat thread
+renews this process's leases while calls are running, so slots held by a
+crashed process free up within a minute.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None  # type: ignore
+
+from .logging_utils import get_logger
+
+
+DEFAULT_RATE_LIMITING: Dict[str, Any] = {
+    "enabled": True,
+    "cross_process": True,
+    "poll_interval": 0.05,
+    "lease_seconds": 60,
+}
+
+# Longest sleep between admission attempts while backing off
+MAX_POLL_INTERVAL = 1.0
+
+LIMIT_KEYS = ("requests_per_minute", "tokens_per_minute", "max_concurrent")
+
+# Agent label used for fair queueing; set by callers (e.g. WePublicDefender)
+current_agent: contextvars.ContextVar[str] = contextvars.ContextVar("wpd_rate_limit_agent", default="default")
+
+Scope = Tuple[str, Dict[str, Any]]  # (scope key, limits)
+
+GLOBAL_SCOPE = "global"
+
+# Runtime limits layered over llm_providers.json (see set_limit_overrides)
+_limit_overrides: Dict[str, Dict[str, Any]] = {}
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Rough pre-send token estimate (~4 characters per token plus per-message overhead).
+
+    Examples:
+        >>> estimate_request_tokens([{"role": "user", "content": "x" * 400}])
+        104
+    """
+    total = 0
+    for m in messages:
+        total += len(str(m.get("content", ""))) // 4 + 4
+    return total
+
+
+def resolve_rate_limiting(root_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with the root `rateLimiting` block.
+
+    Examples:
+        >>> resolve_rate_limiting({})["cross_process"]
+        True
+        >>> resolve_rate_limiting({"rateLimiting": {"enabled": False}})["enabled"]
+        False
+    """
+    cfg = dict(DEFAULT_RATE_LIMITING)
+    if root_cfg:
+        cfg.update(root_cfg.get("rateLimiting", {}) or {})
+    return cfg
+
+
+def scopes_for(
+    provider_name: str,
+    provider_cfg: Dict[str, Any],
+    model_key: str,
+    model_cfg: Dict[str, Any],
+) -> List[Scope]:
+    """
+    Return the (scope, limits) pairs that apply to a call; empty if nothing is limited.
+
+    Examples:
+        >>> scopes_for("openai", {"rate_limits": {"max_concurrent": 2}}, "gpt-5", {})
+        [('provider:openai', {'max_concurrent': 2})]
+        >>> scopes_for("openai", {}, "gpt-5", {})
+        []
+    """
+    scopes: List[Scope] = []
+    if _limit_overrides.get(GLOBAL_SCOPE):
+        scopes.append((GLOBAL_SCOPE, dict(_limit_overrides[GLOBAL_SCOPE])))
+    for key, cfg in ((f"provider:{provider_name}", provider_cfg), (f"model:{model_key}", model_cfg)):
+        limits = {k: v for k, v in (cfg.get("rate_limits", {}) or {}).items() if k in LIMIT_KEYS and v}
+        for k, v in (_limit_overrides.get(key) or {}).items():
+            # An override can only tighten a configured limit
+            limits[k] = min(limits[k], v) if k in limits else v
+        if limits:
+            scopes.append((key, limits))
+    return scopes
+
+
+def set_limit_overrides(overrides: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    """
+    Replace this process's runtime limits ({scope: {limit: value}}); None or {} clears them.
+
+    Examples:
+        >>> set_limit_overrides({"global": {"max_concurrent": 8}, "provider:openai": {"max_concurrent": 2}})
+        >>> scopes_for("openai", {"rate_limits": {"max_concurrent": 4}}, "gpt-5", {})
+        [('global', {'max_concurrent': 8}), ('provider:openai', {'max_concurrent': 2})]
+        >>> set_limit_overrides(None)
+        >>> scopes_for("openai", {}, "gpt-5", {})
+        []
+    """
+    _limit_overrides.clear()
+    for scope, limits in (overrides or {}).items():
+        cleaned = {k: v for k, v in (limits or {}).items() if k in LIMIT_KEYS and v}
+        if cleaned:
+            _limit_overrides[scope] = cleaned
+
+
+# ----- state backends ---------------------------------------------------------
+class _MemoryBackend:
+    """Process-local limiter state."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {}
+
+    def transact(self, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._lock:
+            return fn(self._state)
+
+
+class _FileBackend:
+    """Limiter state shared across processes through an exclusively locked JSON file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def transact(self, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._lock:
+            with open(self.path, "a+", encoding="utf-8") as fh:
+                self._lock_file(fh)
+                try:
+                    fh.seek(0)
+                    raw = fh.read()
+                    try:
+                        state = json.loads(raw) if raw.strip() else {}
+                    except ValueError:
+                        state = {}
+                    result = fn(state)
+                    fh.seek(0)
+                    fh.truncate()
+                    fh.write(json.dumps(state))
+                    fh.flush()
+                    return result
+                finally:
+                    self._unlock_file(fh)
+
+    @staticmethod
+    def _lock_file(fh) -> None:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover - Windows
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    time.sleep(0.01)
+
+    @staticmethod
+    def _unlock_file(fh) -> None:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:  # pragma: no cover - Windows
+            fh.seek(0)
+            try:
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            except OSError:
+                pass
+
+
+def _win_pid_alive(pid: int) -> bool:  # pragma: no cover - Windows
+    """Check a Windows process without signalling it (os.kill would terminate it)."""
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        # ERROR_INVALID_PARAMETER: no such process; anything else (access denied): it exists
+        return ctypes.get_last_error() != 87
+    try:
+        code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        try:
+            return _win_pid_alive(pid)
+        except Exception:
+            return True  # unsupported: rely on lease expiry
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        return True  # no permission / unsupported: assume alive
+    return True
+
+
+# ----- leases -----------------------------------------------------------------
+class RateLimitLease:
+    """Admission granted by the limiter; call `release()` when the request finishes."""
+
+    def __init__(
+        self,
+        limiter: Optional["RateLimiter"],
+        lease_id: str,
+        scopes: List[Scope],
+        estimated_tokens: int,
+        waited: float,
+    ) -> None:
+        self._limiter = limiter
+        self.lease_id = lease_id
+        self.scopes = scopes
+        self.estimated_tokens = estimated_tokens
+        self.waited = waited
+        self._released = False
+
+    def release(self, actual_tokens: Optional[int] = None) -> None:
+        """Free the concurrency slot and reconcile the token estimate with actual usage."""
+        if self._released or self._limiter is None:
+            return
+        self._released = True
+        self._limiter._release(self, actual_tokens)
+
+    async def release_async(self, actual_tokens: Optional[int] = None) -> None:
+        """`release` with the state transaction in a worker thread (it completes even if the caller is cancelled)."""
+        if self._released or self._limiter is None:
+            return
+        self._released = True
+        self._limiter._forget(self)
+        await asyncio.to_thread(self._limiter._release, self, actual_tokens)
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter with concurrency caps and fair admission.
+
+    Args:
+        backend: Shared state store (process-local or cross-process file)
+        poll_interval: First sleep between admission attempts (doubles up to MAX_POLL_INTERVAL)
+        lease_seconds: Expiry of an in-flight lease that stops being renewed (crashed caller)
+    """
+
+    def __init__(
+        self,
+        backend: Optional[Any] = None,
+        poll_interval: float = DEFAULT_RATE_LIMITING["poll_interval"],
+        lease_seconds: float = DEFAULT_RATE_LIMITING["lease_seconds"],
+    ) -> None:
+        self._backend = backend or _MemoryBackend()
+        self.poll_interval = float(poll_interval)
+        self.lease_seconds = float(lease_seconds)
+        self._queue_lock = threading.Lock()
+        self._seq = itertools.count()
+        # scope -> {ticket_seq: agent}
+        self._waiting: Dict[str, Dict[int, str]] = {}
+        self._last_served: Dict[str, float] = {}
+        # Bumped on every grant/release in this process; wakes backed-off waiters
+        self._changes = 0
+        # Leases held by this process, renewed by the heartbeat thread
+        self._active: Dict[str, RateLimitLease] = {}
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_wake = threading.Event()
+
+    # ----- lease heartbeat ----------------------------------------------------
+    def _track(self, lease: RateLimitLease) -> None:
+        with self._queue_lock:
+            self._active[lease.lease_id] = lease
+            self._changes += 1
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="wpd-rate-limit-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _forget(self, lease: RateLimitLease) -> None:
+        with self._queue_lock:
+            self._active.pop(lease.lease_id, None)
+            self._changes += 1
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(0.5, self.lease_seconds / 3.0)
+        while True:
+            self._heartbeat_wake.wait(interval)
+            self._heartbeat_wake.clear()
+            with self._queue_lock:
+                active = list(self._active.values())
+                if not active:
+                    self._heartbeat = None
+                    return
+            try:
+                self._renew(active)
+            except Exception as e:
+                try:
+                    get_logger().warning("Rate limiter lease renewal failed | leases=%d | error=%s", len(active), e)
+                except Exception:
+                    pass
+
+    def _renew(self, leases: List[RateLimitLease]) -> None:
+        """Push back the expiry of leases this process still holds."""
+        expires = time.time() + self.lease_seconds
+
+        def _fn(state: Dict[str, Any]) -> None:
+            inflight = state.setdefault("inflight", {})
+            for lease in leases:
+                for key, _ in lease.scopes:
+                    entry = inflight.get(key, {}).get(lease.lease_id)
+                    if entry is not None:
+                        entry[1] = expires
+
+        self._backend.transact(_fn)
+
+    # ----- fair queue (process-local) -----------------------------------------
+    def _enqueue(self, scopes: List[Scope], agent: str) -> int:
+        seq = next(self._seq)
+        with self._queue_lock:
+            for key, _ in scopes:
+                self._waiting.setdefault(key, {})[seq] = agent
+        return seq
+
+    def _dequeue(self, scopes: List[Scope], seq: int, agent: str, served: bool) -> None:
+        with self._queue_lock:
+            for key, _ in scopes:
+                self._waiting.get(key, {}).pop(seq, None)
+            if served:
+                self._last_served[agent] = time.monotonic()
+
+    def _is_turn(self, scopes: List[Scope], seq: int) -> bool:
+        """True if this ticket is next for every scope: least recently served agent, then FIFO."""
+        with self._queue_lock:
+            for key, _ in scopes:
+                waiting = self._waiting.get(key, {})
+                if not waiting:
+                    continue
+                head = min(
+                    waiting.items(),
+                    key=lambda item: (self._last_served.get(item[1], 0.0), item[0]),
+                )[0]
+                if head != seq:
+                    return False
+        return True
+
+    # ----- shared bucket state ------------------------------------------------
+    def _try_take(self, scopes: List[Scope], tokens: int, lease_id: str) -> float:
+        """Atomically admit the request across all scopes; returns 0 if admitted, else seconds to wait."""
+        now = time.time()
+        pid = os.getpid()
+        lease_seconds = self.lease_seconds
+
+        def _fn(state: Dict[str, Any]) -> float:
+            buckets = state.setdefault("buckets", {})
+            inflight = state.setdefault("inflight", {})
+            wait = 0.0
+            pending: List[Tuple[Dict[str, Any], float]] = []
+            for key, limits in scopes:
+                # Drop leases from expired or dead callers
+                leases = inflight.setdefault(key, {})
+                for lid, (lpid, expires) in list(leases.items()):
+                    if expires < now or not _pid_alive(int(lpid)):
+                        leases.pop(lid, None)
+                max_conc = limits.get("max_concurrent")
+                if max_conc and len(leases) >= int(max_conc):
+                    wait = max(wait, self.poll_interval)
+                for limit_key, need in (("requests_per_minute", 1.0), ("tokens_per_minute", float(tokens))):
+                    per_min = limits.get(limit_key)
+                    if not per_min:
+                        continue
+                    cap = float(per_min)
+                    rate = cap / 60.0
+                    b = buckets.setdefault(f"{key}|{limit_key}", {"level": cap, "ts": now})
+                    b["level"] = min(cap, float(b["level"]) + (now - float(b["ts"])) * rate)
+                    b["ts"] = now
+                    need = min(need, cap)  # oversized requests wait for a full bucket
+                    if b["level"] < need:
+                        wait = max(wait, (need - b["level"]) / rate)
+                    else:
+                        pending.append((b, need))
+            if wait > 0:
+                return wait
+            for b, need in pending:
+                b["level"] -= need
+            for key, _ in scopes:
+                inflight[key][lease_id] = [pid, now + lease_seconds]
+            return 0.0
+
+        return self._backend.transact(_fn)
+
+    def _release(self, lease: RateLimitLease, actual_tokens: Optional[int]) -> None:
+        self._forget(lease)
+        delta = 0.0
+        if actual_tokens is not None:
+            delta = float(lease.estimated_tokens - int(actual_tokens))
+
+        def _fn(state: Dict[str, Any]) -> None:
+            buckets = state.setdefault("buckets", {})
+            inflight = state.setdefault("inflight", {})
+            for key, limits in lease.scopes:
+                inflight.get(key, {}).pop(lease.lease_id, None)
+                per_min = limits.get("tokens_per_minute")
+                b = buckets.get(f"{key}|tokens_per_minute")
+                if per_min and b is not None and delta:
+                    # Refund over-estimates; debit under-estimates (may go negative)
+                    b["level"] = min(float(per_min), float(b["level"]) + delta)
+
+        try:
+            self._backend.transact(_fn)
+        except Exception as e:
+            try:
+                get_logger().warning("Rate limiter release failed | lease=%s | error=%s", lease.lease_id, e)
+            except Exception:
+                pass
+
+    # ----- public API ---------------------------------------------------------
+    def _pause(self, wait: float, delay: float) -> float:
+        """Seconds to sleep before the next attempt: the bucket refill time or the backoff delay, capped."""
+        return min(max(wait, delay), max(self.poll_interval, MAX_POLL_INTERVAL))
+
+    async def acquire_async(self, scopes: List[Scope], tokens: int, agent: Optional[str] = None) -> RateLimitLease:
+        """
+        Wait until the request may be sent.
+
+        State transactions run in a worker thread (the loop never waits on the
+        state-file lock); between attempts the wait backs off and is cut short
+        when a lease is granted or released in this process.
+        """
+        if not scopes:
+            return RateLimitLease(None, "", [], tokens, 0.0)
+        agent = agent or current_agent.get()
+        lease_id = uuid.uuid4().hex
+        started = time.monotonic()
+        seq = self._enqueue(scopes, agent)
+        delay = self.poll_interval
+        try:
+            while True:
+                changes = self._changes
+                if self._is_turn(scopes, seq):
+                    wait = await asyncio.to_thread(self._try_take, scopes, tokens, lease_id)
+                    if wait <= 0:
+                        self._dequeue(scopes, seq, agent, served=True)
+                        return self._granted(lease_id, scopes, tokens, time.monotonic() - started, agent)
+                else:
+                    wait = 0.0
+                deadline = time.monotonic() + self._pause(wait, delay)
+                while self._changes == changes and time.monotonic() < deadline:
+                    await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+                delay = self.poll_interval if self._changes != changes else min(delay * 2, MAX_POLL_INTERVAL)
+        except BaseException:
+            self._dequeue(scopes, seq, agent, served=False)
+            raise
+
+    def acquire(self, scopes: List[Scope], tokens: int, agent: Optional[str] = None) -> RateLimitLease:
+        """Blocking variant of `acquire_async` for threads and sync callers."""
+        if not scopes:
+            return RateLimitLease(None, "", [], tokens, 0.0)
+        agent = agent or current_agent.get()
+        lease_id = uuid.uuid4().hex
+        started = time.monotonic()
+        seq = self._enqueue(scopes, agent)
+        delay = self.poll_interval
+        try:
+            while True:
+                changes = self._changes
+                if self._is_turn(scopes, seq):
+                    wait = self._try_take(scopes, tokens, lease_id)
+                    if wait <= 0:
+                        self._dequeue(scopes, seq, agent, served=True)
+                        return self._granted(lease_id, scopes, tokens, time.monotonic() - started, agent)
+                else:
+                    wait = 0.0
+                deadline = time.monotonic() + self._pause(wait, delay)
+                while self._changes == changes and time.monotonic() < deadline:
+                    time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+                delay = self.poll_interval if self._changes != changes else min(delay * 2, MAX_POLL_INTERVAL)
+        except BaseException:
+            self._dequeue(scopes, seq, agent, served=False)
+            raise
+
+    def _granted(self, lease_id: str, scopes: List[Scope], tokens: int, waited: float, agent: str) -> RateLimitLease:
+        if waited >= 1.0:
+            try:
+                get_logger().info(
+                    "Rate limiter admitted after wait | agent=%s | scopes=%s | est_tokens=%s | waited=%.2fs",
+                    agent,
+                    [k for k, _ in scopes],
+                    tokens,
+                    waited,
+                )
+            except Exception:
+                pass
+        lease = RateLimitLease(self, lease_id, scopes, tokens, waited)
+        self._track(lease)
+        return lease
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_key: Optional[Tuple[Any, ...]] = None
+_limiter_lock = threading.Lock()
+
+
+def default_state_path() -> Path:
+    """Return the cross-process state file (WPD_RATE_LIMIT_DIR or .wepublic_defender/locks)."""
+    env_dir = os.getenv("WPD_RATE_LIMIT_DIR")
+    base = Path(env_dir) if env_dir else Path.cwd() / ".wepublic_defender" / "locks"
+    return base / "rate_limits.json"
+
+
+def get_rate_limiter(root_cfg: Optional[Dict[str, Any]] = None) -> Optional[RateLimiter]:
+    """
+    Return the process-wide limiter for the current `rateLimiting` settings.
+
+    Returns None when rate limiting is disabled.
+    """
+    global _limiter, _limiter_key
+    settings = resolve_rate_limiting(root_cfg)
+    if not settings.get("enabled", True):
+        return None
+    state_path = default_state_path() if settings.get("cross_process") else None
+    key = (
+        str(state_path) if state_path else None,
+        float(settings.get("poll_interval", 0.05)),
+        float(settings.get("lease_seconds", DEFAULT_RATE_LIMITING["lease_seconds"])),
+    )
+    if _limiter is not None and key == _limiter_key:
+        return _limiter
+    with _limiter_lock:
+        if _limiter is None or key != _limiter_key:
+            backend = _FileBackend(state_path) if state_path else _MemoryBackend()
+            _limiter = RateLimiter(backend, poll_interval=key[1], lease_seconds=key[2])
+            _limiter_key = key
+        return _limiter
+
+
+__all__ = [
+    "GLOBAL_SCOPE",
+    "MAX_POLL_INTERVAL",
+    "RateLimitLease",
+    "RateLimiter",
+    "current_agent",
+    "default_state_path",
+    "estimate_request_tokens",
+    "get_rate_limiter",
+    "resolve_rate_limiting",
+    "scopes_for",
+    "set_limit_overrides",
+]
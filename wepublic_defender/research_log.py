@@ -8,10 +8,11 @@ Default log path: 06_RESEARCH/CITATIONS_LOG.md
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
 
 from .models.legal_responses import CitationVerificationResult
 from .logging_utils import get_logger
+from .side_effects import get_side_effect_writer
 
 
 DEFAULT_LOG = Path("06_RESEARCH") / "CITATIONS_LOG.md"
@@ -155,25 +156,33 @@ def log_citation_verifications(
     """
     Upsert citation verification results into a Markdown log.
 
+    The upsert is queued on the background side-effect writer (immediate
+    when no event loop is running); results queued together are applied
+    with a single read and rewrite of the log.
+
     Returns the path of the log file written.
     """
-    logger = get_logger()
     path = Path(log_path) if log_path else DEFAULT_LOG
+    get_side_effect_writer().submit(path, list(results), _upsert_results)
+    return str(path)
+
+
+def _upsert_results(path: Path, batches: List[List[CitationVerificationResult]]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     current = path.read_text(encoding="utf-8") if path.exists() else "# Citation Verification Log\n\n"
 
-    results_list = list(results)
-    count = len(results_list)
-
-    for r in results_list:
-        header = _format_citation_header(r)
-        block = _format_citation_block(r)
-        current = _upsert_section(current, header, block)
+    count = 0
+    for results_list in batches:
+        for r in results_list:
+            header = _format_citation_header(r)
+            block = _format_citation_block(r)
+            current = _upsert_section(current, header, block)
+            count += 1
 
     path.write_text(current, encoding="utf-8")
 
     try:
-        logger.info(
+        get_logger().info(
             "Citations logged | count=%s | path=%s",
             count,
             path,
@@ -181,8 +190,6 @@ def log_citation_verifications(
     except Exception:
         pass
 
-    return str(path)
-
 
 __all__ = ["log_citation_verifications"]
 
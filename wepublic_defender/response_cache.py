@@ -0,0 +1,339 @@
+"""
+Content-addressed on-disk cache for LLM responses.
+
+Re-running an agent on an unchanged draft would otherwise re-bill every call
+in full. Each response is stored under a hash of everything that influences
+the provider output (model key, wire model, effort, service tier, web search
+flag, structured-output schema and the exact messages), so any change to the
+prompt, document or call options is a guaranteed miss.
+
+Cache:
+- .wepublic_defender/cache/llm/<hash[:2]>/<hash>.json
+- Override the location with WPD_LLM_CACHE_DIR
+
+Settings live in the `responseCacheConfig` block of legal_review_settings.json:
+
+    "responseCacheConfig": {
+      "enabled": true,
+      "default_ttl_hours": 168,
+      "web_search_ttl_hours": 24,
+      "max_size_mb": 256
+    }
+
+Agents may set `cache_ttl_hours` in reviewAgentConfig to override the TTL
+(web-search agents such as citation_verify go stale faster). Entries record
+their last access time; when the cache grows past `max_size_mb` the least
+recently used entries are evicted first. The cache size is scanned once and
+then tracked as entries are written, so a put only walks the directory when
+the running total crosses the cap (or every `RESCAN_EVERY` puts, to pick up
+entries written by other processes). Async callers use `get_async` and
+`put_async`, which run the file I/O in a worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Type
+
+from .jsonio import dumpb, loads
+from .logging_utils import get_logger
+
+
+CacheMode = Literal["use", "refresh", "off"]
+
+CACHE_MODES = ("use", "refresh", "off")
+
+DEFAULT_CACHE_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "default_ttl_hours": 168,
+    "web_search_ttl_hours": 24,
+    "max_size_mb": 256,
+}
+
+# Bump when the entry layout changes so stale entries become misses
+CACHE_FORMAT_VERSION = 1
+
+# Re-scan the cache directory after this many puts even below the cap
+RESCAN_EVERY = 256
+
+
+def default_cache_dir() -> Path:
+    """Return the response cache directory (WPD_LLM_CACHE_DIR or .wepublic_defender/cache/llm)."""
+    env_dir = os.getenv("WPD_LLM_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+    return Path.cwd() / ".wepublic_defender" / "cache" / "llm"
+
+
+def resolve_cache_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with the `responseCacheConfig` block of review settings.
+
+    Examples:
+        >>> resolve_cache_config({})["max_size_mb"]
+        256
+        >>> resolve_cache_config({"responseCacheConfig": {"enabled": False}})["enabled"]
+        False
+    """
+    cfg = dict(DEFAULT_CACHE_CONFIG)
+    if review_settings:
+        cfg.update(review_settings.get("responseCacheConfig", {}) or {})
+    return cfg
+
+
+def resolve_ttl_seconds(
+    cache_cfg: Dict[str, Any],
+    agent_config: Optional[Dict[str, Any]],
+    web_search: bool,
+) -> float:
+    """
+    Return the TTL for an agent: agent `cache_ttl_hours` -> web search TTL -> default TTL.
+
+    Examples:
+        >>> cfg = resolve_cache_config({})
+        >>> resolve_ttl_seconds(cfg, {"cache_ttl_hours": 2}, True)
+        7200.0
+        >>> resolve_ttl_seconds(cfg, {}, True)
+        86400.0
+        >>> resolve_ttl_seconds(cfg, None, False)
+        604800.0
+    """
+    if agent_config and agent_config.get("cache_ttl_hours") is not None:
+        hours = agent_config["cache_ttl_hours"]
+    elif web_search:
+        hours = cache_cfg.get("web_search_ttl_hours", cache_cfg.get("default_ttl_hours"))
+    else:
+        hours = cache_cfg.get("default_ttl_hours")
+    return float(hours) * 3600.0
+
+
+def schema_fingerprint(pydantic_model: Optional[Type]) -> Optional[str]:
+    """Return '<ModelName>:<hash of JSON schema>' so schema edits invalidate entries."""
+    if pydantic_model is None:
+        return None
+    try:
+        schema = pydantic_model.model_json_schema()
+    except Exception:
+        schema = {}
+    digest = hashlib.sha256(
+        json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{pydantic_model.__name__}:{digest}"
+
+
+def make_cache_key(
+    *,
+    model_key: str,
+    wire_model: Optional[str],
+    effort: Optional[str],
+    service_tier: Optional[str],
+    web_search: bool,
+    pydantic_model: Optional[Type],
+    messages: List[Dict[str, Any]],
+) -> str:
+    """
+    Hash every input that influences the provider response.
+
+    Examples:
+        >>> msgs = [{"role": "user", "content": "hi"}]
+        >>> a = make_cache_key(model_key="gpt-5", wire_model="gpt-5", effort="low",
+        ...     service_tier="auto", web_search=False, pydantic_model=None, messages=msgs)
+        >>> b = make_cache_key(model_key="gpt-5", wire_model="gpt-5", effort="high",
+        ...     service_tier="auto", web_search=False, pydantic_model=None, messages=msgs)
+        >>> a != b and len(a) == 64
+        True
+    """
+    payload = {
+        "v": CACHE_FORMAT_VERSION,
+        "model_key": model_key,
+        "wire_model": wire_model,
+        "effort": effort,
+        "service_tier": service_tier,
+        "web_search": bool(web_search),
+        "schema": schema_fingerprint(pydantic_model),
+        "messages": messages,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk LLM response store with TTL expiry and LRU size cap.
+
+    Entries hold the `text`/`usage`/`meta` triple returned by `chat_complete`
+    (the provider `raw` object is not persisted). File mtime doubles as the
+    last-access time for LRU eviction.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_size_mb: float = DEFAULT_CACHE_CONFIG["max_size_mb"]):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self._lock = threading.Lock()
+        # Running size estimate (None until the first put scans the directory)
+        self._size: Optional[int] = None
+        self._puts_since_scan = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str, ttl_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for `key`, or None on miss/expiry/corruption."""
+        path = self._path(key)
+        try:
+            entry = loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+
+        created = float(entry.get("created_at", 0.0))
+        if ttl_seconds is not None and time.time() - created > ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path, None)  # mark as recently used
+        except OSError:
+            pass
+        return entry
+
+    def put(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        *,
+        agent: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[Path]:
+        """Store a chat_complete result; returns the entry path (None if the write failed)."""
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "key": key,
+            "agent": agent,
+            "model": model,
+            "created_at": time.time(),
+            "text": result.get("text", ""),
+            "usage": dict(result.get("usage", {}) or {}),
+            "meta": dict(result.get("meta", {}) or {}),
+        }
+        path = self._path(key)
+        blob = dumpb(entry)
+        try:
+            previous = path.stat().st_size
+        except OSError:
+            previous = 0
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+        except Exception as e:
+            try:
+                get_logger().warning("Response cache write failed | key=%s | error=%s", key[:12], e)
+            except Exception:
+                pass
+            return None
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.size_bytes()
+            else:
+                self._size += len(blob) - previous
+            self._puts_since_scan += 1
+            rescan = self._size > self.max_bytes or self._puts_since_scan >= RESCAN_EVERY
+        if rescan:
+            self.evict()
+        return path
+
+    async def get_async(self, key: str, ttl_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """`get` in a worker thread, for use from the event loop."""
+        return await asyncio.to_thread(self.get, key, ttl_seconds)
+
+    async def put_async(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        *,
+        agent: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[Path]:
+        """`put` in a worker thread, for use from the event loop."""
+        return await asyncio.to_thread(self.put, key, result, agent=agent, model=model)
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Remove least recently used entries until the cache fits; returns entries removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = []
+            total = 0
+            for p in self.root.glob("*/*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+            self._puts_since_scan = 0
+            if total <= limit:
+                self._size = total
+                return 0
+            entries.sort()  # oldest access first
+            removed = 0
+            for _, size, p in entries:
+                if total <= limit:
+                    break
+                self._remove(p)
+                total -= size
+                removed += 1
+            self._size = total
+        try:
+            get_logger().info("Response cache evicted %d entries (LRU) | size=%d bytes", removed, total)
+        except Exception:
+            pass
+        return removed
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        for p in self.root.glob("*/*.json"):
+            self._remove(p)
+        with self._lock:
+            self._size = 0
+            self._puts_since_scan = 0
+
+    def size_bytes(self) -> int:
+        """Return the total size of cached entries in bytes."""
+        total = 0
+        for p in self.root.glob("*/*.json"):
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+__all__ = [
+    "CACHE_MODES",
+    "CacheMode",
+    "DEFAULT_CACHE_CONFIG",
+    "ResponseCache",
+    "default_cache_dir",
+    "make_cache_key",
+    "resolve_cache_config",
+    "resolve_ttl_seconds",
+    "schema_fingerprint",
+]
@@ -0,0 +1,282 @@
+"""
+Retry engine for LLM provider calls.
+
+Transient failures (timeouts, dropped connections, 429s, 5xx, gRPC
+UNAVAILABLE/DEADLINE_EXCEEDED) are retried with exponential backoff and full
+jitter; terminal failures (bad request, auth, unknown model, config errors)
+are raised immediately. A `Retry-After` header from the provider overrides
+the computed delay.
+
+Each retry runs with a longer timeout: attempt N applies the
+`timeoutConfig.multipliers.retry_attempt_N` multiplier (see
+`llm_client._compute_timeout`).
+
+Settings come from the root `retryConfig` block of llm_providers.json:
+
+    "retryConfig": {
+      "max_attempts": 3,
+      "base_delay": 1.0,
+      "max_delay": 30.0,
+      "retry_budget_seconds": 300
+    }
+
+`retry_budget_seconds` caps the total backoff sleep for one call, so a long
+provider outage fails fast instead of stalling a pipeline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, TypeVar
+
+try:
+    from openai import APIConnectionError as _OpenAIConnectionError
+except Exception:  # pragma: no cover - allow import to fail gracefully at runtime
+    _OpenAIConnectionError = None  # type: ignore
+
+from .logging_utils import get_logger
+
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_CONFIG: Dict[str, Any] = {
+    "max_attempts": 3,
+    "base_delay": 1.0,
+    "max_delay": 30.0,
+    "retry_budget_seconds": 300.0,
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+
+RETRYABLE_GRPC = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "INTERNAL", "ABORTED", "UNKNOWN"}
+
+# Error codes that arrive as 429 but will not clear by waiting
+TERMINAL_CODES = {"insufficient_quota", "billing_hard_limit_reached"}
+
+
+class ErrorClass(NamedTuple):
+    retryable: bool
+    reason: str
+    retry_after: Optional[float] = None
+
+
+class RetryState:
+    """Attempt bookkeeping for one logical call; exported into the usage dict."""
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.errors: List[str] = []
+        self.waited = 0.0
+
+    def as_usage(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "retry_errors": list(self.errors),
+            "retry_wait": self.waited,
+        }
+
+
+def resolve_retry_config(root_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with the root `retryConfig` block.
+
+    Examples:
+        >>> resolve_retry_config({})["max_attempts"]
+        3
+        >>> resolve_retry_config({"retryConfig": {"max_attempts": 1}})["max_attempts"]
+        1
+    """
+    cfg = dict(DEFAULT_RETRY_CONFIG)
+    if root_cfg:
+        cfg.update(root_cfg.get("retryConfig", {}) or {})
+    return cfg
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def classify_error(exc: BaseException) -> ErrorClass:
+    """
+    Decide whether an exception from a provider call is worth retrying.
+
+    Examples:
+        >>> classify_error(TimeoutError("slow")).retryable
+        True
+        >>> classify_error(ValueError("bad")).retryable
+        False
+    """
+    # Local configuration problems never fix themselves
+    from .llm_client import LLMConfigError
+
+    if isinstance(exc, LLMConfigError):
+        return ErrorClass(False, "config")
+
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        code = getattr(exc, "code", None)
+        if isinstance(code, str) and code in TERMINAL_CODES:
+            return ErrorClass(False, f"http_{status}:{code}")
+        if status in RETRYABLE_STATUS or status >= 500:
+            return ErrorClass(True, f"http_{status}", _retry_after_seconds(exc))
+        return ErrorClass(False, f"http_{status}")
+
+    # gRPC errors from the xAI SDK expose code() -> StatusCode
+    code_fn = getattr(exc, "code", None)
+    if callable(code_fn):
+        try:
+            name = getattr(code_fn(), "name", str(code_fn()))
+        except Exception:
+            name = None
+        if name:
+            return ErrorClass(name in RETRYABLE_GRPC, f"grpc_{name.lower()}")
+
+    if _OpenAIConnectionError is not None and isinstance(exc, _OpenAIConnectionError):
+        return ErrorClass(True, type(exc).__name__)
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return ErrorClass(True, "timeout")
+    if isinstance(exc, ConnectionError):
+        return ErrorClass(True, "connection")
+    return ErrorClass(False, type(exc).__name__)
+
+
+def backoff_delay(attempt: int, cfg: Dict[str, Any], retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (1 = first retry): full jitter, or Retry-After if given.
+
+    Examples:
+        >>> cfg = {"base_delay": 1.0, "max_delay": 30.0}
+        >>> 0.0 <= backoff_delay(3, cfg) <= 4.0
+        True
+        >>> backoff_delay(1, cfg, retry_after=7.5)
+        7.5
+    """
+    if retry_after is not None:
+        return float(retry_after)
+    cap = min(float(cfg.get("max_delay", 30.0)), float(cfg.get("base_delay", 1.0)) * (2 ** (attempt - 1)))
+    return random.uniform(0.0, cap)
+
+
+def _next_delay(state: RetryState, exc: BaseException, cfg: Dict[str, Any], label: str) -> Optional[float]:
+    """Record the failure and return the sleep before the next attempt, or None to give up."""
+    err = classify_error(exc)
+    state.errors.append(err.reason)
+    max_attempts = max(1, int(cfg.get("max_attempts", 1)))
+    if not err.retryable or state.attempts >= max_attempts:
+        return None
+    delay = backoff_delay(state.attempts, cfg, err.retry_after)
+    budget = float(cfg.get("retry_budget_seconds", 0) or 0)
+    if budget and state.waited + delay > budget:
+        try:
+            get_logger().warning(
+                "Retry budget exhausted | call=%s | waited=%.1fs | next_delay=%.1fs | budget=%.0fs",
+                label, state.waited, delay, budget,
+            )
+        except Exception:
+            pass
+        return None
+    try:
+        get_logger().warning(
+            "Retrying LLM call | call=%s | attempt=%s/%s | reason=%s | delay=%.2fs | error=%s",
+            label, state.attempts + 1, max_attempts, err.reason, delay, exc,
+        )
+    except Exception:
+        pass
+    return delay
+
+
+def _tag(exc: BaseException, state: RetryState) -> None:
+    try:
+        setattr(exc, "wpd_attempts", state.attempts)
+        setattr(exc, "wpd_retry_errors", list(state.errors))
+    except Exception:
+        pass
+
+
+async def aretry(
+    fn: Callable[[int], Awaitable[T]],
+    cfg: Dict[str, Any],
+    *,
+    label: str = "llm",
+    should_retry: Optional[Callable[[], bool]] = None,
+) -> "tuple[T, RetryState]":
+    """
+    Run `fn(attempt)` until it succeeds, fails terminally, or the budget runs out.
+
+    Args:
+        fn: Coroutine factory receiving the 1-based attempt number
+        cfg: Resolved retryConfig
+        label: Name used in log lines
+        should_retry: Extra veto (e.g. a stream that already emitted output)
+
+    Returns:
+        (result, RetryState). On final failure the exception is re-raised with
+        `wpd_attempts` / `wpd_retry_errors` attributes attached.
+    """
+    state = RetryState()
+    while True:
+        state.attempts += 1
+        try:
+            return await fn(state.attempts), state
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            delay = _next_delay(state, exc, cfg, label)
+            if delay is None or (should_retry is not None and not should_retry()):
+                _tag(exc, state)
+                raise
+            state.waited += delay
+            await asyncio.sleep(delay)
+
+
+def retry(
+    fn: Callable[[int], T],
+    cfg: Dict[str, Any],
+    *,
+    label: str = "llm",
+    should_retry: Optional[Callable[[], bool]] = None,
+) -> "tuple[T, RetryState]":
+    """Blocking counterpart of `aretry`."""
+    state = RetryState()
+    while True:
+        state.attempts += 1
+        try:
+            return fn(state.attempts), state
+        except Exception as exc:
+            delay = _next_delay(state, exc, cfg, label)
+            if delay is None or (should_retry is not None and not should_retry()):
+                _tag(exc, state)
+                raise
+            state.waited += delay
+            time.sleep(delay)
+
+
+__all__ = [
+    "DEFAULT_RETRY_CONFIG",
+    "ErrorClass",
+    "RetryState",
+    "aretry",
+    "backoff_delay",
+    "classify_error",
+    "resolve_retry_config",
+    "retry",
+]
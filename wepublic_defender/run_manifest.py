@@ -0,0 +1,212 @@
+"""
+Checkpoint manifests for resumable review pipeline runs.
+
+A high-effort wpd-review-pipeline run can take half an hour. Each run now
+keeps a manifest at .wepublic_defender/runs/<run_id>.json, keyed by the run
+id and the SHA-256 of the input document, that records:
+
+- the settings the run started with (iterations, thresholds, overrides)
+- per iteration: the hash of the draft under review, every completed stage
+  with the file its result was saved to, whether the draft met the
+  thresholds, and the revision the drafter wrote
+- the current draft revision
+
+`wpd-review-pipeline --resume <run_id>` (or `--resume latest --file X`)
+reloads the manifest, continues at the first unfinished iteration, and
+reuses each completed stage's saved result instead of paying for the call
+again. A stage whose output file is missing or unreadable, or that reviewed
+a different draft, simply runs again. A run refuses to resume if the input
+document changed since it started.
+
+Examples:
+    >>> manifest = RunManifest(id="r1", file="brief.md", document_hash=document_hash("text"), current_draft="brief.md")
+    >>> manifest.begin_iteration(1, manifest.document_hash).stages
+    {}
+    >>> manifest.resume_point()
+    1
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from .jsonio import read_json
+
+
+RunStatus = Literal["running", "complete", "finished", "stopped"]
+
+
+class StageRecord(BaseModel):
+    """A finished stage of one iteration and where its result was saved."""
+
+    agent: str
+    output: str
+    completed_at: float = Field(default_factory=time.time)
+
+
+class IterationRecord(BaseModel):
+    """Progress of one pipeline iteration."""
+
+    draft_hash: str
+    stages: Dict[str, StageRecord] = Field(default_factory=dict)
+    ready: Optional[bool] = None
+    revision: Optional[str] = None
+    revision_hash: Optional[str] = None
+
+
+class RunManifest(BaseModel):
+    """Local checkpoint of a pipeline run, persisted under .wepublic_defender/runs/."""
+
+    id: str
+    file: str
+    document_hash: str
+    status: RunStatus = "running"
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+    settings: Dict[str, Any] = Field(default_factory=dict)
+    current_draft: str
+    # JSON object keys are strings: "1", "2", ...
+    iterations: Dict[str, IterationRecord] = Field(default_factory=dict)
+
+    def begin_iteration(self, iteration: int, draft_hash: str) -> IterationRecord:
+        """Return the iteration's record, starting it over if it last reviewed a different draft."""
+        record = self.iterations.get(str(iteration))
+        if record is None or record.draft_hash != draft_hash:
+            record = IterationRecord(draft_hash=draft_hash)
+            self.iterations[str(iteration)] = record
+            # Later iterations were built on the old draft
+            for key in [k for k in self.iterations if int(k) > iteration]:
+                del self.iterations[key]
+        return record
+
+    def stage_result(self, iteration: int, stage: str) -> Optional[Dict[str, Any]]:
+        """Saved result of a completed stage, or None if it has to run (again)."""
+        record = self.iterations.get(str(iteration))
+        done = record.stages.get(stage) if record else None
+        if done is None:
+            return None
+        try:
+            result = read_json(done.output)
+        except Exception:
+            return None
+        return result if isinstance(result, dict) else None
+
+    def record_stage(self, iteration: int, stage: str, agent: str, output: Path) -> None:
+        self.iterations[str(iteration)].stages[stage] = StageRecord(agent=agent, output=str(output))
+
+    def record_revision(self, iteration: int, path: Path, text: str) -> None:
+        record = self.iterations[str(iteration)]
+        record.revision = str(path)
+        record.revision_hash = document_hash(text)
+        self.current_draft = str(path)
+
+    def resume_point(self) -> int:
+        """First iteration that is not finished (reviewed and, unless ready, revised)."""
+        done = [int(k) for k, r in self.iterations.items() if r.revision or r.ready]
+        return max(done, default=0) + 1
+
+    def reviewed_text(self, iteration: int) -> Optional[str]:
+        """The draft an iteration reviewed, or None if it is gone or no longer matches."""
+        record = self.iterations.get(str(iteration))
+        if record is None:
+            return None
+        before = self.iterations.get(str(iteration - 1))
+        path = Path(before.revision) if before and before.revision else Path(self.file)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        return text if document_hash(text) == record.draft_hash else None
+
+    def current_text(self) -> str:
+        """The draft to review next; raises ValueError if it changed on disk since it was recorded."""
+        path = Path(self.current_draft)
+        text = path.read_text(encoding="utf-8")
+        last = self.iterations.get(str(self.resume_point() - 1))
+        expected = last.revision_hash if last and last.revision else self.document_hash
+        if document_hash(text) != expected:
+            raise ValueError(f"{path} changed since run {self.id} recorded it; start a new run")
+        return text
+
+
+def document_hash(text: str) -> str:
+    """SHA-256 of a draft's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def runs_dir() -> Path:
+    """Return the case runs directory (.wepublic_defender/runs under CWD)."""
+    return Path.cwd() / ".wepublic_defender" / "runs"
+
+
+def new_run(path: Path, text: str, settings: Optional[Dict[str, Any]] = None) -> RunManifest:
+    """Start a manifest for a pipeline run over `path` (not saved until save_run)."""
+    digest = document_hash(text)
+    run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{path.stem}_{digest[:8]}"
+    return RunManifest(
+        id=run_id,
+        file=str(path),
+        document_hash=digest,
+        settings=dict(settings or {}),
+        current_draft=str(path),
+    )
+
+
+def _manifest_path(run_id: str) -> Path:
+    return runs_dir() / f"{run_id}.json"
+
+
+def save_run(manifest: RunManifest) -> Path:
+    """Write the manifest atomically (a crash mid-write keeps the previous checkpoint)."""
+    manifest.updated_at = time.time()
+    path = _manifest_path(manifest.id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(manifest.model_dump_json(indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_run(run_id: str) -> RunManifest:
+    """Load a run manifest (FileNotFoundError if unknown)."""
+    path = _manifest_path(run_id)
+    if not path.exists():
+        raise FileNotFoundError(f"No run manifest for {run_id} in {runs_dir()}")
+    return RunManifest.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def list_runs() -> List[RunManifest]:
+    """Return all saved runs, newest first."""
+    runs: List[RunManifest] = []
+    for path in runs_dir().glob("*.json"):
+        try:
+            runs.append(RunManifest.model_validate_json(path.read_text(encoding="utf-8")))
+        except Exception:
+            continue
+    return sorted(runs, key=lambda r: r.created_at, reverse=True)
+
+
+def latest_run(text: str) -> Optional[RunManifest]:
+    """Newest unfinished run over a document with this exact text, if any."""
+    digest = document_hash(text)
+    return next((r for r in list_runs() if r.document_hash == digest and r.status != "complete"), None)
+
+
+__all__ = [
+    "IterationRecord",
+    "RunManifest",
+    "StageRecord",
+    "document_hash",
+    "latest_run",
+    "list_runs",
+    "load_run",
+    "new_run",
+    "runs_dir",
+    "save_run",
+]
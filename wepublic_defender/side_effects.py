@@ -0,0 +1,201 @@
+"""
+Background writer for file side effects of agent calls.
+
+Every agent call appends a usage CSV row, citation_verify rewrites
+06_RESEARCH/CITATIONS_LOG.md, and the CLIs save review JSON/MD. Doing that
+inline blocks the event loop (stalling the other calls of a parallel
+fan-out) and lets concurrent calls race on the same file. Instead:
+
+- `submit(path, payload, flush_fn)` queues a payload for a file and returns
+  immediately. Each file has at most one writer task; it takes everything
+  queued for that file so far and hands the batch to `flush_fn(path, payloads)`
+  in a worker thread (one CSV open for N rows, one read/rewrite of the
+  citation log for N results).
+- writes to one file happen in submission order and never overlap
+- with no running event loop (plain scripts, sync CLIs) the write happens
+  synchronously, as before
+- `await flush()` (or `await wpd.flush()`) waits until everything queued is
+  on disk. Pending writes are also flushed when the loop cancels the writer
+  tasks at shutdown, at interpreter exit, and on SIGTERM/SIGHUP once
+  `flush_on_signals()` is installed.
+
+Examples:
+    >>> import tempfile
+    >>> path = Path(tempfile.mkdtemp()) / "out.txt"
+    >>> queue_write(path, "saved")  # no running loop: written immediately
+    >>> path.read_text()
+    'saved'
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import itertools
+import signal
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from .jsonio import storage_bytes
+from .logging_utils import get_logger
+
+
+FlushFn = Callable[[Path, List[Any]], None]
+
+
+class SideEffectWriter:
+    """Per-file queues drained by one writer task per file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Path, List[Tuple[FlushFn, Any]]] = {}
+        self._tasks: Dict[Path, "asyncio.Task[None]"] = {}
+        self._io_locks: Dict[Path, threading.Lock] = {}
+        self.submitted = 0
+        self.batches = 0
+        self.errors = 0
+
+    def submit(self, path: Union[str, Path], payload: Any, flush_fn: FlushFn) -> None:
+        """Queue `payload` for `path`; `flush_fn(path, payloads)` performs the batched write."""
+        path = Path(path).absolute()
+        with self._lock:
+            self._pending.setdefault(path, []).append((flush_fn, payload))
+            self.submitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._drain(path)
+            return
+        task = self._tasks.get(path)
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._tasks[path] = loop.create_task(self._run(path), name=f"wpd-writer:{path.name}")
+
+    def pending(self) -> int:
+        """Number of queued payloads not yet handed to a write."""
+        with self._lock:
+            return sum(len(items) for items in self._pending.values())
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far has been written."""
+        loop = asyncio.get_running_loop()
+        while True:
+            tasks = [t for t in self._tasks.values() if not t.done() and t.get_loop() is loop]
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            elif self.pending():
+                # Queued from a loop that is gone; nothing else will drain it
+                await asyncio.to_thread(self.flush_sync)
+            else:
+                return
+
+    def flush_sync(self) -> None:
+        """Write everything queued, synchronously (exit and signal handlers)."""
+        with self._lock:
+            paths = list(self._pending)
+        for path in paths:
+            self._drain(path)
+
+    def _take(self, path: Path) -> List[Tuple[FlushFn, Any]]:
+        with self._lock:
+            return self._pending.pop(path, [])
+
+    def _drain(self, path: Path) -> None:
+        batch = self._take(path)
+        if batch:
+            self._write(path, batch)
+
+    async def _run(self, path: Path) -> None:
+        try:
+            while True:
+                batch = self._take(path)
+                if not batch:
+                    return
+                await asyncio.to_thread(self._write, path, batch)
+        except asyncio.CancelledError:
+            # Loop is shutting down: finish the queue here rather than lose it
+            self._drain(path)
+            raise
+
+    def _write(self, path: Path, batch: List[Tuple[FlushFn, Any]]) -> None:
+        with self._lock:
+            io_lock = self._io_locks.setdefault(path, threading.Lock())
+        with io_lock:
+            # Consecutive payloads with the same writer go in one call
+            for flush_fn, group in itertools.groupby(batch, key=lambda item: item[0]):
+                payloads = [payload for _, payload in group]
+                try:
+                    flush_fn(path, payloads)
+                    self.batches += 1
+                except Exception as e:
+                    self.errors += 1
+                    try:
+                        get_logger().warning(
+                            "Background write failed | path=%s | items=%d | error=%s",
+                            path,
+                            len(payloads),
+                            e,
+                        )
+                    except Exception:
+                        pass
+
+
+def _write_last(path: Path, payloads: List[bytes]) -> None:
+    """Whole-file writes: only the newest content for a path matters."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(payloads[-1])
+
+
+def queue_write(path: Union[str, Path], data: Union[str, bytes]) -> None:
+    """Queue a whole-file write (UTF-8 for str)."""
+    get_side_effect_writer().submit(path, data.encode("utf-8") if isinstance(data, str) else data, _write_last)
+
+
+def queue_json(path: Union[str, Path], obj: Any, *, pretty: bool = False) -> Path:
+    """Queue a JSON file write; `obj` is serialized now, so later mutation does not leak in."""
+    queue_write(path, storage_bytes(obj, pretty=pretty))
+    return Path(path)
+
+
+_writer: SideEffectWriter = SideEffectWriter()
+
+
+def get_side_effect_writer() -> SideEffectWriter:
+    """Return the process-wide side-effect writer."""
+    return _writer
+
+
+def flush_side_effects() -> None:
+    """Synchronously write everything still queued. Safe to call more than once."""
+    _writer.flush_sync()
+
+
+def flush_on_signals() -> None:
+    """Flush queued writes before exiting on SIGTERM/SIGHUP (call from the main thread)."""
+
+    def handler(signum, frame):
+        flush_side_effects()
+        raise SystemExit(128 + signum)
+
+    for name in ("SIGTERM", "SIGHUP"):
+        sig = getattr(signal, name, None)
+        if sig is None:
+            continue
+        try:
+            signal.signal(sig, handler)
+        except (ValueError, OSError):
+            # Not the main thread, or unsupported on this platform
+            pass
+
+
+atexit.register(flush_side_effects)
+
+
+__all__ = [
+    "SideEffectWriter",
+    "flush_on_signals",
+    "flush_side_effects",
+    "get_side_effect_writer",
+    "queue_json",
+    "queue_write",
+]
@@ -0,0 +1,191 @@
+"""
+Early refinement decisions for review pipeline iterations.
+
+An iteration used to wait for every review stage before deciding whether
+the draft needed another revision, even when an early result had already
+settled it. With `wpd-review-pipeline --speculative` the pipeline checks
+after each stage whether the draft can still meet the filing thresholds
+(`_ready_by_threshold` and no critical opposition). Once it cannot, the
+drafter starts at once with the findings so far, and the stages still
+running are handled per `workflowConfig.pipeline.speculative`:
+
+    "speculative": {
+      "remaining": "cancel",
+      "self_review_decides": true
+    }
+
+- `"cancel"`: stop the remaining reviewers; their calls are not waited for
+  or paid for beyond what the provider already processed
+- `"merge"`: keep them running alongside the drafter. A review that
+  finishes before the draft lands and changes the drafter's brief restarts
+  the drafter with the combined findings (the partial draft is paid for
+  and dropped); if it shows the draft is ready after all, the speculative
+  draft is discarded. Once the draft lands the rest is cancelled, and a
+  review finishing after that is saved with the iteration but only reaches
+  the next one.
+
+The thresholds give final_review's counts precedence over self_review's,
+so strictly a self_review finding cannot decide while final_review is
+pending. `self_review_decides` lets a critical self_review issue decide
+anyway (final_review rarely clears one); turn it off to wait for
+final_review in that case.
+
+Saved cost is the estimated cost of the cancelled calls; saved time is how
+much longer the cancelled stages would typically have run (median past
+duration of the agent, from this run and the usage log) after the landed
+draft started. Merged stages save no time: the draft waited for them.
+
+Examples:
+    >>> results = {"opposing_counsel": {"structured": {"weaknesses_found": [{"severity": "Critical", "issue": "No standing"}]}}}
+    >>> refinement_reason(results, ["self_review", "final_review"], max_major=2)
+    'opposing_counsel found a critical weakness'
+    >>> refinement_reason({"self_review": {"structured": {"major_issues": ["a", "b", "c"]}}}, ["final_review"], max_major=2) is None
+    True
+"""
+
+from __future__ import annotations
+
+import statistics
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .hedging import LatencyHistory
+
+
+DEFAULT_SPECULATIVE_CONFIG: Dict[str, Any] = {
+    "remaining": "cancel",
+    "self_review_decides": True,
+}
+
+REMAINING_POLICIES = ("cancel", "merge")
+
+
+class SpeculationReport(BaseModel):
+    """What an early refinement decision did and saved in one iteration."""
+
+    iteration: int
+    reason: str
+    decided_after: float
+    policy: str = "cancel"
+    cancelled: List[str] = Field(default_factory=list)
+    merged: List[str] = Field(default_factory=list)
+    redrafts: int = 0
+    discarded: bool = False
+    saved_cost: float = 0.0
+    saved_seconds: float = 0.0
+
+    def line(self) -> str:
+        parts = [
+            f"iter={self.iteration}",
+            f"decided after {self.decided_after:.1f}s ({self.reason})",
+            f"cancelled={','.join(self.cancelled) or '-'}",
+            f"merged={','.join(self.merged) or '-'}",
+        ]
+        if self.redrafts:
+            parts.append(f"drafter restarted {self.redrafts}x")
+        if self.discarded:
+            parts.append("draft discarded (a late review passed)")
+        parts.append(f"saved ~${self.saved_cost:.4f}, ~{self.saved_seconds:.1f}s")
+        return " | ".join(parts)
+
+
+def resolve_speculative_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge defaults with `workflowConfig.pipeline.speculative`.
+
+    Raises:
+        ValueError: For an unknown `remaining` policy
+
+    Examples:
+        >>> resolve_speculative_config({})["remaining"]
+        'cancel'
+        >>> resolve_speculative_config({"workflowConfig": {"pipeline": {"speculative": {"remaining": "wait"}}}})
+        Traceback (most recent call last):
+            ...
+        ValueError: workflowConfig.pipeline.speculative.remaining must be one of cancel, merge (got 'wait')
+    """
+    cfg = dict(DEFAULT_SPECULATIVE_CONFIG)
+    if review_settings:
+        pipeline = (review_settings.get("workflowConfig", {}) or {}).get("pipeline", {}) or {}
+        cfg.update({k: v for k, v in (pipeline.get("speculative", {}) or {}).items() if not k.startswith("_")})
+    if cfg.get("remaining") not in REMAINING_POLICIES:
+        raise ValueError(
+            "workflowConfig.pipeline.speculative.remaining must be one of "
+            f"{', '.join(REMAINING_POLICIES)} (got {cfg.get('remaining')!r})"
+        )
+    return cfg
+
+
+def _structured(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    structured = (result or {}).get("structured")
+    return structured if isinstance(structured, dict) else None
+
+
+def _over(review: Dict[str, Any], max_major: int) -> bool:
+    return len(review.get("critical_issues") or []) > 0 or len(review.get("major_issues") or []) > max_major
+
+
+def refinement_reason(
+    results: Dict[str, Dict[str, Any]],
+    pending: Iterable[str],
+    max_major: int,
+    cfg: Optional[Dict[str, Any]] = None,
+) -> Optional[str]:
+    """
+    Why the draft can no longer meet the thresholds given the finished stages, or None if it still can.
+
+    `results` maps finished stage names to agent results; `pending` names
+    the stages still running or not started.
+    """
+    cfg = {**DEFAULT_SPECULATIVE_CONFIG, **(cfg or {})}
+    pending = set(pending)
+    oc = _structured(results.get("opposing_counsel"))
+    if oc and any((w.get("severity") or "").lower() == "critical" for w in oc.get("weaknesses_found") or []):
+        return "opposing_counsel found a critical weakness"
+    fr = _structured(results.get("final_review"))
+    if fr:
+        return "final_review is over the thresholds" if _over(fr, max_major) else None
+    sr = _structured(results.get("self_review"))
+    if not sr or not _over(sr, max_major):
+        return None
+    if "final_review" not in pending:
+        # final_review finished without usable counts, or is not a stage: self_review decides
+        return "self_review is over the thresholds"
+    if cfg.get("self_review_decides") and sr.get("critical_issues"):
+        return "self_review found a critical issue"
+    return None
+
+
+def typical_duration(agent: str, history: LatencyHistory) -> Optional[float]:
+    """Median duration in seconds of past `agent` calls (this run's tracker, then the usage log)."""
+    samples = history.agent_samples(agent)
+    return statistics.median(samples) if samples else None
+
+
+def summarize_speculation(reports: List[SpeculationReport]) -> str:
+    """
+    Per-iteration lines and totals for the end-of-run report.
+
+    Examples:
+        >>> print(summarize_speculation([SpeculationReport(iteration=1, reason="r", decided_after=12.0, cancelled=["final_review"], saved_cost=0.2, saved_seconds=40)]))
+        iter=1 | decided after 12.0s (r) | cancelled=final_review | merged=- | saved ~$0.2000, ~40.0s
+        Total saved: ~$0.2000, ~40.0s over 1 early decision(s)
+    """
+    lines = [r.line() for r in reports]
+    lines.append(
+        f"Total saved: ~${sum(r.saved_cost for r in reports):.4f}, ~{sum(r.saved_seconds for r in reports):.1f}s "
+        f"over {len(reports)} early decision(s)"
+    )
+    return "\n".join(lines)
+
+
+__all__ = [
+    "DEFAULT_SPECULATIVE_CONFIG",
+    "REMAINING_POLICIES",
+    "SpeculationReport",
+    "refinement_reason",
+    "resolve_speculative_config",
+    "summarize_speculation",
+    "typical_duration",
+]
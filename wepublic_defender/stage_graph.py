@@ -0,0 +1,225 @@
+"""
+Declarative stage graph for review pipeline iterations.
+
+Each iteration of wpd-review-pipeline runs a set of review stages over the
+same draft. Stages used to run one after another (only self_review and
+citation_verify could overlap, with --parallel), although none reads
+another's output. The stages and their dependencies are now declared in
+`workflowConfig.pipeline` and an executor starts every stage whose
+dependencies have finished, at most `max_parallel` at a time, so an
+iteration takes about as long as its slowest chain instead of the sum of
+all stages:
+
+    "workflowConfig": {
+      "pipeline": {
+        "max_parallel": 4,
+        "stages": {
+          "self_review": {"needs": []},
+          "citation_verify": {"needs": []},
+          "opposing_counsel": {"needs": []},
+          "final_review": {"needs": []}
+        }
+      }
+    }
+
+A stage runs the agent of the same name unless it sets `"agent"`. `needs`
+only orders stages (e.g. to keep two calls to a rate-limited provider
+apart); every stage reviews the current draft. If a stage raises, no new
+stages start, the running ones finish, and the first error is re-raised.
+Setting the optional `stop` event ends the iteration early: running stages
+are cancelled and only finished stages are returned.
+
+Examples:
+    >>> stages = parse_stages({"a": {}, "b": {"needs": ["a"]}, "c": {}})
+    >>> [s.name for s in stages]
+    ['a', 'c', 'b']
+    >>> stage_levels(stages)
+    [['a', 'c'], ['b']]
+    >>> async def run(stage):
+    ...     return stage.name.upper()
+    >>> asyncio.run(run_stage_graph(stages, run, max_parallel=2))
+    {'a': 'A', 'c': 'C', 'b': 'B'}
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .logging_utils import get_logger
+
+
+DEFAULT_PIPELINE_CONFIG: Dict[str, Any] = {
+    "max_parallel": 4,
+    "stages": {
+        "self_review": {"needs": []},
+        "citation_verify": {"needs": []},
+        "opposing_counsel": {"needs": []},
+        "final_review": {"needs": []},
+    },
+}
+
+
+class Stage(NamedTuple):
+    name: str
+    agent: str
+    needs: Tuple[str, ...] = ()
+
+
+def resolve_pipeline_config(review_settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge defaults with `workflowConfig.pipeline`; a configured `stages` block replaces the default stages.
+
+    Examples:
+        >>> resolve_pipeline_config({})["max_parallel"]
+        4
+        >>> list(resolve_pipeline_config({"workflowConfig": {"pipeline": {"stages": {"self_review": {}}}}})["stages"])
+        ['self_review']
+    """
+    cfg = dict(DEFAULT_PIPELINE_CONFIG)
+    if review_settings:
+        block = (review_settings.get("workflowConfig", {}) or {}).get("pipeline", {}) or {}
+        cfg.update({k: v for k, v in block.items() if not k.startswith("_")})
+    return cfg
+
+
+def parse_stages(spec: Dict[str, Any]) -> List[Stage]:
+    """
+    Build stages from a `stages` block, wave by wave (config order within a wave).
+
+    Raises:
+        ValueError: For an empty graph, an unknown dependency or a cycle
+
+    Examples:
+        >>> parse_stages({"a": {"needs": ["b"]}, "b": {"needs": ["a"]}})
+        Traceback (most recent call last):
+            ...
+        ValueError: Pipeline stages have a dependency cycle: a, b
+        >>> parse_stages({"a": {"needs": ["x"]}})
+        Traceback (most recent call last):
+            ...
+        ValueError: Pipeline stage 'a' needs unknown stage 'x'
+    """
+    declared: Dict[str, Stage] = {}
+    for name, cfg in (spec or {}).items():
+        if name.startswith("_"):
+            continue
+        cfg = cfg or {}
+        needs = cfg.get("needs") or []
+        if isinstance(needs, str):
+            needs = [needs]
+        declared[name] = Stage(name=name, agent=cfg.get("agent") or name, needs=tuple(needs))
+    if not declared:
+        raise ValueError("Pipeline has no stages")
+    for stage in declared.values():
+        for dep in stage.needs:
+            if dep not in declared:
+                raise ValueError(f"Pipeline stage '{stage.name}' needs unknown stage '{dep}'")
+
+    ordered: List[Stage] = []
+    placed: set = set()
+    remaining = list(declared.values())
+    while remaining:
+        ready = [s for s in remaining if all(d in placed for d in s.needs)]
+        if not ready:
+            raise ValueError("Pipeline stages have a dependency cycle: " + ", ".join(s.name for s in remaining))
+        for s in ready:
+            ordered.append(s)
+            placed.add(s.name)
+        remaining = [s for s in remaining if s.name not in placed]
+    return ordered
+
+
+def stage_levels(stages: List[Stage]) -> List[List[str]]:
+    """Group stage names into waves that can run together (for plans and logs)."""
+    level: Dict[str, int] = {}
+    for s in stages:
+        level[s.name] = 1 + max((level[d] for d in s.needs), default=-1)
+    waves: List[List[str]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for s in stages:
+        waves[level[s.name]].append(s.name)
+    return waves
+
+
+async def run_stage_graph(
+    stages: List[Stage],
+    run: Callable[[Stage], Awaitable[Any]],
+    *,
+    max_parallel: int = 4,
+    on_done: Optional[Callable[[Stage, Any, float], None]] = None,
+    stop: Optional[asyncio.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Run every stage once its dependencies are done, at most `max_parallel` at a time.
+
+    Returns {stage name: result} in completion order. `on_done(stage, result,
+    seconds)` is called as each stage finishes (e.g. to save its output).
+    Once `stop` is set, no stage starts, running stages are cancelled, and
+    the finished stages are returned.
+    """
+    logger = get_logger()
+    limit = max(1, int(max_parallel or 1))
+    pending: List[Stage] = list(stages)
+    running: Dict["asyncio.Task[Any]", Tuple[Stage, float]] = {}
+    results: Dict[str, Any] = {}
+    error: Optional[BaseException] = None
+    try:
+        while pending or running:
+            if stop is not None and stop.is_set():
+                break
+            if error is None:
+                for stage in list(pending):
+                    if len(running) >= limit:
+                        break
+                    if all(d in results for d in stage.needs):
+                        pending.remove(stage)
+                        task = asyncio.create_task(run(stage), name=f"wpd-stage:{stage.name}")
+                        running[task] = (stage, time.perf_counter())
+            if not running:
+                break
+            waiting = set(running)
+            stopper = asyncio.create_task(stop.wait()) if stop is not None else None
+            if stopper is not None:
+                waiting.add(stopper)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if stopper is not None:
+                stopper.cancel()
+                done.discard(stopper)
+            for task in done:
+                stage, started = running.pop(task)
+                elapsed = time.perf_counter() - started
+                if task.cancelled() or task.exception() is not None:
+                    # Stop scheduling; let stages already running finish
+                    error = error or (task.exception() if not task.cancelled() else asyncio.CancelledError())
+                    continue
+                results[stage.name] = task.result()
+                try:
+                    logger.info(
+                        "Stage done | stage=%s | agent=%s | dur=%.2fs | running=%d | pending=%d",
+                        stage.name,
+                        stage.agent,
+                        elapsed,
+                        len(running),
+                        len(pending),
+                    )
+                except Exception:
+                    pass
+                if on_done is not None:
+                    on_done(stage, results[stage.name], elapsed)
+    finally:
+        for task in running:
+            task.cancel()
+    if error is not None:
+        raise error
+    return results
+
+
+__all__ = [
+    "DEFAULT_PIPELINE_CONFIG",
+    "Stage",
+    "parse_stages",
+    "resolve_pipeline_config",
+    "run_stage_graph",
+    "stage_levels",
+]
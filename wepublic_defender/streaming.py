@@ -0,0 +1,139 @@
+"""
+Helpers for streamed agent output.
+
+- PartialOutputWriter appends text deltas to a `.partial.md` file under
+  `.wepublic_defender/reviews/` as they arrive, so a long review is never
+  lost and can be followed with `tail -f`.
+- StreamProgress is a delta callback for the CLIs that prints throttled
+  per-agent/model progress lines (chars received, time to first token).
+  A callback with a `start(agent, model)` method is told when each request
+  is sent.
+
+Usage:
+    progress = StreamProgress()
+    await wpd.call_agent("self_review", doc, mode="external-llm",
+                         stream=True, on_delta=progress)
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, TextIO, Tuple
+
+from .logging_utils import get_logger
+
+
+def reviews_dir() -> Path:
+    """Return the case reviews directory (.wepublic_defender/reviews under CWD)."""
+    return Path.cwd() / ".wepublic_defender" / "reviews"
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name)
+
+
+class PartialOutputWriter:
+    """Incrementally write streamed text to a file, flushing every delta."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fh: Optional[TextIO] = None
+        self.chars = 0
+
+    @classmethod
+    def for_agent(cls, agent: str, model: str, root: Optional[Path] = None) -> "PartialOutputWriter":
+        """Create a writer at <reviews>/<timestamp>_<agent>_<model>.partial.md."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        base = root or reviews_dir()
+        return cls(base / f"{timestamp}_{_safe(agent)}_{_safe(model)}.partial.md")
+
+    def write(self, delta: str) -> None:
+        if not delta:
+            return
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(delta)
+        self._fh.flush()
+        self.chars += len(delta)
+
+    def close(self, keep: bool = True) -> Optional[Path]:
+        """Close the file; delete it unless `keep`. Returns the path if it still exists."""
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
+        if not keep:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+            return None
+        return self.path if self.path.exists() else None
+
+
+class StreamProgress:
+    """
+    Delta callback printing throttled progress per (agent, model).
+
+    Args:
+        interval: Minimum seconds between progress lines for one stream
+        echo: Also echo raw deltas (readable for a single stream only)
+        out: Stream to print to (default stdout)
+    """
+
+    def __init__(self, interval: float = 2.0, echo: bool = False, out: Optional[TextIO] = None):
+        self.interval = interval
+        self.echo = echo
+        self.out = out or sys.stdout
+        self._started: Dict[Tuple[str, str], float] = {}
+        self._first: Dict[Tuple[str, str], float] = {}
+        self._chars: Dict[Tuple[str, str], int] = {}
+        self._last_print: Dict[Tuple[str, str], float] = {}
+
+    def start(self, agent: str, model: str) -> None:
+        """
+        Mark when a request was sent so TTFT can be reported.
+
+        Called by WePublicDefender before each streamed request; resets the
+        stream's counters so a repeat call (next iteration) reports afresh.
+        """
+        key = (agent, model)
+        self._started[key] = time.time()
+        self._first.pop(key, None)
+        self._chars.pop(key, None)
+        self._last_print.pop(key, None)
+
+    def __call__(self, agent: str, model: str, delta: str) -> None:
+        key = (agent, model)
+        now = time.time()
+        self._started.setdefault(key, now)
+        self._chars[key] = self._chars.get(key, 0) + len(delta)
+        if key not in self._first:
+            self._first[key] = now
+            ttft = now - self._started[key]
+            print(f"\n[stream] {agent}/{model} first token after {ttft:.1f}s", file=self.out, flush=True)
+            try:
+                get_logger().info("Stream first token | agent=%s | model=%s | ttft=%.2fs", agent, model, ttft)
+            except Exception:
+                pass
+        if self.echo:
+            print(delta, end="", file=self.out, flush=True)
+            return
+        if now - self._last_print.get(key, 0.0) >= self.interval:
+            self._last_print[key] = now
+            elapsed = now - self._first[key]
+            print(
+                f"[stream] {agent}/{model} | {self._chars[key]} chars | {elapsed:.0f}s since first token",
+                file=self.out,
+                flush=True,
+            )
+
+
+__all__ = ["PartialOutputWriter", "StreamProgress", "reviews_dir"]
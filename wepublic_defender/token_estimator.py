@@ -0,0 +1,347 @@
+"""
+Pre-flight token estimation and context-window guard.
+
+`llm_providers.json` records `max_input_tokens`, `max_output_tokens` and
+`total_context_tokens` per model. Without a local check, an oversized brief
+plus prompt plus schema is only rejected after a slow round trip. Before
+each call the routers estimate the request size here and then:
+
+- send it unchanged when it fits
+- shrink `max_output_tokens` when only the output reservation overflows the
+  total context window
+- reroute to a larger-context model (`on_overflow: "reroute"`), or raise
+  ContextWindowExceededError (`on_overflow: "reject"`)
+
+Token counts come from tiktoken when it is installed (OpenAI models). Otherwise
+a characters-per-token ratio is used. The ratio starts from the config and is
+recalibrated in-process from actual `usage.input` counts.
+
+Settings come from the root `contextGuard` block of llm_providers.json:
+
+    "contextGuard": {
+      "enabled": true,
+      "on_overflow": "reroute",
+      "safety_margin": 0.05,
+      "min_output_tokens": 2048,
+      "default_output_tokens": 4000,
+      "chars_per_token": {"default": 4.0, "xai": 3.8},
+      "fallback_models": {"gpt-5": ["grok-4-fast"]}
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Literal, Optional, Type
+
+from pydantic import BaseModel
+
+try:
+    import tiktoken
+except Exception:  # pragma: no cover - optional dependency
+    tiktoken = None  # type: ignore
+
+from .config import get_resolved_llm_config
+from .logging_utils import get_logger
+
+
+DEFAULT_CONTEXT_GUARD: Dict[str, Any] = {
+    "enabled": True,
+    "on_overflow": "reroute",
+    "safety_margin": 0.05,
+    "min_output_tokens": 2048,
+    "default_output_tokens": 4000,
+    "chars_per_token": {"default": 4.0},
+    "fallback_models": {},
+}
+
+# Role/formatting tokens added per message by chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Weight given to each new observation when recalibrating chars/token
+CALIBRATION_ALPHA = 0.2
+MIN_CHARS_PER_TOKEN = 1.5
+MAX_CHARS_PER_TOKEN = 8.0
+
+
+class ContextWindowExceededError(ValueError):
+    """Raised when a request cannot fit the model's context window and may not be rerouted."""
+
+
+class TokenEstimate(BaseModel):
+    """Pre-flight size and cost estimate for one request."""
+
+    model_key: str
+    input_tokens: int
+    chars: int
+    method: Literal["tiktoken", "chars"]
+    max_input_tokens: Optional[int] = None
+    total_context_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    fits: bool = True
+    reason: Optional[str] = None
+    input_cost: float = 0.0
+    estimated_cost: float = 0.0
+    max_cost: float = 0.0
+    rerouted_from: Optional[str] = None
+
+
+def resolve_context_guard(root_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge built-in defaults with the root `contextGuard` block.
+
+    Examples:
+        >>> resolve_context_guard({})["on_overflow"]
+        'reroute'
+        >>> resolve_context_guard({"contextGuard": {"enabled": False}})["enabled"]
+        False
+    """
+    cfg = dict(DEFAULT_CONTEXT_GUARD)
+    if root_cfg:
+        cfg.update(root_cfg.get("contextGuard", {}) or {})
+    return cfg
+
+
+class TokenEstimator:
+    """Counts tokens with tiktoken when possible, else with calibrated chars/token ratios."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ratios: Dict[str, float] = {}
+        self._encodings: Dict[str, Any] = {}
+
+    def _encoding(self, profile: Any) -> Any:
+        if tiktoken is None or profile is None or profile.provider_name != "openai":
+            return None
+        wire = profile.wire_model
+        if wire not in self._encodings:
+            try:
+                enc = tiktoken.encoding_for_model(wire)
+            except Exception:
+                try:
+                    enc = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    enc = None
+            self._encodings[wire] = enc
+        return self._encodings[wire]
+
+    def chars_per_token(self, model_key: str, guard: Optional[Dict[str, Any]] = None) -> float:
+        """Return the calibrated ratio for a model (config seed until observations arrive)."""
+        if model_key in self._ratios:
+            return self._ratios[model_key]
+        ratios = (guard or DEFAULT_CONTEXT_GUARD).get("chars_per_token", {}) or {}
+        profile = get_resolved_llm_config().profile(model_key)
+        provider = profile.provider_name if profile else None
+        return float(ratios.get(model_key) or ratios.get(provider) or ratios.get("default") or 4.0)
+
+    def count(self, model_key: str, text: str, guard: Optional[Dict[str, Any]] = None) -> int:
+        """Estimate tokens in a single string."""
+        enc = self._encoding(get_resolved_llm_config().profile(model_key))
+        if enc is not None:
+            return len(enc.encode(text, disallowed_special=()))
+        return int(len(text) / self.chars_per_token(model_key, guard)) + 1
+
+    def count_request(
+        self,
+        model_key: str,
+        messages: List[Dict[str, Any]],
+        pydantic_model: Optional[Type] = None,
+        guard: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Return {"tokens", "chars", "method"} for a full request."""
+        parts = [str(m.get("content", "")) for m in messages]
+        if pydantic_model is not None:
+            # Structured-output schemas are sent alongside the prompt
+            try:
+                parts.append(json.dumps(pydantic_model.model_json_schema()))
+            except Exception:
+                pass
+        text = "\n".join(parts)
+        method = "tiktoken" if self._encoding(get_resolved_llm_config().profile(model_key)) is not None else "chars"
+        tokens = self.count(model_key, text, guard) + MESSAGE_OVERHEAD_TOKENS * len(messages)
+        return {"tokens": tokens, "chars": len(text), "method": method}
+
+    def observe(self, model_key: str, chars: int, actual_input_tokens: int) -> None:
+        """Recalibrate the chars/token ratio from a completed call's actual input tokens."""
+        if chars <= 0 or actual_input_tokens <= 0:
+            return
+        # Clamp so one odd response (tool output, mocked usage) cannot wreck the estimate
+        observed = min(MAX_CHARS_PER_TOKEN, max(MIN_CHARS_PER_TOKEN, chars / float(actual_input_tokens)))
+        with self._lock:
+            current = self._ratios.get(model_key)
+            self._ratios[model_key] = (
+                observed if current is None else current + CALIBRATION_ALPHA * (observed - current)
+            )
+
+
+_estimator: Optional[TokenEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Return the process-wide estimator, creating it on first use."""
+    global _estimator
+    if _estimator is None:
+        with _estimator_lock:
+            if _estimator is None:
+                _estimator = TokenEstimator()
+    return _estimator
+
+
+def _cost(model_key: str, input_tokens: int, output_tokens: int, service_tier: str) -> float:
+    from .models.token_tracker import TokenTracker, TokenUsage
+
+    tracker = TokenTracker()
+    if model_key not in tracker.cfg:
+        return 0.0
+    tier = service_tier if service_tier in ("auto", "flex", "standard", "priority") else "auto"
+    usage = TokenUsage(model=model_key, input=input_tokens, output=output_tokens, service_tier=tier)
+    return tracker.cost_for_usage(usage)[3]
+
+
+def estimate_request(
+    model_key: str,
+    messages: List[Dict[str, Any]],
+    *,
+    max_output_tokens: Optional[int] = None,
+    expected_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    pydantic_model: Optional[Type] = None,
+    root_cfg: Optional[Dict[str, Any]] = None,
+    prior: Optional[TokenEstimate] = None,
+) -> TokenEstimate:
+    """
+    Estimate input tokens and cost for a request and check it against the model's limits.
+
+    `max_output_tokens` on the result is the output reservation that fits the
+    total context window (possibly lower than requested). `prior` is an
+    earlier estimate of the same messages; if it is for `model_key` its token
+    count is reused instead of counting again.
+    """
+    resolved = get_resolved_llm_config()
+    guard = resolve_context_guard(root_cfg if root_cfg is not None else resolved.root)
+    model_cfg = resolved.model_config(model_key)
+    if prior is not None and prior.model_key == model_key:
+        counted = {"tokens": prior.input_tokens, "chars": prior.chars, "method": prior.method}
+    else:
+        counted = get_token_estimator().count_request(model_key, messages, pydantic_model, guard)
+    input_tokens = int(counted["tokens"])
+
+    max_input = model_cfg.get("max_input_tokens")
+    total_ctx = model_cfg.get("total_context_tokens")
+    out_limit = max_output_tokens or model_cfg.get("max_output_tokens")
+    needed = int(input_tokens * (1.0 + float(guard.get("safety_margin", 0.0) or 0.0)))
+
+    fits, reason = True, None
+    if max_input and needed > int(max_input):
+        fits, reason = False, f"~{input_tokens} input tokens exceeds max_input_tokens={max_input}"
+    elif total_ctx and out_limit and needed + int(out_limit) > int(total_ctx):
+        room = int(total_ctx) - needed
+        if room < int(guard.get("min_output_tokens", 0) or 0):
+            fits, reason = False, f"~{input_tokens} input tokens leaves {max(room, 0)} of total_context_tokens={total_ctx} for output"
+        else:
+            out_limit = room
+
+    expected = expected_output_tokens
+    if expected is None:
+        expected = int(guard.get("default_output_tokens", 4000) or 0)
+        if out_limit:
+            expected = min(expected, int(out_limit))
+    return TokenEstimate(
+        model_key=model_key,
+        input_tokens=input_tokens,
+        chars=int(counted["chars"]),
+        method=counted["method"],
+        max_input_tokens=max_input,
+        total_context_tokens=total_ctx,
+        max_output_tokens=out_limit,
+        fits=fits,
+        reason=reason,
+        input_cost=_cost(model_key, input_tokens, 0, service_tier),
+        estimated_cost=_cost(model_key, input_tokens, expected, service_tier),
+        max_cost=_cost(model_key, input_tokens, int(out_limit or 0), service_tier),
+    )
+
+
+def _fallback_candidates(model_key: str, guard: Dict[str, Any]) -> List[str]:
+    """Configured fallbacks first, then larger-context models with a usable API key (cheapest first)."""
+    resolved = get_resolved_llm_config()
+    configured = list((guard.get("fallback_models") or {}).get(model_key, []) or [])
+    base = resolved.profile(model_key)
+    base_limit = int(resolved.model_config(model_key).get("max_input_tokens") or 0)
+    auto = []
+    for key, profile in resolved.profiles.items():
+        if key == model_key or key in configured:
+            continue
+        cfg = profile.model_cfg
+        if int(cfg.get("max_input_tokens") or 0) <= base_limit:
+            continue
+        env = profile.provider_cfg.get("api_key_env_var")
+        if env and not os.getenv(env):
+            continue
+        same_provider = base is not None and profile.provider_name == base.provider_name
+        auto.append((not same_provider, float(cfg.get("input_token_ppm", 0.0)), key))
+    return configured + [k for _, _, k in sorted(auto)]
+
+
+def check_context_window(
+    model_key: str,
+    messages: List[Dict[str, Any]],
+    *,
+    max_output_tokens: Optional[int] = None,
+    service_tier: str = "auto",
+    pydantic_model: Optional[Type] = None,
+    root_cfg: Optional[Dict[str, Any]] = None,
+    prior: Optional[TokenEstimate] = None,
+) -> TokenEstimate:
+    """
+    Return an estimate for a model that can take the request, rerouting if allowed.
+
+    `prior` (an earlier estimate of the same messages, e.g. the budget
+    scheduler's) saves re-counting the tokens; see `estimate_request`.
+
+    Raises:
+        ContextWindowExceededError: If nothing fits (or on_overflow is "reject")
+    """
+    resolved = get_resolved_llm_config()
+    guard = resolve_context_guard(root_cfg if root_cfg is not None else resolved.root)
+    kwargs = dict(
+        max_output_tokens=max_output_tokens,
+        service_tier=service_tier,
+        pydantic_model=pydantic_model,
+        root_cfg=root_cfg,
+    )
+    estimate = estimate_request(model_key, messages, prior=prior, **kwargs)
+    if estimate.fits or not guard.get("enabled", True):
+        return estimate
+
+    if guard.get("on_overflow") == "reroute":
+        for candidate in _fallback_candidates(model_key, guard):
+            # The requested output cap belonged to the original model
+            alt = estimate_request(candidate, messages, **dict(kwargs, max_output_tokens=None))
+            if alt.fits:
+                alt.rerouted_from = model_key
+                try:
+                    get_logger().warning(
+                        "Context guard rerouted request | from=%s | to=%s | est_input=%s | reason=%s",
+                        model_key, candidate, alt.input_tokens, estimate.reason,
+                    )
+                except Exception:
+                    pass
+                return alt
+
+    raise ContextWindowExceededError(f"Request too large for '{model_key}': {estimate.reason}")
+
+
+__all__ = [
+    "ContextWindowExceededError",
+    "DEFAULT_CONTEXT_GUARD",
+    "TokenEstimate",
+    "TokenEstimator",
+    "check_context_window",
+    "estimate_request",
+    "get_token_estimator",
+    "resolve_context_guard",
+]
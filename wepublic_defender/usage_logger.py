@@ -1,9 +1,48 @@
-"""CSV usage logging for cost tracking."""
+"""
+CSV usage logging for cost tracking.
+
+Rows are queued on the background side-effect writer (see side_effects.py),
+so calls logged from a parallel fan-out are appended in one batch without
+blocking the event loop.
+"""
 import csv
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from .side_effects import get_side_effect_writer
+
+
+USAGE_LOG_HEADER = [
+    "timestamp",
+    "agent",
+    "model",
+    "file",
+    "input_tokens",
+    "output_tokens",
+    "cached_tokens",
+    "cost",
+    "duration",
+    "status",
+    "error",
+]
+
+
+def usage_log_path() -> Path:
+    """Return .wepublic_defender/usage_log.csv in the case root (cwd or nearest parent)."""
+    # Find case root (where .wepublic_defender exists)
+    cwd = Path.cwd()
+    wpd_dir = cwd / ".wepublic_defender"
+
+    # If not in case root, try to find it
+    if not wpd_dir.exists():
+        for parent in cwd.parents:
+            if (parent / ".wepublic_defender").exists():
+                wpd_dir = parent / ".wepublic_defender"
+                break
+
+    return wpd_dir / "usage_log.csv"
 
 
 def log_agent_call(
@@ -18,54 +57,29 @@ def log_agent_call(
     status: str = "success",
     error: Optional[str] = None,
 ) -> None:
-    """Append agent call to usage log CSV."""
-    # Find case root (where .wepublic_defender exists)
-    cwd = Path.cwd()
-    wpd_dir = cwd / ".wepublic_defender"
+    """Append agent call to usage log CSV (queued; written in the background)."""
+    row = [
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        agent,
+        model,
+        file_or_text,
+        input_tokens,
+        output_tokens,
+        cached_tokens,
+        f"{cost:.6f}",
+        f"{duration:.2f}",
+        status,
+        error or "",
+    ]
+    get_side_effect_writer().submit(usage_log_path(), row, _append_rows)
 
-    # If not in case root, try to find it
-    if not wpd_dir.exists():
-        for parent in cwd.parents:
-            if (parent / ".wepublic_defender").exists():
-                wpd_dir = parent / ".wepublic_defender"
-                break
-
-    # Create .wepublic_defender if needed
-    wpd_dir.mkdir(parents=True, exist_ok=True)
-
-    csv_path = wpd_dir / "usage_log.csv"
 
-    # Create with headers if new
+def _append_rows(csv_path: Path, rows: List[List[object]]) -> None:
+    """Append a batch of rows, creating the file with headers if new."""
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
     is_new = not csv_path.exists()
-
     with open(csv_path, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-
         if is_new:
-            writer.writerow([
-                "timestamp",
-                "agent",
-                "model",
-                "file",
-                "input_tokens",
-                "output_tokens",
-                "cached_tokens",
-                "cost",
-                "duration",
-                "status",
-                "error",
-            ])
-
-        writer.writerow([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            agent,
-            model,
-            file_or_text,
-            input_tokens,
-            output_tokens,
-            cached_tokens,
-            f"{cost:.6f}",
-            f"{duration:.2f}",
-            status,
-            error or "",
-        ])
+            writer.writerow(USAGE_LOG_HEADER)
+        writer.writerows(rows)